@@ -17,11 +17,23 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
+import inspect
 from abc import ABC, abstractmethod
 from typing import Dict, Optional
 
 from playwright.async_api import BrowserContext, BrowserType, Playwright
 
+from tools.metrics import instrument_store_method
+
+
+def _instrument_store_methods(cls):
+    """
+    为存储实现中定义的 store_xxx 协程方法加上指标统计（存储条数、耗时、异常），item_type 为 xxx
+    """
+    for name, value in list(vars(cls).items()):
+        if name.startswith("store_") and inspect.iscoroutinefunction(value):
+            setattr(cls, name, instrument_store_method(value, name[len("store_"):]))
+
 
 class AbstractCrawler(ABC):
 
@@ -85,6 +97,10 @@ class AbstractLogin(ABC):
 
 class AbstractStore(ABC):
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _instrument_store_methods(cls)
+
     @abstractmethod
     async def store_content(self, content_item: Dict):
         pass
@@ -101,6 +117,11 @@ class AbstractStore(ABC):
 
 
 class AbstractStoreImage(ABC):
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _instrument_store_methods(cls)
+
     # TODO: support all platform
     # only weibo is supported
     # @abstractmethod
@@ -109,6 +130,11 @@ class AbstractStoreImage(ABC):
 
 
 class AbstractStoreVideo(ABC):
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _instrument_store_methods(cls)
+
     # TODO: support all platform
     # only weibo is supported
     # @abstractmethod
@@ -0,0 +1,602 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/benchmarks/crawler_benchmark.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 端到端吞吐压测：各平台 client 的 搜索 -> 详情 -> 创作者 流程跑在本地模拟平台服务上，
+#            统计 请求数/秒、条目数/秒、p50/p99 延迟和进程峰值内存，可与基线对比用于 CI 发现性能回退
+# 用法（项目根目录下执行，自动在子进程中启动 mock_platform_server）：
+#   python -m benchmarks.crawler_benchmark --platforms xhs dy bili ks wb --concurrency 20 --latency-ms 20
+#   python -m benchmarks.crawler_benchmark --output bench.json --baseline benchmarks/baseline.json --tolerance 0.2
+#
+# 说明：
+#   - 请求经过真实的限流器、并发调度器、代理租用和共享连接池，响应缓存关闭
+#   - 浏览器相关部分不参与压测：playwright page 替换为返回固定 localStorage 的假对象，
+#     小红书签名和抖音 a_bogus 返回固定值（签名性能见 xhs_sign_benchmark / js_sign_benchmark），
+#     B 站 wbi 签名为纯 Python 计算，保留
+#   - 峰值内存为整个压测进程的 ru_maxrss，只增不减，多个平台依次运行时为运行到该平台为止的峰值
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+from abc import ABC, abstractmethod
+from contextlib import ExitStack, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+from unittest import mock
+
+import httpx
+
+import config
+from benchmarks.mock_platform_server import (
+    MockServerSettings,
+    add_server_args,
+    build_settings,
+    run_server,
+)
+from tools.http_client import close_http_clients
+from tools.response_cache import close_response_caches
+
+MOCK_USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+MOCK_WBI_IMG_URLS = (
+    "https://i0.hdslb.com/bfs/wbi/7cd084941338484aae1ad9425b84077c.png-"
+    "https://i0.hdslb.com/bfs/wbi/4932caff0ff746eab6f01bf08b70ac45.png"
+)
+
+# 与基线对比的指标：(指标, 越大越好)
+REGRESSION_METRICS = (
+    ("requests_per_sec", True),
+    ("items_per_sec", True),
+    ("p99_ms", False),
+    ("peak_rss_mb", False),
+)
+
+
+class _FakeBrowserContext:
+
+    async def cookies(self, urls: Optional[List[str]] = None) -> List[Dict]:
+        return []
+
+
+class _FakePage:
+    """
+    代替 playwright Page，只提供 client 在请求路径上用到的 evaluate / goto / context
+    """
+
+    def __init__(self, local_storage: Optional[Dict[str, str]] = None):
+        self.local_storage = local_storage or {}
+        self.context = _FakeBrowserContext()
+
+    async def evaluate(self, expression: str, arg: Any = None) -> Any:
+        return dict(self.local_storage)
+
+    async def goto(self, url: str, **kwargs):
+        return None
+
+
+class _StaticXhsSignEngine:
+    """
+    返回固定签名头的小红书签名引擎
+    """
+
+    async def sign(self, uri: str, data: Any = None, a1: str = "", method: str = "POST") -> Dict[str, str]:
+        return {"x-s": "XYW_mock", "x-t": str(int(time.time() * 1000)), "x-s-common": "mock", "x-b3-traceid": "mock"}
+
+    def invalidate(self):
+        pass
+
+
+async def _static_a_bogus(url: str, params: str, post_data: dict, user_agent: str, page: Any = None) -> str:
+    return "mock_a_bogus"
+
+
+def _mock_headers(origin: str) -> Dict[str, str]:
+    return {
+        "User-Agent": MOCK_USER_AGENT,
+        "Cookie": "a1=mock; web_session=mock",
+        "Origin": origin,
+        "Referer": origin,
+        "Content-Type": "application/json;charset=UTF-8",
+    }
+
+
+class PlatformFlow(ABC):
+    """
+    一个平台的压测流程，search 返回 [{"id", "creator_id", ...}]，detail / creator 返回拿到的条目数
+    """
+
+    platform: str = ""
+
+    @abstractmethod
+    def build_client(self, base_url: str) -> Any:
+        pass
+
+    def patches(self) -> List[Tuple[Any, str, Any]]:
+        """
+        压测期间需要替换的模块属性 (模块, 属性名, 替换值)
+        """
+        return []
+
+    @abstractmethod
+    async def search(self, client: Any, keyword: str, page: int) -> List[Dict]:
+        pass
+
+    @abstractmethod
+    async def detail(self, client: Any, item: Dict) -> int:
+        pass
+
+    @abstractmethod
+    async def creator(self, client: Any, creator_id: str) -> int:
+        pass
+
+
+class XhsFlow(PlatformFlow):
+    platform = "xhs"
+
+    def build_client(self, base_url: str) -> Any:
+        from media_platform.xhs.client import XiaoHongShuClient
+
+        client = XiaoHongShuClient(
+            headers=_mock_headers(base_url), playwright_page=_FakePage(), cookie_dict={"a1": "mock"}
+        )
+        client._host = client._domain = f"{base_url}/xhs"
+        client._sign_engine = _StaticXhsSignEngine()
+        return client
+
+    async def search(self, client: Any, keyword: str, page: int) -> List[Dict]:
+        res = await client.get_note_by_keyword(keyword=keyword, page=page)
+        return [
+            {"id": item["id"], "xsec_token": item.get("xsec_token", ""), "creator_id": item["note_card"]["user"]["user_id"]}
+            for item in res.get("items", [])
+        ]
+
+    async def detail(self, client: Any, item: Dict) -> int:
+        return int(bool(await client.get_note_by_id(item["id"], "pc_search", item["xsec_token"])))
+
+    async def creator(self, client: Any, creator_id: str) -> int:
+        count = int(bool(await client.get_creator_info(creator_id)))
+        cursor, has_more = "", True
+        while has_more:
+            res = await client.get_notes_by_creator(creator_id, cursor)
+            count += len(res.get("notes", []))
+            cursor, has_more = res.get("cursor", ""), res.get("has_more", False)
+        return count
+
+
+class DouyinFlow(PlatformFlow):
+    platform = "dy"
+
+    def build_client(self, base_url: str) -> Any:
+        from media_platform.douyin.client import DouYinClient
+
+        client = DouYinClient(
+            headers=_mock_headers(base_url), playwright_page=_FakePage({"xmst": "mock"}), cookie_dict={}
+        )
+        client._host = f"{base_url}/dy"
+        return client
+
+    def patches(self) -> List[Tuple[Any, str, Any]]:
+        from media_platform.douyin import client as douyin_client
+
+        return [(douyin_client, "get_a_bogus", _static_a_bogus)]
+
+    async def search(self, client: Any, keyword: str, page: int) -> List[Dict]:
+        res = await client.search_info_by_keyword(keyword=keyword, offset=(page - 1) * 15)
+        return [
+            {"id": item["aweme_info"]["aweme_id"], "creator_id": item["aweme_info"]["author"]["sec_uid"]}
+            for item in res.get("data", [])
+        ]
+
+    async def detail(self, client: Any, item: Dict) -> int:
+        return int(bool(await client.get_video_by_id(item["id"])))
+
+    async def creator(self, client: Any, creator_id: str) -> int:
+        count = int(bool(await client.get_user_info(creator_id)))
+        max_cursor, has_more = "", 1
+        while has_more:
+            res = await client.get_user_aweme_posts(creator_id, max_cursor)
+            count += len(res.get("aweme_list", []))
+            max_cursor, has_more = str(res.get("max_cursor", "")), res.get("has_more", 0)
+        return count
+
+
+class BilibiliFlow(PlatformFlow):
+    platform = "bili"
+
+    def build_client(self, base_url: str) -> Any:
+        from media_platform.bilibili.client import BilibiliClient
+
+        client = BilibiliClient(
+            headers=_mock_headers(base_url), playwright_page=_FakePage({"wbi_img_urls": MOCK_WBI_IMG_URLS}), cookie_dict={}
+        )
+        client._host = f"{base_url}/bili"
+        return client
+
+    async def search(self, client: Any, keyword: str, page: int) -> List[Dict]:
+        res = await client.search_video_by_keyword(keyword=keyword, page=page)
+        return [{"id": item["aid"], "creator_id": item["mid"]} for item in res.get("result", [])]
+
+    async def detail(self, client: Any, item: Dict) -> int:
+        return int(bool(await client.get_video_info(aid=item["id"])))
+
+    async def creator(self, client: Any, creator_id: str) -> int:
+        count = int(bool(await client.get_creator_info(creator_id)))
+        pn = 1
+        while True:
+            res = await client.get_creator_videos(creator_id, pn)
+            videos = res.get("list", {}).get("vlist", [])
+            count += len(videos)
+            page_info = res.get("page", {})
+            if not videos or pn * page_info.get("ps", len(videos)) >= page_info.get("count", 0):
+                return count
+            pn += 1
+
+
+class KuaishouFlow(PlatformFlow):
+    platform = "ks"
+
+    def build_client(self, base_url: str) -> Any:
+        from media_platform.kuaishou.client import KuaiShouClient
+
+        client = KuaiShouClient(headers=_mock_headers(base_url), playwright_page=_FakePage(), cookie_dict={})
+        client._host = f"{base_url}/ks/graphql"
+        return client
+
+    async def search(self, client: Any, keyword: str, page: int) -> List[Dict]:
+        res = await client.search_info_by_keyword(keyword=keyword, pcursor=str(page - 1) if page > 1 else "")
+        return [
+            {"id": feed["photo"]["id"], "creator_id": feed["author"]["id"]}
+            for feed in res.get("visionSearchPhoto", {}).get("feeds", [])
+        ]
+
+    async def detail(self, client: Any, item: Dict) -> int:
+        return int(bool(await client.get_video_info(item["id"])))
+
+    async def creator(self, client: Any, creator_id: str) -> int:
+        # 与 KuaishouCrawler 一致，用户信息取 visionProfile.userProfile
+        profile = await client.get_creator_profile(creator_id)
+        count = int(bool(profile.get("visionProfile", {}).get("userProfile")))
+        pcursor = ""
+        while pcursor != "no_more":
+            res = await client.get_video_by_creater(creator_id, pcursor)
+            photo_list = res.get("visionProfilePhotoList", {})
+            count += len(photo_list.get("feeds", []))
+            pcursor = photo_list.get("pcursor", "no_more")
+        return count
+
+
+class WeiboFlow(PlatformFlow):
+    platform = "wb"
+
+    def build_client(self, base_url: str) -> Any:
+        from media_platform.weibo.client import WeiboClient
+
+        client = WeiboClient(headers=_mock_headers(base_url), playwright_page=_FakePage(), cookie_dict={})
+        client._host = f"{base_url}/wb"
+        return client
+
+    async def search(self, client: Any, keyword: str, page: int) -> List[Dict]:
+        res = await client.get_note_by_keyword(keyword=keyword, page=page)
+        return [
+            {"id": card["mblog"]["id"], "creator_id": card["mblog"]["user"]["id"]}
+            for card in res.get("cards", []) if card.get("card_type") == 9
+        ]
+
+    async def detail(self, client: Any, item: Dict) -> int:
+        return int(bool(await client.get_note_info_by_id(item["id"])))
+
+    async def creator(self, client: Any, creator_id: str) -> int:
+        res = await client.get_creator_info_by_id(creator_id)
+        count = int(bool(res.get("userInfo")))
+        since_id = "0"
+        while since_id:
+            # 与 WeiboCrawler 一致，用户微博列表的容器ID为 107603 + 用户ID
+            res = await client.get_notes_by_creator(creator_id, f"107603{creator_id}", since_id)
+            count += len(res.get("cards", []))
+            since_id = str(res.get("cardlistInfo", {}).get("since_id", ""))
+        return count
+
+
+PLATFORM_FLOWS: Dict[str, Callable[[], PlatformFlow]] = {
+    "xhs": XhsFlow,
+    "dy": DouyinFlow,
+    "bili": BilibiliFlow,
+    "ks": KuaishouFlow,
+    "wb": WeiboFlow,
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    最近秩百分位数
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    当前进程的峰值常驻内存（MB），不支持的系统（Windows）返回 None
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节，Linux 为 KB
+    return max_rss / 1024 / 1024 if sys.platform == "darwin" else max_rss / 1024
+
+
+class StageStats:
+    """
+    一个阶段（search / detail / creator）的耗时与条目统计
+    """
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.items = 0
+        self.errors = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            "ops": len(self.latencies),
+            "items": self.items,
+            "errors": self.errors,
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 2),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 2),
+        }
+
+
+@contextmanager
+def benchmark_config(platform: str, concurrency: int, max_rps: float) -> Iterator[None]:
+    """
+    压测期间的配置：不限速到 max_rps、并发 concurrency、关闭响应缓存，结束后恢复
+    """
+    overrides = {
+        "PLATFORM": platform,
+        "MAX_CONCURRENCY_NUM": concurrency,
+        "CRAWLER_MAX_SLEEP_SEC": 0,
+        "RATE_LIMIT_MAX_RPS": max_rps,
+        "RATE_LIMIT_BURST": concurrency,
+        "ENABLE_RESPONSE_CACHE": False,
+    }
+    with ExitStack() as stack:
+        for name, value in overrides.items():
+            stack.enter_context(mock.patch.object(config, name, value))
+        yield
+
+
+async def _fetch_server_stats(base_url: str) -> Dict[str, int]:
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"{base_url}/__stats")
+        return response.json()
+
+
+async def run_flow(
+    flow: PlatformFlow,
+    base_url: str,
+    keywords: List[str],
+    pages: int,
+    max_creators: int,
+    concurrency: int,
+) -> Dict:
+    """
+    跑一个平台的 搜索 -> 详情 -> 创作者 流程
+    Returns:
+        指标字典
+    """
+    client = flow.build_client(base_url)
+    stages = {stage: StageStats() for stage in ("search", "detail", "creator")}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(stage: str, operation: Callable[[], Awaitable[Any]], count: Callable[[Any], int]) -> Any:
+        stats = stages[stage]
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await operation()
+            except Exception:
+                stats.errors += 1
+                return None
+            finally:
+                stats.latencies.append(time.perf_counter() - start)
+        stats.items += count(result)
+        return result
+
+    server_stats = await _fetch_server_stats(base_url)
+    requests_before = server_stats.get(f"requests:{flow.platform}", 0)
+    start = time.perf_counter()
+
+    search_results = await asyncio.gather(*(
+        timed("search", lambda keyword=keyword, page=page: flow.search(client, keyword, page), len)
+        for keyword in keywords for page in range(1, pages + 1)
+    ))
+    items: Dict[str, Dict] = {}
+    for result in search_results:
+        for item in result or []:
+            items.setdefault(str(item["id"]), item)
+
+    await asyncio.gather(*(
+        timed("detail", lambda item=item: flow.detail(client, item), int) for item in items.values()
+    ))
+
+    creator_ids = list(dict.fromkeys(str(item["creator_id"]) for item in items.values()))[:max_creators]
+    await asyncio.gather(*(
+        timed("creator", lambda creator_id=creator_id: flow.creator(client, creator_id), int)
+        for creator_id in creator_ids
+    ))
+
+    duration = time.perf_counter() - start
+    server_stats = await _fetch_server_stats(base_url)
+    requests = server_stats.get(f"requests:{flow.platform}", 0) - requests_before
+    latencies = [latency for stats in stages.values() for latency in stats.latencies]
+    total_items = sum(stats.items for stats in stages.values())
+    return {
+        "platform": flow.platform,
+        "duration_sec": round(duration, 3),
+        "requests": requests,
+        "requests_per_sec": round(requests / duration, 2) if duration else 0.0,
+        "items": total_items,
+        "items_per_sec": round(total_items / duration, 2) if duration else 0.0,
+        "errors": sum(stats.errors for stats in stages.values()),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": {stage: stats.to_dict() for stage, stats in stages.items()},
+    }
+
+
+async def run_benchmark(
+    base_url: str,
+    platforms: List[str],
+    keywords: List[str],
+    pages: int = 3,
+    max_creators: int = 5,
+    concurrency: int = 20,
+    max_rps: float = 1000.0,
+) -> List[Dict]:
+    """
+    依次压测多个平台
+    Args:
+        base_url: 模拟平台服务地址
+        platforms: 平台列表，见 PLATFORM_FLOWS
+        keywords: 搜索关键词
+        pages: 每个关键词的搜索页数
+        max_creators: 最多爬取的创作者数
+        concurrency: 并发的流程操作数，同时也是在途请求上限
+        max_rps: 每类接口的限流上限
+
+    Returns:
+        每个平台的指标
+    """
+    results = []
+    for platform in platforms:
+        flow = PLATFORM_FLOWS[platform]()
+        with benchmark_config(platform, concurrency, max_rps), ExitStack() as stack:
+            for target, name, value in flow.patches():
+                stack.enter_context(mock.patch.object(target, name, value))
+            results.append(await run_flow(flow, base_url, keywords, pages, max_creators, concurrency))
+    await close_response_caches()
+    await close_http_clients()
+    return results
+
+
+def check_regressions(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """
+    与基线对比，吞吐下降或延迟 / 内存上升超过 tolerance 的指标视为回退
+    Returns:
+        回退说明列表，空列表表示没有回退
+    """
+    baseline_by_platform = {result["platform"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        base = baseline_by_platform.get(result["platform"])
+        if not base:
+            continue
+        for metric, higher_is_better in REGRESSION_METRICS:
+            current, expected = result.get(metric), base.get(metric)
+            if not current or not expected:
+                continue
+            if higher_is_better and current < expected * (1 - tolerance):
+                regressions.append(f"{result['platform']} {metric}: {current} < baseline {expected}")
+            elif not higher_is_better and current > expected * (1 + tolerance):
+                regressions.append(f"{result['platform']} {metric}: {current} > baseline {expected}")
+    return regressions
+
+
+def _report(result: Dict):
+    rss = f"{result['peak_rss_mb']:.1f}" if result["peak_rss_mb"] is not None else "n/a"
+    print(
+        f"{result['platform']:<6} {result['requests']:>7} req  {result['requests_per_sec']:>9.1f} req/s  "
+        f"{result['items_per_sec']:>9.1f} items/s  p50 {result['p50_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  "
+        f"errors {result['errors']:>4}  peak rss {rss} MB"
+    )
+
+
+@contextmanager
+def mock_server_process(host: str, port: int, settings: MockServerSettings) -> Iterator[str]:
+    """
+    在子进程中启动模拟平台服务，服务可用后返回地址
+    """
+    process = multiprocessing.Process(target=run_server, args=(host, port, settings), daemon=True)
+    process.start()
+    base_url = f"http://{host}:{port}"
+    try:
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                httpx.get(f"{base_url}/__stats", timeout=1)
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline or not process.is_alive():
+                    raise RuntimeError(f"mock platform server did not start on {base_url}")
+                time.sleep(0.1)
+        yield base_url
+    finally:
+        process.terminate()
+        process.join(timeout=5)
+
+
+def main(args: argparse.Namespace) -> int:
+    benchmark_args = (args.platforms, args.keywords, args.pages, args.creators, args.concurrency, args.max_rps)
+    if args.server_url:
+        results = asyncio.run(run_benchmark(args.server_url.rstrip("/"), *benchmark_args))
+    else:
+        with mock_server_process(args.host, args.port, build_settings(args)) as base_url:
+            results = asyncio.run(run_benchmark(base_url, *benchmark_args))
+
+    for result in results:
+        _report(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = check_regressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"[regression] {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end crawler throughput benchmark against a mock platform server")
+    parser.add_argument("--platforms", nargs="+", default=list(PLATFORM_FLOWS), choices=list(PLATFORM_FLOWS))
+    parser.add_argument("--keywords", nargs="+", default=["编程副业", "编程兼职"], help="search keywords")
+    parser.add_argument("--pages", type=int, default=3, help="search pages per keyword")
+    parser.add_argument("--creators", type=int, default=5, help="creators to crawl per platform")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent flow operations and in-flight requests")
+    parser.add_argument("--max-rps", type=float, default=1000.0, help="rate limit per endpoint family")
+    parser.add_argument("--server-url", default=None, help="use an already running mock server instead of spawning one")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    parser.add_argument("--baseline", default=None, help="baseline JSON to compare against, exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression against the baseline")
+    add_server_args(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
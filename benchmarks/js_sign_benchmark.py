@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/benchmarks/js_sign_benchmark.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 签名吞吐量对比：execjs 每次调用 vs 常驻签名进程池
+# 用法（项目根目录下执行）：
+#   python -m benchmarks.js_sign_benchmark --count 50 --workers 2
+
+import argparse
+import asyncio
+import time
+from typing import Callable, List
+
+import execjs
+
+import config
+from tools.js_sign_pool import JsSignWorkerPool
+
+DOUYIN_PARAMS = (
+    "device_platform=webapp&aid=6383&channel=channel_pc_web&aweme_id=7345492945006595379"
+    "&cookie_enabled=true&browser_language=zh-CN&browser_platform=Win32&browser_name=Chrome"
+)
+ZHIHU_URL = "/api/v4/search_v3?gk_version=gz-gaokao&t=general&q=python&correction=1&offset=0&limit=20"
+ZHIHU_COOKIES = "d_c0=AEBSbenchmark0000000000000000000000|1700000000"
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
+)
+
+CASES = {
+    "douyin": ("libs/douyin.js", "sign_datail", [DOUYIN_PARAMS, USER_AGENT]),
+    "zhihu": ("libs/zhihu.js", "get_sign", [ZHIHU_URL, ZHIHU_COOKIES]),
+}
+
+
+def _report(name: str, count: int, elapsed: float):
+    print(f"{name:<28} {count:>6} signs  {elapsed:>8.3f}s  {count / elapsed:>10.1f} signs/sec")
+
+
+def bench_execjs(script_path: str, fn: str, args: List, count: int) -> float:
+    with open(script_path, encoding="utf-8-sig") as f:
+        ctx = execjs.compile(f.read())
+    start = time.perf_counter()
+    for _ in range(count):
+        ctx.call(fn, *args)
+    return time.perf_counter() - start
+
+
+async def bench_sign_pool(script_path: str, fn: str, args: List, count: int, workers: int) -> float:
+    pool = JsSignWorkerPool(script_path, worker_num=workers)
+    # 进程启动只发生一次，不计入吞吐
+    await pool.start()
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*[pool.call(fn, *args) for _ in range(count)])
+        return time.perf_counter() - start
+    finally:
+        await pool.close()
+
+
+async def main(platforms: List[str], count: int, workers: int):
+    config.JS_SIGN_HEALTH_CHECK_INTERVAL_SEC = 0
+    print(f"execjs runtime: {execjs.get().name}")
+    for platform in platforms:
+        script_path, fn, args = CASES[platform]
+        print(f"\n[{platform}] {script_path}:{fn}")
+        _report("execjs .call", count, bench_execjs(script_path, fn, args, count))
+        _report(f"sign pool ({workers} workers)", count,
+                await bench_sign_pool(script_path, fn, args, count, workers))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="JS signing throughput benchmark")
+    parser.add_argument("--platforms", nargs="+", choices=list(CASES.keys()), default=list(CASES.keys()))
+    parser.add_argument("--count", type=int, default=50, help="signatures per implementation")
+    parser.add_argument("--workers", type=int, default=2, help="sign pool worker processes")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    cli_args = parse_args()
+    asyncio.run(main(cli_args.platforms, cli_args.count, cli_args.workers))
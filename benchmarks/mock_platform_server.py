@@ -0,0 +1,542 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/benchmarks/mock_platform_server.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 本地模拟平台服务，按 media_platform/*/client.py 用到的接口路径返回录制的或合成的响应，
+#            可配置响应延迟、错误率和验证码（风控）比例，供 crawler_benchmark 离线压测使用
+# 用法（项目根目录下执行）：
+#   python -m benchmarks.mock_platform_server --port 8900 --latency-ms 50 --error-rate 0.01 --captcha-rate 0.01
+#
+# 各平台接口挂在平台前缀下，client 的 _host 指向 http://127.0.0.1:8900/<前缀> 即可：
+#   /xhs  小红书   /dy  抖音   /bili  B站   /ks  快手（GraphQL，按 operationName 分发）   /wb  微博
+#
+# 录制的响应：--record-dir 下按 <前缀>/<路由名>.json（HTML 路由为 .html）存放，存在时替代合成数据，
+# 路由名见 ROUTE_NAMES；/__stats 返回请求计数，/__reset 清零
+
+import argparse
+import asyncio
+import json
+import random
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
+
+PLATFORM_PREFIXES = ("xhs", "dy", "bili", "ks", "wb")
+
+# 路由名，录制响应的文件名与之对应
+ROUTE_NAMES = {
+    "xhs": ("search", "feed", "user_profile", "user_posted"),
+    "dy": ("search", "aweme_detail", "user_profile", "aweme_post"),
+    "bili": ("search", "view_detail", "acc_info", "arc_search"),
+    "ks": ("visionSearchPhoto", "visionVideoDetail", "visionProfile", "visionProfilePhotoList"),
+    "wb": ("search", "detail", "user_info", "user_notes"),
+}
+
+
+class MockServerSettings:
+    """
+    模拟服务的行为配置
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        latency_jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        captcha_rate: float = 0.0,
+        page_size: int = 20,
+        max_pages: int = 5,
+        record_dir: Optional[str] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.captcha_rate = captcha_rate
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.record_dir = Path(record_dir) if record_dir else None
+        self.random = random.Random(seed)
+
+
+class RecordedResponses:
+    """
+    录制的响应，按 (平台前缀, 路由名) 读取一次后缓存
+    """
+
+    def __init__(self, record_dir: Optional[Path]):
+        self.record_dir = record_dir
+        self._cache: Dict[str, Optional[Any]] = {}
+
+    def get(self, prefix: str, route: str, html: bool = False) -> Optional[Any]:
+        if self.record_dir is None:
+            return None
+        path = self.record_dir / prefix / f"{route}.{'html' if html else 'json'}"
+        key = str(path)
+        if key not in self._cache:
+            if not path.exists():
+                self._cache[key] = None
+            else:
+                content = path.read_text(encoding="utf-8")
+                self._cache[key] = content if html else json.loads(content)
+        return self._cache[key]
+
+
+def _page_of(params: Dict[str, Any], key: str, default: int = 1) -> int:
+    try:
+        return int(params.get(key) or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def _item_ids(prefix: str, seed: str, page: int, page_size: int) -> List[str]:
+    seed_hash = zlib.crc32(seed.encode("utf-8")) % 100000
+    return [f"{prefix}{seed_hash:05d}{page:03d}{index:03d}" for index in range(page_size)]
+
+
+def _creator_id_of(item_id: str, creators: int = 10) -> str:
+    return f"creator{zlib.crc32(item_id.encode('utf-8')) % creators}"
+
+
+# ---------------------------------------------------------------- 小红书
+def xhs_note_card(note_id: str) -> Dict:
+    return {
+        "note_id": note_id,
+        "type": "normal",
+        "title": f"mock note {note_id}",
+        "desc": "mock description " * 8,
+        "time": 1700000000000,
+        "last_update_time": 1700000000000,
+        "ip_location": "上海",
+        "user": {"user_id": _creator_id_of(note_id), "nickname": "mock user", "avatar": "https://example.com/a.jpg"},
+        "interact_info": {"liked_count": "100", "collected_count": "10", "comment_count": "5", "share_count": "1"},
+        "image_list": [{"url_default": f"https://example.com/{note_id}/{index}.jpg"} for index in range(3)],
+        "tag_list": [{"name": "mock", "type": "topic"}],
+    }
+
+
+def xhs_search(settings: MockServerSettings, body: Dict) -> Dict:
+    page = _page_of(body, "page")
+    note_ids = _item_ids("xhs", body.get("keyword", ""), page, settings.page_size)
+    items = [
+        {"id": note_id, "model_type": "note", "xsec_token": f"token-{note_id}", "note_card": xhs_note_card(note_id)}
+        for note_id in note_ids
+    ]
+    return {"has_more": page < settings.max_pages, "items": items}
+
+
+def xhs_user_posted(settings: MockServerSettings, params: Dict) -> Dict:
+    page = _page_of(params, "cursor", 0) + 1
+    note_ids = _item_ids("xhsu", params.get("user_id", ""), page, settings.page_size)
+    notes = [{"note_id": note_id, "xsec_token": f"token-{note_id}", "display_title": "mock"} for note_id in note_ids]
+    return {"has_more": page < settings.max_pages, "cursor": str(page), "notes": notes}
+
+
+def xhs_user_profile_html(user_id: str) -> str:
+    state = {
+        "user": {
+            "userPageData": {
+                "basicInfo": {"nickname": f"mock {user_id}", "gender": 1, "images": "", "desc": "", "ipLocation": "上海"},
+                "interactions": [{"type": "follows", "count": "10"}, {"type": "fans", "count": "100"}],
+                "tags": [{"tagType": "profession", "name": "mock"}],
+            }
+        }
+    }
+    return f"<html><body><script>window.__INITIAL_STATE__={json.dumps(state, ensure_ascii=False)}</script></body></html>"
+
+
+# ---------------------------------------------------------------- 抖音
+def dy_aweme(aweme_id: str) -> Dict:
+    return {
+        "aweme_id": aweme_id,
+        "desc": f"mock aweme {aweme_id}",
+        "create_time": 1700000000,
+        "author": {"uid": _creator_id_of(aweme_id), "sec_uid": _creator_id_of(aweme_id), "nickname": "mock user"},
+        "statistics": {"digg_count": 100, "comment_count": 5, "share_count": 1, "collect_count": 10},
+        "video": {"play_addr": {"url_list": [f"https://example.com/{aweme_id}.mp4"]}, "cover": {"url_list": []}},
+    }
+
+
+def dy_search(settings: MockServerSettings, params: Dict) -> Dict:
+    offset = _page_of(params, "offset", 0)
+    page = offset // 15 + 1
+    aweme_ids = _item_ids("dy", params.get("keyword", ""), page, settings.page_size)
+    return {
+        "status_code": 0,
+        "has_more": int(page < settings.max_pages),
+        "cursor": offset + 15,
+        "data": [{"type": 1, "aweme_info": dy_aweme(aweme_id)} for aweme_id in aweme_ids],
+        "extra": {"logid": "mock"},
+    }
+
+
+def dy_aweme_post(settings: MockServerSettings, params: Dict) -> Dict:
+    page = _page_of(params, "max_cursor", 0) + 1
+    aweme_ids = _item_ids("dyu", params.get("sec_user_id", ""), page, settings.page_size)
+    return {
+        "status_code": 0,
+        "has_more": int(page < settings.max_pages),
+        "max_cursor": page,
+        "aweme_list": [dy_aweme(aweme_id) for aweme_id in aweme_ids],
+    }
+
+
+# ---------------------------------------------------------------- B站
+def bili_video(aid: int) -> Dict:
+    return {
+        "aid": aid,
+        "bvid": f"BV{aid}",
+        "title": f"mock video {aid}",
+        "desc": "mock description",
+        "pubdate": 1700000000,
+        "cid": aid + 1,
+        "owner": {"mid": aid % 10 + 1, "name": "mock user", "face": ""},
+        "stat": {"view": 1000, "like": 100, "coin": 10, "favorite": 10, "reply": 5, "share": 1, "danmaku": 3},
+    }
+
+
+def bili_envelope(data: Dict) -> Dict:
+    return {"code": 0, "message": "0", "ttl": 1, "data": data}
+
+
+def bili_search(settings: MockServerSettings, params: Dict) -> Dict:
+    page = _page_of(params, "page")
+    aids = [int(item_id) for item_id in _item_ids("", params.get("keyword", ""), page, settings.page_size)]
+    result = [{"type": "video", "aid": aid, "bvid": f"BV{aid}", "mid": aid % 10 + 1} for aid in aids]
+    return bili_envelope({"page": page, "numPages": settings.max_pages, "result": result})
+
+
+def bili_arc_search(settings: MockServerSettings, params: Dict) -> Dict:
+    page = _page_of(params, "pn")
+    aids = [int(item_id) for item_id in _item_ids("", f"up{params.get('mid', '')}", page, settings.page_size)]
+    vlist = [{"aid": aid, "bvid": f"BV{aid}", "title": "mock"} for aid in aids]
+    return bili_envelope({
+        "list": {"vlist": vlist},
+        "page": {"pn": page, "ps": settings.page_size, "count": settings.page_size * settings.max_pages},
+    })
+
+
+# ---------------------------------------------------------------- 快手
+def ks_feed(photo_id: str) -> Dict:
+    return {
+        "photo": {
+            "id": photo_id,
+            "caption": f"mock photo {photo_id}",
+            "timestamp": 1700000000000,
+            "likeCount": "100",
+            "viewCount": "1000",
+            "coverUrl": "",
+            "photoUrl": f"https://example.com/{photo_id}.mp4",
+        },
+        "author": {"id": _creator_id_of(photo_id), "name": "mock user", "headerUrl": ""},
+    }
+
+
+def ks_graphql(settings: MockServerSettings, body: Dict) -> Dict:
+    operation = body.get("operationName", "")
+    variables = body.get("variables") or {}
+    if operation == "visionSearchPhoto":
+        page = _page_of(variables, "pcursor", 0) + 1
+        photo_ids = _item_ids("ks", variables.get("keyword", ""), page, settings.page_size)
+        data = {"visionSearchPhoto": {
+            "result": 1,
+            "pcursor": str(page) if page < settings.max_pages else "no_more",
+            "searchSessionId": "mock-session",
+            "feeds": [ks_feed(photo_id) for photo_id in photo_ids],
+        }}
+    elif operation == "visionVideoDetail":
+        data = {"visionVideoDetail": {"status": 1, **ks_feed(variables.get("photoId", "ks0"))}}
+    elif operation == "visionProfile":
+        user_id = variables.get("userId", "")
+        data = {"visionProfile": {"result": 1, "userProfile": {
+            "profile": {"user_id": user_id, "user_name": f"mock {user_id}", "gender": "F", "user_text": ""},
+            "ownerCount": {"fan": 100, "follow": 10, "photo_public": settings.page_size * settings.max_pages},
+        }}}
+    elif operation == "visionProfilePhotoList":
+        page = _page_of(variables, "pcursor", 0) + 1
+        photo_ids = _item_ids("ksu", variables.get("userId", ""), page, settings.page_size)
+        data = {"visionProfilePhotoList": {
+            "result": 1,
+            "pcursor": str(page) if page < settings.max_pages else "no_more",
+            "feeds": [ks_feed(photo_id) for photo_id in photo_ids],
+        }}
+    else:
+        return {"errors": [{"message": f"unsupported operation {operation}"}], "data": None}
+    return {"data": data}
+
+
+# ---------------------------------------------------------------- 微博
+def wb_mblog(mid: str) -> Dict:
+    return {
+        "id": mid,
+        "mid": mid,
+        "text": f"mock weibo {mid}",
+        "created_at": "Tue Nov 14 10:00:00 +0800 2023",
+        "attitudes_count": 100,
+        "comments_count": 5,
+        "reposts_count": 1,
+        "region_name": "发布于 上海",
+        "user": {"id": _creator_id_of(mid), "screen_name": "mock user", "gender": "f", "profile_image_url": ""},
+    }
+
+
+def wb_envelope(data: Dict) -> Dict:
+    return {"ok": 1, "data": data}
+
+
+def wb_search(settings: MockServerSettings, params: Dict) -> Dict:
+    page = _page_of(params, "page")
+    mids = _item_ids("wb", params.get("containerid", ""), page, settings.page_size)
+    return wb_envelope({
+        "cardlistInfo": {"page": page + 1 if page < settings.max_pages else None},
+        "cards": [{"card_type": 9, "mblog": wb_mblog(mid)} for mid in mids],
+    })
+
+
+def wb_user_info(params: Dict) -> Dict:
+    user_id = params.get("value", "")
+    return wb_envelope({"userInfo": {
+        "id": user_id, "screen_name": f"mock {user_id}", "gender": "f", "description": "",
+        "followers_count": 100, "follow_count": 10,
+    }})
+
+
+def wb_user_notes(settings: MockServerSettings, params: Dict) -> Dict:
+    page = _page_of(params, "since_id", 0) + 1
+    mids = _item_ids("wbu", params.get("value", ""), page, settings.page_size)
+    return wb_envelope({
+        "cardlistInfo": {"since_id": str(page) if page < settings.max_pages else ""},
+        "cards": [{"card_type": 9, "mblog": wb_mblog(mid)} for mid in mids],
+    })
+
+
+def wb_detail_html(mid: str) -> str:
+    render_data = json.dumps([{"status": wb_mblog(mid)}], ensure_ascii=False)
+    return f"<html><body><script>var $render_data = {render_data}[0] || {{}};</script></body></html>"
+
+
+# ---------------------------------------------------------------- 错误与验证码
+def captcha_response(prefix: str) -> Response:
+    """
+    各平台风控时的典型响应，对应 client 中的处理分支
+    """
+    if prefix == "xhs":
+        return JSONResponse(
+            {"code": 461, "success": False, "msg": "captcha"},
+            status_code=461,
+            headers={"Verifytype": "102", "Verifyuuid": "mock-verify-uuid"},
+        )
+    if prefix == "dy":
+        return PlainTextResponse("blocked")
+    if prefix == "bili":
+        return JSONResponse({"code": -352, "message": "风控校验失败", "ttl": 1})
+    if prefix == "ks":
+        return JSONResponse({"errors": [{"message": "need captcha", "extensions": {"code": 400002}}], "data": None})
+    # 微博搜索接口风控时返回 432 且不是 JSON（issue #771）
+    return PlainTextResponse("<html>432</html>", status_code=432)
+
+
+def error_response(prefix: str) -> Response:
+    return PlainTextResponse("mock internal server error", status_code=500)
+
+
+def create_app(settings: Optional[MockServerSettings] = None) -> FastAPI:
+    """
+    创建模拟平台服务
+    Args:
+        settings: 延迟、错误率等行为配置
+
+    Returns:
+        FastAPI 应用
+    """
+    settings = settings or MockServerSettings()
+    recorded = RecordedResponses(settings.record_dir)
+    stats: Counter = Counter()
+    app = FastAPI()
+    app.state.settings = settings
+    app.state.stats = stats
+
+    @app.middleware("http")
+    async def simulate_network(request: Request, call_next: Callable):
+        prefix = request.url.path.strip("/").split("/", 1)[0]
+        if prefix not in PLATFORM_PREFIXES:
+            return await call_next(request)
+        stats["requests"] += 1
+        stats[f"requests:{prefix}"] += 1
+        delay = settings.latency_ms + settings.random.uniform(-1, 1) * settings.latency_jitter_ms
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        roll = settings.random.random()
+        if roll < settings.error_rate:
+            stats[f"errors:{prefix}"] += 1
+            return error_response(prefix)
+        if roll < settings.error_rate + settings.captcha_rate:
+            stats[f"captchas:{prefix}"] += 1
+            return captcha_response(prefix)
+        return await call_next(request)
+
+    def replay(prefix: str, route: str, build: Callable[[], Any], html: bool = False) -> Any:
+        payload = recorded.get(prefix, route, html=html)
+        return payload if payload is not None else build()
+
+    @app.get("/__stats")
+    async def get_stats():
+        return dict(stats)
+
+    @app.post("/__reset")
+    async def reset_stats():
+        stats.clear()
+        return {"ok": True}
+
+    # 小红书：接口 edith.xiaohongshu.com，用户主页 www.xiaohongshu.com，两者都指向 /xhs
+    @app.post("/xhs/api/sns/web/v1/search/notes")
+    async def xhs_search_notes(request: Request):
+        body = await request.json()
+        return {"success": True, "code": 0, "data": replay("xhs", "search", lambda: xhs_search(settings, body))}
+
+    @app.post("/xhs/api/sns/web/v1/feed")
+    async def xhs_feed(request: Request):
+        body = await request.json()
+        note_id = body.get("source_note_id", "")
+        data = replay("xhs", "feed", lambda: {"items": [{"id": note_id, "note_card": xhs_note_card(note_id)}]})
+        return {"success": True, "code": 0, "data": data}
+
+    @app.get("/xhs/user/profile/{user_id}")
+    async def xhs_user_profile(user_id: str):
+        return HTMLResponse(replay("xhs", "user_profile", lambda: xhs_user_profile_html(user_id), html=True))
+
+    @app.get("/xhs/api/sns/web/v1/user_posted")
+    async def xhs_posted(request: Request):
+        params = dict(request.query_params)
+        return {"success": True, "code": 0, "data": replay("xhs", "user_posted", lambda: xhs_user_posted(settings, params))}
+
+    # 抖音
+    @app.get("/dy/aweme/v1/web/general/search/single/")
+    async def dy_search_single(request: Request):
+        params = dict(request.query_params)
+        return replay("dy", "search", lambda: dy_search(settings, params))
+
+    @app.get("/dy/aweme/v1/web/aweme/detail/")
+    async def dy_aweme_detail(request: Request):
+        aweme_id = request.query_params.get("aweme_id", "")
+        return replay("dy", "aweme_detail", lambda: {"status_code": 0, "aweme_detail": dy_aweme(aweme_id)})
+
+    @app.get("/dy/aweme/v1/web/user/profile/other/")
+    async def dy_user_profile(request: Request):
+        sec_user_id = request.query_params.get("sec_user_id", "")
+        return replay("dy", "user_profile", lambda: {"status_code": 0, "user": {
+            "sec_uid": sec_user_id, "nickname": f"mock {sec_user_id}", "follower_count": 100, "following_count": 10,
+            "aweme_count": settings.page_size * settings.max_pages, "total_favorited": 1000,
+        }})
+
+    @app.get("/dy/aweme/v1/web/aweme/post/")
+    async def dy_post(request: Request):
+        params = dict(request.query_params)
+        return replay("dy", "aweme_post", lambda: dy_aweme_post(settings, params))
+
+    # B站
+    @app.get("/bili/x/web-interface/wbi/search/type")
+    async def bili_search_type(request: Request):
+        params = dict(request.query_params)
+        return replay("bili", "search", lambda: bili_search(settings, params))
+
+    @app.get("/bili/x/web-interface/view/detail")
+    async def bili_view_detail(request: Request):
+        aid = _page_of(dict(request.query_params), "aid", 0)
+        return replay("bili", "view_detail", lambda: bili_envelope({"View": bili_video(aid)}))
+
+    @app.get("/bili/x/space/wbi/acc/info")
+    async def bili_acc_info(request: Request):
+        mid = request.query_params.get("mid", "")
+        return replay("bili", "acc_info", lambda: bili_envelope({
+            "mid": mid, "name": f"mock {mid}", "sex": "保密", "face": "", "sign": "", "level": 6,
+        }))
+
+    @app.get("/bili/x/space/wbi/arc/search")
+    async def bili_arc(request: Request):
+        params = dict(request.query_params)
+        return replay("bili", "arc_search", lambda: bili_arc_search(settings, params))
+
+    # 快手：所有请求 POST 到同一个 GraphQL 地址
+    @app.post("/ks/graphql")
+    async def ks_graphql_endpoint(request: Request):
+        body = await request.json()
+        return replay("ks", body.get("operationName", ""), lambda: ks_graphql(settings, body))
+
+    # 微博：搜索、用户信息和用户微博共用 getIndex，按 containerid 区分
+    @app.get("/wb/api/container/getIndex")
+    async def wb_get_index(request: Request):
+        params = dict(request.query_params)
+        containerid = params.get("containerid", "")
+        if containerid.startswith("100103"):
+            return replay("wb", "search", lambda: wb_search(settings, params))
+        if containerid.startswith("100505"):
+            return replay("wb", "user_info", lambda: wb_user_info(params))
+        return replay("wb", "user_notes", lambda: wb_user_notes(settings, params))
+
+    @app.get("/wb/detail/{mid}")
+    async def wb_detail(mid: str):
+        return HTMLResponse(replay("wb", "detail", lambda: wb_detail_html(mid), html=True))
+
+    return app
+
+
+def run_server(host: str, port: int, settings: MockServerSettings):
+    uvicorn.run(create_app(settings), host=host, port=port, log_level="warning", access_log=False)
+
+
+def build_settings(args: argparse.Namespace) -> MockServerSettings:
+    return MockServerSettings(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        captcha_rate=args.captcha_rate,
+        page_size=args.page_size,
+        max_pages=args.max_pages,
+        record_dir=args.record_dir,
+        seed=args.seed,
+    )
+
+
+def add_server_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="mean response latency")
+    parser.add_argument("--latency-jitter-ms", type=float, default=5.0, help="uniform latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of HTTP 500 responses")
+    parser.add_argument("--captcha-rate", type=float, default=0.0, help="share of captcha / risk-control responses")
+    parser.add_argument("--page-size", type=int, default=20, help="items per list page")
+    parser.add_argument("--max-pages", type=int, default=5, help="pages before has_more turns false")
+    parser.add_argument("--record-dir", default=None, help="directory of recorded responses to replay")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for latency / errors")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mock media platform server for offline benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_server_args(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    cli_args = parse_args()
+    run_server(cli_args.host, cli_args.port, build_settings(cli_args))
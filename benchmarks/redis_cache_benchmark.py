@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/benchmarks/redis_cache_benchmark.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : Redis 缓存延迟对比：同步 RedisCache（逐个 GET）vs 异步 AsyncRedisCache（并发 / SCAN + MGET / pipeline）
+# 用法（项目根目录下执行，需要本机 Redis，连接信息见 config/db_config.py）：
+#   python -m benchmarks.redis_cache_benchmark --count 500 --concurrency 50
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+from cache.async_redis_cache import AsyncRedisCache
+from cache.redis_cache import RedisCache
+
+KEY_PREFIX = "BENCHMARK_"
+EXPIRE_TIME = 60
+IP_VALUE = json.dumps({
+    "ip": "127.0.0.1", "port": 8080, "user": "user", "protocol": "https://",
+    "password": "password", "expired_time_ts": 1700000000,
+})
+
+
+def _report(name: str, count: int, elapsed: float):
+    print(f"{name:<36} {count:>6} ops  {elapsed:>8.3f}s  {elapsed / count * 1000:>8.3f} ms/op")
+
+
+def bench_sync(keys: List[str]) -> Dict[str, float]:
+    cache = RedisCache()
+    results = {}
+
+    start = time.perf_counter()
+    for key in keys:
+        cache.set(key, IP_VALUE, EXPIRE_TIME)
+    results["set"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        cache.get(key)
+    results["get"] = time.perf_counter() - start
+
+    # 旧版 IpCache.load_all_ip 的访问方式：KEYS 后逐个 GET
+    start = time.perf_counter()
+    for key in cache.keys(f"{KEY_PREFIX}*"):
+        cache.get(key)
+    results["load all"] = time.perf_counter() - start
+    return results
+
+
+async def bench_async(keys: List[str], concurrency: int) -> Dict[str, float]:
+    cache = AsyncRedisCache()
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {}
+
+    async def get(key: str):
+        async with semaphore:
+            await cache.get(key)
+
+    try:
+        start = time.perf_counter()
+        await cache.mset({key: IP_VALUE for key in keys}, EXPIRE_TIME)
+        results["set"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await asyncio.gather(*(get(key) for key in keys))
+        results["get"] = time.perf_counter() - start
+
+        # 新版 IpCache.load_all_ip 的访问方式：SCAN 后一次 MGET
+        start = time.perf_counter()
+        await cache.mget(await cache.keys(f"{KEY_PREFIX}*"))
+        results["load all"] = time.perf_counter() - start
+
+        await cache.redis_client.delete(*keys)
+    finally:
+        await cache.close()
+    return results
+
+
+def main(count: int, concurrency: int):
+    keys = [f"{KEY_PREFIX}{index}" for index in range(count)]
+    sync_results = bench_sync(keys)
+    async_results = asyncio.run(bench_async(keys, concurrency))
+    async_names = {
+        "set": "async pipeline SET",
+        "get": f"async GET ({concurrency} concurrent)",
+        "load all": "async SCAN + MGET",
+    }
+    for op, async_name in async_names.items():
+        print(f"\n[{op}]")
+        _report("sync RedisCache", count, sync_results[op])
+        _report(async_name, count, async_results[op])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Redis cache latency benchmark")
+    parser.add_argument("--count", type=int, default=500, help="keys per operation")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent async GETs")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    cli_args = parse_args()
+    main(cli_args.count, cli_args.concurrency)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/benchmarks/xhs_sign_benchmark.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 小红书签名引擎吞吐量对比（signatures/sec）
+# 默认启动本地 Chromium 打开一个注入了 mnsv2 桩函数的页面，测量真实的 page.evaluate 往返开销（不访问小红书）；
+# 没有安装浏览器时可使用 --mock-latency-ms 以模拟的 evaluate 延迟运行
+# 用法（项目根目录下执行）：
+#   python -m benchmarks.xhs_sign_benchmark --count 200 --concurrency 16
+#   python -m benchmarks.xhs_sign_benchmark --mock-latency-ms 2
+
+import argparse
+import asyncio
+import hashlib
+import time
+from typing import Any, Optional
+
+from media_platform.xhs.sign_engine import SIGN_ENGINES, create_sign_engine
+
+STUB_PAGE_URL = "https://www.xiaohongshu.com/explore"
+STUB_PAGE_HTML = """
+<html><body><script>
+window.localStorage.setItem("b1", "benchmark_b1_value");
+window.mnsv2 = (signStr, md5Str) => md5Str.split("").reverse().join("") + signStr.length;
+</script></body></html>
+"""
+
+
+class MockPage:
+    """
+    模拟 playwright Page，用于没有浏览器的环境
+    页面只有一个 JS 线程，evaluate 串行执行，每次固定耗时
+    """
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.evaluate_calls = 0
+        self._js_thread = asyncio.Lock()
+
+    async def evaluate(self, expression: str, arg: Optional[Any] = None) -> Any:
+        self.evaluate_calls += 1
+        async with self._js_thread:
+            await asyncio.sleep(self.latency)
+        if "localStorage" in expression:
+            return "mock_b1" if "getItem" in expression else {"b1": "mock_b1"}
+        if arg is not None:
+            return [hashlib.md5(sign_str.encode()).hexdigest() for sign_str, _ in arg]
+        return hashlib.md5(expression.encode()).hexdigest()
+
+
+async def bench_engine(page, engine_name: str, count: int, concurrency: int) -> float:
+    engine = create_sign_engine(page, engine_name)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def sign_one(index: int):
+        async with semaphore:
+            await engine.sign(
+                uri="/api/sns/web/v1/search/notes",
+                data={"keyword": "编程副业", "page": index, "page_size": 20, "search_id": "2c7hu5b3kzoivkh848hp0"},
+                a1="18c2a8bdaa9l6p4qp9bdr4g0b1nc2rhjt5l2wlfud50000139627",
+                method="POST",
+            )
+
+    # 预热（b1 缓存、页面 JIT）
+    await sign_one(-1)
+    start = time.perf_counter()
+    await asyncio.gather(*[sign_one(i) for i in range(count)])
+    return time.perf_counter() - start
+
+
+async def run(page, count: int, concurrency: int):
+    for engine_name in SIGN_ENGINES:
+        calls_before = getattr(page, "evaluate_calls", None)
+        elapsed = await bench_engine(page, engine_name, count, concurrency)
+        extra = ""
+        if calls_before is not None:
+            extra = f"  evaluate calls: {page.evaluate_calls - calls_before}"
+        print(f"{engine_name:<12} {count:>6} signs  {elapsed:>8.3f}s  {count / elapsed:>10.1f} signs/sec{extra}")
+
+
+async def main(count: int, concurrency: int, mock_latency_ms: Optional[float]):
+    print(f"count={count} concurrency={concurrency}")
+    if mock_latency_ms is not None:
+        print(f"page: mock, evaluate latency {mock_latency_ms}ms")
+        await run(MockPage(mock_latency_ms), count, concurrency)
+        return
+
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.route(STUB_PAGE_URL, lambda route: route.fulfill(content_type="text/html", body=STUB_PAGE_HTML))
+        await page.goto(STUB_PAGE_URL)
+        print("page: chromium with stub mnsv2")
+        try:
+            await run(page, count, concurrency)
+        finally:
+            await browser.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="XHS sign engine throughput benchmark")
+    parser.add_argument("--count", type=int, default=200, help="signatures per engine")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent sign requests")
+    parser.add_argument("--mock-latency-ms", type=float, default=None,
+                        help="use a mock page with the given evaluate latency instead of chromium")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    cli_args = parse_args()
+    asyncio.run(main(cli_args.count, cli_args.concurrency, cli_args.mock_latency_ms))
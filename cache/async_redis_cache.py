@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/cache/async_redis_cache.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# @Desc    : 基于 redis.asyncio 的异步 Redis 缓存，连接池复用连接，
+#            keys 使用 SCAN 迭代代替阻塞 Redis 的 KEYS，批量读写使用 MGET / pipeline
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from redis.asyncio import ConnectionPool, Redis
+
+from cache.abs_cache import AbstractAsyncCache
+from cache.codec import decode_value, encode_value
+from config import db_config
+from tools import utils
+
+# 连接绑定创建时的事件循环，每个事件循环一个连接池
+_connection_pools: Dict[int, ConnectionPool] = {}
+
+
+def _get_connection_pool() -> ConnectionPool:
+    loop_id = id(asyncio.get_running_loop())
+    pool = _connection_pools.get(loop_id)
+    if pool is None:
+        pool = ConnectionPool(
+            host=db_config.REDIS_DB_HOST,
+            port=int(db_config.REDIS_DB_PORT),
+            db=int(db_config.REDIS_DB_NUM),
+            password=db_config.REDIS_DB_PWD,
+            max_connections=db_config.REDIS_MAX_CONNECTIONS,
+        )
+        _connection_pools[loop_id] = pool
+    return pool
+
+
+class AsyncRedisCache(AbstractAsyncCache):
+
+    def __init__(self, redis_client: Optional[Redis] = None) -> None:
+        """
+        Args:
+            redis_client: 指定 redis 客户端，不指定时使用当前事件循环的共享连接池
+        """
+        self._redis_client = redis_client
+
+    @property
+    def redis_client(self) -> Redis:
+        if self._redis_client is None:
+            self._redis_client = Redis(connection_pool=_get_connection_pool())
+        return self._redis_client
+
+    @staticmethod
+    def _decode(key: str, value: Optional[bytes]) -> Any:
+        if value is None:
+            return None
+        try:
+            return decode_value(value)
+        except ValueError as e:
+            # 旧版本使用 pickle 存储的值不再反序列化，按缓存未命中处理
+            utils.logger.warning(f"[AsyncRedisCache._decode] skip undecodable value of key {key}: {e}")
+            return None
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        从缓存中获取键的值, 并且反序列化
+        :param key:
+        :return:
+        """
+        return self._decode(key, await self.redis_client.get(key))
+
+    async def set(self, key: str, value: Any, expire_time: int) -> None:
+        """
+        将键的值设置到缓存中, 并且序列化
+        :param key:
+        :param value:
+        :param expire_time:
+        :return:
+        """
+        await self.redis_client.set(key, encode_value(value), ex=expire_time)
+
+    async def keys(self, pattern: str) -> List[str]:
+        """
+        获取所有符合pattern的key，使用 SCAN 分批迭代，不会长时间阻塞 Redis
+        """
+        return [
+            key.decode()
+            async for key in self.redis_client.scan_iter(match=pattern, count=db_config.REDIS_SCAN_COUNT)
+        ]
+
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        一次 MGET 批量获取多个键的值
+        :param keys:
+        :return: 与 keys 顺序一致的值列表，不存在的键为 None
+        """
+        if not keys:
+            return []
+        values = await self.redis_client.mget(keys)
+        return [self._decode(key, value) for key, value in zip(keys, values)]
+
+    async def mset(self, mapping: Dict[str, Any], expire_time: int) -> None:
+        """
+        批量设置多个键的值，MSET 不支持过期时间，这里用一次 pipeline 发送多条 SET EX
+        :param mapping:
+        :param expire_time:
+        :return:
+        """
+        if not mapping:
+            return
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, encode_value(value), ex=expire_time)
+            await pipe.execute()
+
+    async def close(self) -> None:
+        """
+        关闭客户端，归还连接
+        """
+        if self._redis_client is not None:
+            await self._redis_client.close()
+            self._redis_client = None
+
+
+if __name__ == '__main__':
+    async def _main():
+        redis_cache = AsyncRedisCache()
+        await redis_cache.set("name", "程序员阿江-Relakkes", 1)
+        print(await redis_cache.get("name"))  # Relakkes
+        await redis_cache.mset({"list": [1, 2, 3], "dict": {"a": 1}}, 10)
+        print(await redis_cache.mget(["list", "dict", "missing"]))  # [[1, 2, 3], {'a': 1}, None]
+        print(await redis_cache.keys("*"))
+        await redis_cache.close()
+
+    asyncio.run(_main())
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/cache/codec.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# @Desc    : 缓存值编解码，替代 pickle：字符串/字节原样存储，其余类型使用紧凑 JSON，反序列化不会执行任意代码
+
+import json
+from typing import Any
+
+# 1 字节类型前缀
+_TAG_STR = b"s"
+_TAG_BYTES = b"b"
+_TAG_JSON = b"j"
+
+
+def encode_value(value: Any) -> bytes:
+    """
+    编码缓存值
+    Args:
+        value: str / bytes / 可 JSON 序列化的对象（dict、list、int、float、bool、None）
+
+    Returns:
+        编码后的字节串
+    """
+    if isinstance(value, str):
+        return _TAG_STR + value.encode("utf-8")
+    if isinstance(value, (bytes, bytearray)):
+        return _TAG_BYTES + bytes(value)
+    return _TAG_JSON + json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_value(data: bytes) -> Any:
+    """
+    解码缓存值
+    Args:
+        data: encode_value() 编码的字节串
+
+    Returns:
+        原始值
+
+    Raises:
+        ValueError: 不是 encode_value() 编码的数据（如旧版本 pickle 格式的值）
+    """
+    tag, payload = data[:1], data[1:]
+    if tag == _TAG_STR:
+        return payload.decode("utf-8")
+    if tag == _TAG_BYTES:
+        return payload
+    if tag == _TAG_JSON:
+        return json.loads(payload)
+    raise ValueError(f"unknown cache value format: {data[:8]!r}")
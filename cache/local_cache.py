@@ -25,22 +25,48 @@
 # @Desc    : 本地缓存
 
 import asyncio
+import bisect
+import fnmatch
+import heapq
+import re
 import time
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Tuple
 
 from cache.abs_cache import AbstractCache
+from config import db_config
+
+# glob 模式中第一个通配符之前的部分为字面前缀
+_GLOB_SPECIAL_CHARS = re.compile(r"[*?\[]")
 
 
 class ExpiringLocalCache(AbstractCache):
+    """
+    带过期时间和容量上限的本地缓存
+
+    - 按 LRU 顺序保存，get / set 均为 O(1)，超过 max_size 时淘汰最久未使用的键
+    - 过期时间记录在最小堆中，定时清理只弹出已过期的键，不遍历整个缓存
+    - keys() 支持完整的 glob 语法，按字面前缀在有序键索引上二分查找后再匹配
+    """
 
-    def __init__(self, cron_interval: int = 10):
+    def __init__(self, cron_interval: int = 10, max_size: Optional[int] = None):
         """
         初始化本地缓存
         :param cron_interval: 定时清楚cache的时间间隔
+        :param max_size: 最大键数量，默认使用 db_config.LOCAL_CACHE_MAX_SIZE
         :return:
         """
         self._cron_interval = cron_interval
-        self._cache_container: Dict[str, Tuple[Any, float]] = {}
+        self._max_size = max_size or db_config.LOCAL_CACHE_MAX_SIZE
+        self._cache_container: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        # (过期时间, 键)，键被覆盖或删除后旧记录保留在堆中，弹出时与当前过期时间比对后丢弃
+        self._expire_heap: List[Tuple[float, str]] = []
+        # 有序键列表，只在 keys() 调用且键集合变化后重建
+        self._sorted_keys: Optional[List[str]] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
         self._cron_task: Optional[asyncio.Task] = None
         # 开启定时清理任务
         self._schedule_clear()
@@ -53,6 +79,9 @@ class ExpiringLocalCache(AbstractCache):
         if self._cron_task is not None:
             self._cron_task.cancel()
 
+    def __len__(self) -> int:
+        return len(self._cache_container)
+
     def get(self, key: str) -> Optional[Any]:
         """
         从缓存中获取键的值
@@ -61,13 +90,18 @@ class ExpiringLocalCache(AbstractCache):
         """
         value, expire_time = self._cache_container.get(key, (None, 0))
         if value is None:
+            self.misses += 1
             return None
 
         # 如果键已过期，则删除键并返回None
         if expire_time < time.time():
-            del self._cache_container[key]
+            self._delete(key)
+            self.expirations += 1
+            self.misses += 1
             return None
 
+        self._cache_container.move_to_end(key)
+        self.hits += 1
         return value
 
     def set(self, key: str, value: Any, expire_time: int) -> None:
@@ -78,22 +112,67 @@ class ExpiringLocalCache(AbstractCache):
         :param expire_time:
         :return:
         """
-        self._cache_container[key] = (value, time.time() + expire_time)
+        expire_at = time.time() + expire_time
+        if key in self._cache_container:
+            self._cache_container.move_to_end(key)
+        else:
+            self._sorted_keys = None
+        self._cache_container[key] = (value, expire_at)
+        heapq.heappush(self._expire_heap, (expire_at, key))
+
+        while len(self._cache_container) > self._max_size:
+            self._cache_container.popitem(last=False)
+            self._sorted_keys = None
+            self.evictions += 1
+        self._compact_heap()
 
     def keys(self, pattern: str) -> List[str]:
         """
         获取所有符合pattern的key
-        :param pattern: 匹配模式
+        :param pattern: glob 匹配模式，支持 * ? [seq]
         :return:
         """
         if pattern == '*':
             return list(self._cache_container.keys())
 
-        # 本地缓存通配符暂时将*替换为空
-        if '*' in pattern:
-            pattern = pattern.replace('*', '')
+        special = _GLOB_SPECIAL_CHARS.search(pattern)
+        prefix = pattern[:special.start()] if special else pattern
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self._cache_container.keys())
+        start = bisect.bisect_left(self._sorted_keys, prefix)
+        matched = []
+        for key in self._sorted_keys[start:]:
+            if not key.startswith(prefix):
+                break
+            if fnmatch.fnmatchcase(key, pattern):
+                matched.append(key)
+        return matched
+
+    def stats(self) -> Dict[str, int]:
+        """
+        缓存统计：当前键数量、命中、未命中、容量淘汰、过期清理次数
+        :return:
+        """
+        return {
+            "size": len(self._cache_container),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _delete(self, key: str):
+        del self._cache_container[key]
+        self._sorted_keys = None
 
-        return [key for key in self._cache_container.keys() if pattern in key]
+    def _compact_heap(self):
+        """
+        堆中失效记录过多时（同一个键被反复覆盖或已被淘汰）按当前键重建堆，控制内存
+        """
+        if len(self._expire_heap) <= 2 * len(self._cache_container) + 1024:
+            return
+        self._expire_heap = [(expire_at, key) for key, (_, expire_at) in self._cache_container.items()]
+        heapq.heapify(self._expire_heap)
 
     def _schedule_clear(self):
         """
@@ -111,12 +190,18 @@ class ExpiringLocalCache(AbstractCache):
 
     def _clear(self):
         """
-        根据过期时间清理缓存
+        根据过期时间清理缓存，只处理堆顶已过期的记录
         :return:
         """
-        for key, (value, expire_time) in self._cache_container.items():
-            if expire_time < time.time():
-                del self._cache_container[key]
+        now = time.time()
+        while self._expire_heap and self._expire_heap[0][0] < now:
+            expire_at, key = heapq.heappop(self._expire_heap)
+            entry = self._cache_container.get(key)
+            # 键已被删除或被覆盖为新的过期时间，跳过旧记录
+            if entry is None or entry[1] != expire_at:
+                continue
+            self._delete(key)
+            self.expirations += 1
 
     async def _start_clear_cron(self):
         """
@@ -23,14 +23,15 @@
 # @Name    : 程序员阿江-Relakkes
 # @Time    : 2024/5/29 22:57
 # @Desc    : RedisCache实现
-import pickle
 import time
 from typing import Any, List
 
 from redis import Redis
 
 from cache.abs_cache import AbstractCache
+from cache.codec import decode_value, encode_value
 from config import db_config
+from tools import utils
 
 
 class RedisCache(AbstractCache):
@@ -61,7 +62,12 @@ class RedisCache(AbstractCache):
         value = self._redis_client.get(key)
         if value is None:
             return None
-        return pickle.loads(value)
+        try:
+            return decode_value(value)
+        except ValueError as e:
+            # 旧版本使用 pickle 存储的值不再反序列化，按缓存未命中处理
+            utils.logger.warning(f"[RedisCache.get] skip undecodable value of key {key}: {e}")
+            return None
 
     def set(self, key: str, value: Any, expire_time: int) -> None:
         """
@@ -71,13 +77,16 @@ class RedisCache(AbstractCache):
         :param expire_time:
         :return:
         """
-        self._redis_client.set(key, pickle.dumps(value), ex=expire_time)
+        self._redis_client.set(key, encode_value(value), ex=expire_time)
 
     def keys(self, pattern: str) -> List[str]:
         """
-        获取所有符合pattern的key
+        获取所有符合pattern的key，使用 SCAN 分批迭代，不会长时间阻塞 Redis
         """
-        return [key.decode() for key in self._redis_client.keys(pattern)]
+        return [
+            key.decode()
+            for key in self._redis_client.scan_iter(match=pattern, count=db_config.REDIS_SCAN_COUNT)
+        ]
 
 
 if __name__ == '__main__':
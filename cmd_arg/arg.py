@@ -70,6 +70,7 @@ class SaveDataOptionEnum(str, Enum):
     CSV = "csv"
     DB = "db"
     JSON = "json"
+    JSONL = "jsonl"
     SQLITE = "sqlite"
     MONGODB = "mongodb"
     EXCEL = "excel"
@@ -201,7 +202,7 @@ async def parse_cmd(argv: Optional[Sequence[str]] = None):
             SaveDataOptionEnum,
             typer.Option(
                 "--save_data_option",
-                help="数据保存方式 (csv=CSV文件 | db=MySQL数据库 | json=JSON文件 | sqlite=SQLite数据库 | mongodb=MongoDB数据库 | excel=Excel文件)",
+                help="数据保存方式 (csv=CSV文件 | db=MySQL数据库 | json=JSON文件 | jsonl=JSON Lines文件 | sqlite=SQLite数据库 | mongodb=MongoDB数据库 | excel=Excel文件)",
                 rich_help_panel="存储配置",
             ),
         ] = _coerce_enum(
@@ -223,6 +224,23 @@ async def parse_cmd(argv: Optional[Sequence[str]] = None):
                 rich_help_panel="账号配置",
             ),
         ] = config.COOKIES,
+        workers: Annotated[
+            int,
+            typer.Option(
+                "--workers",
+                help="多进程分片爬取的进程数，关键词/帖子/创作者列表会拆分到各进程",
+                rich_help_panel="基础配置",
+                min=1,
+            ),
+        ] = config.CRAWLER_WORKER_NUM,
+        resume: Annotated[
+            bool,
+            typer.Option(
+                "--resume",
+                help="从上次中断的位置继续爬取，跳过已完成的分页和评论",
+                rich_help_panel="基础配置",
+            ),
+        ] = config.CRAWL_RESUME,
     ) -> SimpleNamespace:
         """MediaCrawler 命令行入口"""
 
@@ -240,6 +258,8 @@ async def parse_cmd(argv: Optional[Sequence[str]] = None):
         config.ENABLE_GET_SUB_COMMENTS = enable_sub_comment
         config.SAVE_DATA_OPTION = save_data_option.value
         config.COOKIES = cookies
+        config.CRAWLER_WORKER_NUM = workers
+        config.CRAWL_RESUME = resume
 
         return SimpleNamespace(
             platform=config.PLATFORM,
@@ -252,6 +272,8 @@ async def parse_cmd(argv: Optional[Sequence[str]] = None):
             save_data_option=config.SAVE_DATA_OPTION,
             init_db=init_db_value,
             cookies=config.COOKIES,
+            workers=config.CRAWLER_WORKER_NUM,
+            resume=config.CRAWL_RESUME,
         )
 
     command = typer.main.get_command(app)
@@ -34,6 +34,32 @@ IP_PROXY_POOL_COUNT = 2
 # 代理IP提供商名称
 IP_PROXY_PROVIDER_NAME = "kuaidaili"  # kuaidaili | wandouhttp
 
+# 代理IP并发验证数
+PROXY_VALIDATE_CONCURRENCY = 10
+
+# 单个代理IP的验证超时时间（秒）
+PROXY_VALIDATE_TIMEOUT_SEC = 5
+
+# 代理IP过期前多少秒开始在后台补充新代理，避免请求等待代理商接口
+PROXY_PREFETCH_BEFORE_EXPIRE_SEC = 60
+
+# 后台检查代理池的间隔（秒）
+PROXY_POOL_CHECK_INTERVAL_SEC = 10
+
+# 代理商返回的IP全部无效时，单次补充代理池的最大提取轮数
+PROXY_REFILL_MAX_ATTEMPTS = 3
+
+# 代理IP连续失败多少次后移出代理池
+PROXY_MAX_CONSECUTIVE_FAILURES = 3
+
+# 是否开启多代理轮换：每个请求从代理池租用一个代理，吞吐量随代理池大小（IP_PROXY_POOL_COUNT）增长；
+# 同一帖子的评论翻页固定使用同一个代理。关闭时所有请求共用一个代理，过期后才更换
+# 注意：登录态 Cookie 会在多个出口 IP 上使用，部分平台可能因此触发风控
+ENABLE_PROXY_ROTATION = False
+
+# 多代理轮换模式下每个代理同时进行的最大请求数
+PROXY_MAX_CONCURRENCY_PER_IP = 4
+
 # 设置为True不会打开浏览器（无头浏览器）
 # 设置False会打开一个浏览器
 # 小红书如果一直扫码登录不通过，打开浏览器手动过一下滑动验证码
@@ -70,8 +96,25 @@ BROWSER_LAUNCH_TIMEOUT = 60
 # 设置为False可以保持浏览器运行，便于调试
 AUTO_CLOSE_BROWSER = True
 
-# 数据保存类型选项配置,支持五种类型：csv、db、json、sqlite、excel, 最好保存到DB，有排重的功能。
-SAVE_DATA_OPTION = "json"  # csv or db or json or sqlite or excel
+# 数据保存类型选项配置,支持六种类型：csv、db、json、jsonl、sqlite、excel, 最好保存到DB，有排重的功能。
+# 数据量较大时推荐使用 jsonl，逐条追加写入，不会像 json 那样每条数据都重写整个文件
+SAVE_DATA_OPTION = "json"  # csv or db or json or jsonl or sqlite or excel
+
+# JSONL 存储的缓冲刷新条数，缓冲区达到该条数时批量写入文件
+JSONL_FLUSH_BATCH_SIZE = 200
+
+# JSONL 存储的定时刷新间隔（秒）
+JSONL_FLUSH_INTERVAL_SEC = 5
+
+# 爬取结束后是否将 JSONL 文件转换一份旧版 JSON 数组格式（data/平台/json 目录下），兼容已有的 JSON 使用方
+JSONL_CONVERT_TO_JSON = True
+
+# CSV 存储的缓冲刷新条数与定时刷新间隔（秒），每个 CSV 文件保持一个打开的句柄，列在第一次写入时固定
+CSV_FLUSH_BATCH_SIZE = 200
+CSV_FLUSH_INTERVAL_SEC = 5
+
+# Excel 存储按 write-only 模式逐行写入临时文件，列宽根据每个工作表的前 N 行估算（这些行在确定列宽前暂存在内存中）
+EXCEL_WIDTH_SAMPLE_ROWS = 100
 
 # 用户浏览器缓存的浏览器文件配置
 USER_DATA_DIR = "%s_user_data_dir"  # %s will be replaced by platform name
@@ -82,9 +125,56 @@ START_PAGE = 1
 # 爬取视频/帖子的数量控制
 CRAWLER_MAX_NOTES_COUNT = 15
 
-# 并发爬虫数量控制
+# 并发爬虫数量控制：整个爬取过程中同时等待平台响应的请求数上限，
+# 名额按优先级分配：搜索 > 详情 > 评论 > 子评论 > 媒体下载
 MAX_CONCURRENCY_NUM = 1
 
+# 多进程分片爬取的进程数（命令行 --workers），大于 1 时关键词/帖子/创作者列表按轮询方式拆分到多个子进程，
+# 每个子进程使用独立的浏览器目录（首次从主目录复制登录状态）和代理池，文件类存储结束后自动合并
+CRAWLER_WORKER_NUM = 1
+
+# 分片进度日志输出间隔（秒）
+CRAWLER_SHARD_PROGRESS_INTERVAL_SEC = 30
+
+# 当前子进程的分片编号，由分片运行器设置，请勿手动修改
+CRAWLER_SHARD_ID = None
+
+# 是否记录爬取进度（关键词分页、日期窗口、评论游标），每爬完一页写入检查点
+ENABLE_CRAWL_FRONTIER = True
+
+# 爬取进度数据库目录，每个平台一个 SQLite 文件
+CRAWL_FRONTIER_DIR = "data/.frontier"
+
+# 是否从上次中断的位置继续爬取（命令行 --resume），否则每次运行前清空进度
+CRAWL_RESUME = False
+
+# 是否启用已爬取内容索引（跨运行去重），重复运行时跳过 TTL 内已经爬取过的帖子详情和评论，适合定时重复运行的场景
+# 注意：被跳过的内容不会再次存储，开启后 TTL 内重新运行（如更换 SAVE_DATA_OPTION、写入新日期的文件）时输出中不包含这些内容
+ENABLE_SEEN_INDEX = False
+
+# 已爬取内容索引数据库路径
+SEEN_INDEX_DB_PATH = "data/.seen_index.db"
+
+# 帖子详情的刷新周期（小时），超过后重新爬取；设为 0 表示每次都重新爬取
+SEEN_INDEX_CONTENT_TTL_HOURS = 24
+
+# 帖子评论的刷新周期（小时），超过后重新爬取；设为 0 表示每次都重新爬取
+SEEN_INDEX_COMMENT_TTL_HOURS = 24
+
+# 是否启用 HTTP 响应缓存，帖子详情、创作者信息、视频播放地址在 TTL 内直接使用缓存的响应，不再请求平台
+# 注意：开启后 TTL 内重新运行时，点赞数、评论数、创作者信息等都是缓存时的旧数据
+ENABLE_RESPONSE_CACHE = False
+
+# 响应缓存数据库路径
+RESPONSE_CACHE_DB_PATH = "data/.response_cache.db"
+
+# 各类接口的缓存时间（小时），设为 0 表示不缓存；视频播放地址带有签名，过期较快
+RESPONSE_CACHE_TTL_HOURS = {
+    "note_detail": 24,
+    "creator_info": 24,
+    "play_url": 0.5,
+}
+
 # 是否开启爬媒体模式（包含图片或视频资源），默认不开启爬媒体
 ENABLE_GET_MEIDAS = False
 
@@ -98,6 +188,9 @@ CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES = 10
 # 老版本项目使用了 db, 则需参考 schema/tables.sql line 287 增加表字段
 ENABLE_GET_SUB_COMMENTS = False
 
+# 同一页中同时展开二级评论的一级评论数，各一级评论的二级评论分页互不依赖，请求仍受限流器和 MAX_CONCURRENCY_NUM 约束
+SUB_COMMENT_CONCURRENCY = 4
+
 # 词云相关
 # 是否开启生成评论词云图
 ENABLE_GET_WORDCLOUD = False
@@ -114,9 +207,136 @@ STOP_WORDS_FILE = "./docs/hit_stopwords.txt"
 # 中文字体文件路径
 FONT_PATH = "./docs/STZHONGS.TTF"
 
-# 爬取间隔时间
+# 爬取间隔时间，作为限流器每类接口的初始请求间隔（初始速率 = 1 / CRAWLER_MAX_SLEEP_SEC 次/秒）
 CRAWLER_MAX_SLEEP_SEC = 2
 
+# ==================== 请求限流配置 ====================
+# 每个平台的 search / detail / comments / sub_comments / media 五类接口各有一个令牌桶，所有请求发出前先取令牌
+# 是否根据平台反馈自适应调整速率（AIMD：请求正常时线性加速，出现 429、461/471 验证码、IP 被封或响应变慢时成倍减速）
+# 关闭后按 1 / CRAWLER_MAX_SLEEP_SEC 的固定速率发请求
+ENABLE_ADAPTIVE_RATE_LIMIT = True
+
+# 每类接口的最低 / 最高速率（次/秒）
+RATE_LIMIT_MIN_RPS = 0.05
+RATE_LIMIT_MAX_RPS = 2.0
+
+# 媒体下载走 CDN，初始速率单独配置（次/秒）
+RATE_LIMIT_MEDIA_RPS = 5.0
+
+# 令牌桶容量，允许的突发请求数
+RATE_LIMIT_BURST = 1
+
+# 每次请求成功后速率的线性增量（次/秒）
+RATE_LIMIT_INCREASE_STEP = 0.05
+
+# 平台限流时速率的缩减系数
+RATE_LIMIT_DECREASE_FACTOR = 0.5
+
+# 响应耗时超过该值（秒）视为平台开始限流
+RATE_LIMIT_SLOW_RESPONSE_SEC = 5.0
+
+# ==================== 媒体下载配置 ====================
+# 图片/视频按块流式写入临时目录，中断后通过 Range 请求断点续传，完成后移动到 data/平台/ 目录
+# 媒体下载临时目录
+MEDIA_DOWNLOAD_TMP_DIR = "data/.media_tmp"
+
+# 每次写入文件的块大小（字节）
+MEDIA_DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+# 下载中断后的最大续传次数
+MEDIA_DOWNLOAD_MAX_RETRIES = 3
+
+# 是否使用后台媒体下载队列，开启后爬虫只提交下载任务，由独立 worker 下载，爬取结束时等待队列清空
+ENABLE_MEDIA_DOWNLOAD_QUEUE = True
+
+# 媒体下载队列容量，队列满时爬虫等待（背压）
+MEDIA_QUEUE_MAX_SIZE = 200
+
+# 媒体下载 worker 数量
+MEDIA_QUEUE_WORKERS = 8
+
+# 同一域名的最大并发下载数
+MEDIA_QUEUE_PER_HOST_LIMIT = 3
+
+# 下载进度日志输出间隔（秒）
+MEDIA_QUEUE_PROGRESS_INTERVAL_SEC = 10
+
+# ==================== 搜索流水线配置 ====================
+# 关键词搜索按 搜索 → 详情 → 存储 → 评论 分阶段流水线执行，各阶段之间用有界队列连接，
+# 下一页搜索、未完成的详情请求和评论爬取可以同时进行；媒体下载由上面的媒体下载队列负责
+# 每个阶段队列的容量，队列满时上游阶段等待（背压）
+PIPELINE_QUEUE_SIZE = 50
+
+# 详情阶段 worker 数量
+PIPELINE_DETAIL_WORKERS = 8
+
+# 存储阶段 worker 数量
+PIPELINE_STORE_WORKERS = 1
+
+# 评论阶段 worker 数量（同时爬取评论的帖子数）
+PIPELINE_COMMENT_WORKERS = 8
+
+# ==================== HTTP 连接池配置 ====================
+# 各平台 client 共享的 httpx 连接池，按代理复用长连接
+# 连接池最大连接数
+HTTPX_MAX_CONNECTIONS = 100
+
+# 连接池最大保活连接数
+HTTPX_MAX_KEEPALIVE_CONNECTIONS = 20
+
+# 保活连接的空闲过期时间（秒）
+HTTPX_KEEPALIVE_EXPIRY = 30
+
+# 是否启用HTTP/2（需要安装 h2 包: pip install httpx[http2]，未安装时自动回退到HTTP/1.1）
+ENABLE_HTTP2 = True
+
+# ==================== 签名进程池配置 ====================
+# 抖音 a_bogus / 知乎 x-zse-96 签名使用常驻 Node 进程计算，签名脚本只加载一次
+# 是否启用签名进程池（需要本机安装 Node.js，未安装时自动回退到 execjs）
+ENABLE_JS_SIGN_WORKER_POOL = True
+
+# 每个签名脚本启动的 Node 进程数
+JS_SIGN_WORKER_NUM = 2
+
+# 单次签名超时时间（秒），超时的进程会被重启
+JS_SIGN_TIMEOUT_SEC = 10
+
+# 空闲进程健康检查间隔（秒），0 表示不做定时检查
+JS_SIGN_HEALTH_CHECK_INTERVAL_SEC = 30
+
+# ==================== 监控指标配置 ====================
+# 是否记录运行指标（请求耗时、状态码、重试、流量、存储条数、队列深度）
+ENABLE_METRICS = True
+
+# Prometheus 文本格式指标接口端口，0 表示不启用；分片模式下各子进程依次使用 端口+分片号
+METRICS_PROMETHEUS_PORT = 0
+
+# Prometheus 指标接口监听地址
+METRICS_PROMETHEUS_HOST = "127.0.0.1"
+
+# 定时写入的 JSON 指标快照路径，空字符串表示不写入
+METRICS_SNAPSHOT_PATH = "data/metrics.json"
+
+# JSON 指标快照的写入间隔（秒）
+METRICS_SNAPSHOT_INTERVAL_SEC = 30
+
+# ==================== 日志配置 ====================
+# 日志级别
+LOG_LEVEL = "INFO"
+
+# 日志格式：text 为单行文本，json 为每行一个 JSON 对象（便于日志采集系统解析）
+LOG_FORMAT = "text"
+
+# 按日志分类单独设置级别，分类为 MediaCrawler 下的子 logger，子分类继承父分类的级别
+# 例如 {"payload": "WARNING"} 关闭所有接口返回/数据条目日志，{"payload.store": "DEBUG"} 只调整存储条目日志
+LOG_CATEGORY_LEVELS = {}
+
+# 接口返回和数据条目这类大对象日志的采样率，1 表示每条都打印，0.01 表示每个分类每 100 条打印 1 条，0 表示不打印
+LOG_PAYLOAD_SAMPLE_RATE = 0.01
+
+# 大对象日志的最大字符数，超出部分截断
+LOG_PAYLOAD_MAX_CHARS = 512
+
 from .bilibili_config import *
 from .xhs_config import *
 from .dy_config import *
@@ -41,10 +41,14 @@ REDIS_DB_HOST = "127.0.0.1"  # your redis host
 REDIS_DB_PWD = os.getenv("REDIS_DB_PWD", "123456")  # your redis password
 REDIS_DB_PORT = os.getenv("REDIS_DB_PORT", 6379)  # your redis port
 REDIS_DB_NUM = os.getenv("REDIS_DB_NUM", 0)  # your redis db num
+REDIS_MAX_CONNECTIONS = 20  # 异步 Redis 缓存连接池的最大连接数
+REDIS_SCAN_COUNT = 500  # SCAN 每批返回的 key 数量提示
 
 # cache type
 CACHE_TYPE_REDIS = "redis"
 CACHE_TYPE_MEMORY = "memory"
+CACHE_TYPE_ASYNC_REDIS = "async_redis"
+LOCAL_CACHE_MAX_SIZE = 1000000  # 本地缓存最大键数量，超出后淘汰最久未使用的键
 
 # sqlite config
 SQLITE_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database", "sqlite_tables.db")
@@ -53,6 +57,11 @@ sqlite_db_config = {
     "db_path": SQLITE_DB_PATH
 }
 
+# SQL 存储批量写入配置（db / sqlite）
+# 数据先进入内存缓冲区，攒够条数或超过时间间隔后使用 upsert 批量写入
+DB_BULK_FLUSH_SIZE = 200  # 单表缓冲条数达到该值时刷新
+DB_BULK_FLUSH_INTERVAL_SEC = 3  # 距上次刷新超过该秒数时刷新
+
 # mongodb config
 MONGODB_HOST = os.getenv("MONGODB_HOST", "localhost")
 MONGODB_PORT = os.getenv("MONGODB_PORT", 27017)
@@ -35,3 +35,12 @@ XHS_CREATOR_ID_LIST = [
     "https://www.xiaohongshu.com/user/profile/5f58bd990000000001003753?xsec_token=ABYVg1evluJZZzpMX-VWzchxQ1qSNVW3r-jOEnKqMcgZw=&xsec_source=pc_search"
     # ........................
 ]
+
+# 签名引擎，batched: 合并并发签名请求为一次 page.evaluate 并缓存 b1 | playwright: 每次签名单独调用 page.evaluate
+XHS_SIGN_ENGINE = "batched"
+
+# batched 签名引擎的合并窗口（毫秒），窗口内到达的签名请求合并为一次调用
+XHS_SIGN_BATCH_WINDOW_MS = 5
+
+# batched 签名引擎单批最大签名数量，达到后立即调用
+XHS_SIGN_BATCH_MAX_SIZE = 32
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/database/bulk_upsert.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : SQL 存储的批量写入缓冲，按表缓存待写入的数据，达到条数或时间阈值后使用数据库原生 upsert 批量落盘
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import Table, and_, insert, inspect, or_, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import config
+from database.db_session import get_session
+from tools import utils
+
+
+def _has_unique_key(sync_conn, table_name: str, key_columns: Sequence[str]) -> bool:
+    """
+    检查数据库中的表是否存在覆盖 key_columns 的主键/唯一约束/唯一索引
+    旧版本建表时业务主键只有普通索引，此时原生 upsert 无法去重，需要走兼容写入
+    """
+    inspector = inspect(sync_conn)
+    target = set(key_columns)
+    pk = inspector.get_pk_constraint(table_name) or {}
+    if set(pk.get("constrained_columns") or []) == target:
+        return True
+    for constraint in inspector.get_unique_constraints(table_name):
+        if set(constraint.get("column_names") or []) == target:
+            return True
+    for index in inspector.get_indexes(table_name):
+        if index.get("unique") and set(index.get("column_names") or []) == target:
+            return True
+    return False
+
+
+class BulkUpsertBuffer:
+    """
+    单表写缓冲
+
+    store 实现每条数据调用 add 放入缓冲区（同一业务主键只保留最后一次写入），
+    达到 DB_BULK_FLUSH_SIZE 条或距上次刷新超过 DB_BULK_FLUSH_INTERVAL_SEC 秒时，
+    MySQL 使用 INSERT ... ON DUPLICATE KEY UPDATE，SQLite 使用 INSERT ... ON CONFLICT DO UPDATE 批量写入
+    """
+
+    def __init__(
+        self,
+        model: Type,
+        key_columns: Sequence[str],
+        update_columns: Optional[Sequence[str]] = None,
+    ):
+        """
+        Args:
+            model: ORM 模型
+            key_columns: 业务主键字段，用于判断数据是否已存在
+            update_columns: 数据已存在时需要更新的字段，None 表示更新除业务主键和 add_ts 外的所有字段
+        """
+        self.table: Table = model.__table__
+        self.key_columns: Tuple[str, ...] = tuple(key_columns)
+        self.update_columns = tuple(update_columns) if update_columns is not None else None
+        self.lock = asyncio.Lock()
+        self._rows: Dict[Tuple, Dict] = {}
+        self._last_flush_ts = time.monotonic()
+        self._native_upsert: Optional[bool] = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    async def add(self, row: Dict):
+        """
+        放入一条待写入数据，必要时触发刷新
+        Args:
+            row: 与表字段对应的数据，多余的字段会被忽略
+        """
+        row = {key: value for key, value in row.items() if key in self.table.c and key != "id"}
+        if any(row.get(key) is None for key in self.key_columns):
+            return
+        row_key = tuple(str(row[key]) for key in self.key_columns)
+        # 同一批次内重复的数据只保留最新的一条，但保留首次写入的 add_ts
+        if row_key in self._rows and "add_ts" in self._rows[row_key]:
+            row["add_ts"] = self._rows[row_key]["add_ts"]
+        self._rows[row_key] = row
+        if (
+            len(self._rows) >= config.DB_BULK_FLUSH_SIZE
+            or time.monotonic() - self._last_flush_ts >= config.DB_BULK_FLUSH_INTERVAL_SEC
+        ):
+            try:
+                await self.flush()
+            except Exception as e:
+                # 写入失败的数据已放回缓冲区，下次刷新时重试，不影响本条数据的 store 调用
+                utils.logger.error(f"[BulkUpsertBuffer.add] flush {self.table.name} error: {e}")
+
+    async def flush(self):
+        """
+        将缓冲区中的数据批量写入数据库，写入失败时数据放回缓冲区并抛出异常
+        """
+        async with self.lock:
+            self._last_flush_ts = time.monotonic()
+            if not self._rows:
+                return
+            pending, self._rows = self._rows, {}
+            rows = list(pending.values())
+            try:
+                async with get_session() as session:
+                    if session is None:
+                        self._restore(pending)
+                        utils.logger.warning(
+                            f"[BulkUpsertBuffer.flush] no database session, keep {len(rows)} rows of {self.table.name} buffered"
+                        )
+                        return
+                    conn = await session.connection()
+                    if self._native_upsert is None:
+                        self._native_upsert = await conn.run_sync(
+                            _has_unique_key, self.table.name, self.key_columns
+                        )
+                        if not self._native_upsert:
+                            utils.logger.warning(
+                                f"[BulkUpsertBuffer.flush] table {self.table.name} has no unique key on {self.key_columns}, "
+                                f"fallback to select-then-write, re-create the table to enable native upsert"
+                            )
+                    for group in self._group_by_columns(rows):
+                        if self._native_upsert:
+                            await session.execute(self._build_upsert_stmt(conn.dialect.name, group[0]), group)
+                        else:
+                            await self._fallback_write(session, group)
+            except BaseException:
+                self._restore(pending)
+                raise
+            utils.logger.info(f"[BulkUpsertBuffer.flush] flush {len(rows)} rows into {self.table.name}")
+
+    def _restore(self, pending: Dict[Tuple, Dict]):
+        """
+        把未写入的数据放回缓冲区，刷新期间新加入的同一业务主键数据更新，保留它们而不是用旧数据覆盖
+        """
+        for row_key, row in self._rows.items():
+            if row_key in pending and "add_ts" in pending[row_key]:
+                row["add_ts"] = pending[row_key]["add_ts"]
+            pending[row_key] = row
+        self._rows = pending
+
+    @staticmethod
+    def _group_by_columns(rows: List[Dict]) -> List[List[Dict]]:
+        """
+        executemany 要求每行字段一致，按字段集合分组
+        """
+        groups: Dict[Tuple[str, ...], List[Dict]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row.keys())), []).append(row)
+        return list(groups.values())
+
+    def _get_update_columns(self, sample_row: Dict) -> List[str]:
+        if self.update_columns is not None:
+            return [col for col in self.update_columns if col in sample_row]
+        return [col for col in sample_row if col not in self.key_columns and col != "add_ts"]
+
+    def _build_upsert_stmt(self, dialect_name: str, sample_row: Dict):
+        update_columns = self._get_update_columns(sample_row)
+        if dialect_name == "mysql":
+            stmt = mysql_insert(self.table)
+            if not update_columns:
+                return stmt.prefix_with("IGNORE")
+            return stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in update_columns})
+        if dialect_name == "sqlite":
+            stmt = sqlite_insert(self.table)
+            if not update_columns:
+                return stmt.on_conflict_do_nothing(index_elements=list(self.key_columns))
+            return stmt.on_conflict_do_update(
+                index_elements=list(self.key_columns),
+                set_={col: stmt.excluded[col] for col in update_columns},
+            )
+        raise ValueError(f"[BulkUpsertBuffer] Unsupported dialect for bulk upsert: {dialect_name}")
+
+    async def _fallback_write(self, session, rows: List[Dict]):
+        """
+        表上没有唯一约束时的兼容写入：一次查询已存在的业务主键，新数据批量插入，旧数据逐条更新
+        """
+        key_cols = [self.table.c[key] for key in self.key_columns]
+        conditions = [and_(*[col == row[col.name] for col in key_cols]) for row in rows]
+        result = await session.execute(select(*key_cols).where(or_(*conditions)))
+        existing = {tuple(str(value) for value in record) for record in result.all()}
+
+        new_rows, exist_rows = [], []
+        for row in rows:
+            row_key = tuple(str(row[key]) for key in self.key_columns)
+            (exist_rows if row_key in existing else new_rows).append(row)
+
+        if new_rows:
+            await session.execute(insert(self.table), new_rows)
+        update_columns = self._get_update_columns(rows[0])
+        if not update_columns:
+            return
+        for row in exist_rows:
+            stmt = (
+                update(self.table)
+                .where(and_(*[col == row[col.name] for col in key_cols]))
+                .values({col: row[col] for col in update_columns})
+            )
+            await session.execute(stmt)
+
+
+_buffers: Dict[str, BulkUpsertBuffer] = {}
+_flush_cron_task: Optional[asyncio.Task] = None
+
+
+def get_upsert_buffer(
+    model: Type,
+    key_columns: Sequence[str],
+    update_columns: Optional[Sequence[str]] = None,
+) -> BulkUpsertBuffer:
+    """
+    获取指定表的写缓冲（按表名全局共享），首次调用时启动定时刷新任务
+    Args:
+        model: ORM 模型
+        key_columns: 业务主键字段
+        update_columns: 数据已存在时需要更新的字段
+
+    Returns:
+
+    """
+    table_name = model.__tablename__
+    if table_name not in _buffers:
+        _buffers[table_name] = BulkUpsertBuffer(model, key_columns, update_columns)
+    _ensure_flush_cron()
+    return _buffers[table_name]
+
+
+async def flush_all_upsert_buffers():
+    """
+    刷新所有表的写缓冲，某张表写入失败时记录日志并继续刷新其他表
+    """
+    for buffer in list(_buffers.values()):
+        try:
+            await buffer.flush()
+        except Exception as e:
+            utils.logger.error(
+                f"[flush_all_upsert_buffers] flush {buffer.table.name} error, {len(buffer)} rows kept buffered: {e}"
+            )
+
+
+async def close_all_upsert_buffers():
+    """
+    停止定时刷新任务并刷新所有写缓冲，程序退出前调用
+    """
+    global _flush_cron_task
+    task, _flush_cron_task = _flush_cron_task, None
+    if task is not None and not task.done():
+        try:
+            task.cancel()
+        except RuntimeError:
+            # 任务所属的事件循环已关闭
+            pass
+    await flush_all_upsert_buffers()
+
+
+def _ensure_flush_cron():
+    global _flush_cron_task
+    if _flush_cron_task is not None and not _flush_cron_task.done():
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    _flush_cron_task = loop.create_task(_start_flush_cron())
+
+
+async def _start_flush_cron():
+    """
+    定时刷新写缓冲，保证爬取间隙数据也能按时落库
+    """
+    while True:
+        await asyncio.sleep(config.DB_BULK_FLUSH_INTERVAL_SEC)
+        try:
+            await flush_all_upsert_buffers()
+        except Exception as e:
+            utils.logger.error(f"[bulk_upsert._start_flush_cron] flush upsert buffers error: {e}")
@@ -30,7 +30,8 @@ if str(project_root) not in sys.path:
     sys.path.append(str(project_root))
 
 from tools import utils
-from database.db_session import create_tables
+from database.bulk_upsert import close_all_upsert_buffers
+from database.db_session import create_tables, dispose_engines
 
 async def init_table_schema(db_type: str):
     """
@@ -48,6 +49,7 @@ async def init_db(db_type: str = None):
 
 async def close():
     """
-    Placeholder for closing database connections if needed in the future.
+    Flush buffered rows of the SQL stores and close database connections.
     """
-    pass
+    await close_all_upsert_buffers()
+    await dispose_engines()
@@ -55,7 +55,11 @@ def get_async_engine(db_type: str = None):
     else:
         raise ValueError(f"Unsupported database type: {db_type}")
 
-    engine = create_async_engine(db_url, echo=False)
+    connect_args = {}
+    if db_type == "sqlite":
+        # 多进程分片爬取时多个进程同时写入，等待写锁而不是直接报 database is locked
+        connect_args["timeout"] = 30
+    engine = create_async_engine(db_url, echo=False, connect_args=connect_args)
     _engines[db_type] = engine
     return engine
 
@@ -70,6 +74,13 @@ async def create_tables(db_type: str = None):
             await conn.run_sync(Base.metadata.create_all)
 
 
+async def dispose_engines():
+    engines = list(_engines.values())
+    _engines.clear()
+    for engine in engines:
+        await engine.dispose()
+
+
 @asynccontextmanager
 async def get_session() -> AsyncSession:
     engine = get_async_engine(config.SAVE_DATA_OPTION)
@@ -0,0 +1,50 @@
+// 签名常驻进程：启动时加载一次签名脚本，之后通过 stdin/stdout 按行收发 JSON 请求
+// 用法：node libs/sign_worker.js <script_path>
+// 请求：{"id": 1, "fn": "get_sign", "args": ["..."]}
+// 响应：{"id": 1, "result": ...} 或 {"id": 1, "error": "..."}
+
+const fs = require('fs');
+const readline = require('readline');
+const vm = require('vm');
+
+const scriptPath = process.argv[2];
+let source = fs.readFileSync(scriptPath, 'utf-8');
+if (source.charCodeAt(0) === 0xFEFF) {
+    source = source.slice(1);
+}
+
+// 与 execjs 一致：签名脚本按普通脚本执行，顶层函数挂到全局对象上
+globalThis.require = require;
+vm.runInThisContext(source, {filename: scriptPath});
+
+function reply(message) {
+    process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+const rl = readline.createInterface({input: process.stdin, terminal: false});
+rl.on('line', (line) => {
+    if (!line.trim()) {
+        return;
+    }
+    let request;
+    try {
+        request = JSON.parse(line);
+    } catch (e) {
+        reply({id: null, error: 'invalid request: ' + e.message});
+        return;
+    }
+    if (request.fn === '__ping__') {
+        reply({id: request.id, result: 'pong'});
+        return;
+    }
+    try {
+        const fn = globalThis[request.fn];
+        if (typeof fn !== 'function') {
+            throw new Error('function not found: ' + request.fn);
+        }
+        reply({id: request.id, result: fn.apply(null, request.args || [])});
+    } catch (e) {
+        reply({id: request.id, error: String(e && e.stack || e)});
+    }
+});
+rl.on('close', () => process.exit(0));
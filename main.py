@@ -21,7 +21,7 @@
 import asyncio
 import sys
 import signal
-from typing import Optional
+from typing import List, Optional
 
 import cmd_arg
 import config
@@ -34,7 +34,16 @@ from media_platform.tieba import TieBaCrawler
 from media_platform.weibo import WeiboCrawler
 from media_platform.xhs import XiaoHongShuCrawler
 from media_platform.zhihu import ZhihuCrawler
-from tools.async_file_writer import AsyncFileWriter
+from proxy.proxy_ip_pool import close_ip_pools
+from tools.async_file_writer import AsyncFileWriter, CsvFileSink, JsonlFileSink, convert_jsonl_to_json
+from tools.crawl_frontier import close_crawl_frontiers, prepare_crawl_frontier
+from tools.http_client import close_http_clients
+from tools.js_sign_pool import close_js_sign_pools
+from tools.media_queue import close_media_queues, drain_media_queues
+from tools.metrics import close_metrics_exporters, start_metrics_exporter
+from tools.response_cache import close_response_caches
+from tools.seen_index import close_seen_indexes
+from tools.shard_runner import run_sharded_crawl
 from var import crawler_type_var
 
 
@@ -67,9 +76,6 @@ crawler: Optional[AbstractCrawler] = None
 # 副作用：无
 # 回滚策略：还原此文件。
 async def main():
-    # Init crawler
-    global crawler
-
     # parse cmd
     args = await cmd_arg.parse_cmd()
 
@@ -81,8 +87,34 @@ async def main():
 
 
 
+    # Clear the crawl frontier of the previous run unless --resume is given
+    await prepare_crawl_frontier()
+    await close_crawl_frontiers()
+
+    # Shard keywords / note urls / creators across worker processes
+    if args.workers > 1:
+        merged_file_paths = await run_sharded_crawl(args.workers, run_shard_worker)
+        crawler_type_var.set(config.CRAWLER_TYPE)
+        await post_process_outputs([path for path in merged_file_paths if path.endswith(".jsonl")])
+        return
+
+    await run_crawler()
+    await post_process_outputs(JsonlFileSink.get_file_paths())
+
+
+async def run_crawler():
+    """创建爬虫并执行，结束后刷新各存储的缓冲区"""
+    global crawler
     crawler = CrawlerFactory.create_crawler(platform=config.PLATFORM)
-    await crawler.start()
+    await start_metrics_exporter()
+    try:
+        await crawler.start()
+
+        # Wait for the background media downloads submitted by the crawler
+        await drain_media_queues()
+    finally:
+        # Stop the proxy pools' background prefetch / refill tasks while their event loop is still running
+        await close_ip_pools()
 
     # Flush Excel data if using Excel export
     if config.SAVE_DATA_OPTION == "excel":
@@ -93,9 +125,49 @@ async def main():
         except Exception as e:
             print(f"[Main] Error flushing Excel data: {e}")
 
+    # Flush rows buffered by the SQL stores while the crawler's event loop is still running
+    if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
+        await db.close()
+
+    # Flush buffered JSONL data
+    if config.SAVE_DATA_OPTION == "jsonl":
+        await JsonlFileSink.close_all()
+
+    # Flush buffered CSV rows and close the open CSV files
+    if config.SAVE_DATA_OPTION == "csv":
+        await CsvFileSink.close_all()
+
+    await close_crawl_frontiers()
+    await close_seen_indexes()
+    await close_response_caches()
+    await close_metrics_exporters()
+
+
+async def run_shard_worker():
+    """分片子进程入口，JSON 转换和词云由主进程在合并分片文件后统一生成"""
+    try:
+        await run_crawler()
+    finally:
+        await async_cleanup()
+
+
+async def post_process_outputs(jsonl_file_paths: List[str]):
+    """爬取结束后的数据后处理：JSONL 转 JSON、生成词云"""
+    # Convert JSONL files to the legacy JSON array format
+    if config.SAVE_DATA_OPTION == "jsonl" and config.JSONL_CONVERT_TO_JSON:
+        for jsonl_file_path in jsonl_file_paths:
+            try:
+                json_file_path = await convert_jsonl_to_json(jsonl_file_path)
+                print(f"[Main] Converted {jsonl_file_path} to {json_file_path}")
+            except Exception as e:
+                print(f"[Main] Error converting {jsonl_file_path} to json: {e}")
+
     # Generate wordcloud after crawling is complete
-    # Only for JSON save mode
-    if config.SAVE_DATA_OPTION == "json" and config.ENABLE_GET_WORDCLOUD:
+    # Only for JSON save mode (jsonl mode works after converting to json)
+    json_available = config.SAVE_DATA_OPTION == "json" or (
+        config.SAVE_DATA_OPTION == "jsonl" and config.JSONL_CONVERT_TO_JSON
+    )
+    if json_available and config.ENABLE_GET_WORDCLOUD:
         try:
             file_writer = AsyncFileWriter(
                 platform=config.PLATFORM,
@@ -132,9 +204,43 @@ async def async_cleanup():
                 if "closed" not in error_msg and "disconnected" not in error_msg:
                     print(f"[Main] 关闭浏览器上下文时出错: {e}")
 
+    # 刷新JSONL缓冲区中尚未写入文件的数据
+    if config.SAVE_DATA_OPTION == "jsonl":
+        try:
+            await JsonlFileSink.close_all()
+        except Exception as e:
+            print(f"[Main] 刷新JSONL数据时出错: {e}")
+
+    # 刷新CSV缓冲区并关闭打开的CSV文件
+    if config.SAVE_DATA_OPTION == "csv":
+        try:
+            await CsvFileSink.close_all()
+        except Exception as e:
+            print(f"[Main] 刷新CSV数据时出错: {e}")
+
+    # 停止后台媒体下载 worker，未完成的下载下次运行时续传
+    await close_media_queues()
+
+    # 关闭爬取进度、已爬取内容索引和响应缓存数据库
+    await close_crawl_frontiers()
+    await close_seen_indexes()
+    await close_response_caches()
+
+    # 写入最后一次指标快照
+    await close_metrics_exporters()
+
+    # 关闭共享的HTTP连接池
+    await close_http_clients()
+
+    # 关闭签名常驻进程
+    await close_js_sign_pools()
+
     # 关闭数据库连接
     if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
-        await db.close()
+        try:
+            await db.close()
+        except Exception as e:
+            print(f"[Main] 关闭数据库连接时出错: {e}")
 
 def cleanup():
     """同步清理函数"""
@@ -24,7 +24,8 @@
 import asyncio
 import json
 import random
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
+from functools import partial
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
 from urllib.parse import urlencode
 
 import httpx
@@ -34,6 +35,12 @@ import config
 from base.base_crawler import AbstractApiClient
 from proxy.proxy_mixin import ProxyRefreshMixin
 from tools import utils
+from tools.crawl_frontier import FrontierUnit
+from tools.crawl_pipeline import merge_page_streams
+from tools.http_client import get_http_client
+from tools.media_downloader import get_media_downloader
+from tools.rate_limiter import get_rate_limiter
+from tools.response_cache import CACHE_CREATOR_INFO, CACHE_NOTE_DETAIL, CACHE_PLAY_URL, get_response_cache
 
 if TYPE_CHECKING:
     from proxy.proxy_ip_pool import ProxyIpPool
@@ -65,11 +72,11 @@ class BilibiliClient(AbstractApiClient, ProxyRefreshMixin):
         self.init_proxy_pool(proxy_ip_pool)
 
     async def request(self, method, url, **kwargs) -> Any:
-        # 每次请求前检测代理是否过期
-        await self._refresh_proxy_if_expired()
-
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        async with get_rate_limiter().limit(url) as permit:
+            # 每次请求从代理池租用代理（多代理轮换），或检测当前代理是否过期
+            async with self.lease_proxy() as proxy:
+                response = await get_http_client(proxy).request(method, url, timeout=self.timeout, **kwargs)
+            permit.set_response(response.status_code)
         try:
             data: Dict = response.json()
         except json.JSONDecodeError:
@@ -196,7 +203,9 @@ class BilibiliClient(AbstractApiClient, ProxyRefreshMixin):
             params.update({"aid": aid})
         else:
             params.update({"bvid": bvid})
-        return await self.get(uri, params, enable_params_sign=False)
+        return await get_response_cache().fetch(
+            CACHE_NOTE_DETAIL, "GET", uri, params, lambda: self.get(uri, params, enable_params_sign=False)
+        )
 
     async def get_video_play_url(self, aid: int, cid: int) -> Dict:
         """
@@ -218,23 +227,23 @@ class BilibiliClient(AbstractApiClient, ProxyRefreshMixin):
             "platform": "pc",
         }
 
-        return await self.get(uri, params, enable_params_sign=True)
-
-    async def get_video_media(self, url: str) -> Union[bytes, None]:
-        # Follow CDN 302 redirects and treat any 2xx as success (some endpoints return 206)
-        async with httpx.AsyncClient(proxy=self.proxy, follow_redirects=True) as client:
-            try:
-                response = await client.request("GET", url, timeout=self.timeout, headers=self.headers)
-                response.raise_for_status()
-                if 200 <= response.status_code < 300:
-                    return response.content
-                utils.logger.error(
-                    f"[BilibiliClient.get_video_media] Unexpected status {response.status_code} for {url}"
-                )
-                return None
-            except httpx.HTTPError as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
-                utils.logger.error(f"[BilibiliClient.get_video_media] {exc.__class__.__name__} for {exc.request.url} - {exc}")  # 保留原始异常类型名称，以便开发者调试
-                return None
+        return await get_response_cache().fetch(
+            CACHE_PLAY_URL, "GET", uri, params, lambda: self.get(uri, params, enable_params_sign=True)
+        )
+
+    async def get_video_media(self, url: str) -> Union[str, None]:
+        """
+        流式下载视频到临时文件，跟随 CDN 302 重定向
+        Args:
+            url: 视频地址
+
+        Returns:
+            下载完成的临时文件路径，失败返回 None
+        """
+        async with self.lease_proxy() as proxy:
+            return await get_media_downloader().download(
+                url, proxy=proxy, headers=self.headers, timeout=self.timeout
+            )
 
     async def get_video_comments(
         self,
@@ -252,29 +261,30 @@ class BilibiliClient(AbstractApiClient, ProxyRefreshMixin):
         post_data = {"oid": video_id, "mode": order_mode.value, "type": 1, "ps": 20, "next": next}
         return await self.get(uri, post_data)
 
-    async def get_video_all_comments(
+    async def iter_video_comments(
         self,
         video_id: str,
-        crawl_interval: float = 1.0,
         is_fetch_sub_comments=False,
-        callback: Optional[Callable] = None,
         max_count: int = 10,
-    ):
+        frontier_unit: Optional[FrontierUnit] = None,
+    ) -> AsyncIterator[List[Dict]]:
         """
-        get video all comments include sub comments
+        按页获取视频评论（一级评论页之后紧跟它的二级评论页），每次 yield 一页，不在内存中累积整个评论区
         :param video_id:
-        :param crawl_interval:
         :param is_fetch_sub_comments:
-        :param callback:
-        max_count: 一次笔记爬取的最大评论数量
+        max_count: 一次笔记爬取的最大一级评论数量
+        frontier_unit: 评论游标的爬取进度，传入时从上次的游标继续，调用方处理完一页及其二级评论后写入检查点
 
         :return:
         """
-        result = []
         is_end = False
         next_page = 0
+        fetched_count = 0
+        if frontier_unit and frontier_unit.cursor is not None:
+            next_page = frontier_unit.cursor
+            fetched_count = frontier_unit.payload.get("count", 0)
         max_retries = 3
-        while not is_end and len(result) < max_count:
+        while not is_end and fetched_count < max_count:
             comments_res = None
             for attempt in range(max_retries):
                 try:
@@ -283,10 +293,10 @@ class BilibiliClient(AbstractApiClient, ProxyRefreshMixin):
                 except DataFetchError as e:
                     if attempt < max_retries - 1:
                         delay = 5 * (2**attempt) + random.uniform(0, 1)
-                        utils.logger.warning(f"[BilibiliClient.get_video_all_comments] Retrying video_id {video_id} in {delay:.2f}s... (Attempt {attempt + 1}/{max_retries})")
+                        utils.logger.warning(f"[BilibiliClient.iter_video_comments] Retrying video_id {video_id} in {delay:.2f}s... (Attempt {attempt + 1}/{max_retries})")
                         await asyncio.sleep(delay)
                     else:
-                        utils.logger.error(f"[BilibiliClient.get_video_all_comments] Max retries reached for video_id: {video_id}. Skipping comments. Error: {e}")
+                        utils.logger.error(f"[BilibiliClient.iter_video_comments] Max retries reached for video_id: {video_id}. Skipping comments. Error: {e}")
                         is_end = True
                         break
             if not comments_res:
@@ -294,54 +304,51 @@ class BilibiliClient(AbstractApiClient, ProxyRefreshMixin):
 
             cursor_info: Dict = comments_res.get("cursor")
             if not cursor_info:
-                utils.logger.warning(f"[BilibiliClient.get_video_all_comments] Could not find 'cursor' in response for video_id: {video_id}. Skipping.")
+                utils.logger.warning(f"[BilibiliClient.iter_video_comments] Could not find 'cursor' in response for video_id: {video_id}. Skipping.")
                 break
 
             comment_list: List[Dict] = comments_res.get("replies", [])
 
             # 检查 is_end 和 next 是否存在
             if "is_end" not in cursor_info or "next" not in cursor_info:
-                utils.logger.warning(f"[BilibiliClient.get_video_all_comments] 'is_end' or 'next' not in cursor for video_id: {video_id}. Assuming end of comments.")
+                utils.logger.warning(f"[BilibiliClient.iter_video_comments] 'is_end' or 'next' not in cursor for video_id: {video_id}. Assuming end of comments.")
                 is_end = True
             else:
                 is_end = cursor_info.get("is_end")
                 next_page = cursor_info.get("next")
 
             if not isinstance(is_end, bool):
-                utils.logger.warning(f"[BilibiliClient.get_video_all_comments] 'is_end' is not a boolean for video_id: {video_id}. Assuming end of comments.")
+                utils.logger.warning(f"[BilibiliClient.iter_video_comments] 'is_end' is not a boolean for video_id: {video_id}. Assuming end of comments.")
                 is_end = True
+            comment_list = comment_list[:max_count - fetched_count]
+            fetched_count += len(comment_list)
+            if comment_list:
+                yield comment_list
             if is_fetch_sub_comments:
-                for comment in comment_list:
-                    comment_id = comment['rpid']
-                    if (comment.get("rcount", 0) > 0):
-                        {await self.get_video_all_level_two_comments(video_id, comment_id, CommentOrderType.DEFAULT, 10, crawl_interval, callback)}
-            if len(result) + len(comment_list) > max_count:
-                comment_list = comment_list[:max_count - len(result)]
-            if callback:  # 如果有回调函数，就执行回调函数
-                await callback(video_id, comment_list)
-            await asyncio.sleep(crawl_interval)
-            if not is_fetch_sub_comments:
-                result.extend(comment_list)
-                continue
-        return result
-
-    async def get_video_all_level_two_comments(
+                # 不同一级评论的二级评论分页互不依赖，最多 SUB_COMMENT_CONCURRENCY 条同时展开
+                streams = [
+                    partial(self.iter_video_level_two_comments, video_id, comment["rpid"], CommentOrderType.DEFAULT, 10)
+                    for comment in comment_list
+                    if comment.get("rcount", 0) > 0
+                ]
+                async for sub_comments in merge_page_streams(streams, config.SUB_COMMENT_CONCURRENCY):
+                    yield sub_comments
+            if frontier_unit:
+                await frontier_unit.checkpoint(next_page, count=fetched_count)
+
+    async def iter_video_level_two_comments(
         self,
         video_id: str,
         level_one_comment_id: int,
         order_mode: CommentOrderType,
         ps: int = 10,
-        crawl_interval: float = 1.0,
-        callback: Optional[Callable] = None,
-    ) -> Dict:
+    ) -> AsyncIterator[List[Dict]]:
         """
-        get video all level two comments for a level one comment
+        按页获取一条一级评论下的所有二级评论，每次 yield 一页
         :param video_id: 视频 ID
         :param level_one_comment_id: 一级评论 ID
         :param order_mode:
         :param ps: 一页评论数
-        :param crawl_interval:
-        :param callback:
         :return:
         """
 
@@ -349,9 +356,8 @@ class BilibiliClient(AbstractApiClient, ProxyRefreshMixin):
         while True:
             result = await self.get_video_level_two_comments(video_id, level_one_comment_id, pn, ps, order_mode)
             comment_list: List[Dict] = result.get("replies", [])
-            if callback:  # 如果有回调函数，就执行回调函数
-                await callback(video_id, comment_list)
-            await asyncio.sleep(crawl_interval)
+            if comment_list:
+                yield comment_list
             if (int(result["page"]["count"]) <= pn * ps):
                 break
 
@@ -411,7 +417,9 @@ class BilibiliClient(AbstractApiClient, ProxyRefreshMixin):
         post_data = {
             "mid": creator_id,
         }
-        return await self.get(uri, post_data)
+        return await get_response_cache().fetch(
+            CACHE_CREATOR_INFO, "GET", uri, post_data, lambda: self.get(uri, post_data)
+        )
 
     async def get_creator_fans(
         self,
@@ -476,14 +484,12 @@ class BilibiliClient(AbstractApiClient, ProxyRefreshMixin):
     async def get_creator_all_fans(
         self,
         creator_info: Dict,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_count: int = 100,
     ) -> List:
         """
         get creator all fans
         :param creator_info:
-        :param crawl_interval:
         :param callback:
         :param max_count: 一个up主爬取的最大粉丝数量
 
@@ -501,7 +507,6 @@ class BilibiliClient(AbstractApiClient, ProxyRefreshMixin):
                 fans_list = fans_list[:max_count - len(result)]
             if callback:  # 如果有回调函数，就执行回调函数
                 await callback(creator_info, fans_list)
-            await asyncio.sleep(crawl_interval)
             if not fans_list:
                 break
             result.extend(fans_list)
@@ -510,14 +515,12 @@ class BilibiliClient(AbstractApiClient, ProxyRefreshMixin):
     async def get_creator_all_followings(
         self,
         creator_info: Dict,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_count: int = 100,
     ) -> List:
         """
         get creator all followings
         :param creator_info:
-        :param crawl_interval:
         :param callback:
         :param max_count: 一个up主爬取的最大关注者数量
 
@@ -535,7 +538,6 @@ class BilibiliClient(AbstractApiClient, ProxyRefreshMixin):
                 followings_list = followings_list[:max_count - len(result)]
             if callback:  # 如果有回调函数，就执行回调函数
                 await callback(creator_info, followings_list)
-            await asyncio.sleep(crawl_interval)
             if not followings_list:
                 break
             result.extend(followings_list)
@@ -544,14 +546,12 @@ class BilibiliClient(AbstractApiClient, ProxyRefreshMixin):
     async def get_creator_all_dynamics(
         self,
         creator_info: Dict,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_count: int = 20,
     ) -> List:
         """
         get creator all followings
         :param creator_info:
-        :param crawl_interval:
         :param callback:
         :param max_count: 一个up主爬取的最大动态数量
 
@@ -570,6 +570,5 @@ class BilibiliClient(AbstractApiClient, ProxyRefreshMixin):
                 dynamics_list = dynamics_list[:max_count - len(result)]
             if callback:
                 await callback(creator_info, dynamics_list)
-            await asyncio.sleep(crawl_interval)
             result.extend(dynamics_list)
         return result
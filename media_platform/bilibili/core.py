@@ -26,6 +26,7 @@ import asyncio
 import os
 # import random  # Removed as we now use fixed config.CRAWLER_MAX_SLEEP_SEC intervals
 from asyncio import Task
+from functools import partial
 from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 import pandas as pd
@@ -42,9 +43,14 @@ from playwright._impl._errors import TargetClosedError
 import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_mixin import proxy_session
 from store import bilibili as bilibili_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
+from tools.crawl_frontier import get_crawl_frontier
+from tools.crawl_scheduler import PRIORITY_COMMENTS, PRIORITY_DETAIL, PRIORITY_MEDIA, work_priority
+from tools.media_queue import submit_media
+from tools.seen_index import ITEM_COMMENTS, ITEM_CONTENT, get_seen_index
 from var import crawler_type_var, source_keyword_var
 
 from .client import BilibiliClient
@@ -186,10 +192,16 @@ class BilibiliCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < bili_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = bili_limit_count
         start_page = config.START_PAGE  # start page number
+        frontier = get_crawl_frontier()
+        seen_index = get_seen_index()
         for keyword in config.KEYWORDS.split(","):
             source_keyword_var.set(keyword)
             utils.logger.info(f"[BilibiliCrawler.search_by_keywords] Current search keyword: {keyword}")
-            page = 1
+            search_unit = await frontier.get_unit(f"search:{keyword}", kind="search_page")
+            if search_unit.done:
+                utils.logger.info(f"[BilibiliCrawler.search_by_keywords] Keyword {keyword} already finished, skip")
+                continue
+            page = search_unit.cursor or 1
             while (page - start_page + 1) * bili_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
                 if page < start_page:
                     utils.logger.info(f"[BilibiliCrawler.search_by_keywords] Skip page: {page}")
@@ -212,10 +224,12 @@ class BilibiliCrawler(AbstractCrawler):
                     utils.logger.info(f"[BilibiliCrawler.search_by_keywords] No more videos for '{keyword}', moving to next keyword.")
                     break
 
-                semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+                # 近期已经爬取过的视频不再请求详情，评论是否需要刷新由 get_comments 单独判断
+                unseen_aids = set(await seen_index.filter_unseen(ITEM_CONTENT, [video_item.get("aid") for video_item in video_list]))
+                video_id_list.extend(video_item.get("aid") for video_item in video_list if str(video_item.get("aid")) not in unseen_aids)
                 task_list = []
                 try:
-                    task_list = [self.get_video_info_task(aid=video_item.get("aid"), bvid="", semaphore=semaphore) for video_item in video_list]
+                    task_list = [self.get_video_info_task(aid=video_item.get("aid"), bvid="") for video_item in video_list if str(video_item.get("aid")) in unseen_aids]
                 except Exception as e:
                     utils.logger.warning(f"[BilibiliCrawler.search_by_keywords] error in the task list. The video for this page will not be included. {e}")
                 video_items = await asyncio.gather(*task_list)
@@ -224,14 +238,13 @@ class BilibiliCrawler(AbstractCrawler):
                         video_id_list.append(video_item.get("View").get("aid"))
                         await bilibili_store.update_bilibili_video(video_item)
                         await bilibili_store.update_up_info(video_item)
-                        await self.get_bilibili_video(video_item, semaphore)
+                        await self.get_bilibili_video(video_item)
+                await seen_index.mark_seen(ITEM_CONTENT, [video_item.get("View").get("aid") for video_item in video_items if video_item])
                 page += 1
 
-                # Sleep after page navigation
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[BilibiliCrawler.search_by_keywords] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page-1}")
-
                 await self.batch_get_video_comments(video_id_list)
+                await search_unit.checkpoint(page)
+            await search_unit.finish()
 
     async def search_by_keywords_in_time_range(self, daily_limit: bool):
         """
@@ -241,11 +254,18 @@ class BilibiliCrawler(AbstractCrawler):
         utils.logger.info(f"[BilibiliCrawler.search_by_keywords_in_time_range] Begin search with daily_limit={daily_limit}")
         bili_limit_count = 20
         start_page = config.START_PAGE
+        frontier = get_crawl_frontier()
+        seen_index = get_seen_index()
 
         for keyword in config.KEYWORDS.split(","):
             source_keyword_var.set(keyword)
             utils.logger.info(f"[BilibiliCrawler.search_by_keywords_in_time_range] Current search keyword: {keyword}")
-            total_notes_crawled_for_keyword = 0
+            search_unit = await frontier.get_unit(f"search:{keyword}", kind="search_keyword")
+            if search_unit.done:
+                utils.logger.info(f"[BilibiliCrawler.search_by_keywords_in_time_range] Keyword {keyword} already finished, skip")
+                continue
+            total_notes_crawled_for_keyword = search_unit.payload.get("total", 0)
+            keyword_finished = True
 
             for day in pd.date_range(start=config.START_DAY, end=config.END_DAY, freq="D"):
                 if (daily_limit and total_notes_crawled_for_keyword >= config.CRAWLER_MAX_NOTES_COUNT):
@@ -256,9 +276,13 @@ class BilibiliCrawler(AbstractCrawler):
                     utils.logger.info(f"[BilibiliCrawler.search] Reached CRAWLER_MAX_NOTES_COUNT limit for keyword '{keyword}', skipping remaining days.")
                     break
 
+                day_unit = await frontier.get_unit(f"search:{keyword}:{day.strftime('%Y-%m-%d')}", kind="search_day")
+                if day_unit.done:
+                    continue
                 pubtime_begin_s, pubtime_end_s = await self.get_pubtime_datetime(start=day.strftime("%Y-%m-%d"), end=day.strftime("%Y-%m-%d"))
-                page = 1
-                notes_count_this_day = 0
+                page = day_unit.cursor or 1
+                notes_count_this_day = day_unit.payload.get("count", 0)
+                day_finished = True
 
                 while True:
                     if notes_count_this_day >= config.MAX_NOTES_PER_DAY:
@@ -287,8 +311,9 @@ class BilibiliCrawler(AbstractCrawler):
                             utils.logger.info(f"[BilibiliCrawler.search] No more videos for '{keyword}' on {day.ctime()}, moving to next day.")
                             break
 
-                        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-                        task_list = [self.get_video_info_task(aid=video_item.get("aid"), bvid="", semaphore=semaphore) for video_item in video_list]
+                        unseen_aids = set(await seen_index.filter_unseen(ITEM_CONTENT, [video_item.get("aid") for video_item in video_list]))
+                        video_id_list.extend(video_item.get("aid") for video_item in video_list if str(video_item.get("aid")) not in unseen_aids)
+                        task_list = [self.get_video_info_task(aid=video_item.get("aid"), bvid="") for video_item in video_list if str(video_item.get("aid")) in unseen_aids]
                         video_items = await asyncio.gather(*task_list)
 
                         for video_item in video_items:
@@ -304,20 +329,25 @@ class BilibiliCrawler(AbstractCrawler):
                                 video_id_list.append(video_item.get("View").get("aid"))
                                 await bilibili_store.update_bilibili_video(video_item)
                                 await bilibili_store.update_up_info(video_item)
-                                await self.get_bilibili_video(video_item, semaphore)
+                                await self.get_bilibili_video(video_item)
+                        await seen_index.mark_seen(ITEM_CONTENT, [video_item.get("View").get("aid") for video_item in video_items if video_item])
 
                         page += 1
 
-                        # Sleep after page navigation
-                        await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                        utils.logger.info(f"[BilibiliCrawler.search_by_keywords_in_time_range] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page-1}")
-
                         await self.batch_get_video_comments(video_id_list)
+                        await day_unit.checkpoint(page, count=notes_count_this_day)
+                        await search_unit.checkpoint(None, total=total_notes_crawled_for_keyword)
 
                     except Exception as e:
                         utils.logger.error(f"[BilibiliCrawler.search] Error searching on {day.ctime()}: {e}")
+                        day_finished = keyword_finished = False
                         break
 
+                if day_finished:
+                    await day_unit.finish(count=notes_count_this_day)
+            if keyword_finished:
+                await search_unit.finish(total=total_notes_crawled_for_keyword)
+
     async def batch_get_video_comments(self, video_id_list: List[str]):
         """
         batch get video comments
@@ -329,32 +359,36 @@ class BilibiliCrawler(AbstractCrawler):
             return
 
         utils.logger.info(f"[BilibiliCrawler.batch_get_video_comments] video ids:{video_id_list}")
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         task_list: List[Task] = []
         for video_id in video_id_list:
-            task = asyncio.create_task(self.get_comments(video_id, semaphore), name=video_id)
+            task = asyncio.create_task(self.get_comments(video_id), name=video_id)
             task_list.append(task)
         await asyncio.gather(*task_list)
 
-    async def get_comments(self, video_id: str, semaphore: asyncio.Semaphore):
+    async def get_comments(self, video_id: str):
         """
         get comment for video id
         :param video_id:
-        :param semaphore:
         :return:
         """
-        async with semaphore:
+        with work_priority(PRIORITY_COMMENTS), proxy_session(f"comments:{video_id}"):
+            comment_unit = await get_crawl_frontier().get_unit(f"comments:{video_id}", kind="comment_cursor")
+            if comment_unit.done:
+                utils.logger.info(f"[BilibiliCrawler.get_comments] Comments of video {video_id} already finished, skip")
+                return
+            if await get_seen_index().is_fresh(ITEM_COMMENTS, video_id):
+                return
             try:
                 utils.logger.info(f"[BilibiliCrawler.get_comments] begin get video_id: {video_id} comments ...")
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[BilibiliCrawler.get_comments] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching comments for video {video_id}")
-                await self.bili_client.get_video_all_comments(
+                async for comments in self.bili_client.iter_video_comments(
                     video_id=video_id,
-                    crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
                     is_fetch_sub_comments=config.ENABLE_GET_SUB_COMMENTS,
-                    callback=bilibili_store.batch_update_bilibili_video_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
-                )
+                    frontier_unit=comment_unit,
+                ):
+                    await bilibili_store.batch_update_bilibili_video_comments(video_id, comments)
+                await comment_unit.finish()
+                await get_seen_index().mark_seen(ITEM_COMMENTS, [video_id])
 
             except DataFetchError as ex:
                 utils.logger.error(f"[BilibiliCrawler.get_comments] get video_id: {video_id} comment error: {ex}")
@@ -376,8 +410,6 @@ class BilibiliCrawler(AbstractCrawler):
             await self.get_specified_videos(video_bvids_list)
             if int(result["page"]["count"]) <= pn * ps:
                 break
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-            utils.logger.info(f"[BilibiliCrawler.get_creator_videos] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {pn}")
             pn += 1
 
     async def get_specified_videos(self, video_url_list: List[str]):
@@ -397,8 +429,7 @@ class BilibiliCrawler(AbstractCrawler):
                 utils.logger.error(f"[BilibiliCrawler.get_specified_videos] Failed to parse video URL: {e}")
                 continue
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-        task_list = [self.get_video_info_task(aid=0, bvid=video_id, semaphore=semaphore) for video_id in bvids_list]
+        task_list = [self.get_video_info_task(aid=0, bvid=video_id) for video_id in bvids_list]
         video_details = await asyncio.gather(*task_list)
         video_aids_list = []
         for video_detail in video_details:
@@ -409,25 +440,20 @@ class BilibiliCrawler(AbstractCrawler):
                     video_aids_list.append(video_aid)
                 await bilibili_store.update_bilibili_video(video_detail)
                 await bilibili_store.update_up_info(video_detail)
-                await self.get_bilibili_video(video_detail, semaphore)
+                await self.get_bilibili_video(video_detail)
         await self.batch_get_video_comments(video_aids_list)
 
-    async def get_video_info_task(self, aid: int, bvid: str, semaphore: asyncio.Semaphore) -> Optional[Dict]:
+    async def get_video_info_task(self, aid: int, bvid: str) -> Optional[Dict]:
         """
         Get video detail task
         :param aid:
         :param bvid:
-        :param semaphore:
         :return:
         """
-        async with semaphore:
+        with work_priority(PRIORITY_DETAIL):
             try:
                 result = await self.bili_client.get_video_info(aid=aid, bvid=bvid)
 
-                # Sleep after fetching video details
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[BilibiliCrawler.get_video_info_task] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching video details {bvid or aid}")
-
                 return result
             except DataFetchError as ex:
                 utils.logger.error(f"[BilibiliCrawler.get_video_info_task] Get video detail error: {ex}")
@@ -436,15 +462,14 @@ class BilibiliCrawler(AbstractCrawler):
                 utils.logger.error(f"[BilibiliCrawler.get_video_info_task] have not fund note detail video_id:{bvid}, err: {ex}")
                 return None
 
-    async def get_video_play_url_task(self, aid: int, cid: int, semaphore: asyncio.Semaphore) -> Union[Dict, None]:
+    async def get_video_play_url_task(self, aid: int, cid: int) -> Union[Dict, None]:
         """
         Get video play url
         :param aid:
         :param cid:
-        :param semaphore:
         :return:
         """
-        async with semaphore:
+        with work_priority(PRIORITY_MEDIA):
             try:
                 result = await self.bili_client.get_video_play_url(aid=aid, cid=cid)
                 return result
@@ -563,11 +588,10 @@ class BilibiliCrawler(AbstractCrawler):
         except Exception as e:
             utils.logger.error(f"[BilibiliCrawler.close] An error occurred during close: {e}")
 
-    async def get_bilibili_video(self, video_item: Dict, semaphore: asyncio.Semaphore):
+    async def get_bilibili_video(self, video_item: Dict):
         """
         download bilibili video
         :param video_item:
-        :param semaphore:
         :return:
         """
         if not config.ENABLE_GET_MEIDAS:
@@ -576,7 +600,7 @@ class BilibiliCrawler(AbstractCrawler):
         video_item_view: Dict = video_item.get("View")
         aid = video_item_view.get("aid")
         cid = video_item_view.get("cid")
-        result = await self.get_video_play_url_task(aid, cid, semaphore)
+        result = await self.get_video_play_url_task(aid, cid)
         if result is None:
             utils.logger.info("[BilibiliCrawler.get_bilibili_video] get video play url failed")
             return
@@ -592,13 +616,12 @@ class BilibiliCrawler(AbstractCrawler):
             utils.logger.info("[BilibiliCrawler.get_bilibili_video] get video url failed")
             return
 
-        content = await self.bili_client.get_video_media(video_url)
-        await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-        utils.logger.info(f"[BilibiliCrawler.get_bilibili_video] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching video {aid}")
-        if content is None:
-            return
         extension_file_name = f"video.mp4"
-        await bilibili_store.store_video(aid, content, extension_file_name)
+        await submit_media(
+            video_url,
+            partial(self.bili_client.get_video_media, video_url),
+            partial(bilibili_store.store_video, aid, extension_file_name=extension_file_name),
+        )
 
     async def get_all_creator_details(self, creator_url_list: List[str]):
         """
@@ -619,25 +642,23 @@ class BilibiliCrawler(AbstractCrawler):
 
         utils.logger.info(f"[BilibiliCrawler.get_all_creator_details] creator ids:{creator_id_list}")
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         task_list: List[Task] = []
         try:
             for creator_id in creator_id_list:
-                task = asyncio.create_task(self.get_creator_details(creator_id, semaphore), name=str(creator_id))
+                task = asyncio.create_task(self.get_creator_details(creator_id), name=str(creator_id))
                 task_list.append(task)
         except Exception as e:
             utils.logger.warning(f"[BilibiliCrawler.get_all_creator_details] error in the task list. The creator will not be included. {e}")
 
         await asyncio.gather(*task_list)
 
-    async def get_creator_details(self, creator_id: int, semaphore: asyncio.Semaphore):
+    async def get_creator_details(self, creator_id: int):
         """
         get details for creator id
         :param creator_id:
-        :param semaphore:
         :return:
         """
-        async with semaphore:
+        with work_priority(PRIORITY_DETAIL):
             creator_unhandled_info: Dict = await self.bili_client.get_creator_info(creator_id)
             creator_info: Dict = {
                 "id": creator_id,
@@ -645,24 +666,22 @@ class BilibiliCrawler(AbstractCrawler):
                 "sign": creator_unhandled_info.get("sign"),
                 "avatar": creator_unhandled_info.get("face"),
             }
-        await self.get_fans(creator_info, semaphore)
-        await self.get_followings(creator_info, semaphore)
-        await self.get_dynamics(creator_info, semaphore)
+        await self.get_fans(creator_info)
+        await self.get_followings(creator_info)
+        await self.get_dynamics(creator_info)
 
-    async def get_fans(self, creator_info: Dict, semaphore: asyncio.Semaphore):
+    async def get_fans(self, creator_info: Dict):
         """
         get fans for creator id
         :param creator_info:
-        :param semaphore:
         :return:
         """
         creator_id = creator_info["id"]
-        async with semaphore:
+        with work_priority(PRIORITY_COMMENTS), proxy_session(f"fans:{creator_id}"):
             try:
                 utils.logger.info(f"[BilibiliCrawler.get_fans] begin get creator_id: {creator_id} fans ...")
                 await self.bili_client.get_creator_all_fans(
                     creator_info=creator_info,
-                    crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
                     callback=bilibili_store.batch_update_bilibili_creator_fans,
                     max_count=config.CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES,
                 )
@@ -672,20 +691,18 @@ class BilibiliCrawler(AbstractCrawler):
             except Exception as e:
                 utils.logger.error(f"[BilibiliCrawler.get_fans] may be been blocked, err:{e}")
 
-    async def get_followings(self, creator_info: Dict, semaphore: asyncio.Semaphore):
+    async def get_followings(self, creator_info: Dict):
         """
         get followings for creator id
         :param creator_info:
-        :param semaphore:
         :return:
         """
         creator_id = creator_info["id"]
-        async with semaphore:
+        with work_priority(PRIORITY_COMMENTS), proxy_session(f"followings:{creator_id}"):
             try:
                 utils.logger.info(f"[BilibiliCrawler.get_followings] begin get creator_id: {creator_id} followings ...")
                 await self.bili_client.get_creator_all_followings(
                     creator_info=creator_info,
-                    crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
                     callback=bilibili_store.batch_update_bilibili_creator_followings,
                     max_count=config.CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES,
                 )
@@ -695,20 +712,18 @@ class BilibiliCrawler(AbstractCrawler):
             except Exception as e:
                 utils.logger.error(f"[BilibiliCrawler.get_followings] may be been blocked, err:{e}")
 
-    async def get_dynamics(self, creator_info: Dict, semaphore: asyncio.Semaphore):
+    async def get_dynamics(self, creator_info: Dict):
         """
         get dynamics for creator id
         :param creator_info:
-        :param semaphore:
         :return:
         """
         creator_id = creator_info["id"]
-        async with semaphore:
+        with work_priority(PRIORITY_COMMENTS), proxy_session(f"dynamics:{creator_id}"):
             try:
                 utils.logger.info(f"[BilibiliCrawler.get_dynamics] begin get creator_id: {creator_id} dynamics ...")
                 await self.bili_client.get_creator_all_dynamics(
                     creator_info=creator_info,
-                    crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
                     callback=bilibili_store.batch_update_bilibili_creator_dynamics,
                     max_count=config.CRAWLER_MAX_DYNAMICS_COUNT_SINGLENOTES,
                 )
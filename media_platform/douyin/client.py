@@ -17,18 +17,25 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
-import asyncio
 import copy
 import json
 import urllib.parse
-from typing import TYPE_CHECKING, Any, Callable, Dict, Union, Optional
+from functools import partial
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Union, Optional
 
 import httpx
 from playwright.async_api import BrowserContext
 
+import config
 from base.base_crawler import AbstractApiClient
 from proxy.proxy_mixin import ProxyRefreshMixin
 from tools import utils
+from tools.crawl_frontier import FrontierUnit
+from tools.crawl_pipeline import merge_page_streams
+from tools.http_client import get_http_client
+from tools.media_downloader import get_media_downloader
+from tools.rate_limiter import get_rate_limiter
+from tools.response_cache import CACHE_CREATOR_INFO, CACHE_NOTE_DETAIL, get_response_cache
 from var import request_keyword_var
 
 if TYPE_CHECKING:
@@ -113,11 +120,11 @@ class DouYinClient(AbstractApiClient, ProxyRefreshMixin):
             params["a_bogus"] = a_bogus
 
     async def request(self, method, url, **kwargs):
-        # 每次请求前检测代理是否过期
-        await self._refresh_proxy_if_expired()
-
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        async with get_rate_limiter().limit(url) as permit:
+            # 每次请求从代理池租用代理（多代理轮换），或检测当前代理是否过期
+            async with self.lease_proxy() as proxy:
+                response = await get_http_client(proxy).request(method, url, timeout=self.timeout, **kwargs)
+            permit.set_response(response.status_code)
         try:
             if response.text == "" or response.text == "blocked":
                 utils.logger.error(f"request params incrr, response.text: {response.text}")
@@ -203,7 +210,10 @@ class DouYinClient(AbstractApiClient, ProxyRefreshMixin):
         params = {"aweme_id": aweme_id}
         headers = copy.copy(self.headers)
         del headers["Origin"]
-        res = await self.get("/aweme/v1/web/aweme/detail/", params, headers)
+        uri = "/aweme/v1/web/aweme/detail/"
+        res = await get_response_cache().fetch(
+            CACHE_NOTE_DETAIL, "GET", uri, params, lambda: self.get(uri, params, headers)
+        )
         return res.get("aweme_detail", {})
 
     async def get_aweme_comments(self, aweme_id: str, cursor: int = 0):
@@ -236,64 +246,77 @@ class DouYinClient(AbstractApiClient, ProxyRefreshMixin):
         headers["Referer"] = urllib.parse.quote(referer_url, safe=':/')
         return await self.get(uri, params)
 
-    async def get_aweme_all_comments(
+    async def iter_aweme_comments(
         self,
         aweme_id: str,
-        crawl_interval: float = 1.0,
         is_fetch_sub_comments=False,
-        callback: Optional[Callable] = None,
         max_count: int = 10,
-    ):
+        frontier_unit: Optional[FrontierUnit] = None,
+    ) -> AsyncIterator[List[Dict]]:
         """
-        获取帖子的所有评论，包括子评论
+        按页获取帖子的评论（一级评论页之后紧跟它的子评论页），每次 yield 一页，不在内存中累积整个评论区
         :param aweme_id: 帖子ID
-        :param crawl_interval: 抓取间隔
         :param is_fetch_sub_comments: 是否抓取子评论
-        :param callback: 回调函数，用于处理抓取到的评论
         :param max_count: 一次帖子爬取的最大评论数量
-        :return: 评论列表
+        :param frontier_unit: 评论游标的爬取进度，传入时从上次的游标继续，调用方处理完一页及其子评论后写入检查点
+        :return: 评论页
         """
-        result = []
         comments_has_more = 1
         comments_cursor = 0
-        while comments_has_more and len(result) < max_count:
+        fetched_count = 0
+        if frontier_unit and frontier_unit.cursor is not None:
+            comments_cursor = frontier_unit.cursor
+            fetched_count = frontier_unit.payload.get("count", 0)
+        while comments_has_more and fetched_count < max_count:
             comments_res = await self.get_aweme_comments(aweme_id, comments_cursor)
             comments_has_more = comments_res.get("has_more", 0)
             comments_cursor = comments_res.get("cursor", 0)
             comments = comments_res.get("comments", [])
             if not comments:
                 continue
-            if len(result) + len(comments) > max_count:
-                comments = comments[:max_count - len(result)]
-            result.extend(comments)
-            if callback:  # 如果有回调函数，就执行回调函数
-                await callback(aweme_id, comments)
-
-            await asyncio.sleep(crawl_interval)
-            if not is_fetch_sub_comments:
+            comments = comments[:max_count - fetched_count]
+            fetched_count += len(comments)
+            yield comments
+
+            if is_fetch_sub_comments:
+                async for sub_comments in self.iter_sub_comments(aweme_id, comments):
+                    fetched_count += len(sub_comments)
+                    yield sub_comments
+            if frontier_unit:
+                await frontier_unit.checkpoint(comments_cursor, count=fetched_count)
+
+    async def iter_sub_comments(self, aweme_id: str, comments: List[Dict]) -> AsyncIterator[List[Dict]]:
+        """
+        按页获取一级评论下的二级评论，每次 yield 一页
+        不同一级评论之间互不依赖，最多 SUB_COMMENT_CONCURRENCY 条一级评论同时展开
+        :param aweme_id: 帖子ID
+        :param comments: 一级评论列表
+        :return: 子评论页
+        """
+        streams = [
+            partial(self._iter_root_sub_comments, aweme_id, comment.get("cid"))
+            for comment in comments
+            if comment.get("reply_comment_total") > 0
+        ]
+        async for sub_comments in merge_page_streams(streams, config.SUB_COMMENT_CONCURRENCY):
+            yield sub_comments
+
+    async def _iter_root_sub_comments(self, aweme_id: str, comment_id: str) -> AsyncIterator[List[Dict]]:
+        """
+        按游标翻页获取一条一级评论下的全部二级评论
+        """
+        sub_comments_has_more = 1
+        sub_comments_cursor = 0
+
+        while sub_comments_has_more:
+            sub_comments_res = await self.get_sub_comments(aweme_id, comment_id, sub_comments_cursor)
+            sub_comments_has_more = sub_comments_res.get("has_more", 0)
+            sub_comments_cursor = sub_comments_res.get("cursor", 0)
+            sub_comments = sub_comments_res.get("comments", [])
+
+            if not sub_comments:
                 continue
-            # 获取二级评论
-            for comment in comments:
-                reply_comment_total = comment.get("reply_comment_total")
-
-                if reply_comment_total > 0:
-                    comment_id = comment.get("cid")
-                    sub_comments_has_more = 1
-                    sub_comments_cursor = 0
-
-                    while sub_comments_has_more:
-                        sub_comments_res = await self.get_sub_comments(aweme_id, comment_id, sub_comments_cursor)
-                        sub_comments_has_more = sub_comments_res.get("has_more", 0)
-                        sub_comments_cursor = sub_comments_res.get("cursor", 0)
-                        sub_comments = sub_comments_res.get("comments", [])
-
-                        if not sub_comments:
-                            continue
-                        result.extend(sub_comments)
-                        if callback:  # 如果有回调函数，就执行回调函数
-                            await callback(aweme_id, sub_comments)
-                        await asyncio.sleep(crawl_interval)
-        return result
+            yield sub_comments
 
     async def get_user_info(self, sec_user_id: str):
         uri = "/aweme/v1/web/user/profile/other/"
@@ -302,7 +325,9 @@ class DouYinClient(AbstractApiClient, ProxyRefreshMixin):
             "publish_video_strategy_type": 2,
             "personal_center_strategy": 1,
         }
-        return await self.get(uri, params)
+        return await get_response_cache().fetch(
+            CACHE_CREATOR_INFO, "GET", uri, params, lambda: self.get(uri, params)
+        )
 
     async def get_user_aweme_posts(self, sec_user_id: str, max_cursor: str = "") -> Dict:
         uri = "/aweme/v1/web/aweme/post/"
@@ -332,19 +357,17 @@ class DouYinClient(AbstractApiClient, ProxyRefreshMixin):
             result.extend(aweme_list)
         return result
 
-    async def get_aweme_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            try:
-                response = await client.request("GET", url, timeout=self.timeout, follow_redirects=True)
-                response.raise_for_status()
-                if not response.reason_phrase == "OK":
-                    utils.logger.error(f"[DouYinClient.get_aweme_media] request {url} err, res:{response.text}")
-                    return None
-                else:
-                    return response.content
-            except httpx.HTTPError as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
-                utils.logger.error(f"[DouYinClient.get_aweme_media] {exc.__class__.__name__} for {exc.request.url} - {exc}")  # 保留原始异常类型名称，以便开发者调试
-                return None
+    async def get_aweme_media(self, url: str) -> Union[str, None]:
+        """
+        流式下载作品图片/视频到临时文件
+        Args:
+            url: 媒体地址
+
+        Returns:
+            下载完成的临时文件路径，失败返回 None
+        """
+        async with self.lease_proxy() as proxy:
+            return await get_media_downloader().download(url, proxy=proxy, timeout=self.timeout)
 
     async def resolve_short_url(self, short_url: str) -> str:
         """
@@ -354,19 +377,19 @@ class DouYinClient(AbstractApiClient, ProxyRefreshMixin):
         Returns:
             重定向后的完整URL
         """
-        async with httpx.AsyncClient(proxy=self.proxy, follow_redirects=False) as client:
-            try:
-                utils.logger.info(f"[DouYinClient.resolve_short_url] Resolving short URL: {short_url}")
-                response = await client.get(short_url, timeout=10)
-
-                # 短链接通常返回302重定向
-                if response.status_code in [301, 302, 303, 307, 308]:
-                    redirect_url = response.headers.get("Location", "")
-                    utils.logger.info(f"[DouYinClient.resolve_short_url] Resolved to: {redirect_url}")
-                    return redirect_url
-                else:
-                    utils.logger.warning(f"[DouYinClient.resolve_short_url] Unexpected status code: {response.status_code}")
-                    return ""
-            except Exception as e:
-                utils.logger.error(f"[DouYinClient.resolve_short_url] Failed to resolve short URL: {e}")
+        try:
+            utils.logger.info(f"[DouYinClient.resolve_short_url] Resolving short URL: {short_url}")
+            async with self.lease_proxy() as proxy:
+                response = await get_http_client(proxy).get(short_url, timeout=10, follow_redirects=False)
+
+            # 短链接通常返回302重定向
+            if response.status_code in [301, 302, 303, 307, 308]:
+                redirect_url = response.headers.get("Location", "")
+                utils.logger.info(f"[DouYinClient.resolve_short_url] Resolved to: {redirect_url}")
+                return redirect_url
+            else:
+                utils.logger.warning(f"[DouYinClient.resolve_short_url] Unexpected status code: {response.status_code}")
                 return ""
+        except Exception as e:
+            utils.logger.error(f"[DouYinClient.resolve_short_url] Failed to resolve short URL: {e}")
+            return ""
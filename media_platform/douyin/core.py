@@ -19,8 +19,8 @@
 
 import asyncio
 import os
-import random
 from asyncio import Task
+from functools import partial
 from typing import Any, Dict, List, Optional, Tuple
 
 from playwright.async_api import (
@@ -34,9 +34,15 @@ from playwright.async_api import (
 import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_mixin import proxy_session
 from store import douyin as douyin_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
+from tools.crawl_frontier import get_crawl_frontier
+from tools.crawl_pipeline import CrawlPipeline, PageCheckpointer, PipelineBatch
+from tools.crawl_scheduler import PRIORITY_COMMENTS, PRIORITY_DETAIL, work_priority
+from tools.media_queue import submit_media
+from tools.seen_index import ITEM_COMMENTS, get_seen_index
 from var import crawler_type_var, source_keyword_var
 
 from .client import DouYinClient
@@ -120,50 +126,79 @@ class DouYinCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < dy_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = dy_limit_count
         start_page = config.START_PAGE  # start page number
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(f"[DouYinCrawler.search] Current keyword: {keyword}")
-            aweme_list: List[str] = []
-            page = 0
-            dy_search_id = ""
-            while (page - start_page + 1) * dy_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[DouYinCrawler.search] Skip {page}")
-                    page += 1
+        frontier = get_crawl_frontier()
+        # 搜索 → 存储 → 评论 流水线，评论不再等整个关键词的分页结束才开始
+        pipeline = CrawlPipeline("dy.search")
+        pipeline.add_stage("store", self._search_store_stage, workers=config.PIPELINE_STORE_WORKERS)
+        pipeline.add_stage("comments", self._search_comments_stage, workers=config.PIPELINE_COMMENT_WORKERS)
+        keyword_checkpointers: List[Tuple[PageCheckpointer, bool]] = []
+        async with pipeline:
+            for keyword in config.KEYWORDS.split(","):
+                source_keyword_var.set(keyword)
+                utils.logger.info(f"[DouYinCrawler.search] Current keyword: {keyword}")
+                search_unit = await frontier.get_unit(f"search:{keyword}", kind="search_page")
+                if search_unit.done:
+                    utils.logger.info(f"[DouYinCrawler.search] Keyword {keyword} already finished, skip")
                     continue
-                try:
-                    utils.logger.info(f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page}")
-                    posts_res = await self.dy_client.search_info_by_keyword(
-                        keyword=keyword,
-                        offset=page * dy_limit_count - dy_limit_count,
-                        publish_time=PublishTimeType(config.PUBLISH_TIME_TYPE),
-                        search_id=dy_search_id,
-                    )
-                    if posts_res.get("data") is None or posts_res.get("data") == []:
-                        utils.logger.info(f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page} is empty,{posts_res.get('data')}`")
-                        break
-                except DataFetchError:
-                    utils.logger.error(f"[DouYinCrawler.search] search douyin keyword: {keyword} failed")
-                    break
-
-                page += 1
-                if "data" not in posts_res:
-                    utils.logger.error(f"[DouYinCrawler.search] search douyin keyword: {keyword} failed，账号也许被风控了。")
-                    break
-                dy_search_id = posts_res.get("extra", {}).get("logid", "")
-                for post_item in posts_res.get("data"):
-                    try:
-                        aweme_info: Dict = (post_item.get("aweme_info") or post_item.get("aweme_mix_info", {}).get("mix_items")[0])
-                    except TypeError:
+                checkpointer = PageCheckpointer(search_unit)
+                page = search_unit.cursor or 0
+                dy_search_id = search_unit.payload.get("search_id", "")
+                keyword_finished = True
+                while (page - start_page + 1) * dy_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+                    if page < start_page:
+                        utils.logger.info(f"[DouYinCrawler.search] Skip {page}")
+                        page += 1
                         continue
-                    aweme_list.append(aweme_info.get("aweme_id", ""))
-                    await douyin_store.update_douyin_aweme(aweme_item=aweme_info)
-                    await self.get_aweme_media(aweme_item=aweme_info)
-                # Sleep after each page navigation
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[DouYinCrawler.search] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page-1}")
-            utils.logger.info(f"[DouYinCrawler.search] keyword:{keyword}, aweme_list:{aweme_list}")
-            await self.batch_get_note_comments(aweme_list)
+                    try:
+                        utils.logger.info(f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page}")
+                        posts_res = await self.dy_client.search_info_by_keyword(
+                            keyword=keyword,
+                            offset=page * dy_limit_count - dy_limit_count,
+                            publish_time=PublishTimeType(config.PUBLISH_TIME_TYPE),
+                            search_id=dy_search_id,
+                        )
+                        if "data" not in posts_res:
+                            utils.logger.error(f"[DouYinCrawler.search] search douyin keyword: {keyword} failed，账号也许被风控了。")
+                            keyword_finished = False
+                            break
+                        if posts_res.get("data") is None or posts_res.get("data") == []:
+                            utils.logger.info(f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page} is empty,{posts_res.get('data')}`")
+                            break
+                    except DataFetchError:
+                        utils.logger.error(f"[DouYinCrawler.search] search douyin keyword: {keyword} failed")
+                        keyword_finished = False
+                        break
+
+                    page += 1
+                    dy_search_id = posts_res.get("extra", {}).get("logid", "")
+                    batch = PipelineBatch()
+                    for post_item in posts_res.get("data"):
+                        try:
+                            aweme_info: Dict = (post_item.get("aweme_info") or post_item.get("aweme_mix_info", {}).get("mix_items")[0])
+                        except TypeError:
+                            continue
+                        await pipeline.put("store", (keyword, aweme_info), batch)
+                    checkpointer.add_page(batch, page, search_id=dy_search_id)
+                    await checkpointer.advance()
+                keyword_checkpointers.append((checkpointer, keyword_finished))
+            for checkpointer, keyword_finished in keyword_checkpointers:
+                await checkpointer.finish(keyword_finished)
+
+    async def _search_store_stage(self, item: Tuple[str, Dict]) -> Optional[Tuple[str, str]]:
+        """流水线存储阶段：保存作品、提交媒体下载，开启评论爬取时交给评论阶段"""
+        keyword, aweme_info = item
+        source_keyword_var.set(keyword)
+        await douyin_store.update_douyin_aweme(aweme_item=aweme_info)
+        await self.get_aweme_media(aweme_item=aweme_info)
+        if not config.ENABLE_GET_COMMENTS:
+            return None
+        return keyword, aweme_info.get("aweme_id", "")
+
+    async def _search_comments_stage(self, item: Tuple[str, str]):
+        """流水线评论阶段：爬取一个作品的评论"""
+        keyword, aweme_id = item
+        source_keyword_var.set(keyword)
+        await self.get_comments(aweme_id)
 
     async def get_specified_awemes(self):
         """Get the information and comments of the specified post from URLs or IDs"""
@@ -191,8 +226,7 @@ class DouYinCrawler(AbstractCrawler):
                 utils.logger.error(f"[DouYinCrawler.get_specified_awemes] Failed to parse video URL: {e}")
                 continue
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-        task_list = [self.get_aweme_detail(aweme_id=aweme_id, semaphore=semaphore) for aweme_id in aweme_id_list]
+        task_list = [self.get_aweme_detail(aweme_id=aweme_id) for aweme_id in aweme_id_list]
         aweme_details = await asyncio.gather(*task_list)
         for aweme_detail in aweme_details:
             if aweme_detail is not None:
@@ -200,14 +234,11 @@ class DouYinCrawler(AbstractCrawler):
                 await self.get_aweme_media(aweme_item=aweme_detail)
         await self.batch_get_note_comments(aweme_id_list)
 
-    async def get_aweme_detail(self, aweme_id: str, semaphore: asyncio.Semaphore) -> Any:
+    async def get_aweme_detail(self, aweme_id: str) -> Any:
         """Get note detail"""
-        async with semaphore:
+        with work_priority(PRIORITY_DETAIL):
             try:
                 result = await self.dy_client.get_video_by_id(aweme_id)
-                # Sleep after fetching aweme detail
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[DouYinCrawler.get_aweme_detail] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching aweme {aweme_id}")
                 return result
             except DataFetchError as ex:
                 utils.logger.error(f"[DouYinCrawler.get_aweme_detail] Get aweme detail error: {ex}")
@@ -225,29 +256,31 @@ class DouYinCrawler(AbstractCrawler):
             return
 
         task_list: List[Task] = []
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         for aweme_id in aweme_list:
-            task = asyncio.create_task(self.get_comments(aweme_id, semaphore), name=aweme_id)
+            task = asyncio.create_task(self.get_comments(aweme_id), name=aweme_id)
             task_list.append(task)
         if len(task_list) > 0:
             await asyncio.wait(task_list)
 
-    async def get_comments(self, aweme_id: str, semaphore: asyncio.Semaphore) -> None:
-        async with semaphore:
+    async def get_comments(self, aweme_id: str) -> None:
+        with work_priority(PRIORITY_COMMENTS), proxy_session(f"comments:{aweme_id}"):
+            comment_unit = await get_crawl_frontier().get_unit(f"comments:{aweme_id}", kind="comment_cursor")
+            if comment_unit.done:
+                utils.logger.info(f"[DouYinCrawler.get_comments] Comments of aweme {aweme_id} already finished, skip")
+                return
+            if await get_seen_index().is_fresh(ITEM_COMMENTS, aweme_id):
+                return
             try:
-                # 将关键词列表传递给 get_aweme_all_comments 方法
-                # Use fixed crawling interval
-                crawl_interval = config.CRAWLER_MAX_SLEEP_SEC
-                await self.dy_client.get_aweme_all_comments(
+                # 评论按页存储，不在内存中累积整个评论区
+                async for comments in self.dy_client.iter_aweme_comments(
                     aweme_id=aweme_id,
-                    crawl_interval=crawl_interval,
                     is_fetch_sub_comments=config.ENABLE_GET_SUB_COMMENTS,
-                    callback=douyin_store.batch_update_dy_aweme_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
-                )
-                # Sleep after fetching comments
-                await asyncio.sleep(crawl_interval)
-                utils.logger.info(f"[DouYinCrawler.get_comments] Sleeping for {crawl_interval} seconds after fetching comments for aweme {aweme_id}")
+                    frontier_unit=comment_unit,
+                ):
+                    await douyin_store.batch_update_dy_aweme_comments(aweme_id, comments)
+                await comment_unit.finish()
+                await get_seen_index().mark_seen(ITEM_COMMENTS, [aweme_id])
                 utils.logger.info(f"[DouYinCrawler.get_comments] aweme_id: {aweme_id} comments have all been obtained and filtered ...")
             except DataFetchError as e:
                 utils.logger.error(f"[DouYinCrawler.get_comments] aweme_id: {aweme_id} get comments failed, error: {e}")
@@ -282,8 +315,7 @@ class DouYinCrawler(AbstractCrawler):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-        task_list = [self.get_aweme_detail(post_item.get("aweme_id"), semaphore) for post_item in video_list]
+        task_list = [self.get_aweme_detail(post_item.get("aweme_id")) for post_item in video_list]
 
         note_details = await asyncio.gather(*task_list)
         for aweme_item in note_details:
@@ -420,13 +452,13 @@ class DouYinCrawler(AbstractCrawler):
         for url in note_download_url:
             if not url:
                 continue
-            content = await self.dy_client.get_aweme_media(url)
-            await asyncio.sleep(random.random())
-            if content is None:
-                continue
             extension_file_name = f"{picNum:>03d}.jpeg"
             picNum += 1
-            await douyin_store.update_dy_aweme_image(aweme_id, content, extension_file_name)
+            await submit_media(
+                url,
+                partial(self.dy_client.get_aweme_media, url),
+                partial(douyin_store.update_dy_aweme_image, aweme_id, extension_file_name=extension_file_name),
+            )
 
     async def get_aweme_video(self, aweme_item: Dict):
         """
@@ -444,9 +476,9 @@ class DouYinCrawler(AbstractCrawler):
 
         if not video_download_url:
             return
-        content = await self.dy_client.get_aweme_media(video_download_url)
-        await asyncio.sleep(random.random())
-        if content is None:
-            return
         extension_file_name = f"video.mp4"
-        await douyin_store.update_dy_aweme_video(aweme_id, content, extension_file_name)
+        await submit_media(
+            video_download_url,
+            partial(self.dy_client.get_aweme_media, video_download_url),
+            partial(douyin_store.update_dy_aweme_video, aweme_id, extension_file_name=extension_file_name),
+        )
@@ -33,8 +33,11 @@ from playwright.async_api import Page
 
 from model.m_douyin import VideoUrlInfo, CreatorUrlInfo
 from tools.crawler_util import extract_url_params_to_dict
+from tools.js_sign_pool import get_js_sign_pool, is_js_sign_pool_enabled
 
-douyin_sign_obj = execjs.compile(open('libs/douyin.js', encoding='utf-8-sig').read())
+DOUYIN_SIGN_JS_PATH = 'libs/douyin.js'
+
+douyin_sign_obj = execjs.compile(open(DOUYIN_SIGN_JS_PATH, encoding='utf-8-sig').read())
 
 def get_web_id():
     """
@@ -61,9 +64,19 @@ def get_web_id():
 async def get_a_bogus(url: str, params: str, post_data: dict, user_agent: str, page: Page = None):
     """
     获取 a_bogus 参数, 目前不支持post请求类型的签名
+    优先使用常驻签名进程池，未安装 Node.js 时回退到 execjs
     """
+    if is_js_sign_pool_enabled():
+        return await get_a_bogus_from_sign_pool(url, params, user_agent)
     return get_a_bogus_from_js(url, params, user_agent)
 
+
+def _get_sign_js_name(url: str) -> str:
+    if "/reply" in url:
+        return "sign_reply"
+    return "sign_datail"
+
+
 def get_a_bogus_from_js(url: str, params: str, user_agent: str):
     """
     通过js获取 a_bogus 参数
@@ -75,10 +88,21 @@ def get_a_bogus_from_js(url: str, params: str, user_agent: str):
     Returns:
 
     """
-    sign_js_name = "sign_datail"
-    if "/reply" in url:
-        sign_js_name = "sign_reply"
-    return douyin_sign_obj.call(sign_js_name, params, user_agent)
+    return douyin_sign_obj.call(_get_sign_js_name(url), params, user_agent)
+
+
+async def get_a_bogus_from_sign_pool(url: str, params: str, user_agent: str):
+    """
+    通过常驻签名进程获取 a_bogus 参数
+    Args:
+        url:
+        params:
+        user_agent:
+
+    Returns:
+
+    """
+    return await get_js_sign_pool(DOUYIN_SIGN_JS_PATH).call(_get_sign_js_name(url), params, user_agent)
 
 
 
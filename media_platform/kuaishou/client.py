@@ -19,9 +19,9 @@
 
 
 # -*- coding: utf-8 -*-
-import asyncio
 import json
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+from functools import partial
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional
 from urllib.parse import urlencode
 
 import httpx
@@ -31,6 +31,10 @@ import config
 from base.base_crawler import AbstractApiClient
 from proxy.proxy_mixin import ProxyRefreshMixin
 from tools import utils
+from tools.crawl_pipeline import merge_page_streams
+from tools.http_client import get_http_client
+from tools.rate_limiter import classify_endpoint, get_rate_limiter
+from tools.response_cache import CACHE_CREATOR_INFO, CACHE_NOTE_DETAIL, get_response_cache
 
 if TYPE_CHECKING:
     from proxy.proxy_ip_pool import ProxyIpPool
@@ -61,11 +65,13 @@ class KuaiShouClient(AbstractApiClient, ProxyRefreshMixin):
         self.init_proxy_pool(proxy_ip_pool)
 
     async def request(self, method, url, **kwargs) -> Any:
-        # 每次请求前检测代理是否过期
-        await self._refresh_proxy_if_expired()
-
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        # GraphQL 请求地址相同，由 post 根据 operationName 指定接口类型
+        endpoint = kwargs.pop("endpoint", None)
+        async with get_rate_limiter().limit(url, endpoint=endpoint) as permit:
+            # 每次请求从代理池租用代理（多代理轮换），或检测当前代理是否过期
+            async with self.lease_proxy() as proxy:
+                response = await get_http_client(proxy).request(method, url, timeout=self.timeout, **kwargs)
+            permit.set_response(response.status_code)
         data: Dict = response.json()
         if data.get("errors"):
             raise DataFetchError(data.get("errors", "unkonw error"))
@@ -83,7 +89,11 @@ class KuaiShouClient(AbstractApiClient, ProxyRefreshMixin):
     async def post(self, uri: str, data: dict) -> Dict:
         json_str = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
         return await self.request(
-            method="POST", url=f"{self._host}{uri}", data=json_str, headers=self.headers
+            method="POST",
+            url=f"{self._host}{uri}",
+            data=json_str,
+            headers=self.headers,
+            endpoint=classify_endpoint(data.get("operationName", "")),
         )
 
     async def pong(self) -> bool:
@@ -146,7 +156,9 @@ class KuaiShouClient(AbstractApiClient, ProxyRefreshMixin):
             "variables": {"photoId": photo_id, "page": "search"},
             "query": self.graphql.get("video_detail"),
         }
-        return await self.post("", post_data)
+        return await get_response_cache().fetch(
+            CACHE_NOTE_DETAIL, "POST", "", post_data, lambda: self.post("", post_data)
+        )
 
     async def get_video_comments(self, photo_id: str, pcursor: str = "") -> Dict:
         """get video comments
@@ -186,7 +198,9 @@ class KuaiShouClient(AbstractApiClient, ProxyRefreshMixin):
             "variables": {"userId": userId},
             "query": self.graphql.get("vision_profile"),
         }
-        return await self.post("", post_data)
+        return await get_response_cache().fetch(
+            CACHE_CREATOR_INFO, "POST", "", post_data, lambda: self.post("", post_data)
+        )
 
     async def get_video_by_creater(self, userId: str, pcursor: str = "") -> Dict:
         post_data = {
@@ -196,91 +210,82 @@ class KuaiShouClient(AbstractApiClient, ProxyRefreshMixin):
         }
         return await self.post("", post_data)
 
-    async def get_video_all_comments(
+    async def iter_video_comments(
         self,
         photo_id: str,
-        crawl_interval: float = 1.0,
-        callback: Optional[Callable] = None,
         max_count: int = 10,
-    ):
+    ) -> AsyncIterator[List[Dict]]:
         """
-        get video all comments include sub comments
+        按页获取视频评论（一级评论页之后紧跟它的二级评论页），每次 yield 一页，不在内存中累积整个评论区
         :param photo_id:
-        :param crawl_interval:
-        :param callback:
         :param max_count:
         :return:
         """
 
-        result = []
+        fetched_count = 0
         pcursor = ""
 
-        while pcursor != "no_more" and len(result) < max_count:
+        while pcursor != "no_more" and fetched_count < max_count:
             comments_res = await self.get_video_comments(photo_id, pcursor)
             vision_commen_list = comments_res.get("visionCommentList", {})
             pcursor = vision_commen_list.get("pcursor", "")
-            comments = vision_commen_list.get("rootComments", [])
-            if len(result) + len(comments) > max_count:
-                comments = comments[: max_count - len(result)]
-            if callback:  # 如果有回调函数，就执行回调函数
-                await callback(photo_id, comments)
-            result.extend(comments)
-            await asyncio.sleep(crawl_interval)
-            sub_comments = await self.get_comments_all_sub_comments(
-                comments, photo_id, crawl_interval, callback
-            )
-            result.extend(sub_comments)
-        return result
-
-    async def get_comments_all_sub_comments(
+            comments = vision_commen_list.get("rootComments", [])[: max_count - fetched_count]
+            fetched_count += len(comments)
+            if comments:
+                yield comments
+            async for sub_comments in self.iter_sub_comments(comments, photo_id):
+                fetched_count += len(sub_comments)
+                yield sub_comments
+
+    async def iter_sub_comments(
         self,
         comments: List[Dict],
         photo_id,
-        crawl_interval: float = 1.0,
-        callback: Optional[Callable] = None,
-    ) -> List[Dict]:
+    ) -> AsyncIterator[List[Dict]]:
         """
-        获取指定一级评论下的所有二级评论, 该方法会一直查找一级评论下的所有二级评论信息
+        按页获取指定一级评论下的所有二级评论，每次 yield 一页
+        不同一级评论的二级评论分页互不依赖，最多 SUB_COMMENT_CONCURRENCY 条一级评论同时展开
         Args:
             comments: 评论列表
             photo_id: 视频id
-            crawl_interval: 爬取一次评论的延迟单位（秒）
-            callback: 一次评论爬取结束后
         Returns:
 
         """
         if not config.ENABLE_GET_SUB_COMMENTS:
             utils.logger.info(
-                f"[KuaiShouClient.get_comments_all_sub_comments] Crawling sub_comment mode is not enabled"
+                f"[KuaiShouClient.iter_sub_comments] Crawling sub_comment mode is not enabled"
             )
-            return []
+            return
 
-        result = []
-        for comment in comments:
-            sub_comments = comment.get("subComments")
-            if sub_comments and callback:
-                await callback(photo_id, sub_comments)
+        streams = [partial(self._iter_root_sub_comments, comment, photo_id) for comment in comments]
+        async for sub_comments in merge_page_streams(streams, config.SUB_COMMENT_CONCURRENCY):
+            yield sub_comments
+
+    async def _iter_root_sub_comments(self, comment: Dict, photo_id) -> AsyncIterator[List[Dict]]:
+        """
+        一条一级评论的二级评论：先是随一级评论返回的部分，再按 pcursor 翻页
+        """
+        sub_comments = comment.get("subComments")
+        if sub_comments:
+            yield sub_comments
 
-            sub_comment_pcursor = comment.get("subCommentsPcursor")
-            if sub_comment_pcursor == "no_more":
-                continue
+        sub_comment_pcursor = comment.get("subCommentsPcursor")
+        if sub_comment_pcursor == "no_more":
+            return
 
-            root_comment_id = comment.get("commentId")
-            sub_comment_pcursor = ""
+        root_comment_id = comment.get("commentId")
+        sub_comment_pcursor = ""
 
-            while sub_comment_pcursor != "no_more":
-                comments_res = await self.get_video_sub_comments(
-                    photo_id, root_comment_id, sub_comment_pcursor
-                )
-                vision_sub_comment_list = comments_res.get("visionSubCommentList", {})
-                sub_comment_pcursor = vision_sub_comment_list.get("pcursor", "no_more")
-
-                comments = vision_sub_comment_list.get("subComments", {})
-                if callback:
-                    await callback(photo_id, comments)
-                await asyncio.sleep(crawl_interval)
-                result.extend(comments)
-        return result
+        while sub_comment_pcursor != "no_more":
+            comments_res = await self.get_video_sub_comments(
+                photo_id, root_comment_id, sub_comment_pcursor
+            )
+            vision_sub_comment_list = comments_res.get("visionSubCommentList", {})
+            sub_comment_pcursor = vision_sub_comment_list.get("pcursor", "no_more")
+
+            sub_comments = vision_sub_comment_list.get("subComments", [])
+            if sub_comments:
+                yield sub_comments
 
     async def get_creator_info(self, user_id: str) -> Dict:
         """
@@ -294,14 +299,12 @@ class KuaiShouClient(AbstractApiClient, ProxyRefreshMixin):
     async def get_all_videos_by_creator(
         self,
         user_id: str,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[Dict]:
         """
         获取指定用户下的所有发过的帖子，该方法会一直查找一个用户下的所有帖子信息
         Args:
             user_id: 用户ID
-            crawl_interval: 爬取一次的延迟单位（秒）
             callback: 一次分页爬取结束后的更新回调函数
         Returns:
 
@@ -327,6 +330,5 @@ class KuaiShouClient(AbstractApiClient, ProxyRefreshMixin):
 
             if callback:
                 await callback(videos)
-            await asyncio.sleep(crawl_interval)
             result.extend(videos)
         return result
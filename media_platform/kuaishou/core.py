@@ -37,9 +37,12 @@ import config
 from base.base_crawler import AbstractCrawler
 from model.m_kuaishou import VideoUrlInfo, CreatorUrlInfo
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_mixin import proxy_session
 from store import kuaishou as kuaishou_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
+from tools.crawl_frontier import get_crawl_frontier
+from tools.crawl_scheduler import PRIORITY_COMMENTS, PRIORITY_DETAIL, work_priority
 from var import comment_tasks_var, crawler_type_var, source_keyword_var
 
 from .client import KuaiShouClient
@@ -131,13 +134,18 @@ class KuaishouCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < ks_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = ks_limit_count
         start_page = config.START_PAGE
+        frontier = get_crawl_frontier()
         for keyword in config.KEYWORDS.split(","):
-            search_session_id = ""
             source_keyword_var.set(keyword)
             utils.logger.info(
                 f"[KuaishouCrawler.search] Current search keyword: {keyword}"
             )
-            page = 1
+            search_unit = await frontier.get_unit(f"search:{keyword}", kind="search_page")
+            if search_unit.done:
+                utils.logger.info(f"[KuaishouCrawler.search] Keyword {keyword} already finished, skip")
+                continue
+            search_session_id = search_unit.payload.get("search_session_id", "")
+            page = search_unit.cursor or 1
             while (
                 page - start_page + 1
             ) * ks_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
@@ -174,11 +182,9 @@ class KuaishouCrawler(AbstractCrawler):
                 # batch fetch video comments
                 page += 1
 
-                # Sleep after page navigation
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[KuaishouCrawler.search] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page-1}")
-
                 await self.batch_get_video_comments(video_id_list)
+                await search_unit.checkpoint(page, search_session_id=search_session_id)
+            await search_unit.finish()
 
     async def get_specified_videos(self):
         """Get the information and comments of the specified post"""
@@ -193,9 +199,8 @@ class KuaishouCrawler(AbstractCrawler):
                 utils.logger.error(f"Failed to parse video URL: {e}")
                 continue
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         task_list = [
-            self.get_video_info_task(video_id=video_id, semaphore=semaphore)
+            self.get_video_info_task(video_id=video_id)
             for video_id in video_ids
         ]
         video_details = await asyncio.gather(*task_list)
@@ -205,17 +210,13 @@ class KuaishouCrawler(AbstractCrawler):
         await self.batch_get_video_comments(video_ids)
 
     async def get_video_info_task(
-        self, video_id: str, semaphore: asyncio.Semaphore
+        self, video_id: str
     ) -> Optional[Dict]:
         """Get video detail task"""
-        async with semaphore:
+        with work_priority(PRIORITY_DETAIL):
             try:
                 result = await self.ks_client.get_video_info(video_id)
 
-                # Sleep after fetching video details
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[KuaishouCrawler.get_video_info_task] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching video details {video_id}")
-
                 utils.logger.info(
                     f"[KuaishouCrawler.get_video_info_task] Get video_id:{video_id} info result: {result} ..."
                 )
@@ -246,40 +247,33 @@ class KuaishouCrawler(AbstractCrawler):
         utils.logger.info(
             f"[KuaishouCrawler.batch_get_video_comments] video ids:{video_id_list}"
         )
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         task_list: List[Task] = []
         for video_id in video_id_list:
             task = asyncio.create_task(
-                self.get_comments(video_id, semaphore), name=video_id
+                self.get_comments(video_id), name=video_id
             )
             task_list.append(task)
 
         comment_tasks_var.set(task_list)
         await asyncio.gather(*task_list)
 
-    async def get_comments(self, video_id: str, semaphore: asyncio.Semaphore):
+    async def get_comments(self, video_id: str):
         """
         get comment for video id
         :param video_id:
-        :param semaphore:
         :return:
         """
-        async with semaphore:
+        with work_priority(PRIORITY_COMMENTS), proxy_session(f"comments:{video_id}"):
             try:
                 utils.logger.info(
                     f"[KuaishouCrawler.get_comments] begin get video_id: {video_id} comments ..."
                 )
 
-                # Sleep before fetching comments
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[KuaishouCrawler.get_comments] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds before fetching comments for video {video_id}")
-
-                await self.ks_client.get_video_all_comments(
+                async for comments in self.ks_client.iter_video_comments(
                     photo_id=video_id,
-                    crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
-                    callback=kuaishou_store.batch_update_ks_video_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
-                )
+                ):
+                    await kuaishou_store.batch_update_ks_video_comments(video_id, comments)
             except DataFetchError as ex:
                 utils.logger.error(
                     f"[KuaishouCrawler.get_comments] get video_id: {video_id} comment error: {ex}"
@@ -412,7 +406,6 @@ class KuaishouCrawler(AbstractCrawler):
             # Get all video information of the creator
             all_video_list = await self.ks_client.get_all_videos_by_creator(
                 user_id=user_id,
-                crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
                 callback=self.fetch_creator_video_detail,
             )
 
@@ -425,9 +418,8 @@ class KuaishouCrawler(AbstractCrawler):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         task_list = [
-            self.get_video_info_task(post_item.get("photo", {}).get("id"), semaphore)
+            self.get_video_info_task(post_item.get("photo", {}).get("id"))
             for post_item in video_list
         ]
 
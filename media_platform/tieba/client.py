@@ -19,7 +19,7 @@
 
 import asyncio
 import json
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
 from urllib.parse import urlencode, quote
 
 import requests
@@ -30,7 +30,10 @@ import config
 from base.base_crawler import AbstractApiClient
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
 from proxy.proxy_ip_pool import ProxyIpPool
+from proxy.proxy_mixin import get_proxy_session
 from tools import utils
+from tools.metrics import record_retry
+from tools.rate_limiter import ENDPOINT_COMMENTS, get_rate_limiter
 
 from .field import SearchNoteType, SearchSortType
 from .help import TieBaExtractor
@@ -107,7 +110,7 @@ class BaiduTieBaClient(AbstractApiClient):
                 f"[BaiduTieBaClient._refresh_proxy_if_expired] New proxy: {new_proxy.ip}:{new_proxy.port}"
             )
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
+    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1), before_sleep=record_retry)
     async def request(self, method, url, return_ori_content=False, proxy=None, **kwargs) -> Union[str, Any]:
         """
         封装requests的公共请求方法，对请求响应做一些处理
@@ -121,19 +124,33 @@ class BaiduTieBaClient(AbstractApiClient):
         Returns:
 
         """
-        # 每次请求前检测代理是否过期
-        await self._refresh_proxy_if_expired()
+        # 多代理轮换模式下每次请求从代理池租用代理，否则检测当前代理是否过期
+        enable_rotation = proxy is None and self.ip_pool is not None and config.ENABLE_PROXY_ROTATION
+        if not enable_rotation:
+            await self._refresh_proxy_if_expired()
 
         actual_proxy = proxy if proxy else self.default_ip_proxy
 
         # 在线程池中执行同步的requests请求
-        response = await asyncio.to_thread(
-            self._sync_request,
-            method,
-            url,
-            actual_proxy,
-            **kwargs
-        )
+        async with get_rate_limiter().limit(url) as permit:
+            if enable_rotation:
+                async with self.ip_pool.lease(get_proxy_session()) as lease:
+                    response = await asyncio.to_thread(
+                        self._sync_request,
+                        method,
+                        url,
+                        lease.proxy_url,
+                        **kwargs
+                    )
+            else:
+                response = await asyncio.to_thread(
+                    self._sync_request,
+                    method,
+                    url,
+                    actual_proxy,
+                    **kwargs
+                )
+            permit.set_response(response.status_code)
 
         if response.status_code != 200:
             utils.logger.error(f"Request failed, method: {method}, url: {url}, status code: {response.status_code}")
@@ -169,6 +186,8 @@ class BaiduTieBaClient(AbstractApiClient):
             return res
         except RetryError as e:
             if self.ip_pool:
+                # 当前代理多次请求失败，降低其分数后换一个代理
+                self.ip_pool.report_result(self.ip_pool.current_proxy, success=False)
                 proxie_model = await self.ip_pool.get_proxy()
                 _, proxy = utils.format_proxy_info(proxie_model)
                 res = await self.request(method="GET", url=f"{self._host}{final_uri}", return_ori_content=return_ori_content, proxy=proxy, **kwargs)
@@ -191,6 +210,21 @@ class BaiduTieBaClient(AbstractApiClient):
         json_str = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
         return await self.request(method="POST", url=f"{self._host}{uri}", data=json_str, **kwargs)
 
+    async def _goto_page(self, url: str, endpoint: Optional[str] = None):
+        """
+        使用Playwright访问页面，访问前从限流器获取令牌
+        Args:
+            url: 页面URL
+            endpoint: 接口类型，不指定时根据URL识别
+
+        Returns:
+
+        """
+        async with get_rate_limiter().limit(url, endpoint=endpoint) as permit:
+            response = await self.playwright_page.goto(url, wait_until="domcontentloaded")
+            if response is not None:
+                permit.set_response(response.status)
+
     async def pong(self, browser_context: BrowserContext = None) -> bool:
         """
         用于检查登录态是否失效了
@@ -281,10 +315,7 @@ class BaiduTieBaClient(AbstractApiClient):
 
         try:
             # 使用Playwright访问搜索页面
-            await self.playwright_page.goto(full_url, wait_until="domcontentloaded")
-
-            # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+            await self._goto_page(full_url)
 
             # 获取页面HTML内容
             page_content = await self.playwright_page.content()
@@ -318,10 +349,7 @@ class BaiduTieBaClient(AbstractApiClient):
 
         try:
             # 使用Playwright访问帖子详情页面
-            await self.playwright_page.goto(note_url, wait_until="domcontentloaded")
-
-            # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+            await self._goto_page(note_url)
 
             # 获取页面HTML内容
             page_content = await self.playwright_page.content()
@@ -335,41 +363,35 @@ class BaiduTieBaClient(AbstractApiClient):
             utils.logger.error(f"[BaiduTieBaClient.get_note_by_id] 获取帖子详情失败: {e}")
             raise
 
-    async def get_note_all_comments(
+    async def iter_note_comments(
         self,
         note_detail: TiebaNote,
-        crawl_interval: float = 1.0,
-        callback: Optional[Callable] = None,
         max_count: int = 10,
-    ) -> List[TiebaComment]:
+    ) -> AsyncIterator[List[TiebaComment]]:
         """
-        获取指定帖子下的所有一级评论 (使用Playwright访问页面,避免API检测)
+        按页获取指定帖子下的评论 (使用Playwright访问页面,避免API检测)，一级评论页之后紧跟它的子评论页，
+        每次 yield 一页，不在内存中累积整个评论区
         Args:
             note_detail: 帖子详情对象
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
-            callback: 一次笔记爬取结束后的回调函数
             max_count: 一次帖子爬取的最大评论数量
         Returns:
-            List[TiebaComment]: 评论列表
+            评论页
         """
         if not self.playwright_page:
-            utils.logger.error("[BaiduTieBaClient.get_note_all_comments] playwright_page is None, cannot use browser mode")
+            utils.logger.error("[BaiduTieBaClient.iter_note_comments] playwright_page is None, cannot use browser mode")
             raise Exception("playwright_page is required for browser-based comment fetching")
 
-        result: List[TiebaComment] = []
+        fetched_count = 0
         current_page = 1
 
-        while note_detail.total_replay_page >= current_page and len(result) < max_count:
+        while note_detail.total_replay_page >= current_page and fetched_count < max_count:
             # 构造评论页URL
             comment_url = f"{self._host}/p/{note_detail.note_id}?pn={current_page}"
-            utils.logger.info(f"[BaiduTieBaClient.get_note_all_comments] 访问评论页面: {comment_url}")
+            utils.logger.info(f"[BaiduTieBaClient.iter_note_comments] 访问评论页面: {comment_url}")
 
             try:
                 # 使用Playwright访问评论页面
-                await self.playwright_page.goto(comment_url, wait_until="domcontentloaded")
-
-                # 等待页面加载,使用配置文件中的延时设置
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+                await self._goto_page(comment_url, endpoint=ENDPOINT_COMMENTS)
 
                 # 获取页面HTML内容
                 page_content = await self.playwright_page.content()
@@ -378,59 +400,47 @@ class BaiduTieBaClient(AbstractApiClient):
                 comments = self._page_extractor.extract_tieba_note_parment_comments(
                     page_content, note_id=note_detail.note_id
                 )
+            except Exception as e:
+                utils.logger.error(f"[BaiduTieBaClient.iter_note_comments] 获取第{current_page}页评论失败: {e}")
+                break
 
-                if not comments:
-                    utils.logger.info(f"[BaiduTieBaClient.get_note_all_comments] 第{current_page}页没有评论,停止爬取")
-                    break
-
-                # 限制评论数量
-                if len(result) + len(comments) > max_count:
-                    comments = comments[:max_count - len(result)]
-
-                if callback:
-                    await callback(note_detail.note_id, comments)
-
-                result.extend(comments)
+            if not comments:
+                utils.logger.info(f"[BaiduTieBaClient.iter_note_comments] 第{current_page}页没有评论,停止爬取")
+                break
 
-                # 获取所有子评论
-                await self.get_comments_all_sub_comments(
-                    comments, crawl_interval=crawl_interval, callback=callback
-                )
+            # 限制评论数量
+            comments = comments[:max_count - fetched_count]
+            fetched_count += len(comments)
+            yield comments
 
-                await asyncio.sleep(crawl_interval)
-                current_page += 1
+            # 获取所有子评论
+            async for sub_comments in self.iter_sub_comments(comments):
+                yield sub_comments
 
-            except Exception as e:
-                utils.logger.error(f"[BaiduTieBaClient.get_note_all_comments] 获取第{current_page}页评论失败: {e}")
-                break
+            current_page += 1
 
-        utils.logger.info(f"[BaiduTieBaClient.get_note_all_comments] 共获取 {len(result)} 条一级评论")
-        return result
+        utils.logger.info(f"[BaiduTieBaClient.iter_note_comments] 共获取 {fetched_count} 条一级评论")
 
-    async def get_comments_all_sub_comments(
+    async def iter_sub_comments(
         self,
         comments: List[TiebaComment],
-        crawl_interval: float = 1.0,
-        callback: Optional[Callable] = None,
-    ) -> List[TiebaComment]:
+    ) -> AsyncIterator[List[TiebaComment]]:
         """
-        获取指定评论下的所有子评论 (使用Playwright访问页面,避免API检测)
+        按页获取指定评论下的所有子评论 (使用Playwright访问页面,避免API检测)，每次 yield 一页
         Args:
             comments: 评论列表
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
-            callback: 一次笔记爬取结束后的回调函数
 
         Returns:
-            List[TiebaComment]: 子评论列表
+            子评论页
         """
         if not config.ENABLE_GET_SUB_COMMENTS:
-            return []
+            return
 
         if not self.playwright_page:
-            utils.logger.error("[BaiduTieBaClient.get_comments_all_sub_comments] playwright_page is None, cannot use browser mode")
+            utils.logger.error("[BaiduTieBaClient.iter_sub_comments] playwright_page is None, cannot use browser mode")
             raise Exception("playwright_page is required for browser-based sub-comment fetching")
 
-        all_sub_comments: List[TiebaComment] = []
+        sub_comment_count = 0
 
         for parment_comment in comments:
             if parment_comment.sub_comment_count == 0:
@@ -448,14 +458,11 @@ class BaiduTieBaClient(AbstractApiClient):
                     f"fid={parment_comment.tieba_id}&"
                     f"pn={current_page}"
                 )
-                utils.logger.info(f"[BaiduTieBaClient.get_comments_all_sub_comments] 访问子评论页面: {sub_comment_url}")
+                utils.logger.info(f"[BaiduTieBaClient.iter_sub_comments] 访问子评论页面: {sub_comment_url}")
 
                 try:
                     # 使用Playwright访问子评论页面
-                    await self.playwright_page.goto(sub_comment_url, wait_until="domcontentloaded")
-
-                    # 等待页面加载,使用配置文件中的延时设置
-                    await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+                    await self._goto_page(sub_comment_url)
 
                     # 获取页面HTML内容
                     page_content = await self.playwright_page.content()
@@ -464,30 +471,25 @@ class BaiduTieBaClient(AbstractApiClient):
                     sub_comments = self._page_extractor.extract_tieba_note_sub_comments(
                         page_content, parent_comment=parment_comment
                     )
-
-                    if not sub_comments:
-                        utils.logger.info(
-                            f"[BaiduTieBaClient.get_comments_all_sub_comments] "
-                            f"评论{parment_comment.comment_id}第{current_page}页没有子评论,停止爬取"
-                        )
-                        break
-
-                    if callback:
-                        await callback(parment_comment.note_id, sub_comments)
-
-                    all_sub_comments.extend(sub_comments)
-                    await asyncio.sleep(crawl_interval)
-                    current_page += 1
-
                 except Exception as e:
                     utils.logger.error(
-                        f"[BaiduTieBaClient.get_comments_all_sub_comments] "
+                        f"[BaiduTieBaClient.iter_sub_comments] "
                         f"获取评论{parment_comment.comment_id}第{current_page}页子评论失败: {e}"
                     )
                     break
 
-        utils.logger.info(f"[BaiduTieBaClient.get_comments_all_sub_comments] 共获取 {len(all_sub_comments)} 条子评论")
-        return all_sub_comments
+                if not sub_comments:
+                    utils.logger.info(
+                        f"[BaiduTieBaClient.iter_sub_comments] "
+                        f"评论{parment_comment.comment_id}第{current_page}页没有子评论,停止爬取"
+                    )
+                    break
+
+                sub_comment_count += len(sub_comments)
+                yield sub_comments
+                current_page += 1
+
+        utils.logger.info(f"[BaiduTieBaClient.iter_sub_comments] 共获取 {sub_comment_count} 条子评论")
 
     async def get_notes_by_tieba_name(self, tieba_name: str, page_num: int) -> List[TiebaNote]:
         """
@@ -509,10 +511,7 @@ class BaiduTieBaClient(AbstractApiClient):
 
         try:
             # 使用Playwright访问贴吧页面
-            await self.playwright_page.goto(tieba_url, wait_until="domcontentloaded")
-
-            # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+            await self._goto_page(tieba_url)
 
             # 获取页面HTML内容
             page_content = await self.playwright_page.content()
@@ -544,10 +543,7 @@ class BaiduTieBaClient(AbstractApiClient):
 
         try:
             # 使用Playwright访问创作者主页
-            await self.playwright_page.goto(creator_url, wait_until="domcontentloaded")
-
-            # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+            await self._goto_page(creator_url)
 
             # 获取页面HTML内容
             page_content = await self.playwright_page.content()
@@ -579,10 +575,7 @@ class BaiduTieBaClient(AbstractApiClient):
 
         try:
             # 使用Playwright访问创作者帖子列表页面
-            await self.playwright_page.goto(creator_url, wait_until="domcontentloaded")
-
-            # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+            await self._goto_page(creator_url)
 
             # 获取页面内容(这个接口返回JSON)
             page_content = await self.playwright_page.content()
@@ -606,7 +599,6 @@ class BaiduTieBaClient(AbstractApiClient):
     async def get_all_notes_by_creator_user_name(
         self,
         user_name: str,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_note_count: int = 0,
         creator_page_html_content: str = None,
@@ -615,7 +607,6 @@ class BaiduTieBaClient(AbstractApiClient):
         根据创作者用户名获取创作者所有帖子
         Args:
             user_name: 创作者用户名
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后的回调函数，是一个awaitable类型的函数
             max_note_count: 帖子最大获取数量，如果为0则获取所有
             creator_page_html_content: 创作者主页HTML内容
@@ -652,7 +643,6 @@ class BaiduTieBaClient(AbstractApiClient):
             notes = await asyncio.gather(*note_detail_task)
             if callback:
                 await callback(notes)
-            await asyncio.sleep(crawl_interval)
             result.extend(notes)
             page_number += 1
             total_get_count += page_per_count
@@ -35,9 +35,12 @@ import config
 from base.base_crawler import AbstractCrawler
 from model.m_baidu_tieba import TiebaCreator, TiebaNote
 from proxy.proxy_ip_pool import IpInfoModel, ProxyIpPool, create_ip_pool
+from proxy.proxy_mixin import proxy_session
 from store import tieba as tieba_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
+from tools.crawl_frontier import get_crawl_frontier
+from tools.crawl_scheduler import PRIORITY_COMMENTS, PRIORITY_DETAIL, work_priority
 from var import crawler_type_var, source_keyword_var
 
 from .client import BaiduTieBaClient
@@ -154,12 +157,18 @@ class TieBaCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < tieba_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = tieba_limit_count
         start_page = config.START_PAGE
+        frontier = get_crawl_frontier()
         for keyword in config.KEYWORDS.split(","):
             source_keyword_var.set(keyword)
             utils.logger.info(
                 f"[BaiduTieBaCrawler.search] Current search keyword: {keyword}"
             )
-            page = 1
+            search_unit = await frontier.get_unit(f"search:{keyword}", kind="search_page")
+            if search_unit.done:
+                utils.logger.info(f"[BaiduTieBaCrawler.search] Keyword {keyword} already finished, skip")
+                continue
+            page = search_unit.cursor or 1
+            keyword_finished = True
             while (
                 page - start_page + 1
             ) * tieba_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
@@ -192,16 +201,16 @@ class TieBaCrawler(AbstractCrawler):
                         note_id_list=[note_detail.note_id for note_detail in notes_list]
                     )
 
-                    # Sleep after page navigation
-                    await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                    utils.logger.info(f"[TieBaCrawler.search] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page}")
-
                     page += 1
+                    await search_unit.checkpoint(page)
                 except Exception as ex:
                     utils.logger.error(
                         f"[BaiduTieBaCrawler.search] Search keywords error, current page: {page}, current keyword: {keyword}, err: {ex}"
                     )
+                    keyword_finished = False
                     break
+            if keyword_finished:
+                await search_unit.finish()
 
     async def get_specified_tieba_notes(self):
         """
@@ -234,10 +243,6 @@ class TieBaCrawler(AbstractCrawler):
                 )
                 await self.get_specified_notes([note.note_id for note in note_list])
 
-                # Sleep after processing notes
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[TieBaCrawler.get_specified_tieba_notes] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after processing notes from page {page_number}")
-
                 page_number += tieba_limit_count
 
     async def get_specified_notes(
@@ -251,9 +256,8 @@ class TieBaCrawler(AbstractCrawler):
         Returns:
 
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         task_list = [
-            self.get_note_detail_async_task(note_id=note_id, semaphore=semaphore)
+            self.get_note_detail_async_task(note_id=note_id)
             for note_id in note_id_list
         ]
         note_details = await asyncio.gather(*task_list)
@@ -265,28 +269,23 @@ class TieBaCrawler(AbstractCrawler):
         await self.batch_get_note_comments(note_details_model)
 
     async def get_note_detail_async_task(
-        self, note_id: str, semaphore: asyncio.Semaphore
+        self, note_id: str
     ) -> Optional[TiebaNote]:
         """
         Get note detail
         Args:
             note_id: baidu tieba note id
-            semaphore: asyncio semaphore
 
         Returns:
 
         """
-        async with semaphore:
+        with work_priority(PRIORITY_DETAIL):
             try:
                 utils.logger.info(
                     f"[BaiduTieBaCrawler.get_note_detail] Begin get note detail, note_id: {note_id}"
                 )
                 note_detail: TiebaNote = await self.tieba_client.get_note_by_id(note_id)
 
-                # Sleep after fetching note details
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[TieBaCrawler.get_note_detail_async_task] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching note details {note_id}")
-
                 if not note_detail:
                     utils.logger.error(
                         f"[BaiduTieBaCrawler.get_note_detail] Get note detail error, note_id: {note_id}"
@@ -316,43 +315,36 @@ class TieBaCrawler(AbstractCrawler):
         if not config.ENABLE_GET_COMMENTS:
             return
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         task_list: List[Task] = []
         for note_detail in note_detail_list:
             task = asyncio.create_task(
-                self.get_comments_async_task(note_detail, semaphore),
+                self.get_comments_async_task(note_detail),
                 name=note_detail.note_id,
             )
             task_list.append(task)
         await asyncio.gather(*task_list)
 
     async def get_comments_async_task(
-        self, note_detail: TiebaNote, semaphore: asyncio.Semaphore
+        self, note_detail: TiebaNote
     ):
         """
         Get comments async task
         Args:
             note_detail:
-            semaphore:
 
         Returns:
 
         """
-        async with semaphore:
+        with work_priority(PRIORITY_COMMENTS), proxy_session(f"comments:{note_detail.note_id}"):
             utils.logger.info(
                 f"[BaiduTieBaCrawler.get_comments] Begin get note id comments {note_detail.note_id}"
             )
 
-            # Sleep before fetching comments
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-            utils.logger.info(f"[TieBaCrawler.get_comments_async_task] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds before fetching comments for note {note_detail.note_id}")
-
-            await self.tieba_client.get_note_all_comments(
+            async for comments in self.tieba_client.iter_note_comments(
                 note_detail=note_detail,
-                crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
-                callback=tieba_store.batch_update_tieba_note_comments,
                 max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
-            )
+            ):
+                await tieba_store.batch_update_tieba_note_comments(note_detail.note_id, comments)
 
     async def get_creators_and_notes(self) -> None:
         """
@@ -383,7 +375,6 @@ class TieBaCrawler(AbstractCrawler):
                 all_notes_list = (
                     await self.tieba_client.get_all_notes_by_creator_user_name(
                         user_name=creator_info.user_name,
-                        crawl_interval=0,
                         callback=tieba_store.batch_update_tieba_notes,
                         max_note_count=config.CRAWLER_MAX_NOTES_COUNT,
                         creator_page_html_content=creator_page_html_content,
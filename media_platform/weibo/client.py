@@ -26,7 +26,7 @@ import asyncio
 import copy
 import json
 import re
-from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, Iterator, List, Optional, Union
 from urllib.parse import parse_qs, unquote, urlencode
 
 import httpx
@@ -37,6 +37,12 @@ from tenacity import retry, stop_after_attempt, wait_fixed
 import config
 from proxy.proxy_mixin import ProxyRefreshMixin
 from tools import utils
+from tools.crawl_frontier import FrontierUnit
+from tools.http_client import get_http_client
+from tools.media_downloader import get_media_downloader
+from tools.metrics import record_retry
+from tools.rate_limiter import ENDPOINT_SEARCH, get_rate_limiter
+from tools.response_cache import CACHE_CREATOR_INFO, CACHE_NOTE_DETAIL, get_response_cache
 
 if TYPE_CHECKING:
     from proxy.proxy_ip_pool import ProxyIpPool
@@ -67,14 +73,15 @@ class WeiboClient(ProxyRefreshMixin):
         # 初始化代理池（来自 ProxyRefreshMixin）
         self.init_proxy_pool(proxy_ip_pool)
 
-    @retry(stop=stop_after_attempt(5), wait=wait_fixed(3))
+    @retry(stop=stop_after_attempt(5), wait=wait_fixed(3), before_sleep=record_retry)
     async def request(self, method, url, **kwargs) -> Union[Response, Dict]:
-        # 每次请求前检测代理是否过期
-        await self._refresh_proxy_if_expired()
-
         enable_return_response = kwargs.pop("return_response", False)
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        endpoint = kwargs.pop("endpoint", None)
+        async with get_rate_limiter().limit(url, endpoint=endpoint) as permit:
+            # 每次请求从代理池租用代理（多代理轮换），或检测当前代理是否过期
+            async with self.lease_proxy() as proxy:
+                response = await get_http_client(proxy).request(method, url, timeout=self.timeout, **kwargs)
+            permit.set_response(response.status_code)
 
         if enable_return_response:
             return response
@@ -168,7 +175,8 @@ class WeiboClient(ProxyRefreshMixin):
             "page_type": "searchall",
             "page": page,
         }
-        return await self.get(uri, params)
+        # 搜索和主页共用 getIndex 接口，无法从地址区分
+        return await self.get(uri, params, endpoint=ENDPOINT_SEARCH)
 
     async def get_note_comments(self, mid_id: str, max_id: int, max_id_type: int = 0) -> Dict:
         """get notes comments
@@ -191,68 +199,59 @@ class WeiboClient(ProxyRefreshMixin):
 
         return await self.get(uri, params, headers=headers)
 
-    async def get_note_all_comments(
+    async def iter_note_comments(
         self,
         note_id: str,
-        crawl_interval: float = 1.0,
-        callback: Optional[Callable] = None,
         max_count: int = 10,
-    ):
+        frontier_unit: Optional[FrontierUnit] = None,
+    ) -> AsyncIterator[List[Dict]]:
         """
-        get note all comments include sub comments
+        按页获取微博评论（一级评论页之后紧跟它的子评论），每次 yield 一页，不在内存中累积整个评论区
         :param note_id:
-        :param crawl_interval:
-        :param callback:
         :param max_count:
+        :param frontier_unit: 评论游标的爬取进度，传入时从上次的游标继续，调用方处理完一页及其子评论后写入检查点
         :return:
         """
-        result = []
         is_end = False
         max_id = -1
         max_id_type = 0
-        while not is_end and len(result) < max_count:
+        fetched_count = 0
+        if frontier_unit and frontier_unit.cursor is not None:
+            max_id, max_id_type = frontier_unit.cursor
+            fetched_count = frontier_unit.payload.get("count", 0)
+        while not is_end and fetched_count < max_count:
             comments_res = await self.get_note_comments(note_id, max_id, max_id_type)
             max_id: int = comments_res.get("max_id")
             max_id_type: int = comments_res.get("max_id_type")
-            comment_list: List[Dict] = comments_res.get("data", [])
+            comment_list: List[Dict] = comments_res.get("data", [])[:max_count - fetched_count]
             is_end = max_id == 0
-            if len(result) + len(comment_list) > max_count:
-                comment_list = comment_list[:max_count - len(result)]
-            if callback:  # 如果有回调函数，就执行回调函数
-                await callback(note_id, comment_list)
-            await asyncio.sleep(crawl_interval)
-            result.extend(comment_list)
-            sub_comment_result = await self.get_comments_all_sub_comments(note_id, comment_list, callback)
-            result.extend(sub_comment_result)
-        return result
+            fetched_count += len(comment_list)
+            if comment_list:
+                yield comment_list
+            for sub_comments in self.iter_sub_comments(comment_list):
+                fetched_count += len(sub_comments)
+                yield sub_comments
+            if frontier_unit:
+                await frontier_unit.checkpoint([max_id, max_id_type], count=fetched_count)
 
     @staticmethod
-    async def get_comments_all_sub_comments(
-        note_id: str,
-        comment_list: List[Dict],
-        callback: Optional[Callable] = None,
-    ) -> List[Dict]:
+    def iter_sub_comments(comment_list: List[Dict]) -> Iterator[List[Dict]]:
         """
-        获取评论的所有子评论
+        评论接口随一级评论返回的子评论，每条一级评论的子评论为一页
         Args:
-            note_id:
             comment_list:
-            callback:
 
         Returns:
 
         """
         if not config.ENABLE_GET_SUB_COMMENTS:
-            utils.logger.info(f"[WeiboClient.get_comments_all_sub_comments] Crawling sub_comment mode is not enabled")
-            return []
+            utils.logger.info(f"[WeiboClient.iter_sub_comments] Crawling sub_comment mode is not enabled")
+            return
 
-        res_sub_comments = []
         for comment in comment_list:
             sub_comments = comment.get("comments")
             if sub_comments and isinstance(sub_comments, list):
-                await callback(note_id, sub_comments)
-                res_sub_comments.extend(sub_comments)
-        return res_sub_comments
+                yield sub_comments
 
     async def get_note_info_by_id(self, note_id: str) -> Dict:
         """
@@ -260,23 +259,36 @@ class WeiboClient(ProxyRefreshMixin):
         :param note_id:
         :return:
         """
+        uri = f"/detail/{note_id}"
+        return await get_response_cache().fetch(
+            CACHE_NOTE_DETAIL, "GET", uri, None, lambda: self._get_note_info_by_id(note_id)
+        )
+
+    async def _get_note_info_by_id(self, note_id: str) -> Dict:
+        """
+        请求帖子详情页并解析 $render_data
+        :param note_id:
+        :return:
+        """
         url = f"{self._host}/detail/{note_id}"
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request("GET", url, timeout=self.timeout, headers=self.headers)
-            if response.status_code != 200:
-                raise DataFetchError(f"get weibo detail err: {response.text}")
-            match = re.search(r'var \$render_data = (\[.*?\])\[0\]', response.text, re.DOTALL)
-            if match:
-                render_data_json = match.group(1)
-                render_data_dict = json.loads(render_data_json)
-                note_detail = render_data_dict[0].get("status")
-                note_item = {"mblog": note_detail}
-                return note_item
-            else:
-                utils.logger.info(f"[WeiboClient.get_note_info_by_id] 未找到$render_data的值")
-                return dict()
+        async with get_rate_limiter().limit(url) as permit:
+            async with self.lease_proxy() as proxy:
+                response = await get_http_client(proxy).request("GET", url, timeout=self.timeout, headers=self.headers)
+            permit.set_response(response.status_code)
+        if response.status_code != 200:
+            raise DataFetchError(f"get weibo detail err: {response.text}")
+        match = re.search(r'var \$render_data = (\[.*?\])\[0\]', response.text, re.DOTALL)
+        if match:
+            render_data_json = match.group(1)
+            render_data_dict = json.loads(render_data_json)
+            note_detail = render_data_dict[0].get("status")
+            note_item = {"mblog": note_detail}
+            return note_item
+        else:
+            utils.logger.info(f"[WeiboClient.get_note_info_by_id] 未找到$render_data的值")
+            return dict()
 
-    async def get_note_image(self, image_url: str) -> bytes:
+    async def get_note_image(self, image_url: str) -> Optional[str]:
         image_url = image_url[8:]  # 去掉 https://
         sub_url = image_url.split("/")
         image_url = ""
@@ -291,18 +303,10 @@ class WeiboClient(ProxyRefreshMixin):
         # 由于微博图片是通过 i1.wp.com 来访问的，所以需要拼接一下
         final_uri = (f"{self._image_agent_host}"
                      f"{image_url}")
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            try:
-                response = await client.request("GET", final_uri, timeout=self.timeout)
-                response.raise_for_status()
-                if not response.reason_phrase == "OK":
-                    utils.logger.error(f"[WeiboClient.get_note_image] request {final_uri} err, res:{response.text}")
-                    return None
-                else:
-                    return response.content
-            except httpx.HTTPError as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
-                utils.logger.error(f"[DouYinClient.get_aweme_media] {exc.__class__.__name__} for {exc.request.url} - {exc}")    # 保留原始异常类型名称，以便开发者调试
-                return None
+        async with self.lease_proxy() as proxy:
+            return await get_media_downloader().download(
+                final_uri, proxy=proxy, timeout=self.timeout, follow_redirects=False
+            )
 
     async def get_creator_container_info(self, creator_id: str) -> Dict:
         """
@@ -339,7 +343,9 @@ class WeiboClient(ProxyRefreshMixin):
             "value": creator_id,
             "containerid":containerid,
         }
-        user_res = await self.get(uri, params)
+        user_res = await get_response_cache().fetch(
+            CACHE_CREATOR_INFO, "GET", uri, params, lambda: self.get(uri, params)
+        )
         return user_res
 
     async def get_notes_by_creator(
@@ -372,7 +378,6 @@ class WeiboClient(ProxyRefreshMixin):
         self,
         creator_id: str,
         container_id: str,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[Dict]:
         """
@@ -380,7 +385,6 @@ class WeiboClient(ProxyRefreshMixin):
         Args:
             creator_id:
             container_id:
-            crawl_interval:
             callback:
 
         Returns:
@@ -405,7 +409,6 @@ class WeiboClient(ProxyRefreshMixin):
             notes = [note for note in notes if note.get("card_type") == 9]
             if callback:
                 await callback(notes)
-            await asyncio.sleep(crawl_interval)
             result.extend(notes)
             crawler_total_count += 10
             notes_has_more = notes_res.get("cardlistInfo", {}).get("total", 0) > crawler_total_count
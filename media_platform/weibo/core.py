@@ -26,6 +26,7 @@ import asyncio
 import os
 # import random  # Removed as we now use fixed config.CRAWLER_MAX_SLEEP_SEC intervals
 from asyncio import Task
+from functools import partial
 from typing import Dict, List, Optional, Tuple
 
 from playwright.async_api import (
@@ -39,9 +40,14 @@ from playwright.async_api import (
 import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_mixin import proxy_session
 from store import weibo as weibo_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
+from tools.crawl_frontier import get_crawl_frontier
+from tools.crawl_scheduler import PRIORITY_COMMENTS, PRIORITY_DETAIL, work_priority
+from tools.media_queue import submit_media
+from tools.seen_index import ITEM_COMMENTS, get_seen_index
 from var import crawler_type_var, source_keyword_var
 
 from .client import WeiboClient
@@ -157,10 +163,15 @@ class WeiboCrawler(AbstractCrawler):
             utils.logger.error(f"[WeiboCrawler.search] Invalid WEIBO_SEARCH_TYPE: {config.WEIBO_SEARCH_TYPE}")
             return
 
+        frontier = get_crawl_frontier()
         for keyword in config.KEYWORDS.split(","):
             source_keyword_var.set(keyword)
             utils.logger.info(f"[WeiboCrawler.search] Current search keyword: {keyword}")
-            page = 1
+            search_unit = await frontier.get_unit(f"search:{keyword}", kind="search_page")
+            if search_unit.done:
+                utils.logger.info(f"[WeiboCrawler.search] Keyword {keyword} already finished, skip")
+                continue
+            page = search_unit.cursor or 1
             while (page - start_page + 1) * weibo_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
                 if page < start_page:
                     utils.logger.info(f"[WeiboCrawler.search] Skip page: {page}")
@@ -180,40 +191,32 @@ class WeiboCrawler(AbstractCrawler):
 
                 page += 1
 
-                # Sleep after page navigation
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[WeiboCrawler.search] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page-1}")
-
                 await self.batch_get_notes_comments(note_id_list)
+                await search_unit.checkpoint(page)
+            await search_unit.finish()
 
     async def get_specified_notes(self):
         """
         get specified notes info
         :return:
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-        task_list = [self.get_note_info_task(note_id=note_id, semaphore=semaphore) for note_id in config.WEIBO_SPECIFIED_ID_LIST]
+        task_list = [self.get_note_info_task(note_id=note_id) for note_id in config.WEIBO_SPECIFIED_ID_LIST]
         video_details = await asyncio.gather(*task_list)
         for note_item in video_details:
             if note_item:
                 await weibo_store.update_weibo_note(note_item)
         await self.batch_get_notes_comments(config.WEIBO_SPECIFIED_ID_LIST)
 
-    async def get_note_info_task(self, note_id: str, semaphore: asyncio.Semaphore) -> Optional[Dict]:
+    async def get_note_info_task(self, note_id: str) -> Optional[Dict]:
         """
         Get note detail task
         :param note_id:
-        :param semaphore:
         :return:
         """
-        async with semaphore:
+        with work_priority(PRIORITY_DETAIL):
             try:
                 result = await self.wb_client.get_note_info_by_id(note_id)
 
-                # Sleep after fetching note details
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[WeiboCrawler.get_note_info_task] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching note details {note_id}")
-
                 return result
             except DataFetchError as ex:
                 utils.logger.error(f"[WeiboCrawler.get_note_info_task] Get note detail error: {ex}")
@@ -233,34 +236,36 @@ class WeiboCrawler(AbstractCrawler):
             return
 
         utils.logger.info(f"[WeiboCrawler.batch_get_notes_comments] note ids:{note_id_list}")
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         task_list: List[Task] = []
         for note_id in note_id_list:
-            task = asyncio.create_task(self.get_note_comments(note_id, semaphore), name=note_id)
+            task = asyncio.create_task(self.get_note_comments(note_id), name=note_id)
             task_list.append(task)
         await asyncio.gather(*task_list)
 
-    async def get_note_comments(self, note_id: str, semaphore: asyncio.Semaphore):
+    async def get_note_comments(self, note_id: str):
         """
         get comment for note id
         :param note_id:
-        :param semaphore:
         :return:
         """
-        async with semaphore:
+        with work_priority(PRIORITY_COMMENTS), proxy_session(f"comments:{note_id}"):
+            comment_unit = await get_crawl_frontier().get_unit(f"comments:{note_id}", kind="comment_cursor")
+            if comment_unit.done:
+                utils.logger.info(f"[WeiboCrawler.get_note_comments] Comments of note {note_id} already finished, skip")
+                return
+            if await get_seen_index().is_fresh(ITEM_COMMENTS, note_id):
+                return
             try:
                 utils.logger.info(f"[WeiboCrawler.get_note_comments] begin get note_id: {note_id} comments ...")
 
-                # Sleep before fetching comments
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[WeiboCrawler.get_note_comments] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds before fetching comments for note {note_id}")
-
-                await self.wb_client.get_note_all_comments(
+                async for comments in self.wb_client.iter_note_comments(
                     note_id=note_id,
-                    crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,  # Use fixed interval instead of random
-                    callback=weibo_store.batch_update_weibo_note_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
-                )
+                    frontier_unit=comment_unit,
+                ):
+                    await weibo_store.batch_update_weibo_note_comments(note_id, comments)
+                await comment_unit.finish()
+                await get_seen_index().mark_seen(ITEM_COMMENTS, [note_id])
             except DataFetchError as ex:
                 utils.logger.error(f"[WeiboCrawler.get_note_comments] get note_id: {note_id} comment error: {ex}")
             except Exception as e:
@@ -283,12 +288,12 @@ class WeiboCrawler(AbstractCrawler):
             url = pic.get("url")
             if not url:
                 continue
-            content = await self.wb_client.get_note_image(url)
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-            utils.logger.info(f"[WeiboCrawler.get_note_images] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching image")
-            if content != None:
-                extension_file_name = url.split(".")[-1]
-                await weibo_store.update_weibo_note_image(pic["pid"], content, extension_file_name)
+            extension_file_name = url.split(".")[-1]
+            await submit_media(
+                url,
+                partial(self.wb_client.get_note_image, url),
+                partial(weibo_store.update_weibo_note_image, pic["pid"], extension_file_name=extension_file_name),
+            )
 
     async def get_creators_and_notes(self) -> None:
         """
@@ -310,7 +315,6 @@ class WeiboCrawler(AbstractCrawler):
                 all_notes_list = await self.wb_client.get_all_notes_by_creator_id(
                     creator_id=user_id,
                     container_id=f"107603{user_id}",
-                    crawl_interval=0,
                     callback=weibo_store.batch_update_weibo_notes,
                 )
 
@@ -17,9 +17,9 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
-import asyncio
 import json
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
+from functools import partial
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional, Union
 from urllib.parse import urlencode
 
 import httpx
@@ -30,6 +30,13 @@ import config
 from base.base_crawler import AbstractApiClient
 from proxy.proxy_mixin import ProxyRefreshMixin
 from tools import utils
+from tools.crawl_frontier import FrontierUnit
+from tools.crawl_pipeline import merge_page_streams
+from tools.http_client import get_http_client
+from tools.media_downloader import get_media_downloader
+from tools.metrics import record_retry
+from tools.rate_limiter import get_rate_limiter
+from tools.response_cache import CACHE_CREATOR_INFO, CACHE_NOTE_DETAIL, get_response_cache
 
 if TYPE_CHECKING:
     from proxy.proxy_ip_pool import ProxyIpPool
@@ -38,7 +45,7 @@ from .exception import DataFetchError, IPBlockError
 from .field import SearchNoteType, SearchSortType
 from .help import get_search_id
 from .extractor import XiaoHongShuExtractor
-from .playwright_sign import sign_with_playwright
+from .sign_engine import create_sign_engine
 
 
 class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
@@ -64,6 +71,7 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
         self.NOTE_ABNORMAL_CODE = -510001
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
+        self._sign_engine = create_sign_engine(playwright_page)
         self._extractor = XiaoHongShuExtractor()
         # 初始化代理池（来自 ProxyRefreshMixin）
         self.init_proxy_pool(proxy_ip_pool)
@@ -77,7 +85,7 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
             payload: POST请求的参数
 
         Returns:
-            Dict: 请求头参数签名
+            Dict: 带签名的请求头，每次请求新建，不修改共享的 self.headers（并发请求之间互不覆盖签名）
         """
         a1_value = self.cookie_dict.get("a1", "")
 
@@ -92,8 +100,7 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
             raise ValueError("params or payload is required")
 
         # 使用 playwright 注入方式生成签名
-        signs = await sign_with_playwright(
-            page=self.playwright_page,
+        signs = await self._sign_engine.sign(
             uri=url,
             data=data,
             a1=a1_value,
@@ -106,47 +113,53 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
             "x-S-Common": signs["x-s-common"],
             "X-B3-Traceid": signs["x-b3-traceid"],
         }
-        self.headers.update(headers)
-        return self.headers
+        return {**self.headers, **headers}
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
+    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1), before_sleep=record_retry)
     async def request(self, method, url, **kwargs) -> Union[str, Any]:
         """
         封装httpx的公共请求方法，对请求响应做一些处理
         Args:
             method: 请求方法
             url: 请求的URL
-            **kwargs: 其他请求参数，例如请求头、请求体等
+            **kwargs: 其他请求参数，例如请求头、请求体等；sign_args 为 _pre_headers 的参数，传入时在发送前签名
 
         Returns:
 
         """
-        # 每次请求前检测代理是否过期
-        await self._refresh_proxy_if_expired()
-
         # return response.text
         return_response = kwargs.pop("return_response", False)
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
-
-        if response.status_code == 471 or response.status_code == 461:
-            # someday someone maybe will bypass captcha
-            verify_type = response.headers["Verifytype"]
-            verify_uuid = response.headers["Verifyuuid"]
-            msg = f"出现验证码，请求失败，Verifytype: {verify_type}，Verifyuuid: {verify_uuid}, Response: {response}"
-            utils.logger.error(msg)
-            raise Exception(msg)
-
-        if return_response:
-            return response.text
-        data: Dict = response.json()
-        if data["success"]:
-            return data.get("data", data.get("success", {}))
-        elif data["code"] == self.IP_ERROR_CODE:
-            raise IPBlockError(self.IP_ERROR_STR)
-        else:
-            err_msg = data.get("msg", None) or f"{response.text}"
-            raise DataFetchError(err_msg)
+        sign_args = kwargs.pop("sign_args", None)
+        # 按接口类型限流，出现验证码或IP被封时自动降速
+        async with get_rate_limiter().limit(url, block_errors=(IPBlockError,), defer_start=True) as permit, \
+                self.lease_proxy(block_errors=(IPBlockError,)) as proxy:
+            # 令牌就绪、拿到代理之后再签名，等待期间不会用到过期的 X-T，重试时也会重新签名
+            if sign_args is not None:
+                kwargs["headers"] = await self._pre_headers(**sign_args)
+            # 租用代理和签名不占用在途名额、不计入响应耗时，发请求前才获取名额
+            await permit.start()
+            # 每次请求从代理池租用代理（多代理轮换），IP 被封时该代理移出代理池
+            response = await get_http_client(proxy).request(method, url, timeout=self.timeout, **kwargs)
+            permit.set_response(response.status_code)
+
+            if response.status_code == 471 or response.status_code == 461:
+                # someday someone maybe will bypass captcha
+                verify_type = response.headers["Verifytype"]
+                verify_uuid = response.headers["Verifyuuid"]
+                msg = f"出现验证码，请求失败，Verifytype: {verify_type}，Verifyuuid: {verify_uuid}, Response: {response}"
+                utils.logger.error(msg)
+                raise Exception(msg)
+
+            if return_response:
+                return response.text
+            data: Dict = response.json()
+            if data["success"]:
+                return data.get("data", data.get("success", {}))
+            elif data["code"] == self.IP_ERROR_CODE:
+                raise IPBlockError(self.IP_ERROR_STR)
+            else:
+                err_msg = data.get("msg", None) or f"{response.text}"
+                raise DataFetchError(err_msg)
 
     async def get(self, uri: str, params: Optional[Dict] = None) -> Dict:
         """
@@ -158,11 +171,10 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
         Returns:
 
         """
-        headers = await self._pre_headers(uri, params)
         full_url = f"{self._host}{uri}"
 
         return await self.request(
-            method="GET", url=full_url, headers=headers, params=params
+            method="GET", url=full_url, params=params, sign_args={"url": uri, "params": params}
         )
 
     async def post(self, uri: str, data: dict, **kwargs) -> Dict:
@@ -175,38 +187,28 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
         Returns:
 
         """
-        headers = await self._pre_headers(uri, payload=data)
         json_str = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
         return await self.request(
             method="POST",
             url=f"{self._host}{uri}",
             data=json_str,
-            headers=headers,
+            sign_args={"url": uri, "payload": data},
             **kwargs,
         )
 
-    async def get_note_media(self, url: str) -> Union[bytes, None]:
-        # 请求前检测代理是否过期
-        await self._refresh_proxy_if_expired()
-
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            try:
-                response = await client.request("GET", url, timeout=self.timeout)
-                response.raise_for_status()
-                if not response.reason_phrase == "OK":
-                    utils.logger.error(
-                        f"[XiaoHongShuClient.get_note_media] request {url} err, res:{response.text}"
-                    )
-                    return None
-                else:
-                    return response.content
-            except (
-                httpx.HTTPError
-            ) as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
-                utils.logger.error(
-                    f"[XiaoHongShuClient.get_aweme_media] {exc.__class__.__name__} for {exc.request.url} - {exc}"
-                )  # 保留原始异常类型名称，以便开发者调试
-                return None
+    async def get_note_media(self, url: str) -> Union[str, None]:
+        """
+        流式下载笔记图片/视频到临时文件
+        Args:
+            url: 媒体地址
+
+        Returns:
+            下载完成的临时文件路径，失败返回 None
+        """
+        async with self.lease_proxy() as proxy:
+            return await get_media_downloader().download(
+                url, proxy=proxy, timeout=self.timeout, follow_redirects=False
+            )
 
     async def pong(self) -> bool:
         """
@@ -240,6 +242,8 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
         cookie_str, cookie_dict = utils.convert_cookies(await browser_context.cookies())
         self.headers["Cookie"] = cookie_str
         self.cookie_dict = cookie_dict
+        # 登录态变化后 b1 需要重新获取
+        self._sign_engine.invalidate()
 
     async def get_note_by_keyword(
         self,
@@ -300,7 +304,9 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
             "xsec_token": xsec_token,
         }
         uri = "/api/sns/web/v1/feed"
-        res = await self.post(uri, data)
+        res = await get_response_cache().fetch(
+            CACHE_NOTE_DETAIL, "POST", uri, data, lambda: self.post(uri, data)
+        )
         if res and res.get("items"):
             res_dict: Dict = res["items"][0]["note_card"]
             return res_dict
@@ -368,29 +374,30 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
         }
         return await self.get(uri, params)
 
-    async def get_note_all_comments(
+    async def iter_note_comments(
         self,
         note_id: str,
         xsec_token: str,
-        crawl_interval: float = 1.0,
-        callback: Optional[Callable] = None,
         max_count: int = 10,
-    ) -> List[Dict]:
+        frontier_unit: Optional[FrontierUnit] = None,
+    ) -> AsyncIterator[List[Dict]]:
         """
-        获取指定笔记下的所有一级评论，该方法会一直查找一个帖子下的所有评论信息
+        按页获取指定笔记下的评论（一级评论页之后紧跟它的二级评论页），每次 yield 一页，不在内存中累积整个评论区
         Args:
             note_id: 笔记ID
             xsec_token: 验证token
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
-            callback: 一次笔记爬取结束后
             max_count: 一次笔记爬取的最大评论数量
+            frontier_unit: 评论游标的爬取进度，传入时从上次的游标继续，调用方处理完一页及其二级评论后写入检查点
         Returns:
 
         """
-        result = []
         comments_has_more = True
         comments_cursor = ""
-        while comments_has_more and len(result) < max_count:
+        fetched_count = 0
+        if frontier_unit and frontier_unit.cursor is not None:
+            comments_cursor = frontier_unit.cursor
+            fetched_count = frontier_unit.payload.get("count", 0)
+        while comments_has_more and fetched_count < max_count:
             comments_res = await self.get_note_comments(
                 note_id=note_id, xsec_token=xsec_token, cursor=comments_cursor
             )
@@ -398,90 +405,82 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
             comments_cursor = comments_res.get("cursor", "")
             if "comments" not in comments_res:
                 utils.logger.info(
-                    f"[XiaoHongShuClient.get_note_all_comments] No 'comments' key found in response: {comments_res}"
+                    f"[XiaoHongShuClient.iter_note_comments] No 'comments' key found in response: {comments_res}"
                 )
                 break
-            comments = comments_res["comments"]
-            if len(result) + len(comments) > max_count:
-                comments = comments[: max_count - len(result)]
-            if callback:
-                await callback(note_id, comments)
-            await asyncio.sleep(crawl_interval)
-            result.extend(comments)
-            sub_comments = await self.get_comments_all_sub_comments(
-                comments=comments,
-                xsec_token=xsec_token,
-                crawl_interval=crawl_interval,
-                callback=callback,
-            )
-            result.extend(sub_comments)
-        return result
-
-    async def get_comments_all_sub_comments(
+            comments = comments_res["comments"][: max_count - fetched_count]
+            fetched_count += len(comments)
+            if comments:
+                yield comments
+            async for sub_comments in self.iter_sub_comments(comments=comments, xsec_token=xsec_token):
+                fetched_count += len(sub_comments)
+                yield sub_comments
+            if frontier_unit:
+                await frontier_unit.checkpoint(comments_cursor, count=fetched_count)
+
+    async def iter_sub_comments(
         self,
         comments: List[Dict],
         xsec_token: str,
-        crawl_interval: float = 1.0,
-        callback: Optional[Callable] = None,
-    ) -> List[Dict]:
+    ) -> AsyncIterator[List[Dict]]:
         """
-        获取指定一级评论下的所有二级评论, 该方法会一直查找一级评论下的所有二级评论信息
+        按页获取指定一级评论下的所有二级评论，每次 yield 一页
+        不同一级评论的二级评论分页互不依赖，最多 SUB_COMMENT_CONCURRENCY 条一级评论同时展开
         Args:
             comments: 评论列表
             xsec_token: 验证token
-            crawl_interval: 爬取一次评论的延迟单位（秒）
-            callback: 一次评论爬取结束后
 
         Returns:
 
         """
         if not config.ENABLE_GET_SUB_COMMENTS:
             utils.logger.info(
-                f"[XiaoHongShuCrawler.get_comments_all_sub_comments] Crawling sub_comment mode is not enabled"
+                f"[XiaoHongShuClient.iter_sub_comments] Crawling sub_comment mode is not enabled"
             )
-            return []
+            return
 
-        result = []
-        for comment in comments:
-            note_id = comment.get("note_id")
-            sub_comments = comment.get("sub_comments")
-            if sub_comments and callback:
-                await callback(note_id, sub_comments)
-
-            sub_comment_has_more = comment.get("sub_comment_has_more")
-            if not sub_comment_has_more:
-                continue
+        streams = [partial(self._iter_root_sub_comments, comment, xsec_token) for comment in comments]
+        async for sub_comments in merge_page_streams(streams, config.SUB_COMMENT_CONCURRENCY):
+            yield sub_comments
 
-            root_comment_id = comment.get("id")
-            sub_comment_cursor = comment.get("sub_comment_cursor")
+    async def _iter_root_sub_comments(self, comment: Dict, xsec_token: str) -> AsyncIterator[List[Dict]]:
+        """
+        一条一级评论的二级评论：先是随一级评论返回的部分，再按游标翻页
+        """
+        note_id = comment.get("note_id")
+        sub_comments = comment.get("sub_comments")
+        if sub_comments:
+            yield sub_comments
 
-            while sub_comment_has_more:
-                comments_res = await self.get_note_sub_comments(
-                    note_id=note_id,
-                    root_comment_id=root_comment_id,
-                    xsec_token=xsec_token,
-                    num=10,
-                    cursor=sub_comment_cursor,
-                )
+        sub_comment_has_more = comment.get("sub_comment_has_more")
+        if not sub_comment_has_more:
+            return
 
-                if comments_res is None:
-                    utils.logger.info(
-                        f"[XiaoHongShuClient.get_comments_all_sub_comments] No response found for note_id: {note_id}"
-                    )
-                    continue
-                sub_comment_has_more = comments_res.get("has_more", False)
-                sub_comment_cursor = comments_res.get("cursor", "")
-                if "comments" not in comments_res:
-                    utils.logger.info(
-                        f"[XiaoHongShuClient.get_comments_all_sub_comments] No 'comments' key found in response: {comments_res}"
-                    )
-                    break
-                comments = comments_res["comments"]
-                if callback:
-                    await callback(note_id, comments)
-                await asyncio.sleep(crawl_interval)
-                result.extend(comments)
-        return result
+        root_comment_id = comment.get("id")
+        sub_comment_cursor = comment.get("sub_comment_cursor")
+
+        while sub_comment_has_more:
+            comments_res = await self.get_note_sub_comments(
+                note_id=note_id,
+                root_comment_id=root_comment_id,
+                xsec_token=xsec_token,
+                num=10,
+                cursor=sub_comment_cursor,
+            )
+
+            if comments_res is None:
+                utils.logger.info(
+                    f"[XiaoHongShuClient.iter_sub_comments] No response found for note_id: {note_id}"
+                )
+                continue
+            sub_comment_has_more = comments_res.get("has_more", False)
+            sub_comment_cursor = comments_res.get("cursor", "")
+            if "comments" not in comments_res:
+                utils.logger.info(
+                    f"[XiaoHongShuClient.iter_sub_comments] No 'comments' key found in response: {comments_res}"
+                )
+                break
+            yield comments_res["comments"]
 
     async def get_creator_info(
         self, user_id: str, xsec_token: str = "", xsec_source: str = ""
@@ -503,10 +502,12 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
         if xsec_token and xsec_source:
             uri = f"{uri}?xsec_token={xsec_token}&xsec_source={xsec_source}"
 
-        html_content = await self.request(
-            "GET", self._domain + uri, return_response=True, headers=self.headers
-        )
-        return self._extractor.extract_creator_info_from_html(html_content)
+        async def request_creator_info() -> Optional[Dict]:
+            # 缓存解析后的信息，解析失败（验证码、登录页等）时返回 None，不写入缓存
+            html_content = await self.request("GET", self._domain + uri, return_response=True, headers=self.headers)
+            return self._extractor.extract_creator_info_from_html(html_content)
+
+        return await get_response_cache().fetch(CACHE_CREATOR_INFO, "GET", uri, None, request_creator_info)
 
     async def get_notes_by_creator(
         self,
@@ -541,7 +542,6 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
     async def get_all_notes_by_creator(
         self,
         user_id: str,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         xsec_token: str = "",
         xsec_source: str = "pc_feed",
@@ -550,7 +550,6 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
         获取指定用户下的所有发过的帖子，该方法会一直查找一个用户下的所有帖子信息
         Args:
             user_id: 用户ID
-            crawl_interval: 爬取一次的延迟单位（秒）
             callback: 一次分页爬取结束后的更新回调函数
             xsec_token: 验证token
             xsec_source: 渠道来源
@@ -593,7 +592,6 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
                 await callback(notes_to_add)
 
             result.extend(notes_to_add)
-            await asyncio.sleep(crawl_interval)
 
         utils.logger.info(
             f"[XiaoHongShuClient.get_all_notes_by_creator] Finished getting notes for user {user_id}, total: {len(result)}"
@@ -613,7 +611,7 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
         data = {"original_url": f"{self._domain}/discovery/item/{note_id}"}
         return await self.post(uri, data=data, return_response=True)
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
+    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1), before_sleep=record_retry)
     async def get_note_by_id_from_html(
         self,
         note_id: str,
@@ -643,8 +641,9 @@ class XiaoHongShuClient(AbstractApiClient, ProxyRefreshMixin):
         if not enable_cookie:
             del copy_headers["Cookie"]
 
-        html = await self.request(
-            method="GET", url=url, return_response=True, headers=copy_headers
-        )
+        async def request_note_detail() -> Optional[Dict]:
+            # 缓存解析后的笔记详情，页面中没有 noteDetailMap（验证码、笔记不存在）时返回 None，不写入缓存
+            html = await self.request(method="GET", url=url, return_response=True, headers=copy_headers)
+            return self._extractor.extract_note_detail_from_html(note_id, html)
 
-        return self._extractor.extract_note_detail_from_html(note_id, html)
+        return await get_response_cache().fetch(CACHE_NOTE_DETAIL, "GET", url, None, request_note_detail)
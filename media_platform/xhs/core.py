@@ -19,9 +19,9 @@
 
 import asyncio
 import os
-import random
 from asyncio import Task
-from typing import Dict, List, Optional
+from functools import partial
+from typing import Dict, List, Optional, Tuple
 
 from playwright.async_api import (
     BrowserContext,
@@ -37,9 +37,15 @@ from base.base_crawler import AbstractCrawler
 from config import CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES
 from model.m_xiaohongshu import NoteUrlInfo, CreatorUrlInfo
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_mixin import proxy_session
 from store import xhs as xhs_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
+from tools.crawl_frontier import get_crawl_frontier
+from tools.crawl_pipeline import CrawlPipeline, PageCheckpointer, PipelineBatch
+from tools.crawl_scheduler import PRIORITY_COMMENTS, PRIORITY_DETAIL, work_priority
+from tools.media_queue import submit_media
+from tools.seen_index import ITEM_COMMENTS, ITEM_CONTENT, get_seen_index
 from var import crawler_type_var, source_keyword_var
 
 from .client import XiaoHongShuClient
@@ -130,57 +136,99 @@ class XiaoHongShuCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < xhs_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = xhs_limit_count
         start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(f"[XiaoHongShuCrawler.search] Current search keyword: {keyword}")
-            page = 1
-            search_id = get_search_id()
-            while (page - start_page + 1) * xhs_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[XiaoHongShuCrawler.search] Skip page {page}")
-                    page += 1
+        frontier = get_crawl_frontier()
+        seen_index = get_seen_index()
+        # 搜索 → 详情 → 存储 → 评论 流水线，翻页不再等待上一页的详情和评论
+        pipeline = CrawlPipeline("xhs.search")
+        pipeline.add_stage("detail", self._search_detail_stage, workers=config.PIPELINE_DETAIL_WORKERS)
+        pipeline.add_stage("store", self._search_store_stage, workers=config.PIPELINE_STORE_WORKERS)
+        pipeline.add_stage("comments", self._search_comments_stage, workers=config.PIPELINE_COMMENT_WORKERS)
+        keyword_checkpointers: List[Tuple[PageCheckpointer, bool]] = []
+        async with pipeline:
+            for keyword in config.KEYWORDS.split(","):
+                source_keyword_var.set(keyword)
+                utils.logger.info(f"[XiaoHongShuCrawler.search] Current search keyword: {keyword}")
+                search_unit = await frontier.get_unit(f"search:{keyword}", kind="search_page")
+                if search_unit.done:
+                    utils.logger.info(f"[XiaoHongShuCrawler.search] Keyword {keyword} already finished, skip")
                     continue
-
-                try:
-                    utils.logger.info(f"[XiaoHongShuCrawler.search] search xhs keyword: {keyword}, page: {page}")
-                    note_ids: List[str] = []
-                    xsec_tokens: List[str] = []
-                    notes_res = await self.xhs_client.get_note_by_keyword(
-                        keyword=keyword,
-                        search_id=search_id,
-                        page=page,
-                        sort=(SearchSortType(config.SORT_TYPE) if config.SORT_TYPE != "" else SearchSortType.GENERAL),
-                    )
-                    utils.logger.info(f"[XiaoHongShuCrawler.search] Search notes res:{notes_res}")
-                    if not notes_res or not notes_res.get("has_more", False):
-                        utils.logger.info("No more content!")
+                checkpointer = PageCheckpointer(search_unit)
+                page = search_unit.cursor or 1
+                search_id = get_search_id()
+                keyword_finished = True
+                while (page - start_page + 1) * xhs_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+                    if page < start_page:
+                        utils.logger.info(f"[XiaoHongShuCrawler.search] Skip page {page}")
+                        page += 1
+                        continue
+
+                    try:
+                        utils.logger.info(f"[XiaoHongShuCrawler.search] search xhs keyword: {keyword}, page: {page}")
+                        notes_res = await self.xhs_client.get_note_by_keyword(
+                            keyword=keyword,
+                            search_id=search_id,
+                            page=page,
+                            sort=(SearchSortType(config.SORT_TYPE) if config.SORT_TYPE != "" else SearchSortType.GENERAL),
+                        )
+                        utils.log_payload("search", "[XiaoHongShuCrawler.search] Search notes res:%s", notes_res)
+                        if not notes_res or not notes_res.get("has_more", False):
+                            utils.logger.info("No more content!")
+                            break
+                        post_items = [
+                            post_item for post_item in notes_res.get("items", {})
+                            if post_item.get("model_type") not in ("rec_query", "hot_query")
+                        ]
+                        # 近期已经爬取过的笔记不再请求详情，评论是否需要刷新由 get_comments 单独判断
+                        unseen_note_ids = set(await seen_index.filter_unseen(
+                            ITEM_CONTENT, [post_item.get("id") for post_item in post_items]
+                        ))
+                        batch = PipelineBatch()
+                        for post_item in post_items:
+                            if post_item.get("id") in unseen_note_ids:
+                                await pipeline.put("detail", (keyword, post_item), batch)
+                            elif config.ENABLE_GET_COMMENTS:
+                                await pipeline.put(
+                                    "comments", (keyword, post_item.get("id"), post_item.get("xsec_token")), batch
+                                )
+                        page += 1
+                        checkpointer.add_page(batch, page)
+                        await checkpointer.advance()
+                    except DataFetchError:
+                        utils.logger.error("[XiaoHongShuCrawler.search] Get note detail error")
+                        keyword_finished = False
                         break
-                    semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-                    task_list = [
-                        self.get_note_detail_async_task(
-                            note_id=post_item.get("id"),
-                            xsec_source=post_item.get("xsec_source"),
-                            xsec_token=post_item.get("xsec_token"),
-                            semaphore=semaphore,
-                        ) for post_item in notes_res.get("items", {}) if post_item.get("model_type") not in ("rec_query", "hot_query")
-                    ]
-                    note_details = await asyncio.gather(*task_list)
-                    for note_detail in note_details:
-                        if note_detail:
-                            await xhs_store.update_xhs_note(note_detail)
-                            await self.get_notice_media(note_detail)
-                            note_ids.append(note_detail.get("note_id"))
-                            xsec_tokens.append(note_detail.get("xsec_token"))
-                    page += 1
-                    utils.logger.info(f"[XiaoHongShuCrawler.search] Note details: {note_details}")
-                    await self.batch_get_note_comments(note_ids, xsec_tokens)
-
-                    # Sleep after each page navigation
-                    await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                    utils.logger.info(f"[XiaoHongShuCrawler.search] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page-1}")
-                except DataFetchError:
-                    utils.logger.error("[XiaoHongShuCrawler.search] Get note detail error")
-                    break
+                keyword_checkpointers.append((checkpointer, keyword_finished))
+            for checkpointer, keyword_finished in keyword_checkpointers:
+                await checkpointer.finish(keyword_finished)
+
+    async def _search_detail_stage(self, item: Tuple[str, Dict]) -> Optional[Tuple[str, Dict]]:
+        """流水线详情阶段：获取笔记详情"""
+        keyword, post_item = item
+        source_keyword_var.set(keyword)
+        note_detail = await self.get_note_detail_async_task(
+            note_id=post_item.get("id"),
+            xsec_source=post_item.get("xsec_source"),
+            xsec_token=post_item.get("xsec_token"),
+        )
+        return (keyword, note_detail) if note_detail else None
+
+    async def _search_store_stage(self, item: Tuple[str, Dict]) -> Optional[Tuple[str, str, str]]:
+        """流水线存储阶段：保存笔记、提交媒体下载，开启评论爬取时交给评论阶段"""
+        keyword, note_detail = item
+        source_keyword_var.set(keyword)
+        utils.log_payload("detail", "[XiaoHongShuCrawler.search] Note details: %s", note_detail)
+        await xhs_store.update_xhs_note(note_detail)
+        await self.get_notice_media(note_detail)
+        await get_seen_index().mark_seen(ITEM_CONTENT, [note_detail.get("note_id")])
+        if not config.ENABLE_GET_COMMENTS:
+            return None
+        return keyword, note_detail.get("note_id"), note_detail.get("xsec_token")
+
+    async def _search_comments_stage(self, item: Tuple[str, str, str]):
+        """流水线评论阶段：爬取一篇笔记的评论"""
+        keyword, note_id, xsec_token = item
+        source_keyword_var.set(keyword)
+        await self.get_comments(note_id=note_id, xsec_token=xsec_token)
 
     async def get_creators_and_notes(self) -> None:
         """Get creator's notes and retrieve their comment information."""
@@ -204,12 +252,9 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 utils.logger.error(f"[XiaoHongShuCrawler.get_creators_and_notes] Failed to parse creator URL: {e}")
                 continue
 
-            # Use fixed crawling interval
-            crawl_interval = config.CRAWLER_MAX_SLEEP_SEC
             # Get all note information of the creator
             all_notes_list = await self.xhs_client.get_all_notes_by_creator(
                 user_id=user_id,
-                crawl_interval=crawl_interval,
                 callback=self.fetch_creator_notes_detail,
                 xsec_token=creator_info.xsec_token,
                 xsec_source=creator_info.xsec_source,
@@ -226,13 +271,11 @@ class XiaoHongShuCrawler(AbstractCrawler):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         task_list = [
             self.get_note_detail_async_task(
                 note_id=post_item.get("note_id"),
                 xsec_source=post_item.get("xsec_source"),
                 xsec_token=post_item.get("xsec_token"),
-                semaphore=semaphore,
             ) for post_item in note_list
         ]
 
@@ -257,7 +300,6 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 note_id=note_url_info.note_id,
                 xsec_source=note_url_info.xsec_source,
                 xsec_token=note_url_info.xsec_token,
-                semaphore=asyncio.Semaphore(config.MAX_CONCURRENCY_NUM),
             )
             get_note_detail_task_list.append(crawler_task)
 
@@ -277,7 +319,6 @@ class XiaoHongShuCrawler(AbstractCrawler):
         note_id: str,
         xsec_source: str,
         xsec_token: str,
-        semaphore: asyncio.Semaphore,
     ) -> Optional[Dict]:
         """Get note detail
 
@@ -285,14 +326,13 @@ class XiaoHongShuCrawler(AbstractCrawler):
             note_id:
             xsec_source:
             xsec_token:
-            semaphore:
 
         Returns:
             Dict: note detail
         """
         note_detail = None
         utils.logger.info(f"[get_note_detail_async_task] Begin get note detail, note_id: {note_id}")
-        async with semaphore:
+        with work_priority(PRIORITY_DETAIL):
             try:
                 try:
                     note_detail = await self.xhs_client.get_note_by_id(note_id, xsec_source, xsec_token)
@@ -307,10 +347,6 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
                 note_detail.update({"xsec_token": xsec_token, "xsec_source": xsec_source})
 
-                # Sleep after fetching note detail
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[get_note_detail_async_task] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching note {note_id}")
-
                 return note_detail
 
             except DataFetchError as ex:
@@ -327,33 +363,34 @@ class XiaoHongShuCrawler(AbstractCrawler):
             return
 
         utils.logger.info(f"[XiaoHongShuCrawler.batch_get_note_comments] Begin batch get note comments, note list: {note_list}")
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         task_list: List[Task] = []
         for index, note_id in enumerate(note_list):
             task = asyncio.create_task(
-                self.get_comments(note_id=note_id, xsec_token=xsec_tokens[index], semaphore=semaphore),
+                self.get_comments(note_id=note_id, xsec_token=xsec_tokens[index]),
                 name=note_id,
             )
             task_list.append(task)
         await asyncio.gather(*task_list)
 
-    async def get_comments(self, note_id: str, xsec_token: str, semaphore: asyncio.Semaphore):
+    async def get_comments(self, note_id: str, xsec_token: str):
         """Get note comments with keyword filtering and quantity limitation"""
-        async with semaphore:
+        with work_priority(PRIORITY_COMMENTS), proxy_session(f"comments:{note_id}"):
+            comment_unit = await get_crawl_frontier().get_unit(f"comments:{note_id}", kind="comment_cursor")
+            if comment_unit.done:
+                utils.logger.info(f"[XiaoHongShuCrawler.get_comments] Comments of note {note_id} already finished, skip")
+                return
+            if await get_seen_index().is_fresh(ITEM_COMMENTS, note_id):
+                return
             utils.logger.info(f"[XiaoHongShuCrawler.get_comments] Begin get note id comments {note_id}")
-            # Use fixed crawling interval
-            crawl_interval = config.CRAWLER_MAX_SLEEP_SEC
-            await self.xhs_client.get_note_all_comments(
+            async for comments in self.xhs_client.iter_note_comments(
                 note_id=note_id,
                 xsec_token=xsec_token,
-                crawl_interval=crawl_interval,
-                callback=xhs_store.batch_update_xhs_note_comments,
                 max_count=CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
-            )
-
-            # Sleep after fetching comments
-            await asyncio.sleep(crawl_interval)
-            utils.logger.info(f"[XiaoHongShuCrawler.get_comments] Sleeping for {crawl_interval} seconds after fetching comments for note {note_id}")
+                frontier_unit=comment_unit,
+            ):
+                await xhs_store.batch_update_xhs_note_comments(note_id, comments)
+            await comment_unit.finish()
+            await get_seen_index().mark_seen(ITEM_COMMENTS, [note_id])
 
     async def create_xhs_client(self, httpx_proxy: Optional[str]) -> XiaoHongShuClient:
         """Create xhs client"""
@@ -485,13 +522,13 @@ class XiaoHongShuCrawler(AbstractCrawler):
             url = pic.get("url")
             if not url:
                 continue
-            content = await self.xhs_client.get_note_media(url)
-            await asyncio.sleep(random.random())
-            if content is None:
-                continue
             extension_file_name = f"{picNum}.jpg"
             picNum += 1
-            await xhs_store.update_xhs_note_image(note_id, content, extension_file_name)
+            await submit_media(
+                url,
+                partial(self.xhs_client.get_note_media, url),
+                partial(xhs_store.update_xhs_note_image, note_id, extension_file_name=extension_file_name),
+            )
 
     async def get_notice_video(self, note_item: Dict):
         """
@@ -509,10 +546,10 @@ class XiaoHongShuCrawler(AbstractCrawler):
             return
         videoNum = 0
         for url in videos:
-            content = await self.xhs_client.get_note_media(url)
-            await asyncio.sleep(random.random())
-            if content is None:
-                continue
             extension_file_name = f"{videoNum}.mp4"
             videoNum += 1
-            await xhs_store.update_xhs_note_video(note_id, content, extension_file_name)
+            await submit_media(
+                url,
+                partial(self.xhs_client.get_note_media, url),
+                partial(xhs_store.update_xhs_note_video, note_id, extension_file_name=extension_file_name),
+            )
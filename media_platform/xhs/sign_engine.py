@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/media_platform/xhs/sign_engine.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 小红书签名引擎，可切换不同的签名后端
+#            playwright: 每次签名单独调用 page.evaluate（原有方式）
+#            batched: 合并并发的签名请求为一次 page.evaluate，并缓存 b1
+
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Set, Tuple, Type, Union
+
+from playwright.async_api import Page
+
+import config
+from tools import utils
+
+from .playwright_sign import (
+    _build_sign_string,
+    _build_xs_common,
+    _build_xs_payload,
+    _md5_hex,
+    call_mnsv2,
+    get_b1_from_localstorage,
+    sign_with_playwright,
+)
+from .xhs_sign import get_trace_id
+
+# 一次 page.evaluate 中批量计算 mnsv2，参数以序列化方式传入，无需手动转义
+_BATCH_MNSV2_JS = """
+(items) => items.map(([signStr, md5Str]) => {
+    try {
+        return window.mnsv2(signStr, md5Str) || "";
+    } catch (e) {
+        return null;
+    }
+})
+"""
+
+_GET_B1_JS = "() => window.localStorage.getItem('b1') || ''"
+
+
+class AbstractXhsSignEngine(ABC):
+
+    def __init__(self, page: Page):
+        self.page = page
+
+    @abstractmethod
+    async def sign(
+        self,
+        uri: str,
+        data: Optional[Union[Dict, str]] = None,
+        a1: str = "",
+        method: str = "POST",
+    ) -> Dict[str, Any]:
+        """
+        生成签名请求头
+        Args:
+            uri: API 路径
+            data: 请求数据（GET 的 params 或 POST 的 payload）
+            a1: cookie 中的 a1 值
+            method: 请求方法 (GET 或 POST)
+
+        Returns:
+            包含 x-s, x-t, x-s-common, x-b3-traceid 的字典
+        """
+        raise NotImplementedError
+
+    def invalidate(self):
+        """
+        cookie 变化时调用，清除与登录态相关的缓存
+        """
+        pass
+
+
+class PlaywrightSignEngine(AbstractXhsSignEngine):
+    """每次签名都单独调用 playwright（原有方式）"""
+
+    async def sign(
+        self,
+        uri: str,
+        data: Optional[Union[Dict, str]] = None,
+        a1: str = "",
+        method: str = "POST",
+    ) -> Dict[str, Any]:
+        return await sign_with_playwright(page=self.page, uri=uri, data=data, a1=a1, method=method)
+
+
+class BatchedPlaywrightSignEngine(AbstractXhsSignEngine):
+    """
+    合并并发签名请求的 playwright 签名引擎
+
+    在 XHS_SIGN_BATCH_WINDOW_MS 窗口内到达的签名请求合并为一次 page.evaluate 调用，
+    b1 按 a1 缓存，cookie 变化时失效；批量调用失败时回退到逐条签名
+    """
+
+    def __init__(self, page: Page):
+        super().__init__(page)
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._window_open = False
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self._b1_cache: Optional[Tuple[str, str]] = None
+        self._b1_lock = asyncio.Lock()
+
+    def invalidate(self):
+        self._b1_cache = None
+
+    async def _get_b1(self, a1: str) -> str:
+        if self._b1_cache and self._b1_cache[0] == a1:
+            return self._b1_cache[1]
+        async with self._b1_lock:
+            if self._b1_cache and self._b1_cache[0] == a1:
+                return self._b1_cache[1]
+            try:
+                b1 = await self.page.evaluate(_GET_B1_JS)
+            except Exception:
+                b1 = await get_b1_from_localstorage(self.page)
+            if b1:
+                # b1 为空说明页面还未初始化完成，不缓存
+                self._b1_cache = (a1, b1)
+            return b1
+
+    async def _mnsv2(self, sign_str: str, md5_str: str) -> str:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((sign_str, md5_str, future))
+        if len(self._pending) >= config.XHS_SIGN_BATCH_MAX_SIZE:
+            batch, self._pending = self._pending, []
+            self._spawn(self._flush(batch))
+        elif not self._window_open:
+            self._window_open = True
+            self._spawn(self._flush_after_window())
+        return await future
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush_after_window(self):
+        # 等待窗口内的其他签名请求一并处理
+        await asyncio.sleep(config.XHS_SIGN_BATCH_WINDOW_MS / 1000)
+        self._window_open = False
+        batch, self._pending = self._pending, []
+        if batch:
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[str, str, asyncio.Future]]):
+        try:
+            try:
+                results = await self.page.evaluate(
+                    _BATCH_MNSV2_JS, [[sign_str, md5_str] for sign_str, md5_str, _ in batch]
+                )
+            except Exception as e:
+                utils.logger.warning(f"[BatchedPlaywrightSignEngine._flush] batch sign failed, fallback to single sign: {e}")
+                results = [None] * len(batch)
+
+            for (sign_str, md5_str, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if result is None:
+                    result = await call_mnsv2(self.page, sign_str, md5_str)
+                future.set_result(result)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def sign(
+        self,
+        uri: str,
+        data: Optional[Union[Dict, str]] = None,
+        a1: str = "",
+        method: str = "POST",
+    ) -> Dict[str, Any]:
+        sign_str = _build_sign_string(uri, data, method)
+        b1, x3_value = await asyncio.gather(
+            self._get_b1(a1),
+            self._mnsv2(sign_str, _md5_hex(sign_str)),
+        )
+        data_type = "object" if isinstance(data, (dict, list)) else "string"
+        x_s = _build_xs_payload(x3_value, data_type)
+        x_t = str(int(time.time() * 1000))
+        return {
+            "x-s": x_s,
+            "x-t": x_t,
+            "x-s-common": _build_xs_common(a1, b1, x_s, x_t),
+            "x-b3-traceid": get_trace_id(),
+        }
+
+
+SIGN_ENGINES: Dict[str, Type[AbstractXhsSignEngine]] = {
+    "playwright": PlaywrightSignEngine,
+    "batched": BatchedPlaywrightSignEngine,
+}
+
+
+def create_sign_engine(page: Page, engine_name: Optional[str] = None) -> AbstractXhsSignEngine:
+    """
+    根据配置创建签名引擎
+    Args:
+        page: playwright Page 对象（必须已打开小红书页面）
+        engine_name: 签名引擎名称，默认读取 config.XHS_SIGN_ENGINE
+
+    Returns:
+
+    """
+    engine_name = engine_name or config.XHS_SIGN_ENGINE
+    engine_class = SIGN_ENGINES.get(engine_name)
+    if not engine_class:
+        raise ValueError(f"[create_sign_engine] Invalid xhs sign engine: {engine_name}, supported: {list(SIGN_ENGINES)}")
+    return engine_class(page)
@@ -18,9 +18,9 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
 # -*- coding: utf-8 -*-
-import asyncio
 import json
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
+from functools import partial
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional, Union
 from urllib.parse import urlencode
 
 import httpx
@@ -34,13 +34,17 @@ from constant import zhihu as zhihu_constant
 from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
 from proxy.proxy_mixin import ProxyRefreshMixin
 from tools import utils
+from tools.crawl_pipeline import merge_page_streams
+from tools.http_client import get_http_client
+from tools.metrics import record_retry
+from tools.rate_limiter import get_rate_limiter
 
 if TYPE_CHECKING:
     from proxy.proxy_ip_pool import ProxyIpPool
 
 from .exception import DataFetchError, ForbiddenError
 from .field import SearchSort, SearchTime, SearchType
-from .help import ZhihuExtractor, sign
+from .help import ZhihuExtractor, async_sign
 
 
 class ZhiHuClient(AbstractApiClient, ProxyRefreshMixin):
@@ -74,13 +78,13 @@ class ZhiHuClient(AbstractApiClient, ProxyRefreshMixin):
         d_c0 = self.cookie_dict.get("d_c0")
         if not d_c0:
             raise Exception("d_c0 not found in cookies")
-        sign_res = sign(url, self.default_headers["cookie"])
+        sign_res = await async_sign(url, self.default_headers["cookie"])
         headers = self.default_headers.copy()
         headers['x-zst-81'] = sign_res["x-zst-81"]
         headers['x-zse-96'] = sign_res["x-zse-96"]
         return headers
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
+    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1), before_sleep=record_retry)
     async def request(self, method, url, **kwargs) -> Union[str, Any]:
         """
         封装httpx的公共请求方法，对请求响应做一些处理
@@ -92,14 +96,14 @@ class ZhiHuClient(AbstractApiClient, ProxyRefreshMixin):
         Returns:
 
         """
-        # 每次请求前检测代理是否过期
-        await self._refresh_proxy_if_expired()
-
         # return response.text
         return_response = kwargs.pop('return_response', False)
 
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        async with get_rate_limiter().limit(url) as permit:
+            # 每次请求从代理池租用代理（多代理轮换），或检测当前代理是否过期
+            async with self.lease_proxy() as proxy:
+                response = await get_http_client(proxy).request(method, url, timeout=self.timeout, **kwargs)
+            permit.set_response(response.status_code)
 
         if response.status_code != 200:
             utils.logger.error(f"[ZhiHuClient.request] Requset Url: {url}, Request error: {response.text}")
@@ -280,23 +284,18 @@ class ZhiHuClient(AbstractApiClient, ProxyRefreshMixin):
         }
         return await self.get(uri, params)
 
-    async def get_note_all_comments(
+    async def iter_note_comments(
         self,
         content: ZhihuContent,
-        crawl_interval: float = 1.0,
-        callback: Optional[Callable] = None,
-    ) -> List[ZhihuComment]:
+    ) -> AsyncIterator[List[ZhihuComment]]:
         """
-        获取指定帖子下的所有一级评论，该方法会一直查找一个帖子下的所有评论信息
+        按页获取指定帖子下的评论（一级评论页之后紧跟它的子评论页），每次 yield 一页，不在内存中累积整个评论区
         Args:
             content: 内容详情对象(问题｜文章｜视频)
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
-            callback: 一次笔记爬取结束后
 
         Returns:
 
         """
-        result: List[ZhihuComment] = []
         is_end: bool = False
         offset: str = ""
         limit: int = 10
@@ -312,61 +311,60 @@ class ZhiHuClient(AbstractApiClient, ProxyRefreshMixin):
             if not comments:
                 break
 
-            if callback:
-                await callback(comments)
-
-            result.extend(comments)
-            await self.get_comments_all_sub_comments(content, comments, crawl_interval=crawl_interval, callback=callback)
-            await asyncio.sleep(crawl_interval)
-        return result
+            yield comments
+            async for sub_comments in self.iter_sub_comments(content, comments):
+                yield sub_comments
 
-    async def get_comments_all_sub_comments(
+    async def iter_sub_comments(
         self,
         content: ZhihuContent,
         comments: List[ZhihuComment],
-        crawl_interval: float = 1.0,
-        callback: Optional[Callable] = None,
-    ) -> List[ZhihuComment]:
+    ) -> AsyncIterator[List[ZhihuComment]]:
         """
-        获取指定评论下的所有子评论
+        按页获取指定评论下的所有子评论，每次 yield 一页
+        不同评论的子评论分页互不依赖，最多 SUB_COMMENT_CONCURRENCY 条评论同时展开
         Args:
             content: 内容详情对象(问题｜文章｜视频)
             comments: 评论列表
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
-            callback: 一次笔记爬取结束后
 
         Returns:
 
         """
         if not config.ENABLE_GET_SUB_COMMENTS:
-            return []
-
-        all_sub_comments: List[ZhihuComment] = []
-        for parment_comment in comments:
-            if parment_comment.sub_comment_count == 0:
-                continue
-
-            is_end: bool = False
-            offset: str = ""
-            limit: int = 10
-            while not is_end:
-                child_comment_res = await self.get_child_comments(parment_comment.comment_id, offset, limit)
-                if not child_comment_res:
-                    break
-                paging_info = child_comment_res.get("paging", {})
-                is_end = paging_info.get("is_end")
-                offset = self._extractor.extract_offset(paging_info)
-                sub_comments = self._extractor.extract_comments(content, child_comment_res.get("data"))
-
-                if not sub_comments:
-                    break
-
-                if callback:
-                    await callback(sub_comments)
-
-                all_sub_comments.extend(sub_comments)
-                await asyncio.sleep(crawl_interval)
-        return all_sub_comments
+            return
+
+        streams = [
+            partial(self._iter_root_sub_comments, content, parment_comment)
+            for parment_comment in comments
+            if parment_comment.sub_comment_count != 0
+        ]
+        async for sub_comments in merge_page_streams(streams, config.SUB_COMMENT_CONCURRENCY):
+            yield sub_comments
+
+    async def _iter_root_sub_comments(
+        self,
+        content: ZhihuContent,
+        parment_comment: ZhihuComment,
+    ) -> AsyncIterator[List[ZhihuComment]]:
+        """
+        按 offset 翻页获取一条评论下的全部子评论
+        """
+        is_end: bool = False
+        offset: str = ""
+        limit: int = 10
+        while not is_end:
+            child_comment_res = await self.get_child_comments(parment_comment.comment_id, offset, limit)
+            if not child_comment_res:
+                break
+            paging_info = child_comment_res.get("paging", {})
+            is_end = paging_info.get("is_end")
+            offset = self._extractor.extract_offset(paging_info)
+            sub_comments = self._extractor.extract_comments(content, child_comment_res.get("data"))
+
+            if not sub_comments:
+                break
+
+            yield sub_comments
 
     async def get_creator_info(self, url_token: str) -> Optional[ZhihuCreator]:
         """
@@ -444,12 +442,11 @@ class ZhiHuClient(AbstractApiClient, ProxyRefreshMixin):
         }
         return await self.get(uri, params)
 
-    async def get_all_anwser_by_creator(self, creator: ZhihuCreator, crawl_interval: float = 1.0, callback: Optional[Callable] = None) -> List[ZhihuContent]:
+    async def get_all_anwser_by_creator(self, creator: ZhihuCreator, callback: Optional[Callable] = None) -> List[ZhihuContent]:
         """
         获取创作者的所有回答
         Args:
             creator: 创作者信息
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后
 
         Returns:
@@ -471,20 +468,17 @@ class ZhiHuClient(AbstractApiClient, ProxyRefreshMixin):
                 await callback(contents)
             all_contents.extend(contents)
             offset += limit
-            await asyncio.sleep(crawl_interval)
         return all_contents
 
     async def get_all_articles_by_creator(
         self,
         creator: ZhihuCreator,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[ZhihuContent]:
         """
         获取创作者的所有文章
         Args:
             creator:
-            crawl_interval:
             callback:
 
         Returns:
@@ -505,20 +499,17 @@ class ZhiHuClient(AbstractApiClient, ProxyRefreshMixin):
                 await callback(contents)
             all_contents.extend(contents)
             offset += limit
-            await asyncio.sleep(crawl_interval)
         return all_contents
 
     async def get_all_videos_by_creator(
         self,
         creator: ZhihuCreator,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[ZhihuContent]:
         """
         获取创作者的所有视频
         Args:
             creator:
-            crawl_interval:
             callback:
 
         Returns:
@@ -539,7 +530,6 @@ class ZhiHuClient(AbstractApiClient, ProxyRefreshMixin):
                 await callback(contents)
             all_contents.extend(contents)
             offset += limit
-            await asyncio.sleep(crawl_interval)
         return all_contents
 
     async def get_answer_info(
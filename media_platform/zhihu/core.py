@@ -38,9 +38,12 @@ from constant import zhihu as constant
 from base.base_crawler import AbstractCrawler
 from model.m_zhihu import ZhihuContent, ZhihuCreator
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_mixin import proxy_session
 from store import zhihu as zhihu_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
+from tools.crawl_frontier import get_crawl_frontier
+from tools.crawl_scheduler import PRIORITY_COMMENTS, PRIORITY_DETAIL, work_priority
 from var import crawler_type_var, source_keyword_var
 
 from .client import ZhiHuClient
@@ -149,12 +152,17 @@ class ZhihuCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < zhihu_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = zhihu_limit_count
         start_page = config.START_PAGE
+        frontier = get_crawl_frontier()
         for keyword in config.KEYWORDS.split(","):
             source_keyword_var.set(keyword)
             utils.logger.info(
                 f"[ZhihuCrawler.search] Current search keyword: {keyword}"
             )
-            page = 1
+            search_unit = await frontier.get_unit(f"search:{keyword}", kind="search_page")
+            if search_unit.done:
+                utils.logger.info(f"[ZhihuCrawler.search] Keyword {keyword} already finished, skip")
+                continue
+            page = search_unit.cursor or 1
             while (
                 page - start_page + 1
             ) * zhihu_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
@@ -180,18 +188,16 @@ class ZhihuCrawler(AbstractCrawler):
                         utils.logger.info("No more content!")
                         break
 
-                    # Sleep after page navigation
-                    await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                    utils.logger.info(f"[ZhihuCrawler.search] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page-1}")
-
                     page += 1
                     for content in content_list:
                         await zhihu_store.update_zhihu_content(content)
 
                     await self.batch_get_content_comments(content_list)
+                    await search_unit.checkpoint(page)
                 except DataFetchError:
                     utils.logger.error("[ZhihuCrawler.search] Search content error")
                     return
+            await search_unit.finish()
 
     async def batch_get_content_comments(self, content_list: List[ZhihuContent]):
         """
@@ -208,41 +214,32 @@ class ZhihuCrawler(AbstractCrawler):
             )
             return
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         task_list: List[Task] = []
         for content_item in content_list:
             task = asyncio.create_task(
-                self.get_comments(content_item, semaphore), name=content_item.content_id
+                self.get_comments(content_item), name=content_item.content_id
             )
             task_list.append(task)
         await asyncio.gather(*task_list)
 
     async def get_comments(
-        self, content_item: ZhihuContent, semaphore: asyncio.Semaphore
+        self, content_item: ZhihuContent
     ):
         """
         Get note comments with keyword filtering and quantity limitation
         Args:
             content_item:
-            semaphore:
 
         Returns:
 
         """
-        async with semaphore:
+        with work_priority(PRIORITY_COMMENTS), proxy_session(f"comments:{content_item.content_id}"):
             utils.logger.info(
                 f"[ZhihuCrawler.get_comments] Begin get note id comments {content_item.content_id}"
             )
 
-            # Sleep before fetching comments
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-            utils.logger.info(f"[ZhihuCrawler.get_comments] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds before fetching comments for content {content_item.content_id}")
-
-            await self.zhihu_client.get_note_all_comments(
-                content=content_item,
-                crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
-                callback=zhihu_store.batch_update_zhihu_note_comments,
-            )
+            async for comments in self.zhihu_client.iter_note_comments(content=content_item):
+                await zhihu_store.batch_update_zhihu_note_comments(comments)
 
     async def get_creators_and_notes(self) -> None:
         """
@@ -278,21 +275,18 @@ class ZhihuCrawler(AbstractCrawler):
             # Get all anwser information of the creator
             all_content_list = await self.zhihu_client.get_all_anwser_by_creator(
                 creator=createor_info,
-                crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
                 callback=zhihu_store.batch_update_zhihu_contents,
             )
 
             # Get all articles of the creator's contents
             # all_content_list = await self.zhihu_client.get_all_articles_by_creator(
             #     creator=createor_info,
-            #     crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
             #     callback=zhihu_store.batch_update_zhihu_contents
             # )
 
             # Get all videos of the creator's contents
             # all_content_list = await self.zhihu_client.get_all_videos_by_creator(
             #     creator=createor_info,
-            #     crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
             #     callback=zhihu_store.batch_update_zhihu_contents
             # )
 
@@ -300,18 +294,17 @@ class ZhihuCrawler(AbstractCrawler):
             await self.batch_get_content_comments(all_content_list)
 
     async def get_note_detail(
-        self, full_note_url: str, semaphore: asyncio.Semaphore
+        self, full_note_url: str
     ) -> Optional[ZhihuContent]:
         """
         Get note detail
         Args:
             full_note_url: str
-            semaphore:
 
         Returns:
 
         """
-        async with semaphore:
+        with work_priority(PRIORITY_DETAIL):
             utils.logger.info(
                 f"[ZhihuCrawler.get_specified_notes] Begin get specified note {full_note_url}"
             )
@@ -325,10 +318,6 @@ class ZhihuCrawler(AbstractCrawler):
                 )
                 result = await self.zhihu_client.get_answer_info(question_id, answer_id)
 
-                # Sleep after fetching answer details
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[ZhihuCrawler.get_note_detail] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching answer details {answer_id}")
-
                 return result
 
             elif note_type == constant.ARTICLE_NAME:
@@ -338,10 +327,6 @@ class ZhihuCrawler(AbstractCrawler):
                 )
                 result = await self.zhihu_client.get_article_info(article_id)
 
-                # Sleep after fetching article details
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[ZhihuCrawler.get_note_detail] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching article details {article_id}")
-
                 return result
 
             elif note_type == constant.VIDEO_NAME:
@@ -351,10 +336,6 @@ class ZhihuCrawler(AbstractCrawler):
                 )
                 result = await self.zhihu_client.get_video_info(video_id)
 
-                # Sleep after fetching video details
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[ZhihuCrawler.get_note_detail] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching video details {video_id}")
-
                 return result
 
     async def get_specified_notes(self):
@@ -369,7 +350,6 @@ class ZhihuCrawler(AbstractCrawler):
             full_note_url = full_note_url.split("?")[0]
             crawler_task = self.get_note_detail(
                 full_note_url=full_note_url,
-                semaphore=asyncio.Semaphore(config.MAX_CONCURRENCY_NUM),
             )
             get_note_detail_task_list.append(crawler_task)
 
@@ -30,8 +30,10 @@ from constant import zhihu as zhihu_constant
 from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
 from tools import utils
 from tools.crawler_util import extract_text_from_html
+from tools.js_sign_pool import get_js_sign_pool, is_js_sign_pool_enabled
 
 ZHIHU_SGIN_JS = None
+ZHIHU_SIGN_JS_PATH = "libs/zhihu.js"
 
 
 def sign(url: str, cookies: str) -> Dict:
@@ -46,12 +48,28 @@ def sign(url: str, cookies: str) -> Dict:
     """
     global ZHIHU_SGIN_JS
     if not ZHIHU_SGIN_JS:
-        with open("libs/zhihu.js", mode="r", encoding="utf-8-sig") as f:
+        with open(ZHIHU_SIGN_JS_PATH, mode="r", encoding="utf-8-sig") as f:
             ZHIHU_SGIN_JS = execjs.compile(f.read())
 
     return ZHIHU_SGIN_JS.call("get_sign", url, cookies)
 
 
+async def async_sign(url: str, cookies: str) -> Dict:
+    """
+    zhihu sign algorithm, computed by the long-lived sign worker pool
+    falls back to execjs when Node.js is not available
+    Args:
+        url: request url with query string
+        cookies: request cookies with d_c0 key
+
+    Returns:
+
+    """
+    if not is_js_sign_pool_enabled():
+        return sign(url, cookies)
+    return await get_js_sign_pool(ZHIHU_SIGN_JS_PATH).call("get_sign", url, cookies)
+
+
 class ZhihuExtractor:
     def __init__(self):
         pass
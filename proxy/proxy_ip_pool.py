@@ -21,11 +21,12 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2023/12/2 13:45
 # @Desc    : ip代理池实现
-import random
-from typing import Dict, List
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Type
 
 import httpx
-from tenacity import retry, stop_after_attempt, wait_fixed
 
 import config
 from proxy.providers import (
@@ -33,12 +34,121 @@ from proxy.providers import (
     new_wandou_http_proxy,
 )
 from tools import utils
+from tools.http_client import discard_http_client
 
-from .base_proxy import ProxyProvider
+from .base_proxy import IpGetError, ProxyProvider
 from .types import IpInfoModel, ProviderNameEnum
 
 
+def get_proxy_key(proxy: IpInfoModel) -> str:
+    return f"{proxy.ip}:{proxy.port}"
+
+
+def get_proxy_url(proxy: IpInfoModel) -> str:
+    """
+    httpx 使用的代理URL
+    """
+    if proxy.user and proxy.password:
+        return f"http://{proxy.user}:{proxy.password}@{proxy.ip}:{proxy.port}"
+    return f"http://{proxy.ip}:{proxy.port}"
+
+
+class ProxyStats:
+    """
+    单个代理的健康统计：成功率和响应耗时（指数滑动平均）
+    """
+
+    RTT_SMOOTHING = 0.3
+
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.rtt: Optional[float] = None
+
+    def record(self, success: bool, rtt: Optional[float] = None):
+        if success:
+            self.successes += 1
+            self.consecutive_failures = 0
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+        if rtt is not None:
+            self.rtt = rtt if self.rtt is None else self.rtt + self.RTT_SMOOTHING * (rtt - self.rtt)
+
+    @property
+    def success_rate(self) -> float:
+        # 拉普拉斯平滑，没有样本的新代理按 0.5 计算
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    @property
+    def score(self) -> float:
+        """
+        分数越高越优先：成功率越高、响应越快分数越高
+        """
+        return self.success_rate / (1 + (self.rtt or 0.0))
+
+
+class ProxyLease:
+    """
+    一次请求对代理的租用，结束后归还并发名额并反馈结果
+
+    - 请求成功：记录成功和耗时
+    - 抛出 block_errors（IP 被封）：立即把代理移出代理池
+    - 抛出网络错误：记录失败；其他异常（如接口返回的业务错误）与代理无关，不计入
+    """
+
+    def __init__(
+        self,
+        pool: "ProxyIpPool",
+        sticky_key: Optional[str],
+        block_errors: Tuple[Type[BaseException], ...],
+    ):
+        self.pool = pool
+        self.sticky_key = sticky_key
+        self.block_errors = block_errors
+        self.proxy: Optional[IpInfoModel] = None
+        self._start = time.monotonic()
+
+    @property
+    def proxy_url(self) -> Optional[str]:
+        """
+        httpx 使用的代理URL
+        """
+        if self.proxy is None:
+            return None
+        return get_proxy_url(self.proxy)
+
+    async def __aenter__(self) -> "ProxyLease":
+        self.proxy = await self.pool.acquire_proxy(self.sticky_key)
+        self._start = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.pool.release_proxy(self.proxy)
+        if exc_type is None:
+            self.pool.report_result(self.proxy, success=True, rtt=time.monotonic() - self._start)
+        elif self.block_errors and issubclass(exc_type, self.block_errors):
+            self.pool.evict(self.proxy, f"{exc_type.__name__}: {exc_val}")
+        elif issubclass(exc_type, httpx.TransportError):
+            self.pool.report_result(self.proxy, success=False)
+        return False
+
+
 class ProxyIpPool:
+    """
+    带健康评分的代理IP池
+
+    - 从代理商提取的 IP 并发验证，验证通过的加入代理池，验证耗时作为初始 RTT
+    - get_proxy() 按 (未临近过期, 分数) 选择代理，代理留在池中可被重复使用
+    - 请求结果通过 report_result() 反馈，连续失败 PROXY_MAX_CONSECUTIVE_FAILURES 次的代理移出代理池
+    - 后台任务在代理过期前 PROXY_PREFETCH_BEFORE_EXPIRE_SEC 秒补充新代理，请求不需要等待代理商接口和验证
+    - 多代理轮换模式下每个请求通过 lease() 租用一个代理，每个代理同时最多 PROXY_MAX_CONCURRENCY_PER_IP 个请求，
+      同一个粘性 key（如同一帖子的评论翻页）固定使用同一个代理
+    """
+
+    # 粘性 key 的最大记录数，超出时淘汰最久未使用的
+    MAX_STICKY_KEYS = 10000
 
     def __init__(
         self, ip_pool_count: int, enable_validate_ip: bool, ip_provider: ProxyProvider
@@ -56,6 +166,13 @@ class ProxyIpPool:
         self.proxy_list: List[IpInfoModel] = []
         self.ip_provider: ProxyProvider = ip_provider
         self.current_proxy: IpInfoModel | None = None  # 当前正在使用的代理
+        self._stats: Dict[str, ProxyStats] = {}
+        self._refill_task: Optional[asyncio.Task] = None
+        self._prefetch_task: Optional[asyncio.Task] = None
+        self._in_flight: Dict[str, int] = {}  # 每个代理正在进行的请求数
+        self._sticky_proxies: "OrderedDict[str, str]" = OrderedDict()  # 粘性 key -> 代理
+        self._capacity_waiters: List[asyncio.Future] = []
+        self._retired: Dict[str, IpInfoModel] = {}  # 已移出代理池、还有请求在进行的代理
 
     async def load_proxies(self) -> None:
         """
@@ -63,7 +180,100 @@ class ProxyIpPool:
         Returns:
 
         """
-        self.proxy_list = await self.ip_provider.get_proxy(self.ip_pool_count)
+        await self._refill()
+
+    def get_stats(self, proxy: IpInfoModel) -> ProxyStats:
+        key = get_proxy_key(proxy)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = ProxyStats()
+            self._stats[key] = stats
+        return stats
+
+    def report_result(self, proxy: Optional[IpInfoModel], success: bool, rtt: Optional[float] = None) -> None:
+        """
+        反馈一次使用代理的结果
+        Args:
+            proxy: 使用的代理
+            success: 是否成功
+            rtt: 响应耗时（秒）
+
+        Returns:
+
+        """
+        if proxy is None:
+            return
+        stats = self.get_stats(proxy)
+        stats.record(success, rtt)
+        if stats.consecutive_failures >= config.PROXY_MAX_CONSECUTIVE_FAILURES:
+            self.evict(proxy, f"{stats.consecutive_failures} consecutive failures")
+
+    def evict(self, proxy: Optional[IpInfoModel], reason: str):
+        """
+        把代理移出代理池并在后台补充
+        Args:
+            proxy: 要移除的代理
+            reason: 移除原因，用于日志
+
+        Returns:
+
+        """
+        if proxy is None:
+            return
+        key = get_proxy_key(proxy)
+        remaining = [item for item in self.proxy_list if get_proxy_key(item) != key]
+        if len(remaining) == len(self.proxy_list):
+            return
+        self.proxy_list = remaining
+        self._stats.pop(key, None)
+        self._retire(proxy)
+        utils.logger.warning(f"[ProxyIpPool.evict] remove proxy {key} from pool: {reason}")
+        self._trigger_refill()
+        # 粘性 key 绑定的代理被移除后需要重新分配，唤醒等待者
+        self._notify_capacity()
+
+    def _prune_expired(self):
+        alive = [proxy for proxy in self.proxy_list if not proxy.is_expired()]
+        if len(alive) == len(self.proxy_list):
+            return
+        for proxy in self.proxy_list:
+            if proxy.is_expired():
+                self._retire(proxy)
+        self.proxy_list = alive
+        alive_keys = {get_proxy_key(proxy) for proxy in self.proxy_list}
+        self._stats = {key: stats for key, stats in self._stats.items() if key in alive_keys}
+
+    def _retire(self, proxy: IpInfoModel):
+        """
+        代理移出代理池后关闭它的共享 httpx client，还有请求在使用时等最后一个请求归还后再关闭
+        """
+        key = get_proxy_key(proxy)
+        if self._in_flight.get(key, 0) > 0:
+            self._retired[key] = proxy
+            return
+        self._retired.pop(key, None)
+        discard_http_client(get_proxy_url(proxy))
+
+    def _fresh_count(self) -> int:
+        """
+        未临近过期的代理数量
+        """
+        return sum(1 for proxy in self.proxy_list if not proxy.is_expired(config.PROXY_PREFETCH_BEFORE_EXPIRE_SEC))
+
+    def _needs_refill(self) -> bool:
+        return self._fresh_count() < self.ip_pool_count
+
+    def _pick_proxy(self) -> Optional[IpInfoModel]:
+        self._prune_expired()
+        if not self.proxy_list:
+            return None
+        return max(
+            self.proxy_list,
+            key=lambda proxy: (
+                not proxy.is_expired(config.PROXY_PREFETCH_BEFORE_EXPIRE_SEC),
+                self.get_stats(proxy).score,
+            ),
+        )
 
     async def _is_valid_proxy(self, proxy: IpInfoModel) -> bool:
         """
@@ -81,34 +291,234 @@ class ProxyIpPool:
             else:
                 proxy_url = f"http://{proxy.ip}:{proxy.port}"
 
-            async with httpx.AsyncClient(proxy=proxy_url) as client:
+            async with httpx.AsyncClient(proxy=proxy_url, timeout=config.PROXY_VALIDATE_TIMEOUT_SEC) as client:
                 response = await client.get(self.valid_ip_url)
-            if response.status_code == 200:
-                return True
-            else:
-                return False
+            return response.status_code == 200
         except Exception as e:
             utils.logger.info(
                 f"[ProxyIpPool._is_valid_proxy] testing {proxy.ip} err: {e}"
             )
-            raise e
+            return False
+
+    async def _validate_proxies(self, candidates: List[IpInfoModel]) -> List[IpInfoModel]:
+        """
+        并发验证代理，验证耗时记为代理的初始 RTT
+        """
+        semaphore = asyncio.Semaphore(config.PROXY_VALIDATE_CONCURRENCY)
+
+        async def validate(proxy: IpInfoModel) -> bool:
+            async with semaphore:
+                start = time.monotonic()
+                is_valid = await self._is_valid_proxy(proxy)
+                if is_valid:
+                    self.get_stats(proxy).record(True, time.monotonic() - start)
+                return is_valid
+
+        results = await asyncio.gather(*(validate(proxy) for proxy in candidates))
+        return [proxy for proxy, is_valid in zip(candidates, results) if is_valid]
+
+    async def _do_refill(self):
+        """
+        补充代理池到 ip_pool_count 个未临近过期的代理，代理商返回的 IP 全部无效时重新提取，最多 PROXY_REFILL_MAX_ATTEMPTS 轮
+        """
+        self._prune_expired()
+        for _ in range(config.PROXY_REFILL_MAX_ATTEMPTS):
+            if not self._needs_refill():
+                return
+            existing_keys = {get_proxy_key(proxy) for proxy in self.proxy_list}
+            candidates = [
+                proxy
+                for proxy in await self.ip_provider.get_proxy(self.ip_pool_count - self._fresh_count())
+                if get_proxy_key(proxy) not in existing_keys and not proxy.is_expired()
+            ]
+            if self.enable_validate_ip:
+                candidates = await self._validate_proxies(candidates)
+            self.proxy_list.extend(candidates)
+            utils.logger.info(
+                f"[ProxyIpPool._do_refill] add {len(candidates)} proxies, pool size: {len(self.proxy_list)}"
+            )
+            if candidates:
+                self._notify_capacity()
+                return
+
+    async def _refill(self):
+        """
+        补充代理池，同一时间只有一个补充任务，并发调用者等待同一个任务
+        """
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._do_refill())
+        # shield：调用者被取消时不影响其他等待者共用的补充任务
+        await asyncio.shield(self._refill_task)
+
+    def _trigger_refill(self):
+        """
+        在后台补充代理池，不等待结果
+        """
+        if self._refill_task is not None and not self._refill_task.done():
+            return
+        try:
+            self._refill_task = asyncio.create_task(self._do_refill())
+        except RuntimeError:
+            # 没有运行中的事件循环，下次 get_proxy() 时再补充
+            return
+        self._refill_task.add_done_callback(self._on_background_refill_done)
+
+    @staticmethod
+    def _on_background_refill_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            utils.logger.error(f"[ProxyIpPool._trigger_refill] refill proxy pool error: {task.exception()}")
+
+    async def _prefetch_loop(self):
+        while True:
+            await asyncio.sleep(config.PROXY_POOL_CHECK_INTERVAL_SEC)
+            self._prune_expired()
+            if self._needs_refill():
+                self._trigger_refill()
+
+    def start_prefetch(self):
+        """
+        启动后台预取任务，定期检查并在代理临近过期前补充
+        """
+        if self._prefetch_task is None or self._prefetch_task.done():
+            self._prefetch_task = asyncio.create_task(self._prefetch_loop())
+
+    async def close(self):
+        """
+        停止后台任务
+        """
+        for task in (self._prefetch_task, self._refill_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._prefetch_task = None
+        self._refill_task = None
+
+    def _notify_capacity(self):
+        """
+        有代理名额释放或代理池变化时唤醒等待租用的请求
+        """
+        waiters, self._capacity_waiters = self._capacity_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def _wait_for_capacity(self):
+        waiter = asyncio.get_running_loop().create_future()
+        self._capacity_waiters.append(waiter)
+        try:
+            # 兜底超时：代理临近过期等状态变化不会主动唤醒，定期重新检查
+            await asyncio.wait_for(waiter, timeout=config.PROXY_POOL_CHECK_INTERVAL_SEC)
+        except asyncio.TimeoutError:
+            pass
+
+    def _pick_lease_proxy(self, sticky_key: Optional[str]) -> Optional[IpInfoModel]:
+        """
+        选择一个还有并发名额的代理，粘性 key 已绑定的代理满载时等待而不是换 IP
+        """
+        max_in_flight = config.PROXY_MAX_CONCURRENCY_PER_IP
+        if sticky_key is not None:
+            sticky_proxy_key = self._sticky_proxies.get(sticky_key)
+            for proxy in self.proxy_list:
+                if get_proxy_key(proxy) == sticky_proxy_key:
+                    self._sticky_proxies.move_to_end(sticky_key)
+                    return proxy if self._in_flight.get(sticky_proxy_key, 0) < max_in_flight else None
+        candidates = [
+            proxy for proxy in self.proxy_list if self._in_flight.get(get_proxy_key(proxy), 0) < max_in_flight
+        ]
+        if not candidates:
+            return None
+        # 分数按正在进行的请求数折算，请求分散到整个代理池
+        return max(
+            candidates,
+            key=lambda proxy: (
+                not proxy.is_expired(config.PROXY_PREFETCH_BEFORE_EXPIRE_SEC),
+                self.get_stats(proxy).score / (1 + self._in_flight.get(get_proxy_key(proxy), 0)),
+            ),
+        )
+
+    async def acquire_proxy(self, sticky_key: Optional[str] = None) -> IpInfoModel:
+        """
+        租用一个代理，所有代理都满载时等待，用完后必须调用 release_proxy()
+        Args:
+            sticky_key: 粘性 key，相同 key 的请求使用同一个代理
+
+        Returns:
+            IpInfoModel
+        """
+        while True:
+            self._prune_expired()
+            if not self.proxy_list:
+                await self._refill()
+                if not self.proxy_list:
+                    raise IpGetError("[ProxyIpPool.acquire_proxy] no valid proxy available")
+            proxy = self._pick_lease_proxy(sticky_key)
+            if proxy is not None:
+                break
+            await self._wait_for_capacity()
+
+        key = get_proxy_key(proxy)
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        if sticky_key is not None:
+            self._sticky_proxies[sticky_key] = key
+            self._sticky_proxies.move_to_end(sticky_key)
+            while len(self._sticky_proxies) > self.MAX_STICKY_KEYS:
+                self._sticky_proxies.popitem(last=False)
+        if self._needs_refill():
+            self._trigger_refill()
+        return proxy
+
+    def release_proxy(self, proxy: Optional[IpInfoModel]):
+        """
+        归还租用的代理
+        """
+        if proxy is None:
+            return
+        key = get_proxy_key(proxy)
+        in_flight = self._in_flight.get(key, 0) - 1
+        if in_flight > 0:
+            self._in_flight[key] = in_flight
+        else:
+            self._in_flight.pop(key, None)
+            retired = self._retired.pop(key, None)
+            if retired is not None:
+                discard_http_client(get_proxy_url(retired))
+        self._notify_capacity()
+
+    def lease(
+        self,
+        sticky_key: Optional[str] = None,
+        block_errors: Tuple[Type[BaseException], ...] = (),
+    ) -> ProxyLease:
+        """
+        用法：
+            async with proxy_ip_pool.lease(sticky_key=note_id, block_errors=(IPBlockError,)) as lease:
+                client = get_http_client(lease.proxy_url)
+                response = await client.request(...)
+        Args:
+            sticky_key: 粘性 key，相同 key 的请求使用同一个代理
+            block_errors: 表示 IP 被封的异常类型，请求中抛出时移除该代理
+
+        Returns:
+
+        """
+        return ProxyLease(self, sticky_key, block_errors)
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     async def get_proxy(self) -> IpInfoModel:
         """
-        从代理池中随机提取一个代理IP
+        从代理池中选择分数最高的代理IP，只有代理池为空时才等待补充
         :return:
         """
-        if len(self.proxy_list) == 0:
-            await self._reload_proxies()
-
-        proxy = random.choice(self.proxy_list)
-        self.proxy_list.remove(proxy)  # 取出来一个IP就应该移出掉
-        if self.enable_validate_ip:
-            if not await self._is_valid_proxy(proxy):
-                raise Exception(
-                    "[ProxyIpPool.get_proxy] current ip invalid and again get it"
-                )
+        proxy = self._pick_proxy()
+        if proxy is None:
+            await self._refill()
+            proxy = self._pick_proxy()
+        if proxy is None:
+            raise IpGetError("[ProxyIpPool.get_proxy] no valid proxy available")
+        if self._needs_refill():
+            self._trigger_refill()
         self.current_proxy = proxy  # 保存当前使用的代理
         return proxy
 
@@ -140,14 +550,6 @@ class ProxyIpPool:
             return await self.get_proxy()
         return self.current_proxy
 
-    async def _reload_proxies(self):
-        """
-        # 重新加载代理池
-        :return:
-        """
-        self.proxy_list = []
-        await self.load_proxies()
-
 
 IpProxyProvider: Dict[str, ProxyProvider] = {
     ProviderNameEnum.KUAI_DAILI_PROVIDER.value: new_kuai_daili_proxy(),
@@ -155,6 +557,10 @@ IpProxyProvider: Dict[str, ProxyProvider] = {
 }
 
 
+# 本进程创建的代理池，爬取结束时由 close_ip_pools() 停止它们的后台任务
+_ip_pools: List[ProxyIpPool] = []
+
+
 async def create_ip_pool(ip_pool_count: int, enable_validate_ip: bool) -> ProxyIpPool:
     """
      创建 IP 代理池
@@ -167,9 +573,24 @@ async def create_ip_pool(ip_pool_count: int, enable_validate_ip: bool) -> ProxyI
         enable_validate_ip=enable_validate_ip,
         ip_provider=IpProxyProvider.get(config.IP_PROXY_PROVIDER_NAME),
     )
+    _ip_pools.append(pool)
     await pool.load_proxies()
+    pool.start_prefetch()
     return pool
 
 
+async def close_ip_pools() -> None:
+    """
+    停止所有代理池的后台预取 / 补充任务，需要在创建代理池的事件循环结束前调用
+    """
+    pools = list(_ip_pools)
+    _ip_pools.clear()
+    for pool in pools:
+        try:
+            await pool.close()
+        except Exception as e:
+            utils.logger.warning(f"[close_ip_pools] close proxy pool error: {e}")
+
+
 if __name__ == "__main__":
     pass
@@ -23,14 +23,45 @@
 # @Time    : 2025/11/25
 # @Desc    : 代理自动刷新 Mixin 类，供各平台 client 使用
 
-from typing import TYPE_CHECKING, Optional
+import contextvars
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Optional, Tuple, Type
 
+import config
+from proxy.proxy_ip_pool import get_proxy_url
 from tools import utils
 
 if TYPE_CHECKING:
     from proxy.proxy_ip_pool import ProxyIpPool
 
 
+# 当前协程的代理粘性 key，由爬虫通过 proxy_session() 声明
+_proxy_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("proxy_session", default=None)
+
+
+@contextmanager
+def proxy_session(sticky_key: str):
+    """
+    声明一组需要使用同一个出口 IP 的请求（多代理轮换模式下生效）
+    用法：
+        with proxy_session(f"comments:{note_id}"):
+            async for comments in client.iter_note_comments(...):
+                ...
+    """
+    token = _proxy_session.set(sticky_key)
+    try:
+        yield
+    finally:
+        _proxy_session.reset(token)
+
+
+def get_proxy_session() -> Optional[str]:
+    """
+    获取当前协程的代理粘性 key
+    """
+    return _proxy_session.get()
+
+
 class ProxyRefreshMixin:
     """
     代理自动刷新 Mixin 类
@@ -38,7 +69,7 @@ class ProxyRefreshMixin:
     使用方法：
     1. 让 client 类继承此 Mixin
     2. 在 client 的 __init__ 中调用 init_proxy_pool(proxy_ip_pool)
-    3. 在每次 request 方法调用前调用 await _refresh_proxy_if_expired()
+    3. 在每次 request 方法中通过 async with self.lease_proxy() as proxy 获取本次请求使用的代理
 
     要求：
     - client 类必须有 self.proxy 属性来存储当前代理URL
@@ -68,10 +99,26 @@ class ProxyRefreshMixin:
             )
             new_proxy = await self._proxy_ip_pool.get_or_refresh_proxy()
             # 更新 httpx 代理URL
-            if new_proxy.user and new_proxy.password:
-                self.proxy = f"http://{new_proxy.user}:{new_proxy.password}@{new_proxy.ip}:{new_proxy.port}"
-            else:
-                self.proxy = f"http://{new_proxy.ip}:{new_proxy.port}"
+            self.proxy = get_proxy_url(new_proxy)
             utils.logger.info(
                 f"[{self.__class__.__name__}._refresh_proxy_if_expired] New proxy: {new_proxy.ip}:{new_proxy.port}"
             )
+
+    @asynccontextmanager
+    async def lease_proxy(
+        self, block_errors: Tuple[Type[BaseException], ...] = ()
+    ) -> AsyncIterator[Optional[str]]:
+        """
+        获取本次请求使用的 httpx 代理URL
+        - 多代理轮换模式：从代理池租用一个代理，请求结束后归还，抛出 block_errors 时移除该代理
+        - 否则：代理过期时刷新，返回 self.proxy
+        Args:
+            block_errors: 表示 IP 被封的异常类型
+        """
+        if self._proxy_ip_pool is None or not config.ENABLE_PROXY_ROTATION:
+            await self._refresh_proxy_if_expired()
+            yield self.proxy
+            return
+
+        async with self._proxy_ip_pool.lease(get_proxy_session(), block_errors) as lease:
+            yield lease.proxy_url
@@ -36,6 +36,7 @@ class BiliStoreFactory:
         "csv": BiliCsvStoreImplement,
         "db": BiliDbStoreImplement,
         "json": BiliJsonStoreImplement,
+        "jsonl": BiliJsonlStoreImplement,
         "sqlite": BiliSqliteStoreImplement,
         "mongodb": BiliMongoStoreImplement,
         "excel": BiliExcelStoreImplement,
@@ -45,7 +46,7 @@ class BiliStoreFactory:
     def create_store() -> AbstractStore:
         store_class = BiliStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
-            raise ValueError("[BiliStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb or excel ...")
+            raise ValueError("[BiliStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or sqlite or mongodb or excel ...")
         return store_class()
 
 
@@ -76,7 +77,7 @@ async def update_bilibili_video(video_item: Dict):
         "video_cover_url": video_item_view.get("pic", ""),
         "source_keyword": source_keyword_var.get(),
     }
-    utils.logger.info(f"[store.bilibili.update_bilibili_video] bilibili video id:{video_id}, title:{save_content_item.get('title')}")
+    utils.log_payload("content", "[store.bilibili.update_bilibili_video] bilibili video id:%s, title:%s", save_content_item.get("title"), video_id)
     await BiliStoreFactory.create_store().store_content(content_item=save_content_item)
 
 
@@ -127,7 +128,7 @@ async def update_bilibili_video_comment(video_id: str, comment_item: Dict):
         "like_count": like_count,
         "last_modify_ts": utils.get_current_timestamp(),
     }
-    utils.logger.info(f"[store.bilibili.update_bilibili_video_comment] Bilibili video comment: {comment_id}, content: {save_comment_item.get('content')}")
+    utils.log_payload("comment", "[store.bilibili.update_bilibili_video_comment] Bilibili video comment: %s, content: %s", save_comment_item.get("content"), comment_id)
     await BiliStoreFactory.create_store().store_comment(comment_item=save_comment_item)
 
 
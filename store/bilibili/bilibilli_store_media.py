@@ -24,10 +24,9 @@
 import pathlib
 from typing import Dict
 
-import aiofiles
-
 from base.base_crawler import AbstractStoreImage, AbstractStoreVideo
 from tools import utils
+from tools.media_downloader import MediaContent, save_media_content
 
 
 class BilibiliVideo(AbstractStoreVideo):
@@ -58,13 +57,13 @@ class BilibiliVideo(AbstractStoreVideo):
         """
         return f"{self.video_store_path}/{aid}/{extension_file_name}"
 
-    async def save_video(self, aid: int, video_content: str, extension_file_name="mp4"):
+    async def save_video(self, aid: int, video_content: MediaContent, extension_file_name="mp4"):
         """
         save video to local
 
         Args:
             aid: aid
-            video_content: video content
+            video_content: video content, downloaded file path / byte stream / bytes
             extension_file_name: video filename with extension
 
         Returns:
@@ -72,6 +71,5 @@ class BilibiliVideo(AbstractStoreVideo):
         """
         pathlib.Path(self.video_store_path + "/" + str(aid)).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(str(aid), extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(video_content)
-            utils.logger.info(f"[BilibiliVideoImplement.save_video] save save_video {save_file_name} success ...")
+        await save_media_content(video_content, save_file_name)
+        utils.logger.info(f"[BilibiliVideoImplement.save_video] save save_video {save_file_name} success ...")
@@ -35,6 +35,7 @@ class DouyinStoreFactory:
         "csv": DouyinCsvStoreImplement,
         "db": DouyinDbStoreImplement,
         "json": DouyinJsonStoreImplement,
+        "jsonl": DouyinJsonlStoreImplement,
         "sqlite": DouyinSqliteStoreImplement,
         "mongodb": DouyinMongoStoreImplement,
         "excel": DouyinExcelStoreImplement,
@@ -44,7 +45,7 @@ class DouyinStoreFactory:
     def create_store() -> AbstractStore:
         store_class = DouyinStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
-            raise ValueError("[DouyinStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb or excel ...")
+            raise ValueError("[DouyinStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or sqlite or mongodb or excel ...")
         return store_class()
 
 
@@ -182,7 +183,7 @@ async def update_douyin_aweme(aweme_item: Dict):
         "note_download_url": ",".join(_extract_note_image_list(aweme_item)),
         "source_keyword": source_keyword_var.get(),
     }
-    utils.logger.info(f"[store.douyin.update_douyin_aweme] douyin aweme id:{aweme_id}, title:{save_content_item.get('title')}")
+    utils.log_payload("content", "[store.douyin.update_douyin_aweme] douyin aweme id:%s, title:%s", save_content_item.get("title"), aweme_id)
     await DouyinStoreFactory.create_store().store_content(content_item=save_content_item)
 
 
@@ -221,7 +222,7 @@ async def update_dy_aweme_comment(aweme_id: str, comment_item: Dict):
         "parent_comment_id": parent_comment_id,
         "pictures": ",".join(_extract_comment_image_list(comment_item)),
     }
-    utils.logger.info(f"[store.douyin.update_dy_aweme_comment] douyin aweme comment: {comment_id}, content: {save_comment_item.get('content')}")
+    utils.log_payload("comment", "[store.douyin.update_dy_aweme_comment] douyin aweme comment: %s, content: %s", save_comment_item.get("content"), comment_id)
 
     await DouyinStoreFactory.create_store().store_comment(comment_item=save_comment_item)
 
@@ -243,7 +244,7 @@ async def save_creator(user_id: str, creator: Dict):
         "videos_count": user_info.get("aweme_count", 0),
         "last_modify_ts": utils.get_current_timestamp(),
     }
-    utils.logger.info(f"[store.douyin.save_creator] creator:{local_db_item}")
+    utils.log_payload("creator", "[store.douyin.save_creator] creator:%s", local_db_item)
     await DouyinStoreFactory.create_store().store_creator(local_db_item)
 
 
@@ -20,10 +20,9 @@
 import pathlib
 from typing import Dict
 
-import aiofiles
-
 from base.base_crawler import AbstractStoreImage, AbstractStoreVideo
 from tools import utils
+from tools.media_downloader import MediaContent, save_media_content
 
 
 class DouYinImage(AbstractStoreImage):
@@ -54,13 +53,13 @@ class DouYinImage(AbstractStoreImage):
         """
         return f"{self.image_store_path}/{aweme_id}/{extension_file_name}"
 
-    async def save_image(self, aweme_id: str, pic_content: str, extension_file_name):
+    async def save_image(self, aweme_id: str, pic_content: MediaContent, extension_file_name):
         """
         save image to local
 
         Args:
             aweme_id: aweme id
-            pic_content: image content
+            pic_content: image content, downloaded file path / byte stream / bytes
             extension_file_name: image filename with extension
 
         Returns:
@@ -68,9 +67,8 @@ class DouYinImage(AbstractStoreImage):
         """
         pathlib.Path(self.image_store_path + "/" + aweme_id).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(aweme_id, extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(pic_content)
-            utils.logger.info(f"[DouYinImageStoreImplement.save_image] save image {save_file_name} success ...")
+        await save_media_content(pic_content, save_file_name)
+        utils.logger.info(f"[DouYinImageStoreImplement.save_image] save image {save_file_name} success ...")
 
 
 class DouYinVideo(AbstractStoreVideo):
@@ -101,13 +99,13 @@ class DouYinVideo(AbstractStoreVideo):
         """
         return f"{self.video_store_path}/{aweme_id}/{extension_file_name}"
 
-    async def save_video(self, aweme_id: str, video_content: str, extension_file_name):
+    async def save_video(self, aweme_id: str, video_content: MediaContent, extension_file_name):
         """
         save video to local
 
         Args:
             aweme_id: aweme id
-            video_content: video content
+            video_content: video content, downloaded file path / byte stream / bytes
             extension_file_name: video filename with extension
 
         Returns:
@@ -115,6 +113,5 @@ class DouYinVideo(AbstractStoreVideo):
         """
         pathlib.Path(self.video_store_path + "/" + aweme_id).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(aweme_id, extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(video_content)
-            utils.logger.info(f"[DouYinVideoStoreImplement.save_video] save video {save_file_name} success ...")
+        await save_media_content(video_content, save_file_name)
+        utils.logger.info(f"[DouYinVideoStoreImplement.save_video] save video {save_file_name} success ...")
@@ -29,23 +29,138 @@
 """
 Excel Store Base Implementation
 Provides Excel export functionality for crawled data with formatted sheets
+
+Workbooks are opened in openpyxl write-only mode: rows are streamed to temporary
+files as they are stored, so memory use does not grow with the number of rows.
 """
 
 import threading
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from pathlib import Path
 
 try:
     import openpyxl
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
     from openpyxl.utils import get_column_letter
     EXCEL_AVAILABLE = True
 except ImportError:
     EXCEL_AVAILABLE = False
 
+import config
 from base.base_crawler import AbstractStore
 from tools import utils
+from tools.shard_runner import get_shard_file_suffix
+
+
+HEADER_STYLE_NAME = "mediacrawler_header"
+CELL_STYLE_NAME = "mediacrawler_cell"
+
+
+def _register_named_styles(workbook):
+    """
+    Register the header and data cell styles on a workbook, once per workbook
+
+    Cells reference a named style by index instead of carrying their own
+    Font / Alignment / Border objects
+
+    Args:
+        workbook: Workbook object
+    """
+    border_side = Side(style='thin')
+    border = Border(left=border_side, right=border_side, top=border_side, bottom=border_side)
+    workbook.add_named_style(NamedStyle(
+        name=HEADER_STYLE_NAME,
+        font=Font(bold=True, color="FFFFFF", size=11),
+        fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+        alignment=Alignment(horizontal="center", vertical="center", wrap_text=True),
+        border=border,
+    ))
+    workbook.add_named_style(NamedStyle(
+        name=CELL_STYLE_NAME,
+        alignment=Alignment(vertical="top", wrap_text=True),
+        border=border,
+    ))
+
+
+class _StreamingSheet:
+    """
+    Row writer for one write-only worksheet
+
+    Write-only sheets need their column widths before the first row is written,
+    so the first `sample_rows` rows are kept in memory to estimate the widths;
+    later rows go straight to the sheet's temporary file.
+    """
+
+    def __init__(self, workbook, title: str, sample_rows: int):
+        self.worksheet = workbook.create_sheet(title)
+        self.max_row = 0
+        self._sample_rows = max(1, sample_rows)
+        self._headers: List[str] = []
+        self._pending: List[List[Any]] = []
+        self._cells: List[Any] = []
+        self._started = False
+
+    def write_headers(self, headers: List[str]):
+        self._headers = list(headers)
+        self.max_row = 1
+
+    def append(self, values: List[Any]):
+        self.max_row += 1
+        if self._started:
+            self._write(values)
+            return
+        self._pending.append(values)
+        if len(self._pending) >= self._sample_rows:
+            self._start()
+
+    def close(self):
+        """
+        Write the rows still held for width estimation
+        """
+        if not self._started:
+            self._start()
+
+    def _start(self):
+        for col_num, width in enumerate(self._estimate_widths(), 1):
+            self.worksheet.column_dimensions[get_column_letter(col_num)].width = width
+
+        header_cells = []
+        for header in self._headers:
+            cell = WriteOnlyCell(self.worksheet, value=header)
+            cell.style = HEADER_STYLE_NAME
+            header_cells.append(cell)
+        self.worksheet.append(header_cells)
+
+        self._started = True
+        for values in self._pending:
+            self._write(values)
+        self._pending = []
+
+    def _write(self, values: List[Any]):
+        # One styled cell per column is reused for every row, the row is serialized on append
+        while len(self._cells) < len(values):
+            cell = WriteOnlyCell(self.worksheet)
+            cell.style = CELL_STYLE_NAME
+            self._cells.append(cell)
+        for cell, value in zip(self._cells, values):
+            cell.value = value
+        self.worksheet.append(self._cells[:len(values)])
+
+    def _estimate_widths(self) -> List[int]:
+        """
+        Column widths from the header and the sampled rows, clamped to [10, 50]
+        """
+        widths = [len(str(header)) for header in self._headers]
+        for values in self._pending:
+            for col_num, value in enumerate(values):
+                length = len(str(value)) if value else 0
+                if col_num < len(widths):
+                    widths[col_num] = max(widths[col_num], length)
+                else:
+                    widths.append(length)
+        return [min(max(width + 2, 10), 50) for width in widths]
 
 
 class ExcelStoreBase(AbstractStore):
@@ -53,6 +168,7 @@ class ExcelStoreBase(AbstractStore):
     Base class for Excel storage implementation
     Provides formatted Excel export with multiple sheets for contents, comments, and creators
     Uses singleton pattern to maintain state across multiple store calls
+    Rows are streamed to disk, the workbook is written once by flush()
     """
 
     # Class-level singleton management
@@ -114,14 +230,15 @@ class ExcelStoreBase(AbstractStore):
         self.data_dir = Path("data") / platform
         self.data_dir.mkdir(parents=True, exist_ok=True)
 
-        # Initialize workbook
-        self.workbook = openpyxl.Workbook()
-        self.workbook.remove(self.workbook.active)  # Remove default sheet
+        # Initialize write-only workbook with shared named styles
+        self.workbook = openpyxl.Workbook(write_only=True)
+        _register_named_styles(self.workbook)
+        self.width_sample_rows = config.EXCEL_WIDTH_SAMPLE_ROWS
 
         # Create sheets
-        self.contents_sheet = self.workbook.create_sheet("Contents")
-        self.comments_sheet = self.workbook.create_sheet("Comments")
-        self.creators_sheet = self.workbook.create_sheet("Creators")
+        self.contents_sheet = self._create_sheet("Contents")
+        self.comments_sheet = self._create_sheet("Comments")
+        self.creators_sheet = self._create_sheet("Creators")
 
         # Track if headers are written
         self.contents_headers_written = False
@@ -131,86 +248,45 @@ class ExcelStoreBase(AbstractStore):
         self.dynamics_headers_written = False
 
         # Optional sheets for platforms that need them (e.g., Bilibili)
-        self.contacts_sheet = None
-        self.dynamics_sheet = None
+        self.contacts_sheet: Optional[_StreamingSheet] = None
+        self.dynamics_sheet: Optional[_StreamingSheet] = None
 
         # Generate filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.filename = self.data_dir / f"{platform}_{crawler_type}_{timestamp}.xlsx"
+        self.filename = self.data_dir / f"{platform}_{crawler_type}_{timestamp}{get_shard_file_suffix()}.xlsx"
 
         utils.logger.info(f"[ExcelStoreBase] Initialized Excel export to: {self.filename}")
 
-    def _apply_header_style(self, sheet, row_num: int = 1):
-        """
-        Apply formatting to header row
-
-        Args:
-            sheet: Worksheet object
-            row_num: Row number for headers (default: 1)
-        """
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-
-        for cell in sheet[row_num]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-            cell.border = border
-
-    def _auto_adjust_column_width(self, sheet):
+    def _create_sheet(self, title: str) -> "_StreamingSheet":
         """
-        Auto-adjust column widths based on content
+        Create a streaming worksheet
 
         Args:
-            sheet: Worksheet object
+            title: Sheet title
         """
-        for column in sheet.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
+        return _StreamingSheet(self.workbook, title, self.width_sample_rows)
 
-            for cell in column:
-                try:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-                except (TypeError, AttributeError):
-                    pass
-
-            # Set width with min/max constraints
-            adjusted_width = min(max(max_length + 2, 10), 50)
-            sheet.column_dimensions[column_letter].width = adjusted_width
-
-    def _write_headers(self, sheet, headers: List[str]):
+    def _write_headers(self, sheet: "_StreamingSheet", headers: List[str]):
         """
         Write headers to sheet
 
         Args:
-            sheet: Worksheet object
+            sheet: Streaming worksheet
             headers: List of header names
         """
-        for col_num, header in enumerate(headers, 1):
-            sheet.cell(row=1, column=col_num, value=header)
-
-        self._apply_header_style(sheet)
+        sheet.write_headers(headers)
 
-    def _write_row(self, sheet, data: Dict[str, Any], headers: List[str]):
+    def _write_row(self, sheet: "_StreamingSheet", data: Dict[str, Any], headers: List[str]):
         """
         Write data row to sheet
 
         Args:
-            sheet: Worksheet object
+            sheet: Streaming worksheet
             data: Data dictionary
             headers: List of header names (defines column order)
         """
-        row_num = sheet.max_row + 1
-
-        for col_num, header in enumerate(headers, 1):
+        values = []
+        for header in headers:
             value = data.get(header, "")
 
             # Handle different data types
@@ -218,17 +294,9 @@ class ExcelStoreBase(AbstractStore):
                 value = str(value)
             elif value is None:
                 value = ""
+            values.append(value)
 
-            cell = sheet.cell(row=row_num, column=col_num, value=value)
-
-            # Apply basic formatting
-            cell.alignment = Alignment(vertical="top", wrap_text=True)
-            cell.border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
+        sheet.append(values)
 
     async def store_content(self, content_item: Dict):
         """
@@ -301,7 +369,7 @@ class ExcelStoreBase(AbstractStore):
         """
         # Create contacts sheet if not exists
         if self.contacts_sheet is None:
-            self.contacts_sheet = self.workbook.create_sheet("Contacts")
+            self.contacts_sheet = self._create_sheet("Contacts")
 
         # Define headers
         headers = list(contact_item.keys())
@@ -325,7 +393,7 @@ class ExcelStoreBase(AbstractStore):
         """
         # Create dynamics sheet if not exists
         if self.dynamics_sheet is None:
-            self.dynamics_sheet = self.workbook.create_sheet("Dynamics")
+            self.dynamics_sheet = self._create_sheet("Dynamics")
 
         # Define headers
         headers = list(dynamic_item.keys())
@@ -345,26 +413,15 @@ class ExcelStoreBase(AbstractStore):
         Save workbook to file
         """
         try:
-            # Auto-adjust column widths for all sheets
-            self._auto_adjust_column_width(self.contents_sheet)
-            self._auto_adjust_column_width(self.comments_sheet)
-            self._auto_adjust_column_width(self.creators_sheet)
-            if self.contacts_sheet is not None:
-                self._auto_adjust_column_width(self.contacts_sheet)
-            if self.dynamics_sheet is not None:
-                self._auto_adjust_column_width(self.dynamics_sheet)
-
-            # Remove empty sheets (only header row)
-            if self.contents_sheet.max_row == 1:
-                self.workbook.remove(self.contents_sheet)
-            if self.comments_sheet.max_row == 1:
-                self.workbook.remove(self.comments_sheet)
-            if self.creators_sheet.max_row == 1:
-                self.workbook.remove(self.creators_sheet)
-            if self.contacts_sheet is not None and self.contacts_sheet.max_row == 1:
-                self.workbook.remove(self.contacts_sheet)
-            if self.dynamics_sheet is not None and self.dynamics_sheet.max_row == 1:
-                self.workbook.remove(self.dynamics_sheet)
+            sheets = [self.contents_sheet, self.comments_sheet, self.creators_sheet, self.contacts_sheet, self.dynamics_sheet]
+            for sheet in sheets:
+                if sheet is None:
+                    continue
+                # Remove empty sheets (only header row), write the rows kept for width estimation
+                if sheet.max_row <= 1:
+                    self.workbook.remove(sheet.worksheet)
+                else:
+                    sheet.close()
 
             # Check if there are any sheets left
             if len(self.workbook.sheetnames) == 0:
@@ -35,6 +35,7 @@ class KuaishouStoreFactory:
         "csv": KuaishouCsvStoreImplement,
         "db": KuaishouDbStoreImplement,
         "json": KuaishouJsonStoreImplement,
+        "jsonl": KuaishouJsonlStoreImplement,
         "sqlite": KuaishouSqliteStoreImplement,
         "mongodb": KuaishouMongoStoreImplement,
         "excel": KuaishouExcelStoreImplement,
@@ -45,7 +46,7 @@ class KuaishouStoreFactory:
         store_class = KuaishouStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
             raise ValueError(
-                "[KuaishouStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb or excel ...")
+                "[KuaishouStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or sqlite or mongodb or excel ...")
         return store_class()
 
 
@@ -72,13 +73,13 @@ async def update_kuaishou_video(video_item: Dict):
         "video_play_url": photo_info.get("photoUrl", ""),
         "source_keyword": source_keyword_var.get(),
     }
-    utils.logger.info(
-        f"[store.kuaishou.update_kuaishou_video] Kuaishou video id:{video_id}, title:{save_content_item.get('title')}")
+    utils.log_payload(
+        "content", "[store.kuaishou.update_kuaishou_video] Kuaishou video id:%s, title:%s", save_content_item.get("title"), video_id)
     await KuaishouStoreFactory.create_store().store_content(content_item=save_content_item)
 
 
 async def batch_update_ks_video_comments(video_id: str, comments: List[Dict]):
-    utils.logger.info(f"[store.kuaishou.batch_update_ks_video_comments] video_id:{video_id}, comments:{comments}")
+    utils.log_payload("comment", "[store.kuaishou.batch_update_ks_video_comments] video_id:%s, comments:%s", comments, video_id)
     if not comments:
         return
     for comment_item in comments:
@@ -98,8 +99,8 @@ async def update_ks_video_comment(video_id: str, comment_item: Dict):
         "sub_comment_count": str(comment_item.get("subCommentCount", 0)),
         "last_modify_ts": utils.get_current_timestamp(),
     }
-    utils.logger.info(
-        f"[store.kuaishou.update_ks_video_comment] Kuaishou video comment: {comment_id}, content: {save_comment_item.get('content')}")
+    utils.log_payload(
+        "comment", "[store.kuaishou.update_ks_video_comment] Kuaishou video comment: %s, content: %s", save_comment_item.get("content"), comment_id)
     await KuaishouStoreFactory.create_store().store_comment(comment_item=save_comment_item)
 
 async def save_creator(user_id: str, creator: Dict):
@@ -118,5 +119,5 @@ async def save_creator(user_id: str, creator: Dict):
         'interaction': ownerCount.get("photo_public"),
         "last_modify_ts": utils.get_current_timestamp(),
     }
-    utils.logger.info(f"[store.kuaishou.save_creator] creator:{local_db_item}")
+    utils.log_payload("creator", "[store.kuaishou.save_creator] creator:%s", local_db_item)
     await KuaishouStoreFactory.create_store().store_creator(local_db_item)
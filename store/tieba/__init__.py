@@ -32,6 +32,7 @@ class TieBaStoreFactory:
         "csv": TieBaCsvStoreImplement,
         "db": TieBaDbStoreImplement,
         "json": TieBaJsonStoreImplement,
+        "jsonl": TieBaJsonlStoreImplement,
         "sqlite": TieBaSqliteStoreImplement,
         "mongodb": TieBaMongoStoreImplement,
         "excel": TieBaExcelStoreImplement,
@@ -42,7 +43,7 @@ class TieBaStoreFactory:
         store_class = TieBaStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
             raise ValueError(
-                "[TieBaStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb or excel ...")
+                "[TieBaStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or sqlite or mongodb or excel ...")
         return store_class()
 
 
@@ -73,7 +74,7 @@ async def update_tieba_note(note_item: TiebaNote):
     note_item.source_keyword = source_keyword_var.get()
     save_note_item = note_item.model_dump()
     save_note_item.update({"last_modify_ts": utils.get_current_timestamp()})
-    utils.logger.info(f"[store.tieba.update_tieba_note] tieba note: {save_note_item}")
+    utils.log_payload("content", "[store.tieba.update_tieba_note] tieba note: %s", save_note_item)
 
     await TieBaStoreFactory.create_store().store_content(save_note_item)
 
@@ -106,7 +107,7 @@ async def update_tieba_note_comment(note_id: str, comment_item: TiebaComment):
     """
     save_comment_item = comment_item.model_dump()
     save_comment_item.update({"last_modify_ts": utils.get_current_timestamp()})
-    utils.logger.info(f"[store.tieba.update_tieba_note_comment] tieba note id: {note_id} comment:{save_comment_item}")
+    utils.log_payload("comment", "[store.tieba.update_tieba_note_comment] tieba note id: %s comment:%s", save_comment_item, note_id)
     await TieBaStoreFactory.create_store().store_comment(save_comment_item)
 
 
@@ -121,5 +122,5 @@ async def save_creator(user_info: TiebaCreator):
     """
     local_db_item = user_info.model_dump()
     local_db_item["last_modify_ts"] = utils.get_current_timestamp()
-    utils.logger.info(f"[store.tieba.save_creator] creator:{local_db_item}")
+    utils.log_payload("creator", "[store.tieba.save_creator] creator:%s", local_db_item)
     await TieBaStoreFactory.create_store().store_creator(local_db_item)
@@ -36,6 +36,7 @@ class WeibostoreFactory:
         "csv": WeiboCsvStoreImplement,
         "db": WeiboDbStoreImplement,
         "json": WeiboJsonStoreImplement,
+        "jsonl": WeiboJsonlStoreImplement,
         "sqlite": WeiboSqliteStoreImplement,
         "mongodb": WeiboMongoStoreImplement,
         "excel": WeiboExcelStoreImplement,
@@ -45,7 +46,7 @@ class WeibostoreFactory:
     def create_store() -> AbstractStore:
         store_class = WeibostoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
-            raise ValueError("[WeibotoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb or excel ...")
+            raise ValueError("[WeibotoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or sqlite or mongodb or excel ...")
         return store_class()
 
 
@@ -102,7 +103,7 @@ async def update_weibo_note(note_item: Dict):
         "avatar": user_info.get("profile_image_url", ""),
         "source_keyword": source_keyword_var.get(),
     }
-    utils.logger.info(f"[store.weibo.update_weibo_note] weibo note id:{note_id}, title:{save_content_item.get('content')[:24]} ...")
+    utils.log_payload("content", "[store.weibo.update_weibo_note] weibo note id:%s, title:%s ...", save_content_item.get("content")[:24], note_id)
     await WeibostoreFactory.create_store().store_content(content_item=save_content_item)
 
 
@@ -157,7 +158,7 @@ async def update_weibo_note_comment(note_id: str, comment_item: Dict):
         "profile_url": user_info.get("profile_url", ""),
         "avatar": user_info.get("profile_image_url", ""),
     }
-    utils.logger.info(f"[store.weibo.update_weibo_note_comment] Weibo note comment: {comment_id}, content: {save_comment_item.get('content', '')[:24]} ...")
+    utils.log_payload("comment", "[store.weibo.update_weibo_note_comment] Weibo note comment: %s, content: %s ...", save_comment_item.get("content", "")[:24], comment_id)
     await WeibostoreFactory.create_store().store_comment(comment_item=save_comment_item)
 
 
@@ -197,5 +198,5 @@ async def save_creator(user_id: str, user_info: Dict):
         'tag_list': '',
         "last_modify_ts": utils.get_current_timestamp(),
     }
-    utils.logger.info(f"[store.weibo.save_creator] creator:{local_db_item}")
+    utils.log_payload("creator", "[store.weibo.save_creator] creator:%s", local_db_item)
     await WeibostoreFactory.create_store().store_creator(local_db_item)
@@ -35,6 +35,7 @@ class XhsStoreFactory:
         "csv": XhsCsvStoreImplement,
         "db": XhsDbStoreImplement,
         "json": XhsJsonStoreImplement,
+        "jsonl": XhsJsonlStoreImplement,
         "sqlite": XhsSqliteStoreImplement,
         "mongodb": XhsMongoStoreImplement,
         "excel": XhsExcelStoreImplement,
@@ -44,7 +45,7 @@ class XhsStoreFactory:
     def create_store() -> AbstractStore:
         store_class = XhsStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
-            raise ValueError("[XhsStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb or excel ...")
+            raise ValueError("[XhsStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or sqlite or mongodb or excel ...")
         return store_class()
 
 
@@ -119,7 +120,7 @@ async def update_xhs_note(note_item: Dict):
         "source_keyword": source_keyword_var.get(),  # 搜索关键词
         "xsec_token": note_item.get("xsec_token"),  # xsec_token
     }
-    utils.logger.info(f"[store.xhs.update_xhs_note] xhs note: {local_db_item}")
+    utils.log_payload("content", "[store.xhs.update_xhs_note] xhs note: %s", local_db_item)
     await XhsStoreFactory.create_store().store_content(local_db_item)
 
 
@@ -168,7 +169,7 @@ async def update_xhs_note_comment(note_id: str, comment_item: Dict):
         "last_modify_ts": utils.get_current_timestamp(),  # 最后更新时间戳（MediaCrawler程序生成的，主要用途在db存储的时候记录一条记录最新更新时间）
         "like_count": comment_item.get("like_count", 0),
     }
-    utils.logger.info(f"[store.xhs.update_xhs_note_comment] xhs note comment:{local_db_item}")
+    utils.log_payload("comment", "[store.xhs.update_xhs_note_comment] xhs note comment:%s", local_db_item)
     await XhsStoreFactory.create_store().store_comment(local_db_item)
 
 
@@ -217,7 +218,7 @@ async def save_creator(user_id: str, creator: Dict):
                                 for tag in creator.get('tags')}, ensure_ascii=False),  # 标签
         "last_modify_ts": utils.get_current_timestamp(),  # 最后更新时间戳（MediaCrawler程序生成的，主要用途在db存储的时候记录一条记录最新更新时间）
     }
-    utils.logger.info(f"[store.xhs.save_creator] creator:{local_db_item}")
+    utils.log_payload("creator", "[store.xhs.save_creator] creator:%s", local_db_item)
     await XhsStoreFactory.create_store().store_creator(local_db_item)
 
 
@@ -24,10 +24,9 @@
 import pathlib
 from typing import Dict
 
-import aiofiles
-
 from base.base_crawler import AbstractStoreImage, AbstractStoreVideo
 from tools import utils
+from tools.media_downloader import MediaContent, save_media_content
 
 
 class XiaoHongShuImage(AbstractStoreImage):
@@ -58,13 +57,13 @@ class XiaoHongShuImage(AbstractStoreImage):
         """
         return f"{self.image_store_path}/{notice_id}/{extension_file_name}"
 
-    async def save_image(self, notice_id: str, pic_content: str, extension_file_name):
+    async def save_image(self, notice_id: str, pic_content: MediaContent, extension_file_name):
         """
         save image to local
 
         Args:
             notice_id: notice id
-            pic_content: image content
+            pic_content: image content, downloaded file path / byte stream / bytes
             extension_file_name: image filename with extension
 
         Returns:
@@ -72,9 +71,8 @@ class XiaoHongShuImage(AbstractStoreImage):
         """
         pathlib.Path(self.image_store_path + "/" + notice_id).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(notice_id, extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(pic_content)
-            utils.logger.info(f"[XiaoHongShuImageStoreImplement.save_image] save image {save_file_name} success ...")
+        await save_media_content(pic_content, save_file_name)
+        utils.logger.info(f"[XiaoHongShuImageStoreImplement.save_image] save image {save_file_name} success ...")
 
 
 class XiaoHongShuVideo(AbstractStoreVideo):
@@ -105,13 +103,13 @@ class XiaoHongShuVideo(AbstractStoreVideo):
         """
         return f"{self.video_store_path}/{notice_id}/{extension_file_name}"
 
-    async def save_video(self, notice_id: str, video_content: str, extension_file_name):
+    async def save_video(self, notice_id: str, video_content: MediaContent, extension_file_name):
         """
         save video to local
 
         Args:
             notice_id: notice id
-            video_content: video content
+            video_content: video content, downloaded file path / byte stream / bytes
             extension_file_name: video filename with extension
 
         Returns:
@@ -119,6 +117,5 @@ class XiaoHongShuVideo(AbstractStoreVideo):
         """
         pathlib.Path(self.video_store_path + "/" + notice_id).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(notice_id, extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(video_content)
-            utils.logger.info(f"[XiaoHongShuVideoStoreImplement.save_video] save video {save_file_name} success ...")
+        await save_media_content(video_content, save_file_name)
+        utils.logger.info(f"[XiaoHongShuVideoStoreImplement.save_video] save video {save_file_name} success ...")
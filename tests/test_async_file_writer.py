@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_async_file_writer.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for AsyncFileWriter file sinks
+"""
+
+import csv
+import json
+
+import pytest
+
+from tools.async_file_writer import AsyncFileWriter, BufferedFileSink, CsvFileSink, JsonlFileSink, convert_jsonl_to_json
+
+
+class TestJsonlFileSink:
+    """Test cases for buffered JSONL writing"""
+
+    @pytest.fixture(autouse=True)
+    def clear_sink_state(self):
+        """Clear shared sink state before and after each test"""
+        JsonlFileSink._instances.clear()
+        yield
+        JsonlFileSink._instances.clear()
+
+    @pytest.fixture
+    def writer(self, tmp_path, monkeypatch):
+        """Create an AsyncFileWriter writing under a temp directory"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr('config.JSONL_FLUSH_BATCH_SIZE', 3)
+        monkeypatch.setattr('config.JSONL_FLUSH_INTERVAL_SEC', 3600)
+        return AsyncFileWriter(platform="xhs", crawler_type="search")
+
+    @pytest.mark.asyncio
+    async def test_buffer_flushes_on_batch_size(self, writer):
+        """Items stay buffered until the batch size is reached"""
+        file_path = writer._get_file_path('jsonl', 'comments')
+        await writer.write_to_jsonl({"id": 1}, "comments")
+        await writer.write_to_jsonl({"id": 2}, "comments")
+        sink = JsonlFileSink.get_instance(file_path)
+        assert len(sink._buffer) == 2
+
+        await writer.write_to_jsonl({"id": 3}, "comments")
+        with open(file_path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+        await JsonlFileSink.close_all()
+
+    @pytest.mark.asyncio
+    async def test_close_all_flushes_remaining(self, writer):
+        """Shutdown flush writes items still in the buffer"""
+        await writer.write_to_jsonl({"id": "a", "content": "测试"}, "contents")
+        await JsonlFileSink.close_all()
+
+        file_path = writer._get_file_path('jsonl', 'contents')
+        with open(file_path, encoding='utf-8') as f:
+            assert json.loads(f.readline()) == {"id": "a", "content": "测试"}
+        assert JsonlFileSink.get_file_paths() == [file_path]
+
+    @pytest.mark.asyncio
+    async def test_convert_matches_legacy_json_format(self, writer):
+        """Converted file is byte-identical to the legacy JSON array output"""
+        items = [{"id": 1, "tags": ["a", "b"]}, {"id": 2, "nested": {"k": "值"}}]
+        for item in items:
+            await writer.write_to_jsonl(item, "comments")
+        await JsonlFileSink.close_all()
+
+        jsonl_path = writer._get_file_path('jsonl', 'comments')
+        json_path = await convert_jsonl_to_json(jsonl_path)
+        assert json_path == writer._get_file_path('json', 'comments')
+        with open(json_path, encoding='utf-8') as f:
+            assert f.read() == json.dumps(items, ensure_ascii=False, indent=4)
+
+
+class TestCsvFileSink:
+    """Test cases for buffered CSV writing"""
+
+    @pytest.fixture(autouse=True)
+    def clear_sink_state(self):
+        """Clear shared sink state before and after each test"""
+        CsvFileSink._instances.clear()
+        yield
+        CsvFileSink._instances.clear()
+
+    @pytest.fixture
+    def writer(self, tmp_path, monkeypatch):
+        """Create an AsyncFileWriter writing under a temp directory"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr('config.CSV_FLUSH_BATCH_SIZE', 3)
+        monkeypatch.setattr('config.CSV_FLUSH_INTERVAL_SEC', 3600)
+        return AsyncFileWriter(platform="xhs", crawler_type="search")
+
+    @staticmethod
+    def _read_rows(file_path):
+        with open(file_path, newline='', encoding='utf-8-sig') as f:
+            return list(csv.reader(f))
+
+    @pytest.mark.asyncio
+    async def test_rows_batched_through_one_handle(self, writer):
+        """Rows stay buffered until the batch size, then go through a handle kept open"""
+        file_path = writer._get_file_path('csv', 'contents')
+        await writer.write_to_csv({"id": 1, "title": "a"}, "contents")
+        await writer.write_to_csv({"id": 2, "title": "b"}, "contents")
+        sink = CsvFileSink.get_instance(file_path)
+        assert sink.buffered_count == 2
+        assert sink._file is None
+
+        await writer.write_to_csv({"id": 3, "title": "c"}, "contents")
+        handle = sink._file
+        assert handle is not None
+        assert self._read_rows(file_path) == [["id", "title"], ["1", "a"], ["2", "b"], ["3", "c"]]
+
+        for i in range(4, 7):
+            await writer.write_to_csv({"id": i, "title": "d"}, "contents")
+        assert sink._file is handle
+        await CsvFileSink.close_all()
+        assert sink._file is None
+        assert len(self._read_rows(file_path)) == 7
+
+    @pytest.mark.asyncio
+    async def test_schema_fixed_on_first_write(self, writer):
+        """Later items with other keys keep the columns aligned"""
+        await writer.write_to_csv({"id": 1, "title": "a", "likes": 5}, "comments")
+        await writer.write_to_csv({"likes": 6, "id": 2, "extra": "dropped"}, "comments")
+        await CsvFileSink.close_all()
+
+        file_path = writer._get_file_path('csv', 'comments')
+        assert self._read_rows(file_path) == [["id", "title", "likes"], ["1", "a", "5"], ["2", "", "6"]]
+
+    @pytest.mark.asyncio
+    async def test_existing_file_header_is_reused(self, writer):
+        """Appending to a file from an earlier run keeps its header and writes no second BOM"""
+        await writer.write_to_csv({"id": 1, "content": "测试"}, "creators")
+        await CsvFileSink.close_all()
+        CsvFileSink._instances.clear()
+
+        await writer.write_to_csv({"content": "第二次", "id": 2}, "creators")
+        await CsvFileSink.close_all()
+
+        file_path = writer._get_file_path('csv', 'creators')
+        assert self._read_rows(file_path) == [["id", "content"], ["1", "测试"], ["2", "第二次"]]
+        with open(file_path, 'rb') as f:
+            assert f.read().count(b"\xef\xbb\xbf") == 1
+
+    def test_sink_missing_hooks_fails_on_instantiation(self, tmp_path):
+        """A sink subclass that forgets a hook is rejected when created, not on its first flush"""
+
+        class _IncompleteSink(BufferedFileSink):
+            _instances = {}
+
+            def _append(self, item):
+                pass
+
+        with pytest.raises(TypeError, match="_write_buffer"):
+            _IncompleteSink.get_instance(str(tmp_path / "x.txt"))
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_async_redis_cache.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+"""
+Unit tests for the async Redis cache and its value codec
+"""
+
+import fnmatch
+import pickle
+
+import pytest
+
+from cache.async_redis_cache import AsyncRedisCache
+from cache.cache_factory import CacheFactory
+from cache.codec import decode_value, encode_value
+from proxy.base_proxy import IpCache
+from proxy.types import IpInfoModel
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value, ex))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        for key, value, ex in self.commands:
+            self.redis.data[key] = value
+        return [True] * len(self.commands)
+
+
+class FakeAsyncRedis:
+    """In-memory stand-in for redis.asyncio.Redis that counts round trips"""
+
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+
+    async def get(self, key):
+        self.round_trips += 1
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.round_trips += 1
+        self.data[key] = value
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self.data.get(key) for key in keys]
+
+    async def scan_iter(self, match=None, count=None):
+        self.round_trips += 1
+        for key in list(self.data):
+            if fnmatch.fnmatch(key, match):
+                yield key.encode()
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def keys(self, pattern):
+        raise AssertionError("KEYS blocks redis, use SCAN")
+
+
+def test_codec_round_trip():
+    """Strings and bytes are stored verbatim, other values as compact JSON"""
+    assert encode_value("程序员") == b"s" + "程序员".encode()
+    assert encode_value({"a": [1, 2]}) == b'j{"a":[1,2]}'
+    for value in ("text", b"\x00raw", {"a": [1, 2.5, None, True]}, [1, "二"], 3, None):
+        assert decode_value(encode_value(value)) == value
+
+
+def test_codec_rejects_pickle():
+    """Legacy pickled values are never unpickled"""
+    with pytest.raises(ValueError):
+        decode_value(pickle.dumps({"a": 1}))
+
+
+@pytest.mark.asyncio
+async def test_async_redis_cache_batches_round_trips():
+    """mset is one pipeline, mget is one MGET, undecodable values read as misses"""
+    redis = FakeAsyncRedis()
+    cache = AsyncRedisCache(redis_client=redis)
+
+    await cache.mset({"a": "1", "b": [1, 2], "c": {"k": "v"}}, expire_time=60)
+    assert redis.round_trips == 1
+
+    redis.data["legacy"] = pickle.dumps("old")
+    assert await cache.mget(["a", "b", "c", "missing", "legacy"]) == ["1", [1, 2], {"k": "v"}, None, None]
+    assert redis.round_trips == 2
+
+    await cache.set("d", "x", expire_time=60)
+    assert await cache.get("d") == "x"
+    assert sorted(await cache.keys("*")) == ["a", "b", "c", "d", "legacy"]
+
+
+@pytest.mark.asyncio
+async def test_ip_cache_loads_with_scan_and_mget():
+    """IpCache reads all cached proxies with one SCAN and one MGET"""
+    assert isinstance(CacheFactory.create_cache("async_redis"), AsyncRedisCache)
+    redis = FakeAsyncRedis()
+    ip_cache = IpCache()
+    ip_cache.cache_client = AsyncRedisCache(redis_client=redis)
+    for port in (8000, 8001):
+        proxy = IpInfoModel(ip="127.0.0.1", port=port, user="u", password="p")
+        await ip_cache.set_ip(f"kuaidaili_127.0.0.1_{port}", proxy.model_dump_json(), ex=60)
+    await ip_cache.set_ip("wandouhttp_127.0.0.1_9000", "{}", ex=60)
+
+    redis.round_trips = 0
+    proxies = await ip_cache.load_all_ip("kuaidaili")
+    assert sorted(proxy.port for proxy in proxies) == [8000, 8001]
+    assert redis.round_trips == 2
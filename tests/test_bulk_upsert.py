@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_bulk_upsert.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the batched SQL upsert buffer (SQLite backend)
+"""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, text
+
+from database import bulk_upsert, db_session
+from database.db_session import create_tables, dispose_engines, get_async_engine, get_session
+from database.models import XhsNote, XhsNoteComment
+
+
+@pytest_asyncio.fixture
+async def sqlite_db(tmp_path, monkeypatch):
+    """Point the sqlite store at a temp database and reset shared buffers"""
+    monkeypatch.setattr('config.SAVE_DATA_OPTION', 'sqlite')
+    monkeypatch.setattr('config.DB_BULK_FLUSH_SIZE', 3)
+    monkeypatch.setattr('config.DB_BULK_FLUSH_INTERVAL_SEC', 3600)
+    monkeypatch.setitem(db_session.sqlite_db_config, 'db_path', str(tmp_path / 'test.db'))
+    await dispose_engines()
+    bulk_upsert._buffers.clear()
+    yield
+    await bulk_upsert.close_all_upsert_buffers()
+    bulk_upsert._buffers.clear()
+    await dispose_engines()
+
+
+async def _fetch_notes():
+    async with get_session() as session:
+        result = await session.execute(select(XhsNote.note_id, XhsNote.liked_count, XhsNote.add_ts))
+        return sorted(result.all())
+
+
+class TestBulkUpsertBuffer:
+    """Test cases for BulkUpsertBuffer"""
+
+    @pytest.mark.asyncio
+    async def test_rows_flushed_in_batches_and_upserted(self, sqlite_db):
+        """Rows stay buffered until the batch size, then are upserted by key"""
+        await create_tables('sqlite')
+        buffer = bulk_upsert.get_upsert_buffer(XhsNote, key_columns=("note_id",))
+
+        await buffer.add({"note_id": "n1", "liked_count": "1", "add_ts": 100})
+        await buffer.add({"note_id": "n2", "liked_count": "2", "add_ts": 100})
+        assert await _fetch_notes() == []
+
+        # duplicate key within the same batch keeps the latest values
+        await buffer.add({"note_id": "n1", "liked_count": "10", "add_ts": 200})
+        await buffer.add({"note_id": "n3", "liked_count": "3", "add_ts": 100})
+        assert await _fetch_notes() == [("n1", "10", 100), ("n2", "2", 100), ("n3", "3", 100)]
+
+        # existing row is updated in place, add_ts is preserved
+        await buffer.add({"note_id": "n2", "liked_count": "20", "add_ts": 300})
+        await bulk_upsert.flush_all_upsert_buffers()
+        assert await _fetch_notes() == [("n1", "10", 100), ("n2", "20", 100), ("n3", "3", 100)]
+
+    @pytest.mark.asyncio
+    async def test_fallback_without_unique_index(self, sqlite_db):
+        """Tables created before the unique index existed still get deduplicated rows"""
+        async with get_async_engine('sqlite').begin() as conn:
+            await conn.execute(text(
+                "CREATE TABLE xhs_note (id INTEGER PRIMARY KEY, note_id VARCHAR(255), "
+                "liked_count TEXT, add_ts BIGINT, source_keyword TEXT)"
+            ))
+            await conn.execute(text("CREATE INDEX ix_xhs_note_note_id ON xhs_note (note_id)"))
+            await conn.execute(text("INSERT INTO xhs_note (note_id, liked_count, add_ts) VALUES ('n1', '1', 100)"))
+
+        buffer = bulk_upsert.get_upsert_buffer(XhsNote, key_columns=("note_id",))
+        await buffer.add({"note_id": "n1", "liked_count": "5", "add_ts": 200})
+        await buffer.add({"note_id": "n2", "liked_count": "2", "add_ts": 200})
+        await buffer.flush()
+
+        assert buffer._native_upsert is False
+        assert await _fetch_notes() == [("n1", "5", 100), ("n2", "2", 200)]
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_rows(self, sqlite_db):
+        """A failed write puts the batch back without overwriting rows added meanwhile"""
+        buffer = bulk_upsert.get_upsert_buffer(XhsNote, key_columns=("note_id",))
+        group_by_columns = buffer._group_by_columns
+
+        def add_newer_row_then_group(rows):
+            # A store call adds a newer version of n1 while the batch is being written
+            buffer._rows[("n1",)] = {"note_id": "n1", "liked_count": "99", "add_ts": 500}
+            return group_by_columns(rows)
+
+        buffer._group_by_columns = add_newer_row_then_group
+        buffer._native_upsert = True
+        await buffer.add({"note_id": "n1", "liked_count": "1", "add_ts": 100})
+        await buffer.add({"note_id": "n2", "liked_count": "2", "add_ts": 100})
+        # The table does not exist yet: the threshold flush fails without raising into the store call
+        await buffer.add({"note_id": "n3", "liked_count": "3", "add_ts": 100})
+        assert len(buffer) == 3
+        assert buffer._rows[("n1",)] == {"note_id": "n1", "liked_count": "99", "add_ts": 100}
+
+        buffer._group_by_columns = group_by_columns
+        await create_tables('sqlite')
+        await buffer.flush()
+        assert await _fetch_notes() == [("n1", "99", 100), ("n2", "2", 100), ("n3", "3", 100)]
+
+    @pytest.mark.asyncio
+    async def test_flush_all_continues_after_failure(self, sqlite_db):
+        """One failing table does not keep the other tables from being flushed"""
+        await create_tables('sqlite')
+        notes = bulk_upsert.get_upsert_buffer(XhsNote, key_columns=("note_id",))
+        comments = bulk_upsert.get_upsert_buffer(XhsNoteComment, key_columns=("comment_id",))
+        await notes.add({"note_id": "n1", "liked_count": "1", "add_ts": 100})
+        await comments.add({"comment_id": "c1", "note_id": "n1", "add_ts": 100})
+
+        async def broken_flush():
+            raise RuntimeError("database is locked")
+
+        notes.flush = broken_flush
+        await bulk_upsert.flush_all_upsert_buffers()
+        assert len(comments) == 0
+        assert len(notes) == 1
+        del notes.flush
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_comment_paging.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the async-generator comment paging of the platform clients
+"""
+
+import tracemalloc
+from typing import Any, List
+
+import pytest
+
+from media_platform.bilibili.client import BilibiliClient
+from media_platform.douyin.client import DouYinClient
+from media_platform.xhs.client import XiaoHongShuClient
+
+
+class _FakeFrontierUnit:
+    def __init__(self, events: List[Any]):
+        self.cursor = None
+        self.payload = {}
+        self.events = events
+
+    async def checkpoint(self, cursor: Any, **payload):
+        self.events.append(("checkpoint", cursor, payload["count"]))
+
+
+@pytest.mark.asyncio
+async def test_douyin_pages_yield_sub_comments_and_checkpoint_after_consumer(monkeypatch):
+    """Sub-comment pages follow their parent page; the cursor is saved after the consumer stored them"""
+    monkeypatch.setattr("config.ENABLE_GET_SUB_COMMENTS", True)
+
+    async def get_aweme_comments(aweme_id, cursor=0):
+        comments = [{"cid": f"c{cursor}-{i}", "reply_comment_total": 1 if i == 0 else 0} for i in range(3)]
+        return {"has_more": 1, "cursor": cursor + 3, "comments": comments}
+
+    async def get_sub_comments(aweme_id, comment_id, cursor=0):
+        return {"has_more": 0, "cursor": 0, "comments": [{"cid": f"{comment_id}-reply"}]}
+
+    client = DouYinClient.__new__(DouYinClient)
+    client.get_aweme_comments = get_aweme_comments
+    client.get_sub_comments = get_sub_comments
+    events: List[Any] = []
+    unit = _FakeFrontierUnit(events)
+    async for comments in client.iter_aweme_comments("a1", is_fetch_sub_comments=True, max_count=5, frontier_unit=unit):
+        events.append(("stored", [comment["cid"] for comment in comments]))
+
+    assert events == [
+        ("stored", ["c0-0", "c0-1", "c0-2"]),
+        ("stored", ["c0-0-reply"]),
+        ("checkpoint", 3, 4),
+        ("stored", ["c3-0"]),
+        ("stored", ["c3-0-reply"]),
+        ("checkpoint", 6, 6),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_bilibili_max_count_applies_with_sub_comments(monkeypatch):
+    """Top-level comments count towards max_count even when level-two comments are fetched"""
+    requested = []
+
+    async def get_video_comments(video_id, order_mode, next_page):
+        requested.append(next_page)
+        replies = [{"rpid": next_page * 10 + i, "rcount": 0} for i in range(2)]
+        return {"cursor": {"is_end": False, "next": next_page + 1}, "replies": replies}
+
+    client = BilibiliClient.__new__(BilibiliClient)
+    client.get_video_comments = get_video_comments
+    pages = [page async for page in client.iter_video_comments("v1", is_fetch_sub_comments=True, max_count=3)]
+    assert requested == [0, 1]
+    assert [len(page) for page in pages] == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_memory_stays_flat_on_large_threads(monkeypatch):
+    """Consuming a 100k-comment thread page by page keeps only the current page alive"""
+    monkeypatch.setattr("config.ENABLE_GET_SUB_COMMENTS", True)
+    page_size, page_num = 20, 5000
+
+    async def get_note_comments(note_id, xsec_token, cursor=""):
+        page = int(cursor or 0)
+        comments = [{"id": f"{page}-{i}", "content": "x" * 200, "note_id": note_id} for i in range(page_size)]
+        return {"cursor": str(page + 1), "has_more": page + 1 < page_num, "comments": comments}
+
+    client = XiaoHongShuClient.__new__(XiaoHongShuClient)
+    client.get_note_comments = get_note_comments
+
+    stored = 0
+    tracemalloc.start()
+    try:
+        async for comments in client.iter_note_comments("n1", "token", max_count=page_size * page_num):
+            stored += len(comments)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert stored == page_size * page_num
+    # The whole thread is ~50 MB of dicts; a single page is a few KB
+    assert peak < 2 * 1024 * 1024
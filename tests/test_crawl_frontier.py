@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_crawl_frontier.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the persistent crawl frontier
+"""
+
+import pytest
+
+from media_platform.xhs.client import XiaoHongShuClient
+from tools.crawl_frontier import CrawlFrontier
+
+
+class TestCrawlFrontier:
+    """Test cases for CrawlFrontier"""
+
+    @pytest.mark.asyncio
+    async def test_checkpoint_survives_restart(self, tmp_path):
+        """Cursor, payload and state are read back by a new frontier instance"""
+        db_path = str(tmp_path / "xhs.db")
+        frontier = CrawlFrontier(db_path)
+        unit = await frontier.get_unit("search:python", kind="search_page")
+        assert unit.cursor is None and not unit.done
+        await unit.checkpoint(7, search_id="abc")
+        done_unit = await frontier.get_unit("comments:n1", kind="comment_cursor")
+        await done_unit.finish()
+        await frontier.close()
+
+        frontier = CrawlFrontier(db_path)
+        unit = await frontier.get_unit("search:python", kind="search_page")
+        assert unit.cursor == 7
+        assert unit.payload == {"search_id": "abc"}
+        assert (await frontier.get_unit("comments:n1", kind="comment_cursor")).done
+
+        await frontier.reset()
+        assert (await frontier.get_unit("search:python", kind="search_page")).cursor is None
+        await frontier.close()
+
+    @pytest.mark.asyncio
+    async def test_disabled_frontier_does_not_persist(self, tmp_path):
+        """A disabled frontier hands out fresh units and writes nothing"""
+        frontier = CrawlFrontier(str(tmp_path / "xhs.db"), enabled=False)
+        unit = await frontier.get_unit("search:python", kind="search_page")
+        await unit.checkpoint(3)
+        assert (await frontier.get_unit("search:python", kind="search_page")).cursor is None
+        assert not (tmp_path / "xhs.db").exists()
+
+
+@pytest.mark.asyncio
+async def test_xhs_comments_resume_from_cursor(tmp_path):
+    """Comment paging resumes from the saved cursor instead of the first page"""
+    pages = {"": ("c1", True), "c1": ("c2", True), "c2": ("", False)}
+    requested = []
+
+    async def get_note_comments(note_id, xsec_token, cursor=""):
+        requested.append(cursor)
+        next_cursor, has_more = pages[cursor]
+        return {"cursor": next_cursor, "has_more": has_more, "comments": [{"id": cursor or "first"}]}
+
+    async def iter_sub_comments(**kwargs):
+        return
+        yield
+
+    client = XiaoHongShuClient.__new__(XiaoHongShuClient)
+    client.get_note_comments = get_note_comments
+    client.iter_sub_comments = iter_sub_comments
+
+    frontier = CrawlFrontier(str(tmp_path / "xhs.db"))
+    unit = await frontier.get_unit("comments:n1", kind="comment_cursor")
+    await unit.checkpoint("c1", count=1)
+
+    unit = await frontier.get_unit("comments:n1", kind="comment_cursor")
+    result = [
+        comments async for comments in client.iter_note_comments("n1", "token", max_count=10, frontier_unit=unit)
+    ]
+
+    assert requested == ["c1", "c2"]
+    assert result == [[{"id": "c1"}], [{"id": "c2"}]]
+    unit = await frontier.get_unit("comments:n1", kind="comment_cursor")
+    assert unit.payload == {"count": 3}
+    await frontier.close()
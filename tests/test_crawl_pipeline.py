@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_crawl_pipeline.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the staged crawl pipeline and the overlapped xhs / douyin keyword search
+"""
+
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from media_platform.douyin.core import DouYinCrawler
+from media_platform.douyin.exception import DataFetchError
+from media_platform.xhs.core import XiaoHongShuCrawler
+from store import douyin as douyin_store
+from store import xhs as xhs_store
+from tools.crawl_frontier import close_crawl_frontiers, get_crawl_frontier
+from tools.crawl_pipeline import CrawlPipeline, PageCheckpointer, PipelineBatch
+
+
+class _FakeFrontierUnit:
+    def __init__(self):
+        self.checkpoints: List[Any] = []
+        self.finished = False
+
+    async def checkpoint(self, cursor: Any, **payload):
+        self.checkpoints.append((cursor, payload))
+
+    async def finish(self, **payload):
+        self.finished = True
+
+
+@pytest.mark.asyncio
+async def test_stages_forward_results_with_backpressure():
+    """Results flow to the next stage, bounded queues hold back the producer"""
+    stored, release = [], asyncio.Event()
+
+    async def detail(item):
+        return None if item % 5 == 0 else item * 10
+
+    async def store(item):
+        await release.wait()
+        stored.append(item)
+
+    pipeline = CrawlPipeline("test", queue_size=2)
+    pipeline.add_stage("detail", detail, workers=2).add_stage("store", store, workers=1)
+    async with pipeline:
+        producer = asyncio.create_task(asyncio.wait_for(
+            asyncio.gather(*(pipeline.put("detail", i) for i in range(1, 11))), timeout=5
+        ))
+        await asyncio.sleep(0.05)
+        # store is blocked: 1 in progress + 2 queued in store + detail workers and queue are full
+        assert not producer.done()
+        assert pipeline.stats()["store"]["queued"] == 2
+        release.set()
+        await producer
+    assert sorted(stored) == [10, 20, 30, 40, 60, 70, 80, 90]
+    assert pipeline.stats()["detail"]["processed"] == 10
+
+
+@pytest.mark.asyncio
+async def test_page_checkpoints_wait_for_drained_batches():
+    """A page is checkpointed only once it and every earlier page went through all stages"""
+    gates = {"a": asyncio.Event(), "b": asyncio.Event()}
+
+    async def fetch(item):
+        await gates[item].wait()
+        if item == "b":
+            raise ValueError("broken detail")
+        return item
+
+    pipeline = CrawlPipeline("test")
+    pipeline.add_stage("detail", fetch, workers=2).add_stage("store", lambda item: asyncio.sleep(0), workers=1)
+    unit = _FakeFrontierUnit()
+    checkpointer = PageCheckpointer(unit)
+    async with pipeline:
+        for page, item in ((2, "a"), (3, "b")):
+            batch = PipelineBatch()
+            await pipeline.put("detail", item, batch)
+            checkpointer.add_page(batch, page, search_id="s")
+        empty_batch = PipelineBatch()
+        checkpointer.add_page(empty_batch, 4)
+
+        gates["b"].set()
+        await asyncio.sleep(0.01)
+        await checkpointer.advance()
+        assert unit.checkpoints == []
+
+        gates["a"].set()
+        await checkpointer.finish()
+    # Failed items still complete their batch so the crawl moves on
+    assert unit.checkpoints == [(4, {})]
+    assert unit.finished
+    assert pipeline.stats()["detail"]["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_error_in_producer_stops_workers():
+    """Leaving the pipeline with an exception cancels pending work instead of waiting for it"""
+    never = asyncio.Event()
+
+    async def hang(item):
+        await never.wait()
+
+    pipeline = CrawlPipeline("test")
+    pipeline.add_stage("detail", hang, workers=1)
+    with pytest.raises(RuntimeError):
+        async with pipeline:
+            await pipeline.put("detail", 1)
+            raise RuntimeError("search failed")
+    assert all(not stage.workers for stage in pipeline._stages)
+
+
+class _FakeXhsClient:
+    def __init__(self, page_two_requested: asyncio.Event):
+        self.page_two_requested = page_two_requested
+        self.searched_pages: List[int] = []
+
+    async def get_note_by_keyword(self, keyword: str, search_id: str, page: int, sort) -> Dict:
+        self.searched_pages.append(page)
+        if page == 2:
+            self.page_two_requested.set()
+        items = [{"id": f"n{page}-{i}", "xsec_source": "pc_search", "xsec_token": f"t{i}"} for i in range(3)]
+        return {"has_more": True, "items": items}
+
+    async def get_note_by_id(self, note_id: str, xsec_source: str, xsec_token: str) -> Dict:
+        return {"note_id": note_id}
+
+
+@pytest.mark.asyncio
+async def test_xhs_search_overlaps_pages_and_comments(monkeypatch):
+    """The next search page is requested while comments of the previous page are still running"""
+    monkeypatch.setattr("config.KEYWORDS", "mock")
+    monkeypatch.setattr("config.START_PAGE", 1)
+    monkeypatch.setattr("config.CRAWLER_MAX_NOTES_COUNT", 40)
+    monkeypatch.setattr("config.ENABLE_CRAWL_FRONTIER", False)
+    monkeypatch.setattr("config.ENABLE_SEEN_INDEX", False)
+    monkeypatch.setattr("config.ENABLE_GET_COMMENTS", True)
+    monkeypatch.setattr("config.ENABLE_GET_MEIDAS", False)
+    stored_notes, commented_notes = [], []
+    page_two_requested = asyncio.Event()
+
+    async def update_xhs_note(note_detail: Dict):
+        stored_notes.append(note_detail["note_id"])
+
+    async def get_comments(note_id: str, xsec_token: str):
+        # Would dead-lock if comments of page 1 had to finish before page 2 is searched
+        await asyncio.wait_for(page_two_requested.wait(), timeout=5)
+        commented_notes.append(note_id)
+
+    monkeypatch.setattr(xhs_store, "update_xhs_note", update_xhs_note)
+    crawler = XiaoHongShuCrawler()
+    crawler.xhs_client = _FakeXhsClient(page_two_requested)
+    monkeypatch.setattr(crawler, "get_comments", get_comments)
+    await crawler.search()
+
+    assert crawler.xhs_client.searched_pages == [1, 2]
+    expected = sorted(f"n{page}-{i}" for page in (1, 2) for i in range(3))
+    assert sorted(stored_notes) == expected
+    assert sorted(commented_notes) == expected
+
+
+class _FakeDouYinClient:
+    async def search_info_by_keyword(self, keyword: str, offset: int = 0, **kwargs) -> Dict:
+        if keyword == "failed":
+            raise DataFetchError("search failed")
+        if keyword == "risk_control":
+            return {"status_code": 0}
+        if offset:
+            return {"data": []}
+        return {"data": [{"aweme_info": {"aweme_id": f"{keyword}-1"}}], "extra": {"logid": "log1"}}
+
+
+@pytest.mark.asyncio
+async def test_douyin_search_keeps_failed_keywords_in_progress(monkeypatch, tmp_path):
+    """Only keywords whose results ran out are checkpointed as finished, failed ones are resumed"""
+    monkeypatch.setattr("config.PLATFORM", "dy")
+    monkeypatch.setattr("config.KEYWORDS", "ok,failed,risk_control")
+    monkeypatch.setattr("config.START_PAGE", 1)
+    monkeypatch.setattr("config.CRAWLER_MAX_NOTES_COUNT", 20)
+    monkeypatch.setattr("config.ENABLE_CRAWL_FRONTIER", True)
+    monkeypatch.setattr("config.CRAWL_FRONTIER_DIR", str(tmp_path))
+    monkeypatch.setattr("config.ENABLE_GET_COMMENTS", False)
+    stored_awemes = []
+
+    async def update_douyin_aweme(aweme_item: Dict):
+        stored_awemes.append(aweme_item["aweme_id"])
+
+    async def get_aweme_media(aweme_item: Dict):
+        pass
+
+    monkeypatch.setattr(douyin_store, "update_douyin_aweme", update_douyin_aweme)
+    crawler = DouYinCrawler()
+    crawler.dy_client = _FakeDouYinClient()
+    monkeypatch.setattr(crawler, "get_aweme_media", get_aweme_media)
+    try:
+        await crawler.search()
+        frontier = get_crawl_frontier()
+        assert (await frontier.get_unit("search:ok", kind="search_page")).done
+        assert not (await frontier.get_unit("search:failed", kind="search_page")).done
+        assert not (await frontier.get_unit("search:risk_control", kind="search_page")).done
+    finally:
+        await close_crawl_frontiers()
+    assert stored_awemes == ["ok-1"]
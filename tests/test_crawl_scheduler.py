@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_crawl_scheduler.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the crawl-wide priority concurrency scheduler
+"""
+
+import asyncio
+
+import pytest
+
+from tools import crawl_scheduler
+from tools.crawl_scheduler import (
+    PRIORITY_COMMENTS,
+    PRIORITY_DETAIL,
+    PRIORITY_MEDIA,
+    PRIORITY_SEARCH,
+    PRIORITY_SUB_COMMENTS,
+    CrawlScheduler,
+    get_request_priority,
+    work_priority,
+)
+from tools.rate_limiter import RateLimiter
+
+
+class TestCrawlScheduler:
+    """Test cases for CrawlScheduler"""
+
+    @pytest.mark.asyncio
+    async def test_freed_slots_go_to_highest_priority(self):
+        """Waiters are served by priority, then by arrival order"""
+        scheduler = CrawlScheduler(max_in_flight=1)
+        await scheduler.acquire(PRIORITY_DETAIL)
+        order = []
+
+        async def request(name, priority):
+            await scheduler.acquire(priority)
+            order.append(name)
+            await asyncio.sleep(0)
+            scheduler.release()
+
+        tasks = [
+            asyncio.create_task(request("media", PRIORITY_MEDIA)),
+            asyncio.create_task(request("comments-1", PRIORITY_COMMENTS)),
+            asyncio.create_task(request("search", PRIORITY_SEARCH)),
+            asyncio.create_task(request("comments-2", PRIORITY_COMMENTS)),
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.waiting == 4
+
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        assert order == ["search", "comments-1", "comments-2", "media"]
+        assert scheduler.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        """A waiter cancelled while queued is skipped when slots are handed out"""
+        scheduler = CrawlScheduler(max_in_flight=1)
+        await scheduler.acquire(PRIORITY_SEARCH)
+        cancelled = asyncio.create_task(scheduler.acquire(PRIORITY_SEARCH))
+        waiting = asyncio.create_task(scheduler.acquire(PRIORITY_MEDIA))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+
+        scheduler.release()
+        await asyncio.wait_for(waiting, timeout=1)
+        assert scheduler.in_flight == 1
+        assert scheduler.waiting == 0
+
+    @pytest.mark.asyncio
+    async def test_permits_cap_in_flight_requests(self, monkeypatch):
+        """Rate permits hold a slot until the response arrives"""
+        monkeypatch.setattr("config.CRAWLER_MAX_SLEEP_SEC", 0.001)
+        monkeypatch.setattr("config.RATE_LIMIT_MAX_RPS", 1000.0)
+        monkeypatch.setattr("config.RATE_LIMIT_BURST", 10)
+        scheduler = CrawlScheduler(max_in_flight=2)
+        monkeypatch.setattr(crawl_scheduler, "get_crawl_scheduler", lambda: scheduler)
+        monkeypatch.setattr("tools.rate_limiter.get_crawl_scheduler", lambda: scheduler)
+        limiter = RateLimiter("xhs")
+        peak = 0
+
+        async def request(index):
+            nonlocal peak
+            async with limiter.limit(f"https://example.com/api/feed/{index}") as permit:
+                peak = max(peak, scheduler.in_flight)
+                await asyncio.sleep(0.01)
+                permit.set_response(200)
+                # Reading a streamed body after the headers no longer holds a slot
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(request(index) for index in range(6)))
+        assert peak == 2
+        assert scheduler.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_token_wait_does_not_hold_a_slot(self, monkeypatch):
+        """A request waiting on a throttled bucket leaves the slot to other endpoints"""
+        monkeypatch.setattr("config.CRAWLER_MAX_SLEEP_SEC", 10)
+        monkeypatch.setattr("config.RATE_LIMIT_BURST", 1)
+        scheduler = CrawlScheduler(max_in_flight=1)
+        monkeypatch.setattr("tools.rate_limiter.get_crawl_scheduler", lambda: scheduler)
+        limiter = RateLimiter("xhs")
+
+        async with limiter.limit("https://example.com/api/search/notes") as permit:
+            permit.set_response(200)
+        # The search bucket is empty for the next 10 seconds
+        throttled = asyncio.create_task(limiter.limit("https://example.com/api/search/notes").__aenter__())
+        await asyncio.sleep(0.01)
+        assert scheduler.in_flight == 0
+
+        async with limiter.limit("https://example.com/api/feed") as permit:
+            assert scheduler.in_flight == 1
+            permit.set_response(200)
+        assert not throttled.done()
+        throttled.cancel()
+        await asyncio.gather(throttled, return_exceptions=True)
+        assert scheduler.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_deferred_start_leaves_slot_free_while_preparing(self, monkeypatch):
+        """Work done before permit.start() neither holds a slot nor counts as response latency"""
+        monkeypatch.setattr("config.CRAWLER_MAX_SLEEP_SEC", 0.01)
+        monkeypatch.setattr("config.RATE_LIMIT_MAX_RPS", 1000.0)
+        monkeypatch.setattr("config.RATE_LIMIT_SLOW_RESPONSE_SEC", 0.05)
+        scheduler = CrawlScheduler(max_in_flight=1)
+        monkeypatch.setattr("tools.rate_limiter.get_crawl_scheduler", lambda: scheduler)
+        limiter = RateLimiter("xhs")
+        rate_before = limiter.get_bucket("detail").rate
+
+        async with limiter.limit("https://example.com/api/feed", defer_start=True) as permit:
+            # e.g. waiting for a proxy lease and signing the request
+            await asyncio.sleep(0.1)
+            assert scheduler.in_flight == 0
+            await permit.start()
+            assert scheduler.in_flight == 1
+            permit.set_response(200)
+        assert scheduler.in_flight == 0
+        assert permit.latency < 0.05
+        assert limiter.get_bucket("detail").rate > rate_before
+
+
+def test_work_priority_lowers_request_priority():
+    """Requests inside a work scope never outrank the work they belong to"""
+    assert get_request_priority(PRIORITY_DETAIL) == PRIORITY_DETAIL
+    with work_priority(PRIORITY_COMMENTS):
+        assert get_request_priority(PRIORITY_SEARCH) == PRIORITY_COMMENTS
+        assert get_request_priority(PRIORITY_SUB_COMMENTS) == PRIORITY_SUB_COMMENTS
+    assert get_request_priority(PRIORITY_SEARCH) == PRIORITY_SEARCH
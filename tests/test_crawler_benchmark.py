@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_crawler_benchmark.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Smoke tests for the mock platform server and the end-to-end crawler benchmark
+"""
+
+import asyncio
+import socket
+
+import httpx
+import pytest
+import uvicorn
+
+import config
+from benchmarks.crawler_benchmark import PLATFORM_FLOWS, check_regressions, run_benchmark
+from benchmarks.mock_platform_server import MockServerSettings, create_app
+
+
+async def _get(app, method: str, url: str, **kwargs) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://mock") as client:
+        return await client.request(method, url, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_mock_server_simulates_captcha_and_errors():
+    """Captcha responses follow each platform's format, errors are plain 500s"""
+    captcha_app = create_app(MockServerSettings(captcha_rate=1.0))
+    response = await _get(captcha_app, "POST", "/xhs/api/sns/web/v1/search/notes", json={"keyword": "mock"})
+    assert response.status_code == 461
+    assert response.headers["Verifytype"]
+    response = await _get(captcha_app, "GET", "/bili/x/web-interface/view/detail?aid=1")
+    assert response.json()["code"] == -352
+
+    error_app = create_app(MockServerSettings(error_rate=1.0))
+    response = await _get(error_app, "POST", "/ks/graphql", json={"operationName": "visionVideoDetail"})
+    assert response.status_code == 500
+
+    stats = (await _get(error_app, "GET", "/__stats")).json()
+    assert stats["requests:ks"] == 1 and stats["errors:ks"] == 1
+
+
+@pytest.mark.asyncio
+async def test_run_benchmark_against_mock_server(monkeypatch):
+    """Every platform flow crawls search, detail and creator pages without errors"""
+    monkeypatch.setattr(config, "ENABLE_RESPONSE_CACHE", True)
+    app = create_app(MockServerSettings(page_size=3, max_pages=2))
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", access_log=False))
+    server_task = asyncio.create_task(server.serve(sockets=[sock]))
+    try:
+        while not server.started:
+            await asyncio.sleep(0.01)
+        results = await run_benchmark(
+            f"http://127.0.0.1:{port}", list(PLATFORM_FLOWS), ["mock"], pages=1, max_creators=1, concurrency=4
+        )
+    finally:
+        server.should_exit = True
+        await server_task
+        sock.close()
+
+    assert [result["platform"] for result in results] == list(PLATFORM_FLOWS)
+    for result in results:
+        assert result["errors"] == 0, result
+        # 1 search page + 3 details + creator info + 2 creator pages
+        assert result["requests"] == 7
+        assert result["stages"]["detail"]["items"] == 3
+        assert result["stages"]["creator"]["items"] == 1 + 2 * 3
+        assert result["p99_ms"] >= result["p50_ms"] > 0
+    # Config overrides are restored after the run
+    assert config.ENABLE_RESPONSE_CACHE is True
+
+
+def test_check_regressions():
+    """Throughput drops and latency / memory growth beyond the tolerance are reported"""
+    baseline = [{"platform": "xhs", "requests_per_sec": 100, "items_per_sec": 500, "p99_ms": 200, "peak_rss_mb": 100}]
+    ok = [{"platform": "xhs", "requests_per_sec": 90, "items_per_sec": 520, "p99_ms": 230, "peak_rss_mb": None}]
+    assert check_regressions(ok, baseline, tolerance=0.2) == []
+
+    slow = [{"platform": "xhs", "requests_per_sec": 70, "items_per_sec": 500, "p99_ms": 300, "peak_rss_mb": 100}]
+    regressions = check_regressions(slow, baseline, tolerance=0.2)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("xhs requests_per_sec")
+    assert regressions[1].startswith("xhs p99_ms")
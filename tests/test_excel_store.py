@@ -163,12 +163,44 @@ class TestExcelStoreBase:
     def test_header_formatting(self, excel_store):
         """Test header row formatting"""
         asyncio.run(excel_store.store_content({"note_id": "test", "title": "Test"}))
+        excel_store.flush()
 
-        # Check header formatting
-        header_cell = excel_store.contents_sheet.cell(row=1, column=1)
+        # Check header formatting in the saved file
+        wb = openpyxl.load_workbook(excel_store.filename)
+        header_cell = wb["Contents"].cell(row=1, column=1)
         assert header_cell.font.bold is True
         # RGB color may have different prefix (00 or FF), check the actual color part
         assert header_cell.fill.start_color.rgb[-6:] == "366092"
+        data_cell = wb["Contents"].cell(row=2, column=1)
+        assert data_cell.style == "mediacrawler_cell"
+        assert data_cell.border.left.style == "thin"
+        wb.close()
+
+    @pytest.mark.asyncio
+    async def test_rows_streamed_after_width_sample(self, temp_dir, monkeypatch):
+        """Only the width sample is held in memory; widths come from the sampled rows"""
+        monkeypatch.chdir(temp_dir)
+        monkeypatch.setattr("config.EXCEL_WIDTH_SAMPLE_ROWS", 3)
+        store = ExcelStoreBase(platform="test", crawler_type="search")
+
+        for i in range(2):
+            await store.store_content({"note_id": f"note{i}", "title": "x" * 20})
+        assert len(store.contents_sheet._pending) == 2
+
+        for i in range(2, 500):
+            await store.store_content({"note_id": f"note{i}", "title": "y" * 200})
+        assert store.contents_sheet._pending == []
+        assert store.contents_sheet.max_row == 501
+
+        store.flush()
+        wb = openpyxl.load_workbook(store.filename)
+        sheet = wb["Contents"]
+        assert sheet.max_row == 501
+        assert sheet.cell(row=501, column=1).value == "note499"
+        # Sampled rows: header "note_id" / "note0" -> minimum width, title 20 / 200 chars -> capped at 50
+        assert sheet.column_dimensions["A"].width == 10
+        assert sheet.column_dimensions["B"].width == 50
+        wb.close()
 
     def test_empty_sheets_removed(self, excel_store):
         """Test that empty sheets are removed on flush"""
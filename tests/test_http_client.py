@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_http_client.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the shared httpx client pool
+"""
+
+import asyncio
+
+import pytest
+
+from tools.http_client import HttpClientPool
+
+
+class TestHttpClientPool:
+    """Test cases for HttpClientPool"""
+
+    @pytest.mark.asyncio
+    async def test_client_reused_per_proxy(self):
+        """Same proxy should return the same long-lived client"""
+        pool = HttpClientPool()
+        direct = pool.get_client(None)
+        assert pool.get_client(None) is direct
+        assert pool.get_client("http://127.0.0.1:8888") is not direct
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_closed_client_is_recreated(self):
+        """A closed client should be replaced on next access"""
+        pool = HttpClientPool()
+        client = pool.get_client(None)
+        await pool.close()
+        assert client.is_closed
+        assert pool.get_client(None) is not client
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_discard_closes_proxy_client(self):
+        """Discarding a proxy closes only that proxy's client"""
+        pool = HttpClientPool()
+        direct = pool.get_client(None)
+        proxied = pool.get_client("http://127.0.0.1:8888")
+        pool.discard("http://127.0.0.1:8888")
+        await pool.close()
+        assert proxied.is_closed
+        assert direct.is_closed
+        assert pool._clients == {}
+
+        direct = pool.get_client(None)
+        proxied = pool.get_client("http://127.0.0.1:8888")
+        pool.discard("http://127.0.0.1:8888")
+        await asyncio.sleep(0)
+        assert proxied.is_closed and not direct.is_closed
+        assert pool.get_client("http://127.0.0.1:8888") is not proxied
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_response_cookies_not_persisted(self):
+        """Shared clients must stay stateless between requests"""
+        import httpx
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, headers={"Set-Cookie": "sid=abc; Path=/"})
+
+        pool = HttpClientPool()
+        client = pool.get_client(None)
+        client._transport = httpx.MockTransport(handler)
+        response = await client.get("https://example.com/")
+        assert response.cookies.get("sid") == "abc"
+        assert len(client.cookies) == 0
+        await pool.close()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_js_sign_pool.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the long-lived JS sign worker pool
+"""
+
+import shutil
+
+import pytest
+
+from tools.js_sign_pool import JsSignError, JsSignWorkerPool
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="Node.js is not installed")
+
+
+@pytest.fixture(autouse=True)
+def disable_health_check(monkeypatch):
+    """Avoid background health check tasks outliving the test loop"""
+    monkeypatch.setattr('config.JS_SIGN_HEALTH_CHECK_INTERVAL_SEC', 0)
+    monkeypatch.setattr('config.JS_SIGN_TIMEOUT_SEC', 10)
+
+
+class TestJsSignWorkerPool:
+    """Test cases for JsSignWorkerPool"""
+
+    @pytest.mark.asyncio
+    async def test_sign_zhihu(self):
+        """Pool returns the same structure as the execjs sign function"""
+        pool = JsSignWorkerPool("libs/zhihu.js", worker_num=2)
+        try:
+            result = await pool.call("get_sign", "/api/v4/search_v3?q=python", "d_c0=abc|1700000000")
+            assert set(result.keys()) == {"x-zst-81", "x-zse-96"}
+            assert result["x-zse-96"].startswith("2.0_")
+        finally:
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_dead_worker_is_restarted(self):
+        """A crashed worker process is restarted transparently"""
+        pool = JsSignWorkerPool("libs/douyin.js", worker_num=1)
+        try:
+            await pool.start()
+            worker = pool._workers[0]
+            worker._process.kill()
+            await worker._process.wait()
+            assert not worker.alive
+
+            a_bogus = await pool.call("sign_datail", "aid=6383", "Mozilla/5.0")
+            assert isinstance(a_bogus, str) and a_bogus
+            assert worker.alive
+            assert worker.generation == 2
+        finally:
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_script_error_raised_without_restart(self):
+        """Errors thrown by the sign script surface as JsSignError"""
+        pool = JsSignWorkerPool("libs/zhihu.js", worker_num=1)
+        try:
+            with pytest.raises(JsSignError):
+                await pool.call("no_such_function")
+            assert pool._workers[0].generation == 1
+            assert await pool.health_check() == 0
+        finally:
+            await pool.close()
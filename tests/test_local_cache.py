@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_local_cache.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+"""
+Unit tests for the bounded in-memory ExpiringLocalCache
+"""
+
+import pytest
+
+from cache.local_cache import ExpiringLocalCache
+
+
+@pytest.fixture
+def fake_time(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("cache.local_cache.time.time", lambda: now[0])
+    return now
+
+
+@pytest.mark.asyncio
+async def test_lru_capacity_and_counters(fake_time):
+    """The least recently used key is evicted once max_size is exceeded"""
+    cache = ExpiringLocalCache(max_size=3)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper(), 60)
+    assert cache.get("a") == "A"  # "b" is now the least recently used
+    cache.set("d", "D", 60)
+
+    assert cache.get("b") is None
+    assert sorted(cache.keys("*")) == ["a", "c", "d"]
+    assert cache.stats() == {"size": 3, "hits": 1, "misses": 1, "evictions": 1, "expirations": 0}
+
+
+@pytest.mark.asyncio
+async def test_expiry_heap_clears_only_expired_keys(fake_time):
+    """Overwritten keys keep their new expiry; clearing pops just the expired heap entries"""
+    cache = ExpiringLocalCache()
+    cache.set("short", 1, 10)
+    cache.set("long", 2, 100)
+    cache.set("renewed", 3, 10)
+    cache.set("renewed", 4, 100)
+
+    fake_time[0] += 50
+    cache._clear()
+    assert sorted(cache.keys("*")) == ["long", "renewed"]
+    assert cache.get("renewed") == 4
+    assert cache.expirations == 1
+
+    fake_time[0] += 100
+    assert cache.get("long") is None
+    cache._clear()
+    assert len(cache) == 0
+    assert cache._expire_heap == []
+
+
+@pytest.mark.asyncio
+async def test_heap_stays_bounded_under_overwrites(fake_time):
+    """Repeatedly overwriting one key does not grow the expiry heap without bound"""
+    cache = ExpiringLocalCache()
+    for index in range(5000):
+        cache.set("key", index, 60)
+    assert len(cache._expire_heap) <= 1024 + 3
+
+
+@pytest.mark.asyncio
+async def test_keys_glob_matching(fake_time):
+    """keys() implements real glob semantics, not substring matching"""
+    cache = ExpiringLocalCache()
+    for key in ("kuaidaili_1.1.1.1_80", "kuaidaili_2.2.2.2_8080", "wandouhttp_3.3.3.3_80", "xkuaidaili_0", "sms_13800000000"):
+        cache.set(key, "v", 60)
+
+    assert cache.keys("kuaidaili_*") == ["kuaidaili_1.1.1.1_80", "kuaidaili_2.2.2.2_8080"]
+    assert cache.keys("*_80") == ["kuaidaili_1.1.1.1_80", "wandouhttp_3.3.3.3_80"]
+    assert cache.keys("kuaidaili_?.?.?.?_80") == ["kuaidaili_1.1.1.1_80"]
+    assert cache.keys("sms_1[3-9]*") == ["sms_13800000000"]
+    assert cache.keys("sms_13800000000") == ["sms_13800000000"]
+    assert cache.keys("kuaidaili") == []
+
+    # The prefix index picks up keys added after the last lookup
+    cache.set("kuaidaili_4.4.4.4_80", "v", 60)
+    assert len(cache.keys("kuaidaili_*")) == 3
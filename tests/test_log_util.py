@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_log_util.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the background logging sink, category levels and payload sampling
+"""
+
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+from tools import log_util
+from tools.log_util import format_payload, get_logger, init_logging, log_payload, stop_log_listener
+
+
+class _CountingRepr:
+    calls = 0
+
+    def __repr__(self):
+        _CountingRepr.calls += 1
+        return "payload"
+
+
+@pytest.fixture
+def log_stream(monkeypatch):
+    """Route logging into a buffer, restore the default setup afterwards"""
+    monkeypatch.setattr("config.LOG_PAYLOAD_SAMPLE_RATE", 1)
+    log_util._payload_sampler.reset()
+    stream = io.StringIO()
+    yield stream
+    for category in ("payload", "payload.comment"):
+        get_logger(category).setLevel(logging.NOTSET)
+    log_util._payload_sampler.reset()
+    init_logging()
+
+
+def test_records_are_written_by_background_thread(log_stream):
+    """Callers only enqueue records, the listener thread writes them"""
+    writer_threads = []
+
+    class _ThreadRecordingStream(io.StringIO):
+        def write(self, text):
+            writer_threads.append(threading.current_thread())
+            return log_stream.write(text)
+
+    init_logging(stream=_ThreadRecordingStream())
+    logging.getLogger("MediaCrawler").info("hello %s", "world")
+    stop_log_listener()
+    assert "MediaCrawler INFO" in log_stream.getvalue()
+    assert "hello world" in log_stream.getvalue()
+    assert writer_threads and threading.current_thread() not in writer_threads
+
+
+def test_payload_sampling_and_category_levels(log_stream, monkeypatch):
+    """Disabled or unsampled payload logs never format the payload"""
+    init_logging(stream=log_stream, category_levels={"payload.comment": "WARNING"})
+    _CountingRepr.calls = 0
+    log_payload("comment", "[test] comment: %s", _CountingRepr())
+    assert _CountingRepr.calls == 0
+
+    monkeypatch.setattr("config.LOG_PAYLOAD_SAMPLE_RATE", 0.25)
+    for i in range(8):
+        log_payload("content", "[test] note %s: %s", _CountingRepr(), i)
+    stop_log_listener()
+    assert _CountingRepr.calls == 2
+    lines = log_stream.getvalue().splitlines()
+    assert [line.split(" - ")[1] for line in lines] == ["[test] note 0: payload", "[test] note 4: payload"]
+    assert "MediaCrawler.payload.content" in lines[0]
+    # The record points at the caller, not at log_payload
+    assert "test_log_util.py" in lines[0]
+
+
+def test_format_payload_truncates_large_objects():
+    """Nested containers and long strings are cut down to the configured size"""
+    text = format_payload({"desc": "x" * 10000, "comments": list(range(1000))}, max_chars=200)
+    assert len(text) <= 200 + len("...(99999 more chars)")
+    assert text.startswith("{'comments': [0, 1, 2")
+    assert format_payload({"a": 1}, max_chars=200) == "{'a': 1}"
+
+
+def test_json_format_includes_fields(log_stream):
+    """JSON lines carry the message, source location and extra fields"""
+    init_logging(stream=log_stream, log_format="json")
+    log_payload("search", "[test] search res: %s", {"items": [1, 2]}, keyword="mock", page=1)
+    stop_log_listener()
+    record = json.loads(log_stream.getvalue().splitlines()[0])
+    assert record["logger"] == "MediaCrawler.payload.search"
+    assert record["message"] == "[test] search res: {'items': [1, 2]}"
+    assert record["keyword"] == "mock" and record["page"] == 1
+    assert record["file"] == "test_log_util.py"
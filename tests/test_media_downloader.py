@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_media_downloader.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the streaming media downloader
+"""
+
+import os
+
+import httpx
+import pytest
+
+from tools import media_downloader
+from tools.media_downloader import MediaDownloader, save_media_content
+
+MEDIA_URL = "https://cdn.example.com/video.mp4"
+MEDIA_BODY = bytes(range(256)) * 40
+
+
+def _response(status_code: int, body: bytes, headers: dict) -> httpx.Response:
+    # stream= keeps the body unread, like a real network response
+    headers.setdefault("Content-Length", str(len(body)))
+    return httpx.Response(status_code, stream=httpx.ByteStream(body), headers=headers)
+
+
+def _serve(request: httpx.Request, truncate_first: bool, calls: list) -> httpx.Response:
+    calls.append(request.headers.get("Range"))
+    range_header = request.headers.get("Range")
+    if range_header:
+        start = int(range_header.split("=")[1].rstrip("-"))
+        body = MEDIA_BODY[start:]
+        return _response(206, body, {
+            "Content-Range": f"bytes {start}-{len(MEDIA_BODY) - 1}/{len(MEDIA_BODY)}",
+        })
+    if truncate_first and len(calls) == 1:
+        # connection dropped half way: fewer bytes than announced
+        return _response(200, MEDIA_BODY[:1000], {"Content-Length": str(len(MEDIA_BODY))})
+    return _response(200, MEDIA_BODY, {})
+
+
+@pytest.fixture
+def mock_cdn(monkeypatch):
+    """Route the downloader's http client to an in-memory CDN"""
+    state = {"truncate_first": False, "calls": []}
+
+    def handler(request):
+        return _serve(request, state["truncate_first"], state["calls"])
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(media_downloader, "get_http_client", lambda proxy=None: client)
+    return state
+
+
+class TestMediaDownloader:
+    """Test cases for MediaDownloader"""
+
+    @pytest.mark.asyncio
+    async def test_download_to_tmp_file(self, tmp_path, mock_cdn):
+        """A full download lands in the tmp dir and can be moved into place"""
+        downloader = MediaDownloader(tmp_dir=str(tmp_path / "tmp"), chunk_size=1024, max_retries=0)
+        file_path = await downloader.download(MEDIA_URL)
+        assert file_path and not os.path.exists(f"{file_path}.part")
+
+        target = tmp_path / "video.mp4"
+        await save_media_content(file_path, str(target))
+        assert target.read_bytes() == MEDIA_BODY
+        assert not os.path.exists(file_path)
+
+    @pytest.mark.asyncio
+    async def test_incomplete_body_is_resumed_with_range(self, tmp_path, mock_cdn):
+        """A truncated body is detected and the rest is fetched with a Range request"""
+        mock_cdn["truncate_first"] = True
+        downloader = MediaDownloader(tmp_dir=str(tmp_path / "tmp"), chunk_size=1024, max_retries=2)
+        file_path = await downloader.download(MEDIA_URL)
+        assert mock_cdn["calls"] == [None, "bytes=1000-"]
+        with open(file_path, "rb") as f:
+            assert f.read() == MEDIA_BODY
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_retries(self, tmp_path, mock_cdn):
+        """Download returns None and keeps the partial file for a later resume"""
+        mock_cdn["truncate_first"] = True
+        downloader = MediaDownloader(tmp_dir=str(tmp_path / "tmp"), chunk_size=1024, max_retries=0)
+        assert await downloader.download(MEDIA_URL) is None
+        assert os.path.getsize(downloader._get_tmp_path(MEDIA_URL) + ".part") == 1000
+
+
+@pytest.mark.asyncio
+async def test_save_media_content_accepts_bytes_and_streams(tmp_path):
+    """Media stores still accept bytes and also async byte streams"""
+    async def chunks():
+        yield b"abc"
+        yield b"def"
+
+    await save_media_content(b"raw", str(tmp_path / "a.jpg"))
+    await save_media_content(chunks(), str(tmp_path / "b.jpg"))
+    assert (tmp_path / "a.jpg").read_bytes() == b"raw"
+    assert (tmp_path / "b.jpg").read_bytes() == b"abcdef"
+    assert sorted(os.listdir(tmp_path)) == ["a.jpg", "b.jpg"]
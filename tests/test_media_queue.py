@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_media_queue.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the background media download queue
+"""
+
+import asyncio
+
+import pytest
+
+from tools.media_queue import MediaDownloadQueue
+
+
+class TestMediaDownloadQueue:
+    """Test cases for MediaDownloadQueue"""
+
+    @pytest.mark.asyncio
+    async def test_per_host_limit_and_drain(self):
+        """Downloads run in parallel, capped per host, and drain() waits for all of them"""
+        running = {"a.com": 0, "b.com": 0}
+        peak = {"a.com": 0, "b.com": 0}
+        saved = []
+
+        def make_fetch(host: str, index: int):
+            async def fetch():
+                running[host] += 1
+                peak[host] = max(peak[host], running[host])
+                await asyncio.sleep(0.01)
+                running[host] -= 1
+                return None if index == 0 else f"{host}/{index}"
+            return fetch
+
+        async def save(content):
+            saved.append(content)
+
+        media_queue = MediaDownloadQueue(max_size=4, worker_num=6, per_host_limit=2)
+        for index in range(5):
+            for host in running:
+                await media_queue.submit(f"https://{host}/{index}.jpg", make_fetch(host, index), save)
+        await media_queue.drain()
+
+        assert peak == {"a.com": 2, "b.com": 2}
+        assert len(saved) == 8
+        assert (media_queue.succeeded, media_queue.failed, media_queue.pending) == (8, 2, 0)
+
+    @pytest.mark.asyncio
+    async def test_submit_blocks_when_queue_is_full(self):
+        """A full queue applies backpressure to the producer"""
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return b"data"
+
+        async def save(content):
+            pass
+
+        media_queue = MediaDownloadQueue(max_size=1, worker_num=1, per_host_limit=1)
+        await media_queue.submit("https://a.com/0.jpg", fetch, save)  # taken by the worker
+        await media_queue.submit("https://a.com/1.jpg", fetch, save)  # fills the queue
+        blocked = asyncio.create_task(media_queue.submit("https://a.com/2.jpg", fetch, save))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        release.set()
+        await blocked
+        await media_queue.drain()
+        assert media_queue.succeeded == 3
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_metrics.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the metrics registry, the request / store instrumentation and the exporters
+"""
+
+import asyncio
+import json
+import socket
+from typing import Dict
+
+import httpx
+import pytest
+
+from base.base_crawler import AbstractStore
+from tools.http_client import HttpClientPool
+from tools.metrics import (
+    HTTP_BYTES,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS,
+    STORE_ERRORS,
+    STORE_ITEMS,
+    Histogram,
+    MetricsExporter,
+    MetricsRegistry,
+    get_metrics,
+)
+from tools.rate_limiter import ENDPOINT_DETAIL, ENDPOINT_SEARCH, get_rate_limiter
+
+
+class FakeBlockError(Exception):
+    pass
+
+
+class _ChunkedStream(httpx.AsyncByteStream):
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            yield chunk
+
+
+@pytest.fixture(autouse=True)
+def metrics_config(monkeypatch):
+    monkeypatch.setattr("config.ENABLE_METRICS", True)
+    monkeypatch.setattr("config.PLATFORM", "xhs")
+    monkeypatch.setattr("config.SAVE_DATA_OPTION", "json")
+    monkeypatch.setattr("config.CRAWLER_MAX_SLEEP_SEC", 0.01)
+    get_metrics().reset()
+    yield
+    get_metrics().reset()
+
+
+def test_histogram_quantile_and_prometheus_format():
+    """Quantiles interpolate within buckets, buckets are rendered cumulatively"""
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.cumulative_counts() == [2, 4, 5]
+    assert histogram.quantile(0.2) == pytest.approx(0.05)
+    assert histogram.quantile(0.99) == 1.0
+
+    registry = MetricsRegistry()
+    registry.describe("demo_total", "counter", "Demo counter")
+    registry.inc("demo_total", endpoint='se"arch')
+    registry.observe("demo_seconds", 0.5, buckets=(0.1, 1.0), endpoint="search")
+    registry.register_collector(lambda r: r.set_gauge("demo_depth", 3))
+    text = registry.render_prometheus()
+    assert "# HELP demo_total Demo counter" in text
+    assert 'demo_total{endpoint="se\\"arch"} 1' in text
+    assert 'demo_seconds_bucket{endpoint="search",le="0.1"} 0' in text
+    assert 'demo_seconds_bucket{endpoint="search",le="+Inf"} 1' in text
+    assert "demo_depth 3" in text
+
+
+@pytest.mark.asyncio
+async def test_rate_permit_records_status_and_latency():
+    """Responses count by status code, block errors by exception name"""
+    limiter = get_rate_limiter()
+    async with limiter.limit("https://edith.xiaohongshu.com/api/sns/web/v1/search/notes") as permit:
+        permit.set_response(200)
+    with pytest.raises(FakeBlockError):
+        async with limiter.limit("https://edith.xiaohongshu.com/api/sns/web/v1/feed", block_errors=(FakeBlockError,)) as permit:
+            permit.set_response(200)
+            raise FakeBlockError("ip blocked")
+
+    registry = get_metrics()
+    assert registry.get_counter(HTTP_REQUESTS, platform="xhs", endpoint=ENDPOINT_SEARCH, status="200") == 1
+    assert registry.get_counter(HTTP_REQUESTS, platform="xhs", endpoint=ENDPOINT_DETAIL, status="FakeBlockError") == 1
+    assert registry.get_counter(HTTP_REQUESTS, platform="xhs", endpoint=ENDPOINT_DETAIL, status="200") == 0
+    assert registry.get_histogram(HTTP_REQUEST_DURATION, platform="xhs", endpoint=ENDPOINT_SEARCH).count == 1
+    assert 'mediacrawler_rate_limit_rps{endpoint="search",platform="xhs"}' in registry.render_prometheus()
+
+
+@pytest.mark.asyncio
+async def test_store_methods_are_instrumented():
+    """Store subclasses count stored items and failures per item type"""
+
+    class _MemoryStore(AbstractStore):
+        def __init__(self):
+            self.items = []
+
+        async def store_content(self, content_item: Dict):
+            self.items.append(content_item)
+
+        async def store_comment(self, comment_item: Dict):
+            raise ValueError("disk full")
+
+        async def store_creator(self, creator: Dict):
+            self.items.append(creator)
+
+    store = _MemoryStore()
+    await store.store_content({"note_id": "1"})
+    await store.store_content({"note_id": "2"})
+    with pytest.raises(ValueError):
+        await store.store_comment({"comment_id": "1"})
+
+    registry = get_metrics()
+    labels = {"platform": "xhs", "store": "json"}
+    assert store.items == [{"note_id": "1"}, {"note_id": "2"}]
+    assert registry.get_counter(STORE_ITEMS, item_type="content", **labels) == 2
+    assert registry.get_counter(STORE_ITEMS, item_type="comment", **labels) == 0
+    assert registry.get_counter(STORE_ERRORS, item_type="comment", **labels) == 1
+
+
+@pytest.mark.asyncio
+async def test_http_client_counts_transfer_bytes():
+    """The shared client hook counts request and streamed response body bytes"""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, stream=_ChunkedStream([b"x" * 400, b"x" * 600]))
+
+    pool = HttpClientPool()
+    client = pool.get_client(None)
+    client._transport = httpx.MockTransport(handler)
+    await client.post("https://edith.xiaohongshu.com/api/sns/web/v1/search/notes", content=b"k" * 10)
+    async with client.stream("GET", "https://sns-img-qc.xhscdn.com/abc") as response:
+        async for _ in response.aiter_bytes():
+            pass
+    await pool.close()
+
+    registry = get_metrics()
+    assert registry.get_counter(HTTP_BYTES, platform="xhs", endpoint=ENDPOINT_SEARCH, direction="sent") == 10
+    assert registry.get_counter(HTTP_BYTES, platform="xhs", endpoint=ENDPOINT_SEARCH, direction="received") == 1000
+    received = sum(
+        value for (name, labels), value in registry.counter_values().items()
+        if name == HTTP_BYTES and ("direction", "received") in labels
+    )
+    assert received == 2000
+
+
+@pytest.mark.asyncio
+async def test_exporter_serves_prometheus_and_writes_snapshot(tmp_path):
+    """The Prometheus endpoint serves the text format, snapshots include per-second rates"""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    registry = get_metrics()
+    snapshot_path = tmp_path / "metrics" / "metrics.json"
+    exporter = MetricsExporter(registry, prometheus_port=port, snapshot_path=str(snapshot_path), snapshot_interval=0.05)
+    await exporter.start()
+    try:
+        registry.inc(STORE_ITEMS, 5, platform="xhs", store="json", item_type="content")
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"http://127.0.0.1:{port}/metrics")
+            assert response.status_code == 200
+            assert 'mediacrawler_store_items_total{item_type="content",platform="xhs",store="json"} 5' in response.text
+            assert (await client.get(f"http://127.0.0.1:{port}/other")).status_code == 404
+        for _ in range(100):
+            if snapshot_path.exists():
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await exporter.close()
+
+    snapshot = json.loads(snapshot_path.read_text(encoding="utf-8"))
+    assert snapshot["counters"][0]["value"] == 5
+    assert snapshot["rates"][0]["name"] == STORE_ITEMS
+    assert snapshot["interval_sec"] > 0
+    assert not (tmp_path / "metrics" / "metrics.json.tmp").exists()
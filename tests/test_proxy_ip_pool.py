@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_proxy_ip_pool.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the health-scored proxy IP pool
+"""
+
+import asyncio
+import time
+from typing import List
+
+import pytest
+
+from proxy.base_proxy import ProxyProvider
+from proxy import proxy_ip_pool
+from proxy.proxy_ip_pool import ProxyIpPool, close_ip_pools, create_ip_pool
+from proxy.types import IpInfoModel
+
+
+class FakeProvider(ProxyProvider):
+    """Hands out sequential proxies, recording every extraction"""
+
+    def __init__(self, ttl: int = 3600):
+        self.ttl = ttl
+        self.calls: List[int] = []
+        self._next_port = 8000
+
+    async def get_proxy(self, num: int) -> List[IpInfoModel]:
+        self.calls.append(num)
+        proxies = []
+        for _ in range(num):
+            proxies.append(IpInfoModel(
+                ip="127.0.0.1",
+                port=self._next_port,
+                user="",
+                password="",
+                expired_time_ts=int(time.time()) + self.ttl,
+            ))
+            self._next_port += 1
+        return proxies
+
+
+@pytest.fixture(autouse=True)
+def pool_config(monkeypatch):
+    monkeypatch.setattr("config.PROXY_VALIDATE_CONCURRENCY", 10)
+    monkeypatch.setattr("config.PROXY_PREFETCH_BEFORE_EXPIRE_SEC", 60)
+    monkeypatch.setattr("config.PROXY_REFILL_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr("config.PROXY_MAX_CONSECUTIVE_FAILURES", 3)
+
+
+def build_pool(provider: FakeProvider, count: int, invalid_ports=()) -> ProxyIpPool:
+    pool = ProxyIpPool(ip_pool_count=count, enable_validate_ip=True, ip_provider=provider)
+
+    async def fake_is_valid_proxy(proxy: IpInfoModel) -> bool:
+        await asyncio.sleep(0.1)
+        return proxy.port not in invalid_ports
+
+    pool._is_valid_proxy = fake_is_valid_proxy
+    return pool
+
+
+@pytest.mark.asyncio
+async def test_candidates_are_validated_concurrently():
+    """Validation runs in parallel and an all-invalid batch is replaced in a new round"""
+    provider = FakeProvider()
+    pool = build_pool(provider, count=5, invalid_ports={8000, 8001, 8002, 8003, 8004})
+
+    start = time.monotonic()
+    await pool.load_proxies()
+    elapsed = time.monotonic() - start
+
+    # Two rounds of 0.1s validation, not 10 serial checks
+    assert elapsed < 0.4
+    assert provider.calls == [5, 5]
+    assert [proxy.port for proxy in pool.proxy_list] == [8005, 8006, 8007, 8008, 8009]
+
+
+@pytest.mark.asyncio
+async def test_picks_by_score_and_evicts_failing_proxy():
+    """Fast, reliable proxies win; repeatedly failing proxies leave the pool"""
+    provider = FakeProvider()
+    pool = build_pool(provider, count=3)
+    await pool.load_proxies()
+    first, second, third = pool.proxy_list
+
+    pool.report_result(first, success=True, rtt=0.5)
+    pool.report_result(second, success=True, rtt=0.01)
+    pool.report_result(third, success=False)
+    assert (await pool.get_proxy()).port == second.port
+    assert pool.current_proxy.port == second.port
+
+    for _ in range(3):
+        pool.report_result(second, success=False)
+    assert second.port not in {proxy.port for proxy in pool.proxy_list}
+    assert (await pool.get_proxy()).port == first.port
+
+    # The eviction refills the pool in the background
+    await asyncio.sleep(0.2)
+    assert len(pool.proxy_list) == 3
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_prefetches_before_expiry_without_blocking():
+    """Proxies close to expiry are still served while replacements load in the background"""
+    provider = FakeProvider(ttl=45)
+    pool = build_pool(provider, count=1)
+    await pool.load_proxies()
+    expiring = pool.proxy_list[0]
+    provider.ttl = 3600
+
+    start = time.monotonic()
+    assert (await pool.get_proxy()).port == expiring.port
+    assert time.monotonic() - start < 0.05
+
+    await asyncio.sleep(0.2)
+    fresh = await pool.get_proxy()
+    assert fresh.port != expiring.port
+    assert not fresh.is_expired(60)
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_leases_spread_across_pool_with_per_proxy_cap(monkeypatch):
+    """Concurrent leases use every proxy, never exceeding the per-proxy cap"""
+    monkeypatch.setattr("config.PROXY_MAX_CONCURRENCY_PER_IP", 2)
+    pool = build_pool(FakeProvider(), count=3)
+    await pool.load_proxies()
+    active = {}
+    peak = {}
+
+    async def request():
+        async with pool.lease() as lease:
+            port = lease.proxy.port
+            active[port] = active.get(port, 0) + 1
+            peak[port] = max(peak.get(port, 0), active[port])
+            await asyncio.sleep(0.05)
+            active[port] -= 1
+
+    start = time.monotonic()
+    await asyncio.gather(*(request() for _ in range(12)))
+    # 12 requests, 3 proxies x 2 slots -> two waves
+    assert time.monotonic() - start < 0.2
+    assert set(peak) == {8000, 8001, 8002}
+    assert max(peak.values()) == 2
+    assert pool._in_flight == {}
+
+
+@pytest.mark.asyncio
+async def test_sticky_lease_and_eviction_on_block():
+    """A sticky key keeps its proxy until that proxy gets blocked"""
+
+    class FakeBlockError(Exception):
+        pass
+
+    pool = build_pool(FakeProvider(), count=2)
+    await pool.load_proxies()
+
+    async with pool.lease(sticky_key="comments:1") as lease:
+        sticky_port = lease.proxy.port
+    for _ in range(3):
+        async with pool.lease(sticky_key="comments:1") as lease:
+            assert lease.proxy.port == sticky_port
+
+    with pytest.raises(FakeBlockError):
+        async with pool.lease(sticky_key="comments:1", block_errors=(FakeBlockError,)):
+            raise FakeBlockError("ip blocked")
+    assert sticky_port not in {proxy.port for proxy in pool.proxy_list}
+
+    async with pool.lease(sticky_key="comments:1") as lease:
+        assert lease.proxy.port != sticky_port
+        assert lease.proxy_url == f"http://127.0.0.1:{lease.proxy.port}"
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_evicted_proxy_client_closed_after_last_lease(monkeypatch):
+    """The shared http client of a removed proxy is discarded once no request uses it"""
+    discarded = []
+    monkeypatch.setattr("proxy.proxy_ip_pool.discard_http_client", discarded.append)
+    pool = build_pool(FakeProvider(), count=1)
+    await pool.load_proxies()
+
+    async with pool.lease() as lease:
+        proxy_url = lease.proxy_url
+        pool.evict(lease.proxy, "blocked")
+        assert discarded == []
+    assert discarded == [proxy_url]
+
+    # The eviction triggered a background refill
+    await pool._refill_task
+    expired = pool.proxy_list[0]
+    expired.expired_time_ts = int(time.time()) - 1
+    pool._prune_expired()
+    assert discarded == [proxy_url, f"http://127.0.0.1:{expired.port}"]
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_close_ip_pools_stops_background_tasks(monkeypatch):
+    """Pools created for a crawl are closed before the crawl's event loop ends"""
+    monkeypatch.setitem(proxy_ip_pool.IpProxyProvider, "fake", FakeProvider())
+    monkeypatch.setattr("config.IP_PROXY_PROVIDER_NAME", "fake")
+    monkeypatch.setattr(ProxyIpPool, "_is_valid_proxy", lambda self, proxy: asyncio.sleep(0, result=True))
+    pool = await create_ip_pool(ip_pool_count=1, enable_validate_ip=True)
+    prefetch_task = pool._prefetch_task
+    assert prefetch_task is not None and not prefetch_task.done()
+
+    await close_ip_pools()
+    assert prefetch_task.done()
+    assert pool._prefetch_task is None
+    assert proxy_ip_pool._ip_pools == []
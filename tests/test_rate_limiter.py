@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_rate_limiter.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the adaptive per-endpoint rate limiter
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from tools.rate_limiter import (
+    ENDPOINT_COMMENTS,
+    ENDPOINT_DETAIL,
+    ENDPOINT_MEDIA,
+    ENDPOINT_SEARCH,
+    ENDPOINT_SUB_COMMENTS,
+    AdaptiveTokenBucket,
+    RateLimiter,
+    classify_endpoint,
+)
+
+
+class FakeBlockError(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def limiter_config(monkeypatch):
+    monkeypatch.setattr("config.CRAWLER_MAX_SLEEP_SEC", 0.1)
+    monkeypatch.setattr("config.ENABLE_ADAPTIVE_RATE_LIMIT", True)
+    monkeypatch.setattr("config.RATE_LIMIT_MIN_RPS", 1.0)
+    monkeypatch.setattr("config.RATE_LIMIT_MAX_RPS", 20.0)
+    monkeypatch.setattr("config.RATE_LIMIT_MEDIA_RPS", 50.0)
+    monkeypatch.setattr("config.RATE_LIMIT_BURST", 1)
+    monkeypatch.setattr("config.RATE_LIMIT_INCREASE_STEP", 1.0)
+    monkeypatch.setattr("config.RATE_LIMIT_DECREASE_FACTOR", 0.5)
+    monkeypatch.setattr("config.RATE_LIMIT_SLOW_RESPONSE_SEC", 5.0)
+
+
+def test_classify_endpoint():
+    """Endpoint families are derived from the request path, not the query string"""
+    assert classify_endpoint("https://edith.xiaohongshu.com/api/sns/web/v1/search/notes") == ENDPOINT_SEARCH
+    assert classify_endpoint("https://edith.xiaohongshu.com/api/sns/web/v2/comment/page") == ENDPOINT_COMMENTS
+    assert classify_endpoint("https://edith.xiaohongshu.com/api/sns/web/v2/comment/sub/page") == ENDPOINT_SUB_COMMENTS
+    assert classify_endpoint("https://api.bilibili.com/x/v2/reply/reply?oid=1") == ENDPOINT_SUB_COMMENTS
+    assert classify_endpoint("https://api.bilibili.com/x/v2/reply/wbi/main?oid=1") == ENDPOINT_COMMENTS
+    assert classify_endpoint("https://api.bilibili.com/x/web-interface/view/detail?q=search") == ENDPOINT_DETAIL
+    assert classify_endpoint("visionSearchPhoto") == ENDPOINT_SEARCH
+    assert classify_endpoint("commentListQuery") == ENDPOINT_COMMENTS
+    assert classify_endpoint("visionSubCommentList") == ENDPOINT_SUB_COMMENTS
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_concurrent_acquires():
+    """Concurrent callers are spaced by 1 / rate after the burst is used up"""
+    bucket = AdaptiveTokenBucket(rate=20, min_rate=1, max_rate=20, burst=1)
+    start = time.monotonic()
+    await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+    assert time.monotonic() - start >= 4 / 20 * 0.9
+
+
+@pytest.mark.asyncio
+async def test_permit_adapts_rate_per_endpoint():
+    """Successes raise the rate additively; 461, block errors and slow responses halve it"""
+    limiter = RateLimiter("xhs")
+    search_url = "https://edith.xiaohongshu.com/api/sns/web/v1/search/notes"
+
+    async with limiter.limit(search_url) as permit:
+        permit.set_response(200)
+    search_bucket = limiter.get_bucket(ENDPOINT_SEARCH)
+    assert search_bucket.rate == pytest.approx(11.0)
+
+    async with limiter.limit(search_url) as permit:
+        permit.set_response(461)
+    assert search_bucket.rate == pytest.approx(5.5)
+
+    # Several throttles within one request interval only slow down once
+    limiter.on_throttle(ENDPOINT_SEARCH, "concurrent captcha")
+    assert search_bucket.rate == pytest.approx(5.5)
+
+    detail_url = "https://edith.xiaohongshu.com/api/sns/web/v1/feed"
+    with pytest.raises(FakeBlockError):
+        async with limiter.limit(detail_url, block_errors=(FakeBlockError,)):
+            raise FakeBlockError("ip blocked")
+    assert limiter.get_bucket(ENDPOINT_DETAIL).rate == pytest.approx(5.0)
+
+    # Other errors are neutral, media has its own initial rate
+    with pytest.raises(ValueError):
+        async with limiter.limit(detail_url):
+            raise ValueError("bad payload")
+    assert limiter.get_bucket(ENDPOINT_DETAIL).rate == pytest.approx(5.0)
+    assert limiter.get_bucket(ENDPOINT_MEDIA).rate == pytest.approx(50.0)
+    assert search_bucket.rate == pytest.approx(5.5)
+
+
+def test_fixed_rate_when_adaptation_disabled(monkeypatch):
+    """Without adaptation the bucket keeps 1 / CRAWLER_MAX_SLEEP_SEC"""
+    monkeypatch.setattr("config.ENABLE_ADAPTIVE_RATE_LIMIT", False)
+    bucket = RateLimiter("dy").get_bucket(ENDPOINT_COMMENTS)
+    bucket.on_success()
+    assert not bucket.on_throttle()
+    assert bucket.rate == pytest.approx(10.0)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_response_cache.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+"""
+Unit tests for the persistent HTTP response cache
+"""
+
+import json
+
+import pytest
+
+from media_platform.xhs import client as xhs_client_module
+from media_platform.xhs.client import XiaoHongShuClient
+from media_platform.xhs.extractor import XiaoHongShuExtractor
+from tools import response_cache
+from tools.response_cache import (
+    CACHE_NOTE_DETAIL,
+    CACHE_PLAY_URL,
+    ResponseCache,
+    build_cache_key,
+)
+
+
+@pytest.fixture(autouse=True)
+def cache_ttls(monkeypatch):
+    monkeypatch.setattr("config.RESPONSE_CACHE_TTL_HOURS", {"note_detail": 24, "creator_info": 24, "play_url": 0})
+
+
+def test_cache_key_ignores_volatile_params():
+    """Signatures, timestamps and tokens do not change the key; real params do"""
+    base = build_cache_key("get", "/x/web-interface/view/detail", {"bvid": "BV1", "aid": 1})
+    assert base == build_cache_key("GET", "/x/web-interface/view/detail?aid=1", {"bvid": "BV1", "wts": 1, "w_rid": "abc"})
+    assert base != build_cache_key("GET", "/x/web-interface/view/detail", {"bvid": "BV2", "aid": 1})
+    assert base != build_cache_key("POST", "/x/web-interface/view/detail", {"bvid": "BV1", "aid": 1})
+
+    feed = {"source_note_id": "n1", "xsec_token": "t1", "extra": {"need_body_topic": 1}}
+    assert build_cache_key("POST", "/feed", feed) == build_cache_key("POST", "/feed", {**feed, "xsec_token": "t2"})
+
+
+@pytest.mark.asyncio
+async def test_fetch_persists_across_runs(tmp_path, monkeypatch):
+    """A second cache instance on the same file serves the response without a request"""
+    db_path = str(tmp_path / "response_cache.db")
+    calls = []
+
+    async def request():
+        calls.append(1)
+        return {"items": [{"note_card": {"note_id": "n1"}}]}
+
+    first_run = ResponseCache(db_path, "xhs")
+    assert await first_run.fetch(CACHE_NOTE_DETAIL, "POST", "/feed", {"id": "n1"}, request) == await request()
+    await first_run.close()
+
+    second_run = ResponseCache(db_path, "xhs")
+    assert await second_run.fetch(CACHE_NOTE_DETAIL, "POST", "/feed", {"id": "n1", "ts": 2}, request) == await request()
+    assert len(calls) == 3  # one real fetch plus the two comparisons above
+    assert second_run.stats() == {CACHE_NOTE_DETAIL: {"hits": 1, "misses": 0, "hit_rate": 1.0}}
+
+    # Other platforms do not share entries, and expired entries are refetched
+    other_platform = ResponseCache(db_path, "dy")
+    await other_platform.fetch(CACHE_NOTE_DETAIL, "POST", "/feed", {"id": "n1"}, request)
+    assert len(calls) == 4
+    monkeypatch.setattr(response_cache.time, "time", lambda: 10 ** 12)
+    await second_run.fetch(CACHE_NOTE_DETAIL, "POST", "/feed", {"id": "n1"}, request)
+    assert len(calls) == 5
+    await second_run.close()
+    await other_platform.close()
+
+
+@pytest.mark.asyncio
+async def test_empty_and_disabled_responses_are_not_cached(tmp_path):
+    """Empty payloads and endpoints with a zero TTL always hit the network"""
+    cache = ResponseCache(str(tmp_path / "response_cache.db"), "bili")
+    responses = [{}, {"durl": ["a"]}, {"durl": ["b"]}]
+
+    async def request():
+        return responses.pop(0)
+
+    assert await cache.fetch(CACHE_NOTE_DETAIL, "GET", "/view", {"aid": 1}, request) == {}
+    assert await cache.fetch(CACHE_PLAY_URL, "GET", "/playurl", {"aid": 1}, request) == {"durl": ["a"]}
+    assert await cache.fetch(CACHE_PLAY_URL, "GET", "/playurl", {"aid": 1}, request) == {"durl": ["b"]}
+    assert cache.stats() == {CACHE_NOTE_DETAIL: {"hits": 0, "misses": 1, "hit_rate": 0.0}}
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_xhs_captcha_page_is_not_cached(tmp_path, monkeypatch):
+    """Only a parsed note detail is cached; a captcha page is requested again next time"""
+    cache = ResponseCache(str(tmp_path / "response_cache.db"), "xhs")
+    monkeypatch.setattr(xhs_client_module, "get_response_cache", lambda: cache)
+    state = {"note": {"noteDetailMap": {"n1": {"note": {"noteId": "n1"}}}}}
+    pages = [
+        "<html>captcha</html>",
+        f"<script>window.__INITIAL_STATE__={json.dumps(state)}</script>",
+    ]
+    requested = []
+
+    async def request(method, url, **kwargs):
+        requested.append(url)
+        return pages.pop(0)
+
+    client = XiaoHongShuClient.__new__(XiaoHongShuClient)
+    client.headers = {"Cookie": ""}
+    client._extractor = XiaoHongShuExtractor()
+    client.request = request
+
+    try:
+        assert await client.get_note_by_id_from_html("n1", "pc_search", "t1") is None
+        for _ in range(2):
+            assert await client.get_note_by_id_from_html("n1", "pc_search", "t1") == {"note_id": "n1"}
+        assert len(requested) == 2
+    finally:
+        await cache.close()
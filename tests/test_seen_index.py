@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_seen_index.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the cross-run seen-ID index
+"""
+
+import pytest
+
+from tools import seen_index as seen_index_module
+from tools.seen_index import ITEM_COMMENTS, ITEM_CONTENT, SeenIndex
+
+
+@pytest.fixture(autouse=True)
+def seen_ttl(monkeypatch):
+    monkeypatch.setattr("config.SEEN_INDEX_CONTENT_TTL_HOURS", 24)
+    monkeypatch.setattr("config.SEEN_INDEX_COMMENT_TTL_HOURS", 1)
+
+
+class TestSeenIndex:
+    """Test cases for SeenIndex"""
+
+    @pytest.mark.asyncio
+    async def test_filter_unseen_respects_ttl(self, tmp_path, monkeypatch):
+        """Items are skipped until their TTL expires, per item type"""
+        now = [1_000_000.0]
+        monkeypatch.setattr(seen_index_module.time, "time", lambda: now[0])
+        index = SeenIndex(str(tmp_path / "seen.db"), "xhs")
+
+        await index.mark_seen(ITEM_CONTENT, ["n1", "n2"])
+        await index.mark_seen(ITEM_COMMENTS, ["n1"])
+        assert await index.filter_unseen(ITEM_CONTENT, ["n1", "n3", "n2"]) == ["n3"]
+        assert await index.is_fresh(ITEM_COMMENTS, "n1")
+
+        now[0] += 2 * 3600
+        assert not await index.is_fresh(ITEM_COMMENTS, "n1")
+        assert await index.filter_unseen(ITEM_CONTENT, ["n1"]) == []
+
+        now[0] += 24 * 3600
+        assert await index.filter_unseen(ITEM_CONTENT, ["n1", "n2"]) == ["n1", "n2"]
+        await index.close()
+
+    @pytest.mark.asyncio
+    async def test_platforms_are_isolated(self, tmp_path):
+        """The same ID on another platform is not considered seen"""
+        db_path = str(tmp_path / "seen.db")
+        xhs_index, dy_index = SeenIndex(db_path, "xhs"), SeenIndex(db_path, "dy")
+        await xhs_index.mark_seen(ITEM_CONTENT, [123])
+        assert await dy_index.filter_unseen(ITEM_CONTENT, [123]) == ["123"]
+        assert await xhs_index.filter_unseen(ITEM_CONTENT, [123]) == []
+        await xhs_index.close()
+        await dy_index.close()
+
+    @pytest.mark.asyncio
+    async def test_close_warns_with_skipped_totals(self, tmp_path, monkeypatch):
+        """Closing the index logs how many items of each type this run skipped"""
+        warnings = []
+        monkeypatch.setattr(seen_index_module.utils.logger, "warning", warnings.append)
+        index = SeenIndex(str(tmp_path / "seen.db"), "xhs")
+        await index.mark_seen(ITEM_CONTENT, ["n1", "n2"])
+        await index.filter_unseen(ITEM_CONTENT, ["n1", "n3"])
+        await index.filter_unseen(ITEM_CONTENT, ["n2"])
+        warnings.clear()
+
+        await index.close()
+        assert len(warnings) == 1
+        assert f"2 {ITEM_CONTENT}" in warnings[0] and "ENABLE_SEEN_INDEX" in warnings[0]
+
+    @pytest.mark.asyncio
+    async def test_disabled_or_zero_ttl_keeps_everything(self, tmp_path, monkeypatch):
+        """A disabled index or a zero TTL never skips anything"""
+        index = SeenIndex(str(tmp_path / "seen.db"), "xhs")
+        await index.mark_seen(ITEM_CONTENT, ["n1"])
+        monkeypatch.setattr("config.SEEN_INDEX_CONTENT_TTL_HOURS", 0)
+        assert await index.filter_unseen(ITEM_CONTENT, ["n1"]) == ["n1"]
+        await index.close()
+
+        disabled = SeenIndex(str(tmp_path / "other.db"), "xhs", enabled=False)
+        await disabled.mark_seen(ITEM_CONTENT, ["n1"])
+        assert not (tmp_path / "other.db").exists()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_shard_runner.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the multi-process shard runner
+"""
+
+import csv
+import json
+import os
+
+import pytest
+
+import config
+from tools.shard_runner import ShardRunner, apply_shard_items, merge_shard_files, split_into_shards
+
+
+async def record_shard_items():
+    """Crawl function executed inside the worker processes"""
+    os.makedirs("data", exist_ok=True)
+    with open(f"data/shard{config.CRAWLER_SHARD_ID}.json", "w", encoding="utf-8") as f:
+        json.dump({"keywords": config.KEYWORDS, "user_data_dir": config.USER_DATA_DIR}, f)
+    if "boom" in config.KEYWORDS:
+        raise RuntimeError("boom")
+
+
+def test_split_and_apply_shards(monkeypatch):
+    """Items are distributed round robin and lists are replaced in place"""
+    assert split_into_shards(list("abcde"), 2) == [["a", "c", "e"], ["b", "d"]]
+    assert split_into_shards(["a"], 3) == [["a"]]
+
+    creator_list = ["1", "2", "3"]
+    monkeypatch.setattr(config, "XHS_CREATOR_ID_LIST", creator_list)
+    apply_shard_items("XHS_CREATOR_ID_LIST", ["2"])
+    assert creator_list == ["2"]
+
+
+def test_merge_shard_files(tmp_path, monkeypatch):
+    """Per-shard csv/json/jsonl files are merged into the regular file name"""
+    monkeypatch.chdir(tmp_path)
+    for file_type in ("csv", "json", "jsonl"):
+        os.makedirs(f"data/xhs/{file_type}")
+    for shard_id in range(2):
+        with open(f"data/xhs/csv/search_contents_2025-01-01_shard{shard_id}.csv", "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.DictWriter(f, fieldnames=["note_id", "title"])
+            writer.writeheader()
+            writer.writerow({"note_id": str(shard_id), "title": f"t{shard_id}"})
+        with open(f"data/xhs/json/search_contents_2025-01-01_shard{shard_id}.json", "w", encoding="utf-8") as f:
+            json.dump([{"note_id": str(shard_id)}], f)
+        with open(f"data/xhs/jsonl/search_contents_2025-01-01_shard{shard_id}.jsonl", "w", encoding="utf-8") as f:
+            f.write(json.dumps({"note_id": str(shard_id)}) + "\n")
+
+    assert merge_shard_files("xhs", "csv") == ["data/xhs/csv/search_contents_2025-01-01.csv"]
+    merge_shard_files("xhs", "json")
+    merge_shard_files("xhs", "jsonl")
+
+    with open("data/xhs/csv/search_contents_2025-01-01.csv", newline="", encoding="utf-8-sig") as f:
+        assert [row["note_id"] for row in csv.DictReader(f)] == ["0", "1"]
+    with open("data/xhs/json/search_contents_2025-01-01.json", encoding="utf-8") as f:
+        assert json.load(f) == [{"note_id": "0"}, {"note_id": "1"}]
+    with open("data/xhs/jsonl/search_contents_2025-01-01.jsonl", encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+    assert not [name for name in os.listdir("data/xhs/csv") if "_shard" in name]
+
+
+def test_runner_reports_per_shard_results(tmp_path, monkeypatch):
+    """Each worker process gets its own keywords and browser profile; failures are reported"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "PLATFORM", "xhs")
+    monkeypatch.setattr(config, "CRAWLER_TYPE", "search")
+    monkeypatch.setattr(config, "KEYWORDS", "a,b,boom")
+
+    results = ShardRunner(3, record_shard_items).run()
+
+    assert [result.status for result in results] == ["done", "done", "failed"]
+    assert "boom" in results[2].error
+    with open("data/shard1.json", encoding="utf-8") as f:
+        shard = json.load(f)
+    assert shard["keywords"] == "b"
+    assert shard["user_data_dir"].endswith("_shard1")
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_sub_comment_fanout.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the bounded-concurrency sub-comment expansion across root comments
+"""
+
+import asyncio
+from functools import partial
+from typing import List
+
+import pytest
+
+from media_platform.douyin.client import DouYinClient
+from media_platform.xhs.client import XiaoHongShuClient
+from tools.crawl_pipeline import merge_page_streams
+
+
+class _ConcurrencyProbe:
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.cancelled = 0
+
+    async def stream(self, name: str, pages: int = 2, fail: bool = False):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            for page in range(pages):
+                await asyncio.sleep(0.01)
+                if fail:
+                    raise RuntimeError(f"{name} failed")
+                yield [f"{name}-{page}"]
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.active -= 1
+
+
+@pytest.mark.asyncio
+async def test_merge_page_streams_bounds_concurrency():
+    """At most `concurrency` streams run at once and every page is yielded"""
+    probe = _ConcurrencyProbe()
+    streams = [partial(probe.stream, f"root{i}") for i in range(7)]
+    pages = [page async for page in merge_page_streams(streams, 3)]
+
+    assert sorted(item for page in pages for item in page) == sorted(
+        f"root{i}-{p}" for i in range(7) for p in range(2)
+    )
+    assert 1 < probe.max_active <= 3
+    assert probe.active == 0
+
+
+@pytest.mark.asyncio
+async def test_merge_page_streams_propagates_errors_and_cancels():
+    """A failing stream stops the others and surfaces its error to the consumer"""
+    probe = _ConcurrencyProbe()
+    streams = [partial(probe.stream, "slow", pages=100), partial(probe.stream, "bad", fail=True)]
+    with pytest.raises(RuntimeError, match="bad failed"):
+        async for _ in merge_page_streams(streams, 2):
+            pass
+    assert probe.cancelled == 1
+    assert probe.active == 0
+
+
+@pytest.mark.asyncio
+async def test_merge_page_streams_early_exit_cancels_streams():
+    """Closing the merged iterator early stops the streams still running"""
+    probe = _ConcurrencyProbe()
+    merged = merge_page_streams([partial(probe.stream, f"root{i}", pages=100) for i in range(4)], 2)
+    first = await merged.__anext__()
+    await merged.aclose()
+
+    assert first
+    assert probe.active == 0
+    assert probe.cancelled == 2
+
+
+@pytest.mark.asyncio
+async def test_xhs_and_douyin_sub_comments_fan_out(monkeypatch):
+    """Roots are expanded in parallel up to SUB_COMMENT_CONCURRENCY, keeping each root's page order"""
+    monkeypatch.setattr("config.ENABLE_GET_SUB_COMMENTS", True)
+    monkeypatch.setattr("config.SUB_COMMENT_CONCURRENCY", 2)
+    active = {"now": 0, "max": 0}
+
+    async def fetch(root: str, cursor: int):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        return [f"{root}-{cursor}"], cursor + 1, cursor + 1 < 3
+
+    async def get_note_sub_comments(note_id, root_comment_id, xsec_token, num=10, cursor=""):
+        page, next_cursor, has_more = await fetch(root_comment_id, int(cursor or 0))
+        return {"comments": page, "cursor": str(next_cursor), "has_more": has_more}
+
+    xhs = XiaoHongShuClient.__new__(XiaoHongShuClient)
+    xhs.get_note_sub_comments = get_note_sub_comments
+    roots = [
+        {"id": f"r{i}", "note_id": "n1", "sub_comments": [f"r{i}-inline"], "sub_comment_has_more": True}
+        for i in range(4)
+    ]
+    pages: List[List[str]] = [page async for page in xhs.iter_sub_comments(roots, "token")]
+    assert active["max"] == 2
+    for i in range(4):
+        root_pages = [page[0] for page in pages if page[0].startswith(f"r{i}-")]
+        assert root_pages == [f"r{i}-inline", f"r{i}-0", f"r{i}-1", f"r{i}-2"]
+
+    async def get_sub_comments(aweme_id, comment_id, cursor=0):
+        page, next_cursor, has_more = await fetch(comment_id, cursor)
+        return {"comments": page, "cursor": next_cursor, "has_more": int(has_more)}
+
+    active["max"] = 0
+    douyin = DouYinClient.__new__(DouYinClient)
+    douyin.get_sub_comments = get_sub_comments
+    roots = [{"cid": f"c{i}", "reply_comment_total": 0 if i == 1 else 3} for i in range(4)]
+    pages = [page async for page in douyin.iter_sub_comments("a1", roots)]
+    assert active["max"] == 2
+    assert sorted(page[0] for page in pages) == sorted(f"c{i}-{p}" for i in (0, 2, 3) for p in range(3))
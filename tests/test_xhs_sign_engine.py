@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tests/test_xhs_sign_engine.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+Unit tests for the XHS sign engines
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+
+from media_platform.xhs.client import XiaoHongShuClient
+from media_platform.xhs.sign_engine import (
+    BatchedPlaywrightSignEngine,
+    PlaywrightSignEngine,
+    create_sign_engine,
+)
+
+
+class FakePage:
+    """Minimal stand-in for a playwright Page"""
+
+    def __init__(self, fail_batch: bool = False):
+        self.fail_batch = fail_batch
+        self.batch_calls = []
+        self.single_calls = 0
+        self.b1_calls = 0
+        self.b1 = "b1_value"
+
+    async def evaluate(self, expression, arg=None):
+        await asyncio.sleep(0)
+        if "localStorage" in expression:
+            self.b1_calls += 1
+            return self.b1 if "getItem" in expression else {"b1": self.b1}
+        if arg is not None:
+            if self.fail_batch:
+                raise RuntimeError("batch evaluate failed")
+            self.batch_calls.append(len(arg))
+            return [f"x3:{md5_str}" for _, md5_str in arg]
+        self.single_calls += 1
+        return "x3:single"
+
+
+@pytest.fixture(autouse=True)
+def batch_config(monkeypatch):
+    monkeypatch.setattr('config.XHS_SIGN_BATCH_WINDOW_MS', 5)
+    monkeypatch.setattr('config.XHS_SIGN_BATCH_MAX_SIZE', 32)
+
+
+class TestBatchedPlaywrightSignEngine:
+    """Test cases for BatchedPlaywrightSignEngine"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_signs_share_one_evaluate(self):
+        """Concurrent sign requests are coalesced into one batch"""
+        page = FakePage()
+        engine = BatchedPlaywrightSignEngine(page)
+        results = await asyncio.gather(*[
+            engine.sign("/api/sns/web/v1/feed", {"source_note_id": str(i)}, a1="a1") for i in range(10)
+        ])
+        assert page.batch_calls == [10]
+        assert len({result["x-s"] for result in results}) == 10
+        assert all(set(result) == {"x-s", "x-t", "x-s-common", "x-b3-traceid"} for result in results)
+
+    @pytest.mark.asyncio
+    async def test_b1_cached_until_invalidated(self):
+        """b1 is read once per login state"""
+        page = FakePage()
+        engine = BatchedPlaywrightSignEngine(page)
+        await engine.sign("/api/a", {"k": 1}, a1="a1")
+        await engine.sign("/api/b", {"k": 2}, a1="a1")
+        assert page.b1_calls == 1
+
+        engine.invalidate()
+        await engine.sign("/api/c", {"k": 3}, a1="a1")
+        assert page.b1_calls == 2
+
+        await engine.sign("/api/d", {"k": 4}, a1="another_a1")
+        assert page.b1_calls == 3
+
+    @pytest.mark.asyncio
+    async def test_fallback_to_single_sign(self):
+        """A failed batch falls back to the per-call signer"""
+        page = FakePage(fail_batch=True)
+        engine = BatchedPlaywrightSignEngine(page)
+        await asyncio.gather(*[engine.sign("/api/a", {"k": i}, a1="a1") for i in range(3)])
+        assert page.single_calls == 3
+
+
+def test_create_sign_engine():
+    """Engines are selected by name"""
+    page = FakePage()
+    assert isinstance(create_sign_engine(page, "playwright"), PlaywrightSignEngine)
+    assert isinstance(create_sign_engine(page, "batched"), BatchedPlaywrightSignEngine)
+    with pytest.raises(ValueError):
+        create_sign_engine(page, "unknown")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_keep_their_own_signature(monkeypatch):
+    """Each request is signed after its permit wait and never shares the header dict"""
+    events = []
+
+    class FakeSignEngine:
+        async def sign(self, uri, data, a1, method):
+            events.append(("sign", uri))
+            return {"x-s": f"xs:{uri}", "x-t": "1", "x-s-common": "common", "x-b3-traceid": "trace"}
+
+    class FakePermit:
+        def __init__(self, url):
+            self.url = url
+
+        async def start(self):
+            events.append(("start", self.url))
+
+        def set_response(self, status_code):
+            pass
+
+    class FakeLimiter:
+        @asynccontextmanager
+        async def limit(self, url, block_errors=(), defer_start=False):
+            events.append(("permit", url))
+            # The slower endpoint waits longer for its token
+            await asyncio.sleep(0.02 if url.endswith("/api/slow") else 0)
+            yield FakePermit(url)
+
+    class FakeHttpClient:
+        async def request(self, method, url, **kwargs):
+            sent[url] = kwargs["headers"]["X-S"]
+            return httpx.Response(200, json={"success": True, "data": {}})
+
+    sent = {}
+    monkeypatch.setattr("media_platform.xhs.client.get_rate_limiter", lambda: FakeLimiter())
+    monkeypatch.setattr("media_platform.xhs.client.get_http_client", lambda proxy: FakeHttpClient())
+    client = XiaoHongShuClient.__new__(XiaoHongShuClient)
+    client.headers = {"Cookie": "a1=x"}
+    client.cookie_dict = {"a1": "x"}
+    client.proxy = None
+    client.timeout = 1
+    client._host = "https://edith.xiaohongshu.com"
+    client._sign_engine = FakeSignEngine()
+    client.init_proxy_pool(None)
+
+    await asyncio.gather(client.get("/api/slow", {"k": 1}), client.post("/api/fast", {"k": 2}))
+
+    assert sent == {
+        "https://edith.xiaohongshu.com/api/slow": "xs:/api/slow",
+        "https://edith.xiaohongshu.com/api/fast": "xs:/api/fast",
+    }
+    assert client.headers == {"Cookie": "a1=x"}
+    slow_url = "https://edith.xiaohongshu.com/api/slow"
+    # Signed after the token wait, but before the in-flight slot is taken
+    assert events.index(("permit", slow_url)) < events.index(("sign", "/api/slow")) < events.index(("start", slow_url))
@@ -18,15 +18,288 @@
 
 import asyncio
 import csv
+import io
 import json
 import os
 import pathlib
-from typing import Dict, List
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Set
 import aiofiles
 import config
+from tools.metrics import MetricsRegistry, get_metrics
+from tools.shard_runner import get_shard_file_suffix
 from tools.utils import utils
 from tools.words import AsyncWordCloudGenerator
 
+
+class BufferedFileSink(ABC):
+    """
+    追加写入缓冲基类（按文件路径全局共享）
+
+    store 实现每条数据都会新建 AsyncFileWriter，因此缓冲区需要按文件路径共享：
+    数据先序列化到内存缓冲区，达到批量条数或距上次刷新超过刷新间隔时批量追加到文件，
+    程序结束时由 close_all 刷新剩余数据。子类各自声明 _instances / _flush_cron_task。
+    """
+
+    _instances: Dict[str, "BufferedFileSink"] = {}
+    _flush_cron_task: Optional[asyncio.Task] = None
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.lock = asyncio.Lock()
+        self._last_flush_ts = time.monotonic()
+
+    @classmethod
+    def get_instance(cls, file_path: str) -> "BufferedFileSink":
+        if file_path not in cls._instances:
+            cls._instances[file_path] = cls(file_path)
+        cls._ensure_flush_cron()
+        return cls._instances[file_path]
+
+    @classmethod
+    def get_file_paths(cls) -> List[str]:
+        """
+        本次运行中写入过的所有文件路径
+        :return:
+        """
+        return list(cls._instances.keys())
+
+    @classmethod
+    @abstractmethod
+    def _batch_size(cls) -> int:
+        pass
+
+    @classmethod
+    @abstractmethod
+    def _flush_interval(cls) -> float:
+        pass
+
+    @property
+    @abstractmethod
+    def buffered_count(self) -> int:
+        pass
+
+    @abstractmethod
+    def _append(self, item: Dict):
+        pass
+
+    @abstractmethod
+    async def _write_buffer(self):
+        """
+        把缓冲区追加到文件，调用方持有 self.lock
+        """
+        pass
+
+    async def write(self, item: Dict):
+        self._append(item)
+        if (
+            self.buffered_count >= self._batch_size()
+            or time.monotonic() - self._last_flush_ts >= self._flush_interval()
+        ):
+            await self.flush()
+
+    async def flush(self):
+        async with self.lock:
+            self._last_flush_ts = time.monotonic()
+            if not self.buffered_count:
+                return
+            await self._write_buffer()
+
+    async def close(self):
+        await self.flush()
+
+    @classmethod
+    async def flush_all(cls):
+        for sink in list(cls._instances.values()):
+            await sink.flush()
+
+    @classmethod
+    async def close_all(cls):
+        """
+        停止定时刷新任务并刷新所有缓冲区，程序退出前调用
+        :return:
+        """
+        task, cls._flush_cron_task = cls._flush_cron_task, None
+        if task is not None and not task.done():
+            try:
+                task.cancel()
+            except RuntimeError:
+                # 任务所属的事件循环已关闭
+                pass
+        for sink in list(cls._instances.values()):
+            await sink.close()
+
+    @classmethod
+    def _ensure_flush_cron(cls):
+        if cls._flush_cron_task is not None and not cls._flush_cron_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        cls._flush_cron_task = loop.create_task(cls._start_flush_cron())
+
+    @classmethod
+    async def _start_flush_cron(cls):
+        """
+        定时刷新缓冲区，避免爬取间隙数据长时间停留在内存中
+        :return:
+        """
+        while True:
+            await asyncio.sleep(cls._flush_interval())
+            try:
+                await cls.flush_all()
+            except Exception as e:
+                utils.logger.error(f"[{cls.__name__}._start_flush_cron] flush error: {e}")
+
+
+class JsonlFileSink(BufferedFileSink):
+    """
+    JSONL 追加写入缓冲，达到 JSONL_FLUSH_BATCH_SIZE 条或距上次刷新超过 JSONL_FLUSH_INTERVAL_SEC 秒时批量写入
+    """
+
+    _instances: Dict[str, "JsonlFileSink"] = {}
+    _flush_cron_task: Optional[asyncio.Task] = None
+
+    def __init__(self, file_path: str):
+        super().__init__(file_path)
+        self._buffer: List[str] = []
+
+    @classmethod
+    def _batch_size(cls) -> int:
+        return config.JSONL_FLUSH_BATCH_SIZE
+
+    @classmethod
+    def _flush_interval(cls) -> float:
+        return config.JSONL_FLUSH_INTERVAL_SEC
+
+    @property
+    def buffered_count(self) -> int:
+        return len(self._buffer)
+
+    def _append(self, item: Dict):
+        self._buffer.append(json.dumps(item, ensure_ascii=False))
+
+    async def _write_buffer(self):
+        lines, self._buffer = self._buffer, []
+        async with aiofiles.open(self.file_path, 'a', encoding='utf-8') as f:
+            await f.write("\n".join(lines) + "\n")
+
+
+class CsvFileSink(BufferedFileSink):
+    """
+    CSV 追加写入缓冲，达到 CSV_FLUSH_BATCH_SIZE 条或距上次刷新超过 CSV_FLUSH_INTERVAL_SEC 秒时批量写入
+
+    - 列在第一次写入时固定：文件已存在时沿用它的表头，否则取第一条数据的字段；
+      之后缺少的列留空，多出的字段丢弃并记录一次警告，不会出现列错位
+    - 数据写入时即格式化为 CSV 文本放在缓冲区，文件句柄在第一次刷新时打开并保持到 close_all
+    """
+
+    _instances: Dict[str, "CsvFileSink"] = {}
+    _flush_cron_task: Optional[asyncio.Task] = None
+
+    def __init__(self, file_path: str):
+        super().__init__(file_path)
+        self.fieldnames: Optional[List[str]] = None
+        self._buffer = io.StringIO()
+        self._buffered_rows = 0
+        self._writer: Optional[csv.DictWriter] = None
+        self._dropped_fields: Set[str] = set()
+        self._file = None
+
+    @classmethod
+    def _batch_size(cls) -> int:
+        return config.CSV_FLUSH_BATCH_SIZE
+
+    @classmethod
+    def _flush_interval(cls) -> float:
+        return config.CSV_FLUSH_INTERVAL_SEC
+
+    @property
+    def buffered_count(self) -> int:
+        return self._buffered_rows
+
+    def _read_existing_header(self) -> Optional[List[str]]:
+        if not os.path.exists(self.file_path) or os.path.getsize(self.file_path) == 0:
+            return None
+        with open(self.file_path, 'r', newline='', encoding='utf-8-sig') as f:
+            return next(csv.reader(f), None) or None
+
+    def _append(self, item: Dict):
+        if self._writer is None:
+            existing_header = self._read_existing_header()
+            self.fieldnames = existing_header or list(item.keys())
+            self._writer = csv.DictWriter(self._buffer, fieldnames=self.fieldnames, restval="", extrasaction="ignore")
+            if existing_header is None:
+                self._writer.writeheader()
+
+        dropped_fields = item.keys() - set(self.fieldnames) - self._dropped_fields
+        if dropped_fields:
+            self._dropped_fields.update(dropped_fields)
+            utils.logger.warning(
+                f"[CsvFileSink._append] fields {sorted(dropped_fields)} are not in the columns of {self.file_path}, dropped"
+            )
+        self._writer.writerow(item)
+        self._buffered_rows += 1
+
+    async def _write_buffer(self):
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._buffered_rows = 0
+        if self._file is None:
+            self._file = await aiofiles.open(self.file_path, 'a', newline='', encoding='utf-8-sig')
+        await self._file.write(data)
+        await self._file.flush()
+
+    async def close(self):
+        await self.flush()
+        async with self.lock:
+            file, self._file = self._file, None
+            if file is not None:
+                await file.close()
+
+
+def _collect_file_sink_metrics(registry: MetricsRegistry):
+    registry.set_gauge(
+        "mediacrawler_jsonl_buffered_rows", sum(sink.buffered_count for sink in JsonlFileSink._instances.values())
+    )
+    registry.set_gauge(
+        "mediacrawler_csv_buffered_rows", sum(sink.buffered_count for sink in CsvFileSink._instances.values())
+    )
+
+
+get_metrics().register_collector(_collect_file_sink_metrics)
+
+
+async def convert_jsonl_to_json(jsonl_file_path: str) -> str:
+    """
+    将 JSONL 文件流式转换为旧版 JSON 数组格式（与 write_single_item_to_json 的输出格式一致），
+    输出到同平台的 json 目录下，已存在的同名文件会被覆盖
+    :param jsonl_file_path: JSONL 文件路径，如 data/xhs/jsonl/search_contents_2025-01-01.jsonl
+    :return: 生成的 JSON 文件路径
+    """
+    jsonl_path = pathlib.Path(jsonl_file_path)
+    json_dir = jsonl_path.parent.parent / "json"
+    json_dir.mkdir(parents=True, exist_ok=True)
+    json_file_path = str(json_dir / f"{jsonl_path.stem}.json")
+
+    async with aiofiles.open(jsonl_file_path, 'r', encoding='utf-8') as src, \
+            aiofiles.open(json_file_path, 'w', encoding='utf-8') as dst:
+        await dst.write("[")
+        first = True
+        async for line in src:
+            line = line.strip()
+            if not line:
+                continue
+            item_str = json.dumps(json.loads(line), ensure_ascii=False, indent=4)
+            item_str = "\n".join("    " + item_line for item_line in item_str.split("\n"))
+            await dst.write(("\n" if first else ",\n") + item_str)
+            first = False
+        await dst.write("]" if first else "\n]")
+    return json_file_path
+
 class AsyncFileWriter:
     def __init__(self, platform: str, crawler_type: str):
         self.lock = asyncio.Lock()
@@ -37,18 +310,18 @@ class AsyncFileWriter:
     def _get_file_path(self, file_type: str, item_type: str) -> str:
         base_path = f"data/{self.platform}/{file_type}"
         pathlib.Path(base_path).mkdir(parents=True, exist_ok=True)
-        file_name = f"{self.crawler_type}_{item_type}_{utils.get_current_date()}.{file_type}"
+        file_name = f"{self.crawler_type}_{item_type}_{utils.get_current_date()}{get_shard_file_suffix()}.{file_type}"
         return f"{base_path}/{file_name}"
 
     async def write_to_csv(self, item: Dict, item_type: str):
+        """
+        追加写入 CSV，数据先进入缓冲区再批量落盘，列在文件第一次写入时固定
+        :param item:
+        :param item_type:
+        :return:
+        """
         file_path = self._get_file_path('csv', item_type)
-        async with self.lock:
-            file_exists = os.path.exists(file_path)
-            async with aiofiles.open(file_path, 'a', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=item.keys())
-                if not file_exists or await f.tell() == 0:
-                    await writer.writeheader()
-                await writer.writerow(item)
+        await CsvFileSink.get_instance(file_path).write(item)
 
     async def write_single_item_to_json(self, item: Dict, item_type: str):
         file_path = self._get_file_path('json', item_type)
@@ -70,6 +343,16 @@ class AsyncFileWriter:
             async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
                 await f.write(json.dumps(existing_data, ensure_ascii=False, indent=4))
 
+    async def write_to_jsonl(self, item: Dict, item_type: str):
+        """
+        以 JSON Lines 格式追加写入，数据先进入缓冲区再批量落盘
+        :param item:
+        :param item_type:
+        :return:
+        """
+        file_path = self._get_file_path('jsonl', item_type)
+        await JsonlFileSink.get_instance(file_path).write(item)
+
     async def generate_wordcloud_from_comments(self):
         """
         Generate wordcloud from comments data
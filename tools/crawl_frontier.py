@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/crawl_frontier.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 持久化的爬取进度（crawl frontier），记录每个工作单元（关键词分页、日期窗口、帖子评论游标）的状态，
+#            每爬完一页或一个评论游标后写入检查点，--resume 时从上次中断的位置继续，不重复请求已完成的分页
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+import aiosqlite
+
+import config
+from tools import utils
+
+STATE_IN_PROGRESS = "in_progress"
+STATE_DONE = "done"
+
+_CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS crawl_frontier (
+    unit_key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    state TEXT NOT NULL,
+    cursor TEXT,
+    payload TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+
+_UPSERT_SQL = """
+INSERT INTO crawl_frontier (unit_key, kind, state, cursor, payload, updated_at)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(unit_key) DO UPDATE SET
+    kind = excluded.kind,
+    state = excluded.state,
+    cursor = excluded.cursor,
+    payload = excluded.payload,
+    updated_at = excluded.updated_at
+"""
+
+
+class FrontierUnit:
+    """
+    一个工作单元的进度
+
+    cursor: 下一次请求使用的分页/游标（新单元为 None）
+    payload: 恢复时需要的其他状态，如已爬取数量、搜索会话 ID
+    """
+
+    def __init__(
+        self,
+        frontier: "CrawlFrontier",
+        key: str,
+        kind: str,
+        state: Optional[str] = None,
+        cursor: Any = None,
+        payload: Optional[Dict] = None,
+    ):
+        self.frontier = frontier
+        self.key = key
+        self.kind = kind
+        self.state = state
+        self.cursor = cursor
+        self.payload: Dict = payload or {}
+
+    @property
+    def done(self) -> bool:
+        return self.state == STATE_DONE
+
+    async def checkpoint(self, cursor: Any, **payload):
+        """
+        记录当前单元已经完成到 cursor 之前的部分
+        Args:
+            cursor: 下一次请求使用的分页/游标
+            **payload: 需要一并保存的状态
+
+        Returns:
+
+        """
+        self.state, self.cursor = STATE_IN_PROGRESS, cursor
+        self.payload.update(payload)
+        await self.frontier.save(self)
+
+    async def finish(self, **payload):
+        """
+        标记当前单元已完成，--resume 时整体跳过
+        """
+        self.state = STATE_DONE
+        self.payload.update(payload)
+        await self.frontier.save(self)
+
+
+class CrawlFrontier:
+    """
+    基于 SQLite 的爬取进度存储，每个平台一个数据库文件：<CRAWL_FRONTIER_DIR>/<platform>.db
+    多进程分片爬取时各进程的工作单元互不重叠，共用同一个文件
+    """
+
+    def __init__(self, db_path: str, enabled: bool = True):
+        self.db_path = db_path
+        self.enabled = enabled
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def _get_db(self) -> aiosqlite.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            db = await aiosqlite.connect(self.db_path, timeout=30)
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.execute(_CREATE_TABLE_SQL)
+            await db.commit()
+            self._db = db
+        return self._db
+
+    async def get_unit(self, key: str, kind: str) -> FrontierUnit:
+        """
+        读取工作单元的进度，不存在时返回一个新单元
+        Args:
+            key: 单元唯一标识，如 search:<关键词>、comments:<帖子ID>
+            kind: 单元类型
+
+        Returns:
+
+        """
+        if not self.enabled:
+            return FrontierUnit(self, key, kind)
+        async with self._lock:
+            db = await self._get_db()
+            async with db.execute(
+                "SELECT state, cursor, payload FROM crawl_frontier WHERE unit_key = ?", (key,)
+            ) as db_cursor:
+                row = await db_cursor.fetchone()
+        if row is None:
+            return FrontierUnit(self, key, kind)
+        state, cursor, payload = row
+        return FrontierUnit(
+            self,
+            key,
+            kind,
+            state=state,
+            cursor=json.loads(cursor) if cursor is not None else None,
+            payload=json.loads(payload) if payload else {},
+        )
+
+    async def save(self, unit: FrontierUnit):
+        if not self.enabled:
+            return
+        async with self._lock:
+            db = await self._get_db()
+            await db.execute(
+                _UPSERT_SQL,
+                (
+                    unit.key,
+                    unit.kind,
+                    unit.state,
+                    json.dumps(unit.cursor, ensure_ascii=False) if unit.cursor is not None else None,
+                    json.dumps(unit.payload, ensure_ascii=False),
+                    time.time(),
+                ),
+            )
+            await db.commit()
+
+    async def reset(self):
+        """
+        清空进度，开始新的一轮爬取
+        """
+        if not self.enabled:
+            return
+        async with self._lock:
+            db = await self._get_db()
+            await db.execute("DELETE FROM crawl_frontier")
+            await db.commit()
+
+    async def close(self):
+        if self._db is not None:
+            db, self._db = self._db, None
+            await db.close()
+
+
+_frontiers: Dict[int, CrawlFrontier] = {}
+
+
+def get_crawl_frontier() -> CrawlFrontier:
+    """
+    获取当前事件循环中当前平台的爬取进度存储
+    """
+    loop_id = id(asyncio.get_running_loop())
+    frontier = _frontiers.get(loop_id)
+    if frontier is None:
+        db_path = os.path.join(config.CRAWL_FRONTIER_DIR, f"{config.PLATFORM}.db")
+        frontier = CrawlFrontier(db_path, enabled=config.ENABLE_CRAWL_FRONTIER)
+        _frontiers[loop_id] = frontier
+    return frontier
+
+
+async def prepare_crawl_frontier():
+    """
+    爬取开始前调用：未指定 --resume 时清空上一次的进度
+    """
+    frontier = get_crawl_frontier()
+    if not frontier.enabled:
+        return
+    if config.CRAWL_RESUME:
+        utils.logger.info(f"[prepare_crawl_frontier] Resume crawl from {frontier.db_path}")
+    else:
+        await frontier.reset()
+
+
+async def close_crawl_frontiers():
+    frontiers = list(_frontiers.values())
+    _frontiers.clear()
+    for frontier in frontiers:
+        try:
+            await frontier.close()
+        except Exception as e:
+            utils.logger.warning(f"[close_crawl_frontiers] close crawl frontier error: {e}")
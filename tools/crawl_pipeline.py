@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/crawl_pipeline.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+# @Desc    : 分阶段爬取流水线：搜索 → 详情 → 存储 → 评论，阶段之间用有界队列连接，
+#            每个阶段有独立的 worker 数量，上一页的详情、评论与下一页的搜索同时进行；
+#            以及多个互不依赖的分页流的有界并发合并（二级评论展开）
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar
+
+import config
+from tools import utils
+from tools.metrics import MetricsRegistry, get_metrics
+
+# 阶段处理函数：返回值不为 None 时交给下一个阶段
+StageHandler = Callable[[Any], Awaitable[Optional[Any]]]
+
+T = TypeVar("T")
+
+_STREAM_DONE = object()
+
+
+class PipelineBatch:
+    """
+    一组一起提交的条目（如一页搜索结果），所有条目走完流水线后 done 为 True
+
+    条目在阶段之间传递时仍属于同一个批次；seal() 表示不会再加入新条目
+    """
+
+    def __init__(self):
+        self._pending = 0
+        self._sealed = False
+        self._done = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def _add(self):
+        self._pending += 1
+
+    def _finish(self):
+        self._pending -= 1
+        self._check()
+
+    def seal(self):
+        self._sealed = True
+        self._check()
+
+    def _check(self):
+        if self._sealed and self._pending <= 0:
+            self._done.set()
+
+    async def wait(self):
+        await self._done.wait()
+
+
+class PipelineStage:
+    __slots__ = ("name", "handler", "worker_num", "queue", "workers", "in_progress", "processed", "failed")
+
+    def __init__(self, name: str, handler: StageHandler, worker_num: int, queue_size: int):
+        self.name = name
+        self.handler = handler
+        self.worker_num = max(1, worker_num)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.workers: List[asyncio.Task] = []
+        self.in_progress = 0
+        self.processed = 0
+        self.failed = 0
+
+
+class CrawlPipeline:
+    """
+    按添加顺序串联的阶段，阶段处理函数的返回值交给下一个阶段，返回 None 表示该条目到此结束
+
+    - 每个阶段的队列有界，下游处理不过来时上游 put 会等待，不会无限堆积
+    - 处理函数抛出的异常只记录日志，不影响其他条目
+    - 用法：
+        pipeline = CrawlPipeline("xhs.search")
+        pipeline.add_stage("detail", fetch_detail, workers=8)
+        pipeline.add_stage("store", store_note, workers=1)
+        pipeline.add_stage("comments", fetch_comments, workers=8)
+        async with pipeline:
+            await pipeline.put("detail", post_item)
+        # 退出 async with 时等待所有条目处理完；出现异常时直接停止 worker
+    """
+
+    def __init__(self, name: str, queue_size: Optional[int] = None):
+        self.name = name
+        self.queue_size = queue_size or config.PIPELINE_QUEUE_SIZE
+        self._stages: List[PipelineStage] = []
+        self._stage_index: Dict[str, int] = {}
+
+    def add_stage(self, name: str, handler: StageHandler, workers: int = 1) -> "CrawlPipeline":
+        self._stage_index[name] = len(self._stages)
+        self._stages.append(PipelineStage(name, handler, workers, self.queue_size))
+        return self
+
+    def start(self):
+        for index, stage in enumerate(self._stages):
+            if not stage.workers:
+                stage.workers = [asyncio.create_task(self._worker(index)) for _ in range(stage.worker_num)]
+        _active_pipelines.add(self)
+
+    async def put(self, stage_name: str, item: Any, batch: Optional[PipelineBatch] = None):
+        """
+        把条目放入指定阶段的队列，队列已满时等待空位
+        Args:
+            stage_name: 阶段名，可以跳过前面的阶段直接进入后面的阶段
+            item: 条目
+            batch: 所属批次
+
+        Returns:
+
+        """
+        if batch is not None:
+            batch._add()
+        await self._stages[self._stage_index[stage_name]].queue.put((item, batch))
+
+    async def _worker(self, index: int):
+        stage = self._stages[index]
+        next_stage = self._stages[index + 1] if index + 1 < len(self._stages) else None
+        while True:
+            item, batch = await stage.queue.get()
+            result = None
+            stage.in_progress += 1
+            try:
+                result = await stage.handler(item)
+                stage.processed += 1
+            except Exception as e:
+                stage.failed += 1
+                utils.logger.error(f"[CrawlPipeline.{self.name}] stage {stage.name} error: {e}")
+            finally:
+                stage.in_progress -= 1
+            try:
+                if result is not None and next_stage is not None:
+                    if batch is not None:
+                        batch._add()
+                    await next_stage.queue.put((result, batch))
+            finally:
+                if batch is not None:
+                    batch._finish()
+                stage.queue.task_done()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            stage.name: {
+                "queued": stage.queue.qsize(),
+                "in_progress": stage.in_progress,
+                "processed": stage.processed,
+                "failed": stage.failed,
+            }
+            for stage in self._stages
+        }
+
+    async def join(self):
+        """
+        等待所有条目处理完，条目只会向后传递，所以按阶段顺序依次等待即可
+        """
+        for stage in self._stages:
+            await stage.queue.join()
+
+    async def close(self):
+        """
+        停止所有 worker，队列中未处理的条目被丢弃
+        """
+        _active_pipelines.discard(self)
+        tasks = [task for stage in self._stages for task in stage.workers]
+        for stage in self._stages:
+            stage.workers = []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __aenter__(self) -> "CrawlPipeline":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                await self.join()
+                utils.logger.info(f"[CrawlPipeline.{self.name}] finished: {self.stats()}")
+        finally:
+            await self.close()
+        return False
+
+
+class PageCheckpointer:
+    """
+    流水线模式下搜索断点的推进：某一页及之前所有页的条目都走完流水线后才保存这一页的断点，
+    中断恢复时不会跳过还没处理完的页
+    """
+
+    def __init__(self, frontier_unit):
+        self.frontier_unit = frontier_unit
+        self._pages: List[Tuple[PipelineBatch, Any, Dict[str, Any]]] = []
+
+    def add_page(self, batch: PipelineBatch, cursor: Any, **payload):
+        """
+        登记一页，cursor / payload 为这一页处理完之后要保存的断点
+        """
+        batch.seal()
+        self._pages.append((batch, cursor, payload))
+
+    async def advance(self):
+        """
+        保存已经处理完的连续页中最后一页的断点，不等待
+        """
+        latest = None
+        while self._pages and self._pages[0][0].done:
+            latest = self._pages.pop(0)
+        if latest is not None:
+            await self.frontier_unit.checkpoint(latest[1], **latest[2])
+
+    async def finish(self, keyword_finished: bool = True):
+        """
+        等待所有已登记的页处理完并保存断点，keyword_finished 为 True 时把断点标记为完成
+        """
+        for batch, _, _ in self._pages:
+            await batch.wait()
+        await self.advance()
+        if keyword_finished:
+            await self.frontier_unit.finish()
+
+
+async def merge_page_streams(
+    streams: Iterable[Callable[[], AsyncIterator[T]]],
+    concurrency: int,
+) -> AsyncIterator[T]:
+    """
+    同时消费多个互不依赖的分页流（如各条一级评论的二级评论），最多 concurrency 个流同时进行，按到达顺序 yield
+
+    - 流以工厂函数传入，只有轮到时才开始请求
+    - 结果队列有界，调用方处理不过来时各个流暂停翻页
+    - 任一流抛出异常时停止其余流并把异常抛给调用方；调用方提前结束迭代时同样停止所有流
+    Args:
+        streams: 返回异步迭代器的工厂函数
+        concurrency: 同时进行的流数量
+
+    Returns:
+
+    """
+    pending = iter(streams)
+    results: asyncio.Queue = asyncio.Queue(maxsize=max(1, concurrency))
+    tasks: Set[asyncio.Task] = set()
+
+    async def drain(factory: Callable[[], AsyncIterator[T]]):
+        try:
+            async for page in factory():
+                await results.put((page, None))
+        except Exception as e:
+            await results.put((_STREAM_DONE, e))
+        else:
+            await results.put((_STREAM_DONE, None))
+
+    def start_next() -> bool:
+        factory = next(pending, None)
+        if factory is None:
+            return False
+        task = asyncio.create_task(drain(factory))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return True
+
+    running = 0
+    while running < max(1, concurrency) and start_next():
+        running += 1
+    try:
+        while running:
+            page, error = await results.get()
+            if page is not _STREAM_DONE:
+                yield page
+                continue
+            if error is not None:
+                raise error
+            running -= 1
+            if start_next():
+                running += 1
+    finally:
+        remaining = list(tasks)
+        for task in remaining:
+            task.cancel()
+        await asyncio.gather(*remaining, return_exceptions=True)
+
+
+_active_pipelines: Set[CrawlPipeline] = set()
+
+
+def _collect_pipeline_metrics(registry: MetricsRegistry):
+    """
+    各阶段排队和处理中的条目数，某个阶段长期排满说明它是瓶颈，可以调大该阶段的 worker 数
+    """
+    totals: Dict[Tuple[str, str], List[int]] = {}
+    for pipeline in _active_pipelines:
+        for stage_name, stats in pipeline.stats().items():
+            total = totals.setdefault((pipeline.name, stage_name), [0, 0])
+            total[0] += stats["queued"]
+            total[1] += stats["in_progress"]
+    for (pipeline_name, stage_name), (queued, in_progress) in totals.items():
+        registry.set_gauge("mediacrawler_pipeline_queued", queued, pipeline=pipeline_name, stage=stage_name)
+        registry.set_gauge("mediacrawler_pipeline_in_progress", in_progress, pipeline=pipeline_name, stage=stage_name)
+
+
+get_metrics().register_collector(_collect_pipeline_metrics)
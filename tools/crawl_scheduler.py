@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/crawl_scheduler.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 整个爬取过程共用的并发调度器，统一管理同时在途的请求数（MAX_CONCURRENCY_NUM），
+#            名额按优先级分配：搜索 > 详情 > 评论 > 子评论 > 媒体下载，避免媒体下载占满名额拖慢元数据爬取
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import config
+from tools.metrics import MetricsRegistry, get_metrics
+
+# 优先级，数值越小越优先
+PRIORITY_SEARCH = 0
+PRIORITY_DETAIL = 1
+PRIORITY_COMMENTS = 2
+PRIORITY_SUB_COMMENTS = 3
+PRIORITY_MEDIA = 4
+
+# 当前协程所属工作的优先级，由爬虫通过 work_priority() 声明
+_work_priority: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("crawl_work_priority", default=None)
+
+
+@contextmanager
+def work_priority(priority: int):
+    """
+    声明当前协程中的工作类型，其中发出的请求按 max(工作优先级, 接口优先级) 排队
+    用法：
+        with work_priority(PRIORITY_COMMENTS):
+            async for comments in client.iter_note_comments(...):
+                ...
+    """
+    token = _work_priority.set(priority)
+    try:
+        yield
+    finally:
+        _work_priority.reset(token)
+
+
+def get_request_priority(priority: int) -> int:
+    """
+    请求的优先级：接口本身的优先级与所属工作的优先级中较低的一个
+    """
+    current_work_priority = _work_priority.get()
+    if current_work_priority is not None:
+        priority = max(priority, current_work_priority)
+    return priority
+
+
+class CrawlScheduler:
+    """
+    在途请求名额调度
+
+    - 名额空闲且没有排队者时直接获得，否则按 (优先级, 到达顺序) 排队
+    - 释放名额时唤醒优先级最高的排队者，同优先级先到先得
+    """
+
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max(max_in_flight, 1)
+        self.in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, waiter in self._waiters if not waiter.done())
+
+    async def acquire(self, priority: int):
+        if self.in_flight < self.max_in_flight and not self.waiting:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # 已经分到名额后才被取消，归还名额
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake_up()
+
+    def _wake_up(self):
+        while self._waiters and self.in_flight < self.max_in_flight:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+
+_crawl_schedulers: Dict[int, CrawlScheduler] = {}
+
+
+_PRIORITY_NAMES = {
+    PRIORITY_SEARCH: "search",
+    PRIORITY_DETAIL: "detail",
+    PRIORITY_COMMENTS: "comments",
+    PRIORITY_SUB_COMMENTS: "sub_comments",
+    PRIORITY_MEDIA: "media",
+}
+
+
+def _collect_scheduler_metrics(registry: MetricsRegistry):
+    """
+    在途请求数和按优先级排队的请求数，某类工作长期排队说明并发名额不够或被更高优先级的工作占满
+    """
+    waiting = {priority: 0 for priority in _PRIORITY_NAMES}
+    in_flight = 0
+    for scheduler in _crawl_schedulers.values():
+        in_flight += scheduler.in_flight
+        for priority, _, waiter in scheduler._waiters:
+            if not waiter.done():
+                waiting[priority] = waiting.get(priority, 0) + 1
+    registry.set_gauge("mediacrawler_scheduler_in_flight", in_flight)
+    for priority, count in waiting.items():
+        registry.set_gauge("mediacrawler_scheduler_waiting", count, priority=_PRIORITY_NAMES.get(priority, str(priority)))
+
+
+get_metrics().register_collector(_collect_scheduler_metrics)
+
+
+def get_crawl_scheduler() -> CrawlScheduler:
+    """
+    获取当前事件循环的并发调度器
+    """
+    loop_id = id(asyncio.get_running_loop())
+    scheduler = _crawl_schedulers.get(loop_id)
+    if scheduler is None:
+        scheduler = CrawlScheduler(config.MAX_CONCURRENCY_NUM)
+        _crawl_schedulers[loop_id] = scheduler
+    return scheduler
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/http_client.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 共享的 httpx 连接池，按代理复用长连接（keep-alive / HTTP2），供各平台 client 使用
+
+import asyncio
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import AsyncIterator, Callable, Dict, Optional, Set, Tuple
+
+import httpx
+
+import config
+from tools import utils
+from tools.metrics import record_bytes
+from tools.rate_limiter import classify_endpoint
+
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2 包
+    _H2_AVAILABLE = True
+except ImportError:
+    _H2_AVAILABLE = False
+
+
+class _NoPersistCookiePolicy(DefaultCookiePolicy):
+    """
+    不在共享 client 上持久化响应 Set-Cookie，保持与每次新建 client 时一致的无状态行为，
+    登录态 Cookie 仍由各平台 client 通过请求头传入
+    """
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+class _CountingByteStream(httpx.AsyncByteStream):
+    """
+    统计响应体在线路上的字节数（压缩前），流式读取的媒体下载同样计入
+    """
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_bytes: Callable[[int], None]):
+        self._stream = stream
+        self._on_bytes = on_bytes
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            self._on_bytes(len(chunk))
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+
+async def _record_transfer_bytes(response: httpx.Response) -> None:
+    """
+    响应钩子：记录请求体和响应体的字节数
+    """
+    if not config.ENABLE_METRICS:
+        return
+    platform, endpoint = config.PLATFORM, classify_endpoint(str(response.request.url))
+    try:
+        record_bytes(platform, endpoint, "sent", len(response.request.content))
+    except httpx.RequestNotRead:
+        pass
+    response.stream = _CountingByteStream(
+        response.stream, lambda num_bytes: record_bytes(platform, endpoint, "received", num_bytes)
+    )
+
+
+class HttpClientPool:
+    """
+    按代理地址缓存长生命周期的 httpx.AsyncClient
+
+    每个 (事件循环, 代理) 组合对应一个 client，连接在请求之间复用，
+    避免每次请求都重新建立 TCP + TLS 连接。
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[int, str], httpx.AsyncClient] = {}
+        self._closing: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _build_limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=config.HTTPX_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTPX_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.HTTPX_KEEPALIVE_EXPIRY,
+        )
+
+    def get_client(self, proxy: Optional[str] = None) -> httpx.AsyncClient:
+        """
+        获取指定代理对应的共享 client，不存在则创建
+        Args:
+            proxy: httpx 代理URL，None 表示直连
+
+        Returns:
+            httpx.AsyncClient
+        """
+        loop_id = id(asyncio.get_running_loop())
+        key = (loop_id, proxy or "")
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                proxy=proxy,
+                cookies=CookieJar(policy=_NoPersistCookiePolicy()),
+                limits=self._build_limits(),
+                http2=config.ENABLE_HTTP2 and _H2_AVAILABLE,
+                event_hooks={"response": [_record_transfer_bytes]},
+            )
+            self._clients[key] = client
+        return client
+
+    def discard(self, proxy: Optional[str]) -> None:
+        """
+        代理被移出代理池（IP 被封、过期）后关闭它的 client，释放到失效代理的长连接
+        Args:
+            proxy: httpx 代理URL
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        client = self._clients.pop((id(loop), proxy or ""), None)
+        if client is None or client.is_closed:
+            return
+        task = loop.create_task(self._close_client(client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close_client(client: httpx.AsyncClient) -> None:
+        try:
+            await client.aclose()
+        except Exception as e:
+            utils.logger.warning(f"[HttpClientPool.discard] close http client error: {e}")
+
+    async def close(self) -> None:
+        """
+        关闭所有共享 client，程序退出时调用
+        """
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                # 事件循环已切换时关闭旧连接可能会失败，退出阶段忽略即可
+                utils.logger.warning(f"[HttpClientPool.close] close http client error: {e}")
+
+
+_http_client_pool = HttpClientPool()
+
+
+def get_http_client(proxy: Optional[str] = None) -> httpx.AsyncClient:
+    """
+    获取共享的 httpx client
+    Args:
+        proxy: httpx 代理URL
+
+    Returns:
+
+    """
+    return _http_client_pool.get_client(proxy)
+
+
+def discard_http_client(proxy: Optional[str]) -> None:
+    """
+    关闭指定代理的共享 httpx client，代理池移除代理时调用
+    Args:
+        proxy: httpx 代理URL
+
+    Returns:
+
+    """
+    _http_client_pool.discard(proxy)
+
+
+async def close_http_clients() -> None:
+    """
+    关闭所有共享的 httpx client
+    Returns:
+
+    """
+    await _http_client_pool.close()
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/js_sign_pool.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 签名 JS 常驻进程池，Node 进程启动时加载一次签名脚本，之后通过管道收发签名请求，
+#            替代 execjs 每次 call 都重新启动 Node 进程并重新解析脚本的开销
+
+import asyncio
+import itertools
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from tools import utils
+
+SIGN_WORKER_JS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "libs", "sign_worker.js")
+
+# 单行响应的最大长度
+_STREAM_LIMIT = 1024 * 1024
+
+
+class JsSignError(Exception):
+    """签名进程调用失败"""
+
+
+def is_js_sign_pool_enabled() -> bool:
+    """
+    是否使用常驻进程签名，未安装 Node.js 时回退到 execjs
+    Returns:
+
+    """
+    return config.ENABLE_JS_SIGN_WORKER_POOL and shutil.which("node") is not None
+
+
+class JsSignWorker:
+    """
+    单个 Node 签名进程，请求按 id 与响应对应，同一进程内的请求由 Node 串行执行
+    """
+
+    def __init__(self, script_path: str, worker_id: int):
+        self.script_path = script_path
+        self.worker_id = worker_id
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._id_counter = itertools.count(1)
+        # 每次(重新)启动递增，用于避免并发请求重复重启同一个进程
+        self.generation = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def start(self):
+        self._process = await asyncio.create_subprocess_exec(
+            shutil.which("node") or "node", SIGN_WORKER_JS_PATH, self.script_path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=_STREAM_LIMIT,
+        )
+        self.generation += 1
+        # 每个进程使用独立的等待表，避免旧进程的退出处理影响重启后的请求
+        self._pending = {}
+        self._reader_task = asyncio.create_task(self._read_responses(self._process, self._pending))
+        utils.logger.info(
+            f"[JsSignWorker.start] sign worker {self.worker_id} started, pid: {self._process.pid}, script: {self.script_path}"
+        )
+
+    async def _read_responses(self, process: asyncio.subprocess.Process, pending: Dict[int, asyncio.Future]):
+        while True:
+            try:
+                line = await process.stdout.readline()
+            except (ValueError, asyncio.LimitOverrunError) as e:
+                utils.logger.error(f"[JsSignWorker._read_responses] read sign response error: {e}")
+                break
+            if not line:
+                break
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                utils.logger.warning(f"[JsSignWorker._read_responses] invalid sign response: {line[:200]}")
+                continue
+            future = pending.pop(message.get("id"), None)
+            if future is None or future.done():
+                continue
+            if "error" in message:
+                future.set_exception(JsSignError(message["error"]))
+            else:
+                future.set_result(message.get("result"))
+        # 进程退出，未完成的请求全部失败
+        self._fail_pending(pending, JsSignError(f"sign worker {self.worker_id} exited"))
+
+    @staticmethod
+    def _fail_pending(pending: Dict[int, asyncio.Future], exc: Exception):
+        futures = list(pending.values())
+        pending.clear()
+        for future in futures:
+            if not future.done():
+                future.set_exception(exc)
+
+    async def call(self, fn: str, args: List[Any], timeout: float) -> Any:
+        """
+        调用签名脚本中的函数
+        Args:
+            fn: 函数名
+            args: 参数列表，需可被 JSON 序列化
+            timeout: 超时时间（秒）
+
+        Returns:
+
+        """
+        if not self.alive:
+            raise JsSignError(f"sign worker {self.worker_id} is not running")
+        request_id = next(self._id_counter)
+        pending = self._pending
+        future = asyncio.get_running_loop().create_future()
+        pending[request_id] = future
+        payload = json.dumps({"id": request_id, "fn": fn, "args": args}, ensure_ascii=False) + "\n"
+        try:
+            self._process.stdin.write(payload.encode("utf-8"))
+            await self._process.stdin.drain()
+            return await asyncio.wait_for(future, timeout)
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise JsSignError(f"sign worker {self.worker_id} pipe closed: {e}")
+        finally:
+            pending.pop(request_id, None)
+
+    async def ping(self, timeout: float) -> bool:
+        try:
+            return await self.call("__ping__", [], timeout) == "pong"
+        except (JsSignError, asyncio.TimeoutError):
+            return False
+
+    async def stop(self):
+        process, self._process = self._process, None
+        if process is not None and process.returncode is None:
+            try:
+                process.kill()
+                await asyncio.wait_for(process.wait(), 5)
+            except Exception as e:
+                # 事件循环已切换时无法等待旧进程退出，kill 之后忽略即可
+                utils.logger.warning(f"[JsSignWorker.stop] stop sign worker {self.worker_id} error: {e}")
+        if self._reader_task is not None and not self._reader_task.done():
+            try:
+                self._reader_task.cancel()
+            except RuntimeError:
+                pass
+        self._reader_task = None
+        self._fail_pending(self._pending, JsSignError(f"sign worker {self.worker_id} stopped"))
+
+
+class JsSignWorkerPool:
+    """
+    N 个常驻签名进程组成的进程池
+
+    请求分发到排队最少的进程；进程异常退出或超时会被自动重启，
+    后台定时对空闲进程做健康检查
+    """
+
+    def __init__(self, script_path: str, worker_num: Optional[int] = None):
+        self.script_path = os.path.abspath(script_path)
+        self.worker_num = max(1, worker_num or config.JS_SIGN_WORKER_NUM)
+        self._workers: List[JsSignWorker] = [JsSignWorker(self.script_path, i) for i in range(self.worker_num)]
+        self._start_lock = asyncio.Lock()
+        self._restart_lock = asyncio.Lock()
+        self._started = False
+        self._health_check_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        async with self._start_lock:
+            if self._started:
+                return
+            await asyncio.gather(*[worker.start() for worker in self._workers])
+            self._started = True
+            if config.JS_SIGN_HEALTH_CHECK_INTERVAL_SEC > 0:
+                self._health_check_task = asyncio.create_task(self._health_check_loop())
+
+    async def _restart_worker(self, worker: JsSignWorker, generation: int):
+        async with self._restart_lock:
+            if worker.generation != generation:
+                # 其他请求已经重启过该进程
+                return
+            utils.logger.warning(f"[JsSignWorkerPool._restart_worker] restart sign worker {worker.worker_id}")
+            await worker.stop()
+            await worker.start()
+
+    def _pick_worker(self) -> JsSignWorker:
+        return min(self._workers, key=lambda worker: (not worker.alive, worker.pending_count))
+
+    async def call(self, fn: str, *args) -> Any:
+        """
+        调用签名函数，进程故障时在重启后的进程上重试一次
+        Args:
+            fn: 签名脚本中的函数名
+            *args: 函数参数
+
+        Returns:
+
+        """
+        if not self._started:
+            await self.start()
+        last_error: Optional[Exception] = None
+        for _ in range(2):
+            worker = self._pick_worker()
+            if not worker.alive:
+                await self._restart_worker(worker, worker.generation)
+            generation = worker.generation
+            try:
+                return await worker.call(fn, list(args), config.JS_SIGN_TIMEOUT_SEC)
+            except asyncio.TimeoutError:
+                last_error = JsSignError(f"sign worker {worker.worker_id} call {fn} timeout")
+                await self._restart_worker(worker, generation)
+            except JsSignError as e:
+                if worker.alive:
+                    # 进程正常但签名脚本抛出异常，重试无意义
+                    raise
+                last_error = e
+        raise last_error
+
+    async def health_check(self) -> int:
+        """
+        检查所有进程，重启无响应的进程
+        Returns:
+            重启的进程数量
+        """
+        restarted = 0
+        for worker in self._workers:
+            if worker.alive and worker.pending_count:
+                # 有请求在处理中，说明进程仍在工作
+                continue
+            generation = worker.generation
+            if not await worker.ping(config.JS_SIGN_TIMEOUT_SEC):
+                await self._restart_worker(worker, generation)
+                restarted += 1
+        return restarted
+
+    async def _health_check_loop(self):
+        while True:
+            await asyncio.sleep(config.JS_SIGN_HEALTH_CHECK_INTERVAL_SEC)
+            try:
+                await self.health_check()
+            except Exception as e:
+                utils.logger.error(f"[JsSignWorkerPool._health_check_loop] health check error: {e}")
+
+    async def close(self):
+        task, self._health_check_task = self._health_check_task, None
+        if task is not None and not task.done():
+            try:
+                task.cancel()
+            except RuntimeError:
+                pass
+        for worker in self._workers:
+            await worker.stop()
+        self._started = False
+
+
+_sign_pools: Dict[Tuple[int, str], JsSignWorkerPool] = {}
+
+
+def get_js_sign_pool(script_path: str) -> JsSignWorkerPool:
+    """
+    获取签名脚本对应的进程池（子进程与事件循环绑定，按事件循环区分）
+    Args:
+        script_path: 签名脚本路径，例如 libs/douyin.js
+
+    Returns:
+
+    """
+    key = (id(asyncio.get_running_loop()), os.path.abspath(script_path))
+    if key not in _sign_pools:
+        _sign_pools[key] = JsSignWorkerPool(script_path)
+    return _sign_pools[key]
+
+
+async def close_js_sign_pools():
+    """
+    关闭所有签名进程，程序退出时调用
+    """
+    pools = list(_sign_pools.values())
+    _sign_pools.clear()
+    for pool in pools:
+        await pool.close()
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/log_util.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+# @Desc    : 日志：后台线程输出（QueueHandler + QueueListener）、按分类设置级别、
+#            文本 / JSON 两种格式，以及接口返回和数据条目这类大对象日志的采样与截断
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import reprlib
+import sys
+import threading
+from typing import Any, Dict, Optional
+
+import config
+
+LOGGER_NAME = "MediaCrawler"
+
+TEXT_FORMAT = "%(asctime)s %(name)s %(levelname)s (%(filename)s:%(lineno)d) - %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    每条日志一行 JSON，extra={"fields": {...}} 传入的字段合并到顶层
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, dict):
+            data.update(fields)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _build_formatter(log_format: str) -> logging.Formatter:
+    if log_format == "json":
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+
+def stop_log_listener():
+    """
+    输出队列中剩余的日志并停止后台线程，进程退出时自动调用
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def init_logging(
+    level: Optional[str] = None,
+    log_format: Optional[str] = None,
+    category_levels: Optional[Dict[str, str]] = None,
+    stream=None,
+) -> logging.Logger:
+    """
+    初始化日志：调用方只把日志记录放入队列，格式化和写终端在后台线程完成，不阻塞事件循环
+    重复调用会替换之前的输出线程，可以在解析命令行参数后重新应用配置
+    Args:
+        level: 日志级别，默认 config.LOG_LEVEL
+        log_format: text / json，默认 config.LOG_FORMAT
+        category_levels: 分类级别，默认 config.LOG_CATEGORY_LEVELS
+        stream: 输出流，默认 stderr
+
+    Returns:
+        MediaCrawler logger
+    """
+    global _listener, _queue_handler
+    level = (level or config.LOG_LEVEL).upper()
+    log_format = log_format or config.LOG_FORMAT
+    category_levels = config.LOG_CATEGORY_LEVELS if category_levels is None else category_levels
+
+    stop_log_listener()
+    root = logging.getLogger()
+    if _queue_handler is not None:
+        root.removeHandler(_queue_handler)
+
+    stream_handler = logging.StreamHandler(stream or sys.stderr)
+    stream_handler.setFormatter(_build_formatter(log_format))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    for category, category_level in category_levels.items():
+        get_logger(category).setLevel(category_level.upper())
+
+    # 关闭 httpx 的 INFO 日志
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return logger
+
+
+atexit.register(stop_log_listener)
+
+
+def get_logger(category: str) -> logging.Logger:
+    """
+    获取分类 logger（MediaCrawler.<category>），级别可通过 LOG_CATEGORY_LEVELS 单独设置
+    """
+    return logging.getLogger(f"{LOGGER_NAME}.{category}")
+
+
+def _build_repr(max_chars: int) -> reprlib.Repr:
+    payload_repr = reprlib.Repr()
+    payload_repr.maxlevel = 4
+    payload_repr.maxdict = 32
+    payload_repr.maxlist = 16
+    payload_repr.maxtuple = 16
+    payload_repr.maxset = 16
+    payload_repr.maxstring = max(max_chars // 4, 32)
+    payload_repr.maxother = max(max_chars // 4, 32)
+    return payload_repr
+
+
+_payload_reprs: Dict[int, reprlib.Repr] = {}
+
+
+def format_payload(payload: Any, max_chars: Optional[int] = None) -> str:
+    """
+    大对象转字符串：用 reprlib 限制嵌套层数和容器长度，不会先生成完整的 repr 再截断
+    """
+    max_chars = config.LOG_PAYLOAD_MAX_CHARS if max_chars is None else max_chars
+    payload_repr = _payload_reprs.get(max_chars)
+    if payload_repr is None:
+        payload_repr = _build_repr(max_chars)
+        _payload_reprs[max_chars] = payload_repr
+    text = payload_repr.repr(payload)
+    if len(text) > max_chars:
+        text = f"{text[:max_chars]}...({len(text) - max_chars} more chars)"
+    return text
+
+
+class PayloadSampler:
+    """
+    按分类计数采样：每个分类的第 1 条总会打印，之后每 1/rate 条打印 1 条
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def should_log(self, category: str, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        if rate >= 1:
+            return True
+        every = max(1, round(1 / rate))
+        with self._lock:
+            count = self._counts.get(category, 0)
+            self._counts[category] = count + 1
+        return count % every == 0
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+_payload_sampler = PayloadSampler()
+
+
+def log_payload(category: str, message: str, payload: Any, *args, level: int = logging.INFO, **fields):
+    """
+    打印接口返回或数据条目，日志级别未开启或未被采样时不做任何格式化
+    分类为 payload.<category>，可以在 LOG_CATEGORY_LEVELS 中用 payload 或 payload.<category> 调整级别
+    用法：
+        utils.log_payload("search", "[XiaoHongShuCrawler.search] Search notes res: %s", notes_res)
+        utils.log_payload("store", "[store.xhs.update_xhs_note] xhs note %s: %s", local_db_item, note_id)
+    Args:
+        category: 分类，如 search / detail / comment / store
+        message: %-格式的消息，前面的占位符依次为 args，最后一个占位符为 payload
+        payload: 大对象，采样命中时才会转换并截断
+        level: 日志级别
+        fields: JSON 格式日志中附加的字段
+    """
+    logger = get_logger(f"payload.{category}")
+    if not logger.isEnabledFor(level) or not _payload_sampler.should_log(category, config.LOG_PAYLOAD_SAMPLE_RATE):
+        return
+    extra = {"fields": fields} if fields else None
+    logger.log(level, message, *args, format_payload(payload), extra=extra, stacklevel=2)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/media_downloader.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 媒体文件流式下载，按块写入临时文件，支持 Range 断点续传与 Content-Length 校验，
+#            完成后原子重命名；媒体存储通过 save_media_content 接收文件路径、字节流或 bytes
+
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+from typing import AsyncIterable, Dict, Optional, Tuple, Union
+
+import aiofiles
+import httpx
+
+import config
+from tools import utils
+from tools.http_client import get_http_client
+from tools.rate_limiter import ENDPOINT_MEDIA, get_rate_limiter
+
+# 媒体存储可接收的内容：已下载的临时文件路径、异步字节流或完整的 bytes（兼容旧调用）
+MediaContent = Union[str, os.PathLike, AsyncIterable[bytes], bytes]
+
+_CONTENT_RANGE_PATTERN = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+
+class MediaDownloadError(Exception):
+    """媒体下载不完整或响应不符合预期"""
+
+
+def _parse_content_range_start(content_range: Optional[str]) -> Optional[int]:
+    if not content_range:
+        return None
+    match = _CONTENT_RANGE_PATTERN.match(content_range.strip())
+    return int(match.group(1)) if match else None
+
+
+def _remove_file(file_path: str):
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+
+def _move_file(src: str, dst: str):
+    try:
+        os.replace(src, dst)
+    except OSError:
+        # 跨磁盘时无法直接重命名，先复制到目标目录再原子替换
+        tmp_dst = f"{dst}.part"
+        shutil.copyfile(src, tmp_dst)
+        os.replace(tmp_dst, dst)
+        _remove_file(src)
+
+
+class MediaDownloader:
+    """
+    流式媒体下载器
+
+    下载内容按块写入 <tmp_dir>/<url哈希>.part，中断后再次下载同一 URL 时通过 Range 请求续传，
+    下载完成并校验 Content-Length 后重命名为 <tmp_dir>/<url哈希>，由媒体存储移动到最终位置
+    """
+
+    def __init__(
+        self,
+        tmp_dir: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+    ):
+        self.tmp_dir = tmp_dir or config.MEDIA_DOWNLOAD_TMP_DIR
+        self.chunk_size = chunk_size or config.MEDIA_DOWNLOAD_CHUNK_SIZE
+        self.max_retries = config.MEDIA_DOWNLOAD_MAX_RETRIES if max_retries is None else max_retries
+        # 同一 URL 的下载串行执行，避免并发写同一个临时文件；值为 (锁, 等待者数量)
+        self._url_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    def _get_tmp_path(self, url: str) -> str:
+        return os.path.join(self.tmp_dir, hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    async def download(
+        self,
+        url: str,
+        *,
+        proxy: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 60,
+        follow_redirects: bool = True,
+    ) -> Optional[str]:
+        """
+        下载媒体文件到临时目录
+        Args:
+            url: 媒体地址
+            proxy: httpx 代理URL
+            headers: 请求头
+            timeout: 超时时间
+            follow_redirects: 是否跟随重定向
+
+        Returns:
+            下载完成的临时文件路径，失败返回 None
+        """
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        tmp_path = self._get_tmp_path(url)
+        lock, waiters = self._url_locks.get(tmp_path, (asyncio.Lock(), 0))
+        self._url_locks[tmp_path] = (lock, waiters + 1)
+        try:
+            async with lock:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        await self._download_once(url, tmp_path, proxy, headers, timeout, follow_redirects)
+                        return tmp_path
+                    except httpx.HTTPStatusError as exc:
+                        if exc.response.status_code < 500:
+                            utils.logger.error(
+                                f"[MediaDownloader.download] request {url} err, status: {exc.response.status_code}"
+                            )
+                            return None
+                        error = exc
+                    except (httpx.HTTPError, MediaDownloadError) as exc:
+                        error = exc
+                    utils.logger.warning(
+                        f"[MediaDownloader.download] download {url} interrupted, attempt {attempt + 1}, "
+                        f"{error.__class__.__name__}: {error}"
+                    )
+                utils.logger.error(f"[MediaDownloader.download] download {url} failed after {self.max_retries + 1} attempts")
+                return None
+        finally:
+            lock, waiters = self._url_locks[tmp_path]
+            if waiters <= 1:
+                del self._url_locks[tmp_path]
+            else:
+                self._url_locks[tmp_path] = (lock, waiters - 1)
+
+    async def _download_once(
+        self,
+        url: str,
+        tmp_path: str,
+        proxy: Optional[str],
+        headers: Optional[Dict[str, str]],
+        timeout: float,
+        follow_redirects: bool,
+    ):
+        part_path = f"{tmp_path}.part"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        request_headers = dict(headers or {})
+        if offset:
+            request_headers["Range"] = f"bytes={offset}-"
+
+        client = get_http_client(proxy)
+        async with get_rate_limiter().limit(url, endpoint=ENDPOINT_MEDIA) as permit, client.stream(
+            "GET", url, headers=request_headers, timeout=timeout, follow_redirects=follow_redirects
+        ) as response:
+            permit.set_response(response.status_code)
+            if response.status_code == 416:
+                # 本地的不完整文件与服务端文件不一致，丢弃后重新下载
+                _remove_file(part_path)
+                raise MediaDownloadError("range not satisfiable, restart download")
+            response.raise_for_status()
+
+            if offset and response.status_code == 206:
+                if _parse_content_range_start(response.headers.get("Content-Range")) != offset:
+                    _remove_file(part_path)
+                    raise MediaDownloadError("unexpected Content-Range, restart download")
+                mode = "ab"
+            else:
+                # 服务端不支持 Range 时返回完整内容，从头写入
+                offset, mode = 0, "wb"
+
+            content_length = response.headers.get("Content-Length")
+            async with aiofiles.open(part_path, mode) as f:
+                async for chunk in response.aiter_bytes(self.chunk_size):
+                    await f.write(chunk)
+
+            if content_length is not None and response.num_bytes_downloaded != int(content_length):
+                raise MediaDownloadError(
+                    f"incomplete body, expected {content_length} bytes, got {response.num_bytes_downloaded}"
+                )
+
+        os.replace(part_path, tmp_path)
+        if offset:
+            utils.logger.info(f"[MediaDownloader._download_once] resumed {url} from byte {offset}")
+
+
+_media_downloader: Optional[MediaDownloader] = None
+
+
+def get_media_downloader() -> MediaDownloader:
+    global _media_downloader
+    if _media_downloader is None:
+        _media_downloader = MediaDownloader()
+    return _media_downloader
+
+
+async def save_media_content(content: MediaContent, save_file_name: str):
+    """
+    将媒体内容保存到目标文件，写入过程使用临时文件，完成后原子替换
+    Args:
+        content: 已下载的文件路径、异步字节流或 bytes
+        save_file_name: 目标文件路径
+
+    Returns:
+
+    """
+    if isinstance(content, (str, os.PathLike)):
+        await asyncio.to_thread(_move_file, os.fspath(content), save_file_name)
+        return
+
+    part_path = f"{save_file_name}.part"
+    async with aiofiles.open(part_path, "wb") as f:
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            await f.write(content)
+        else:
+            async for chunk in content:
+                await f.write(chunk)
+    os.replace(part_path, save_file_name)
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/media_queue.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 后台媒体下载队列，爬虫只负责提交下载任务，由独立的 worker 池按域名限流下载并保存，
+#            元数据爬取不再等待图片/视频下载
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import config
+from tools import utils
+from tools.metrics import MetricsRegistry, get_metrics
+
+# 下载函数：返回媒体内容（临时文件路径 / bytes），失败返回 None
+MediaFetcher = Callable[[], Awaitable[Optional[Any]]]
+# 保存函数：接收下载得到的媒体内容
+MediaSaver = Callable[[Any], Awaitable[None]]
+
+
+class MediaJob:
+    __slots__ = ("url", "fetch", "save")
+
+    def __init__(self, url: str, fetch: MediaFetcher, save: MediaSaver):
+        self.url = url
+        self.fetch = fetch
+        self.save = save
+
+
+class MediaDownloadQueue:
+    """
+    有界的媒体下载队列
+
+    - 队列满时 submit 会等待，对爬虫形成背压，避免待下载任务无限堆积
+    - MEDIA_QUEUE_WORKERS 个 worker 并发下载，同一域名最多 MEDIA_QUEUE_PER_HOST_LIMIT 个并发
+    - drain() 等待已提交的任务全部完成后停止 worker，定期输出下载进度
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        worker_num: Optional[int] = None,
+        per_host_limit: Optional[int] = None,
+    ):
+        self.max_size = max_size or config.MEDIA_QUEUE_MAX_SIZE
+        self.worker_num = worker_num or config.MEDIA_QUEUE_WORKERS
+        self.per_host_limit = per_host_limit or config.MEDIA_QUEUE_PER_HOST_LIMIT
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers: List[asyncio.Task] = []
+        self._progress_task: Optional[asyncio.Task] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        return self.submitted - self.succeeded - self.failed
+
+    def _get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host_limit)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    def _ensure_workers(self):
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_num)]
+        self._progress_task = asyncio.create_task(self._report_progress_loop())
+
+    async def submit(self, url: str, fetch: MediaFetcher, save: MediaSaver):
+        """
+        提交一个媒体下载任务，队列已满时等待空位
+        Args:
+            url: 媒体地址，用于按域名限流
+            fetch: 下载函数
+            save: 保存函数
+
+        Returns:
+
+        """
+        self._ensure_workers()
+        self.submitted += 1
+        await self._queue.put(MediaJob(url, fetch, save))
+
+    async def _run_job(self, job: MediaJob):
+        try:
+            async with self._get_host_semaphore(job.url):
+                content = await job.fetch()
+            if content is None:
+                self.failed += 1
+                return
+            await job.save(content)
+            self.succeeded += 1
+        except Exception as e:
+            self.failed += 1
+            utils.logger.error(f"[MediaDownloadQueue._run_job] download {job.url} error: {e}")
+
+    async def _worker(self):
+        while True:
+            job: MediaJob = await self._queue.get()
+            try:
+                await self._run_job(job)
+            finally:
+                self._queue.task_done()
+
+    def _log_progress(self):
+        utils.logger.info(
+            f"[MediaDownloadQueue] media progress: {self.succeeded} saved, {self.failed} failed, "
+            f"{self.pending} pending, {self._queue.qsize()} queued"
+        )
+
+    async def _report_progress_loop(self):
+        while True:
+            await asyncio.sleep(config.MEDIA_QUEUE_PROGRESS_INTERVAL_SEC)
+            if self.pending:
+                self._log_progress()
+
+    async def drain(self):
+        """
+        等待所有已提交的任务完成，然后停止 worker
+        """
+        if not self._workers:
+            return
+        start = time.monotonic()
+        if self.pending:
+            utils.logger.info(f"[MediaDownloadQueue.drain] waiting for {self.pending} media downloads ...")
+        await self._queue.join()
+        await self.close()
+        self._log_progress()
+        utils.logger.info(f"[MediaDownloadQueue.drain] media queue drained in {time.monotonic() - start:.1f}s")
+
+    async def close(self):
+        """
+        立即停止 worker，未完成的任务被丢弃（已下载一半的文件可在下次运行时续传）
+        """
+        tasks = self._workers + ([self._progress_task] if self._progress_task else [])
+        self._workers, self._progress_task = [], None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_media_queues: Dict[int, MediaDownloadQueue] = {}
+
+
+def _collect_media_queue_metrics(registry: MetricsRegistry):
+    media_queues = list(_media_queues.values())
+    registry.set_gauge("mediacrawler_media_queue_pending", sum(q.pending for q in media_queues))
+    registry.set_gauge("mediacrawler_media_queue_queued", sum(q._queue.qsize() for q in media_queues))
+    registry.set_gauge("mediacrawler_media_downloads_succeeded", sum(q.succeeded for q in media_queues))
+    registry.set_gauge("mediacrawler_media_downloads_failed", sum(q.failed for q in media_queues))
+
+
+get_metrics().register_collector(_collect_media_queue_metrics)
+
+
+def get_media_queue() -> MediaDownloadQueue:
+    """
+    获取当前事件循环对应的媒体下载队列
+    """
+    loop_id = id(asyncio.get_running_loop())
+    media_queue = _media_queues.get(loop_id)
+    if media_queue is None:
+        media_queue = MediaDownloadQueue()
+        _media_queues[loop_id] = media_queue
+    return media_queue
+
+
+async def submit_media(url: str, fetch: MediaFetcher, save: MediaSaver):
+    """
+    提交媒体下载任务；未开启下载队列时直接在当前协程中下载并保存
+    Args:
+        url: 媒体地址
+        fetch: 下载函数
+        save: 保存函数
+
+    Returns:
+
+    """
+    if not config.ENABLE_MEDIA_DOWNLOAD_QUEUE:
+        content = await fetch()
+        if content is not None:
+            await save(content)
+        return
+    await get_media_queue().submit(url, fetch, save)
+
+
+async def drain_media_queues():
+    """
+    等待当前事件循环中已提交的媒体任务下载完成
+    """
+    media_queue = _media_queues.pop(id(asyncio.get_running_loop()), None)
+    if media_queue:
+        await media_queue.drain()
+
+
+async def close_media_queues():
+    """
+    停止所有媒体下载 worker（中断退出时调用）
+    """
+    media_queues = list(_media_queues.values())
+    _media_queues.clear()
+    for media_queue in media_queues:
+        try:
+            await media_queue.close()
+        except Exception as e:
+            # 任务属于已经停止的事件循环时无法再等待，直接忽略
+            utils.logger.warning(f"[close_media_queues] close media queue error: {e}")
@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/metrics.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 运行指标：请求耗时直方图、状态码/异常计数、重试次数、流量、存储条数和各队列深度，
+#            通过 Prometheus 文本格式接口（METRICS_PROMETHEUS_PORT）或定时写入的 JSON 快照文件（METRICS_SNAPSHOT_PATH）导出
+
+import asyncio
+import functools
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import config
+from tools import utils
+
+# 指标名
+HTTP_REQUESTS = "mediacrawler_http_requests_total"
+HTTP_REQUEST_DURATION = "mediacrawler_http_request_duration_seconds"
+HTTP_RETRIES = "mediacrawler_http_retries_total"
+HTTP_BYTES = "mediacrawler_http_bytes_total"
+STORE_ITEMS = "mediacrawler_store_items_total"
+STORE_ERRORS = "mediacrawler_store_errors_total"
+STORE_DURATION = "mediacrawler_store_duration_seconds"
+
+# 请求耗时直方图的桶（秒）
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(label_key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(label_key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    """
+    累积直方图，counts[i] 为落在 (buckets[i-1], buckets[i]] 的观测数，最后一个为 +Inf
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> List[int]:
+        result, total = [], 0
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def quantile(self, q: float) -> float:
+        """
+        按桶内线性插值估算分位数，落在 +Inf 桶时返回最大的桶边界
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        lower, seen = 0.0, 0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.buckets[-1] if self.buckets else 0.0
+
+
+class MetricsRegistry:
+    """
+    进程内的指标登记表，计数器 / 仪表 / 直方图按 (指标名, 标签) 区分
+
+    只在事件循环线程中同步更新，不需要加锁；队列深度这类瞬时值由 register_collector 注册的回调在导出前采集
+    """
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._gauges: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._collectors: List[Callable[["MetricsRegistry"], None]] = []
+
+    def describe(self, name: str, metric_type: str, help_text: str):
+        self._help[name] = (metric_type, help_text)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _label_key(labels))
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels):
+        key = (name, _label_key(labels))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = Histogram(buckets)
+            self._histograms[key] = histogram
+        histogram.observe(value)
+
+    def counter_values(self) -> Dict[Tuple[str, LabelKey], float]:
+        return dict(self._counters)
+
+    def get_counter(self, name: str, **labels) -> float:
+        return self._counters.get((name, _label_key(labels)), 0)
+
+    def get_gauge(self, name: str, **labels) -> Optional[float]:
+        return self._gauges.get((name, _label_key(labels)))
+
+    def get_histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self._histograms.get((name, _label_key(labels)))
+
+    def register_collector(self, collector: Callable[["MetricsRegistry"], None]):
+        """
+        注册导出前调用的采集回调，用于更新队列深度等仪表
+        """
+        self._collectors.append(collector)
+
+    def collect(self):
+        for collector in self._collectors:
+            try:
+                collector(self)
+            except Exception as e:
+                utils.logger.warning(f"[MetricsRegistry.collect] collector {collector.__name__} error: {e}")
+
+    def reset(self):
+        self._counters.clear()
+        self._gauges.clear()
+        self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """
+        Prometheus 文本格式
+        """
+        self.collect()
+        lines: List[str] = []
+        described = set()
+
+        def header(name: str, default_type: str):
+            if name in described:
+                return
+            described.add(name)
+            metric_type, help_text = self._help.get(name, (default_type, ""))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        for (name, label_key), value in sorted(self._counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(label_key)} {value}")
+        for (name, label_key), value in sorted(self._gauges.items()):
+            header(name, "gauge")
+            lines.append(f"{name}{_format_labels(label_key)} {value}")
+        for (name, label_key), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+            header(name, "histogram")
+            bounds = [str(bound) for bound in histogram.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, histogram.cumulative_counts()):
+                lines.append(f"{name}_bucket{_format_labels(label_key, ('le', bound))} {count}")
+            lines.append(f"{name}_sum{_format_labels(label_key)} {histogram.sum}")
+            lines.append(f"{name}_count{_format_labels(label_key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        JSON 快照，直方图附带估算的 p50 / p90 / p99
+        """
+        self.collect()
+        return {
+            "timestamp": time.time(),
+            "counters": [
+                {"name": name, "labels": dict(label_key), "value": value}
+                for (name, label_key), value in sorted(self._counters.items())
+            ],
+            "gauges": [
+                {"name": name, "labels": dict(label_key), "value": value}
+                for (name, label_key), value in sorted(self._gauges.items())
+            ],
+            "histograms": [
+                {
+                    "name": name,
+                    "labels": dict(label_key),
+                    "count": histogram.count,
+                    "sum": round(histogram.sum, 6),
+                    "p50": round(histogram.quantile(0.5), 6),
+                    "p90": round(histogram.quantile(0.9), 6),
+                    "p99": round(histogram.quantile(0.99), 6),
+                    "buckets": dict(zip([str(bound) for bound in histogram.buckets] + ["+Inf"], histogram.cumulative_counts())),
+                }
+                for (name, label_key), histogram in sorted(self._histograms.items(), key=lambda item: item[0])
+            ],
+        }
+
+
+_metrics_registry = MetricsRegistry()
+_metrics_registry.describe(HTTP_REQUESTS, "counter", "Platform API requests by endpoint family and status code or exception")
+_metrics_registry.describe(HTTP_REQUEST_DURATION, "histogram", "Time until response headers by endpoint family")
+_metrics_registry.describe(HTTP_RETRIES, "counter", "Request retries scheduled by tenacity")
+_metrics_registry.describe(HTTP_BYTES, "counter", "Request and response body bytes on the wire")
+_metrics_registry.describe(STORE_ITEMS, "counter", "Items written by the store implementations")
+_metrics_registry.describe(STORE_ERRORS, "counter", "Store calls that raised")
+_metrics_registry.describe(STORE_DURATION, "histogram", "Store call duration")
+
+
+def get_metrics() -> MetricsRegistry:
+    """
+    获取进程内共享的指标登记表
+    """
+    return _metrics_registry
+
+
+def record_request(platform: str, endpoint: str, status: str, latency: float):
+    """
+    记录一次平台接口请求
+    Args:
+        platform: 平台
+        endpoint: 接口类型，见 tools.rate_limiter
+        status: 状态码，请求异常时为异常类名
+        latency: 收到响应头为止的耗时（秒）
+    """
+    if not config.ENABLE_METRICS:
+        return
+    _metrics_registry.inc(HTTP_REQUESTS, platform=platform, endpoint=endpoint, status=status)
+    _metrics_registry.observe(HTTP_REQUEST_DURATION, latency, platform=platform, endpoint=endpoint)
+
+
+def record_bytes(platform: str, endpoint: str, direction: str, num_bytes: int):
+    if not config.ENABLE_METRICS or not num_bytes:
+        return
+    _metrics_registry.inc(HTTP_BYTES, num_bytes, platform=platform, endpoint=endpoint, direction=direction)
+
+
+def record_retry(retry_state):
+    """
+    tenacity 的 before_sleep 回调，记录一次重试
+    用法：
+        @retry(stop=stop_after_attempt(3), wait=wait_fixed(1), before_sleep=record_retry)
+    """
+    if not config.ENABLE_METRICS:
+        return
+    function = getattr(retry_state.fn, "__qualname__", "unknown")
+    _metrics_registry.inc(HTTP_RETRIES, platform=config.PLATFORM, function=function)
+
+
+def instrument_store_method(func: Callable[..., Awaitable], item_type: str) -> Callable[..., Awaitable]:
+    """
+    包装存储实现的 store_xxx 方法，记录存储条数、耗时和异常
+    """
+    if getattr(func, "__metrics_instrumented__", False):
+        return func
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not config.ENABLE_METRICS:
+            return await func(*args, **kwargs)
+        labels = {"platform": config.PLATFORM, "store": config.SAVE_DATA_OPTION, "item_type": item_type}
+        start = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException:
+            _metrics_registry.inc(STORE_ERRORS, **labels)
+            raise
+        finally:
+            _metrics_registry.observe(STORE_DURATION, time.monotonic() - start, **labels)
+        _metrics_registry.inc(STORE_ITEMS, **labels)
+        return result
+
+    wrapper.__metrics_instrumented__ = True
+    return wrapper
+
+
+class MetricsExporter:
+    """
+    指标导出：Prometheus 文本格式 HTTP 接口和 / 或定时写入的 JSON 快照
+
+    JSON 快照中的 rates 为两次快照之间各计数器的每秒增量（请求数/秒、存储条数/秒等）
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        prometheus_host: str = "127.0.0.1",
+        prometheus_port: int = 0,
+        snapshot_path: str = "",
+        snapshot_interval: float = 30,
+    ):
+        self.registry = registry
+        self.prometheus_host = prometheus_host
+        self.prometheus_port = prometheus_port
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._snapshot_task: Optional[asyncio.Task] = None
+        self._last_counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._last_snapshot_at = time.monotonic()
+
+    async def start(self):
+        if self.prometheus_port:
+            self._server = await asyncio.start_server(self._handle_http, self.prometheus_host, self.prometheus_port)
+            utils.logger.info(
+                f"[MetricsExporter.start] prometheus metrics on http://{self.prometheus_host}:{self.prometheus_port}/metrics"
+            )
+        if self.snapshot_path and self.snapshot_interval > 0:
+            self._snapshot_task = asyncio.create_task(self._snapshot_loop())
+
+    async def _handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[1].split("?")[0] in ("/", "/metrics"):
+                status, body = "200 OK", self.registry.render_prometheus().encode("utf-8")
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def build_snapshot(self) -> Dict[str, Any]:
+        snapshot = self.registry.snapshot()
+        now = time.monotonic()
+        interval = max(now - self._last_snapshot_at, 1e-6)
+        counters = self.registry.counter_values()
+        snapshot["interval_sec"] = round(interval, 3)
+        snapshot["rates"] = [
+            {"name": name, "labels": dict(label_key), "per_sec": round((value - self._last_counters.get((name, label_key), 0)) / interval, 3)}
+            for (name, label_key), value in sorted(counters.items())
+        ]
+        self._last_counters, self._last_snapshot_at = counters, now
+        return snapshot
+
+    def _write_snapshot(self, snapshot: Dict[str, Any]):
+        directory = os.path.dirname(self.snapshot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.snapshot_path)
+
+    async def write_snapshot(self):
+        await asyncio.to_thread(self._write_snapshot, self.build_snapshot())
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.write_snapshot()
+            except Exception as e:
+                utils.logger.warning(f"[MetricsExporter._snapshot_loop] write metrics snapshot error: {e}")
+
+    async def close(self):
+        if self._snapshot_task:
+            self._snapshot_task.cancel()
+            await asyncio.gather(self._snapshot_task, return_exceptions=True)
+            self._snapshot_task = None
+        if self.snapshot_path:
+            await self.write_snapshot()
+            utils.logger.info(f"[MetricsExporter.close] metrics snapshot saved to {self.snapshot_path}")
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+_metrics_exporters: Dict[int, MetricsExporter] = {}
+
+
+def _get_shard_snapshot_path(path: str) -> str:
+    if not path or config.CRAWLER_SHARD_ID is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_shard{config.CRAWLER_SHARD_ID}{ext}"
+
+
+async def start_metrics_exporter() -> Optional[MetricsExporter]:
+    """
+    启动当前事件循环的指标导出，分片子进程的端口依次加上分片号、快照文件加上分片后缀
+    """
+    if not config.ENABLE_METRICS:
+        return None
+    loop_id = id(asyncio.get_running_loop())
+    exporter = _metrics_exporters.get(loop_id)
+    if exporter is None:
+        port = config.METRICS_PROMETHEUS_PORT
+        if port and config.CRAWLER_SHARD_ID is not None:
+            port += config.CRAWLER_SHARD_ID
+        exporter = MetricsExporter(
+            _metrics_registry,
+            prometheus_host=config.METRICS_PROMETHEUS_HOST,
+            prometheus_port=port,
+            snapshot_path=_get_shard_snapshot_path(config.METRICS_SNAPSHOT_PATH),
+            snapshot_interval=config.METRICS_SNAPSHOT_INTERVAL_SEC,
+        )
+        _metrics_exporters[loop_id] = exporter
+        try:
+            await exporter.start()
+        except OSError as e:
+            utils.logger.error(f"[start_metrics_exporter] start prometheus endpoint error: {e}")
+    return exporter
+
+
+async def close_metrics_exporters():
+    exporters = list(_metrics_exporters.values())
+    _metrics_exporters.clear()
+    for exporter in exporters:
+        try:
+            await exporter.close()
+        except Exception as e:
+            utils.logger.warning(f"[close_metrics_exporters] close metrics exporter error: {e}")
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/rate_limiter.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 自适应请求限流，按 平台 + 接口类型（search / detail / comments / sub_comments / media）维护令牌桶，
+#            所有请求发出前取令牌，并根据响应耗时、429、461/471 验证码和 IP 被封按 AIMD 调整速率，
+#            替代原来散落在各处的固定 CRAWLER_MAX_SLEEP_SEC 休眠
+
+import asyncio
+import re
+import time
+from typing import Dict, Optional, Tuple, Type
+from urllib.parse import urlparse
+
+import httpx
+
+import config
+from tools import utils
+from tools.crawl_scheduler import (
+    PRIORITY_COMMENTS,
+    PRIORITY_DETAIL,
+    PRIORITY_MEDIA,
+    PRIORITY_SEARCH,
+    PRIORITY_SUB_COMMENTS,
+    get_crawl_scheduler,
+    get_request_priority,
+)
+from tools.metrics import MetricsRegistry, get_metrics, record_request
+
+# 接口类型
+ENDPOINT_SEARCH = "search"
+ENDPOINT_DETAIL = "detail"
+ENDPOINT_COMMENTS = "comments"
+ENDPOINT_SUB_COMMENTS = "sub_comments"
+ENDPOINT_MEDIA = "media"
+
+# 各类接口在并发调度器中的优先级
+ENDPOINT_PRIORITIES: Dict[str, int] = {
+    ENDPOINT_SEARCH: PRIORITY_SEARCH,
+    ENDPOINT_DETAIL: PRIORITY_DETAIL,
+    ENDPOINT_COMMENTS: PRIORITY_COMMENTS,
+    ENDPOINT_SUB_COMMENTS: PRIORITY_SUB_COMMENTS,
+    ENDPOINT_MEDIA: PRIORITY_MEDIA,
+}
+
+# 平台限流时返回的状态码：429 请求过多，461/471 小红书等平台的验证码
+THROTTLE_STATUS_CODES = (429, 461, 471)
+
+# 按请求路径（快手为 GraphQL operationName）识别接口类型，按顺序匹配，都不匹配的归为 detail
+_ENDPOINT_PATTERNS = (
+    (ENDPOINT_SUB_COMMENTS, re.compile(r"comment/sub|sub_?comment|reply/reply|comment/list/reply|child_comment|^/p/comment", re.IGNORECASE)),
+    (ENDPOINT_COMMENTS, re.compile(r"comment|reply|hotflow", re.IGNORECASE)),
+    (ENDPOINT_SEARCH, re.compile(r"search", re.IGNORECASE)),
+)
+
+
+def classify_endpoint(url: str) -> str:
+    """
+    根据请求地址识别接口类型
+    Args:
+        url: 请求地址，或快手 GraphQL 的 operationName
+
+    Returns:
+        search / comments / sub_comments / detail
+    """
+    path = urlparse(url).path or url
+    for endpoint, pattern in _ENDPOINT_PATTERNS:
+        if pattern.search(path):
+            return endpoint
+    return ENDPOINT_DETAIL
+
+
+class AdaptiveTokenBucket:
+    """
+    单个接口类型的令牌桶
+
+    - acquire() 按当前速率发放令牌，多个协程按到达顺序排队
+    - on_success() 请求正常时速率线性增加 increase_step，直到 max_rate
+    - on_throttle() 平台限流时速率乘以 decrease_factor（不低于 min_rate）并清空令牌，
+      同一个请求间隔内的多次限流只减速一次，避免并发请求同时失败时速率骤降
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        burst: int = 1,
+        increase_step: float = 0.05,
+        decrease_factor: float = 0.5,
+        adaptive: bool = True,
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.burst = max(burst, 1)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.adaptive = adaptive
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._last_decrease_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        while True:
+            await self.wait_ready()
+            if self.try_acquire():
+                return
+
+    async def wait_ready(self):
+        """
+        按到达顺序排队，等到桶里有令牌为止，不消耗令牌
+        """
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    return
+                # 等待期间速率可能被调整，醒来后重新计算
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def try_acquire(self) -> bool:
+        """
+        不等待，桶里有令牌时取走一个
+        """
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def on_success(self):
+        if not self.adaptive:
+            return
+        self._refill()
+        self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self) -> bool:
+        """
+        平台限流，降低速率
+        Returns:
+            本次是否实际降速
+        """
+        if not self.adaptive:
+            return False
+        now = time.monotonic()
+        if now - self._last_decrease_at < 1 / self.rate:
+            return False
+        self._refill()
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self._tokens = min(self._tokens, 0.0)
+        self._last_decrease_at = now
+        return True
+
+
+class RatePermit:
+    """
+    一次请求的令牌，请求结束后根据响应结果反馈给令牌桶
+
+    进入时先等令牌桶里有令牌，再按优先级从并发调度器获取在途名额并取走令牌，
+    等令牌期间不占用名额，限流较慢的接口不会挡住其他接口和更高优先级的请求；
+    收到响应头后即归还名额，流式读取响应体（媒体下载）不占用名额
+
+    defer_start 为 True 时进入只等令牌就绪，调用方租用代理、签名后再调用 start() 获取名额，
+    这些等待既不占用名额，也不计入响应耗时
+    """
+
+    def __init__(
+        self,
+        limiter: "RateLimiter",
+        endpoint: str,
+        block_errors: Tuple[Type[BaseException], ...],
+        defer_start: bool = False,
+    ):
+        self.limiter = limiter
+        self.endpoint = endpoint
+        self.block_errors = block_errors
+        self.defer_start = defer_start
+        self.status_code: Optional[int] = None
+        self.latency: Optional[float] = None
+        self._start = time.monotonic()
+        self._started = False
+        self._holding_slot = False
+
+    def _release_slot(self):
+        if self._holding_slot:
+            self._holding_slot = False
+            get_crawl_scheduler().release()
+
+    def set_response(self, status_code: int):
+        """
+        记录响应状态码和响应耗时（收到响应头为止，不含流式读取响应体的时间）
+        """
+        self.status_code = status_code
+        self.latency = time.monotonic() - self._start
+        self._release_slot()
+
+    async def start(self):
+        """
+        获取在途名额并取走令牌，响应耗时从这里开始计算
+        """
+        bucket = self.limiter.get_bucket(self.endpoint)
+        priority = get_request_priority(ENDPOINT_PRIORITIES.get(self.endpoint, PRIORITY_DETAIL))
+        scheduler = get_crawl_scheduler()
+        while True:
+            await scheduler.acquire(priority)
+            if bucket.try_acquire():
+                break
+            # 等名额期间令牌被同一接口的其他请求取走，归还名额重新排队
+            scheduler.release()
+            await bucket.wait_ready()
+        self._holding_slot = True
+        self._started = True
+        self._start = time.monotonic()
+
+    async def __aenter__(self) -> "RatePermit":
+        await self.limiter.get_bucket(self.endpoint).wait_ready()
+        if not self.defer_start:
+            await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._release_slot()
+        if not self._started:
+            # 租用代理或签名时出错，请求没有发出，也没有取走令牌
+            return False
+        latency = self.latency if self.latency is not None else time.monotonic() - self._start
+        is_block_error = exc_type is not None and self.block_errors and issubclass(exc_type, self.block_errors)
+        if self.status_code is not None and not is_block_error:
+            record_request(self.limiter.platform, self.endpoint, str(self.status_code), latency)
+        elif exc_type is not None:
+            # 请求异常或 IP 被封（响应正常但内容表示被封）按异常类名计数
+            record_request(self.limiter.platform, self.endpoint, exc_type.__name__, latency)
+        if self.status_code in THROTTLE_STATUS_CODES:
+            self.limiter.on_throttle(self.endpoint, f"status code {self.status_code}")
+        elif is_block_error:
+            self.limiter.on_throttle(self.endpoint, f"{exc_type.__name__}: {exc_val}")
+        elif exc_type is not None and issubclass(exc_type, httpx.TimeoutException):
+            self.limiter.on_throttle(self.endpoint, "request timeout")
+        elif latency > config.RATE_LIMIT_SLOW_RESPONSE_SEC:
+            self.limiter.on_throttle(self.endpoint, f"slow response {latency:.1f}s")
+        elif exc_type is None:
+            self.limiter.get_bucket(self.endpoint).on_success()
+        return False
+
+
+class RateLimiter:
+    """
+    一个平台的限流器，每类接口一个令牌桶
+    """
+
+    def __init__(self, platform: str):
+        self.platform = platform
+        self._buckets: Dict[str, AdaptiveTokenBucket] = {}
+
+    def _build_bucket(self, endpoint: str) -> AdaptiveTokenBucket:
+        base_rate = 1 / config.CRAWLER_MAX_SLEEP_SEC if config.CRAWLER_MAX_SLEEP_SEC > 0 else config.RATE_LIMIT_MAX_RPS
+        rate, max_rate = base_rate, config.RATE_LIMIT_MAX_RPS
+        if endpoint == ENDPOINT_MEDIA:
+            rate = max_rate = config.RATE_LIMIT_MEDIA_RPS
+        return AdaptiveTokenBucket(
+            rate=rate,
+            min_rate=config.RATE_LIMIT_MIN_RPS,
+            max_rate=max(max_rate, base_rate),
+            burst=config.RATE_LIMIT_BURST,
+            increase_step=config.RATE_LIMIT_INCREASE_STEP,
+            decrease_factor=config.RATE_LIMIT_DECREASE_FACTOR,
+            adaptive=config.ENABLE_ADAPTIVE_RATE_LIMIT,
+        )
+
+    def get_bucket(self, endpoint: str) -> AdaptiveTokenBucket:
+        bucket = self._buckets.get(endpoint)
+        if bucket is None:
+            bucket = self._build_bucket(endpoint)
+            self._buckets[endpoint] = bucket
+        return bucket
+
+    def limit(
+        self,
+        url: str,
+        endpoint: Optional[str] = None,
+        block_errors: Tuple[Type[BaseException], ...] = (),
+        defer_start: bool = False,
+    ) -> RatePermit:
+        """
+        用法：
+            async with rate_limiter.limit(url, block_errors=(IPBlockError,)) as permit:
+                response = await client.request(...)
+                permit.set_response(response.status_code)
+        Args:
+            url: 请求地址，用于识别接口类型
+            endpoint: 指定接口类型，不指定时根据 url 识别
+            block_errors: 表示 IP 被封的异常类型，请求中抛出时降速
+            defer_start: 为 True 时发请求前需调用 permit.start()
+
+        Returns:
+
+        """
+        return RatePermit(self, endpoint or classify_endpoint(url), block_errors, defer_start)
+
+    def on_throttle(self, endpoint: str, reason: str):
+        bucket = self.get_bucket(endpoint)
+        if bucket.on_throttle():
+            utils.logger.warning(
+                f"[RateLimiter.on_throttle] {self.platform} {endpoint} throttled ({reason}), "
+                f"slow down to {bucket.rate:.2f} req/s"
+            )
+
+
+_rate_limiters: Dict[int, RateLimiter] = {}
+
+
+def _collect_rate_limit_metrics(registry: MetricsRegistry):
+    """
+    各接口类型令牌桶的当前速率，速率持续下降说明平台在限流
+    """
+    for rate_limiter in _rate_limiters.values():
+        for endpoint, bucket in rate_limiter._buckets.items():
+            registry.set_gauge(
+                "mediacrawler_rate_limit_rps", bucket.rate, platform=rate_limiter.platform, endpoint=endpoint
+            )
+
+
+get_metrics().register_collector(_collect_rate_limit_metrics)
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    获取当前事件循环中当前平台的限流器
+    """
+    loop_id = id(asyncio.get_running_loop())
+    rate_limiter = _rate_limiters.get(loop_id)
+    if rate_limiter is None:
+        rate_limiter = RateLimiter(config.PLATFORM)
+        _rate_limiters[loop_id] = rate_limiter
+    return rate_limiter
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/response_cache.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 持久化 HTTP 响应缓存，缓存帖子详情、创作者主页、视频播放地址等短期内不变的接口响应，
+#            按 请求方法 + URI + 参数（去掉签名、时间戳等每次都变化的字段）生成缓存 key，
+#            各类接口单独设置 TTL，同一份数据在本次运行或重复运行中不再重复请求
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import aiosqlite
+
+import config
+from tools import utils
+
+# 缓存的接口类型
+CACHE_NOTE_DETAIL = "note_detail"
+CACHE_CREATOR_INFO = "creator_info"
+CACHE_PLAY_URL = "play_url"
+
+# 不参与缓存 key 的参数：签名、时间戳、设备指纹、访问令牌等，同一份数据每次请求都不一样
+_VOLATILE_PARAMS = frozenset({
+    "a_bogus", "x-bogus", "x_bogus", "mstoken", "verifyfp", "fp", "w_rid", "wts",
+    "_signature", "signature", "timestamp", "ts", "_t", "xsec_token", "xsec_source",
+})
+
+_CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS responses (
+    platform TEXT NOT NULL,
+    cache_key TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    cached_at REAL NOT NULL,
+    PRIMARY KEY (platform, cache_key)
+)
+"""
+
+_UPSERT_SQL = """
+INSERT INTO responses (platform, cache_key, endpoint, payload, cached_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(platform, cache_key) DO UPDATE SET
+    endpoint = excluded.endpoint, payload = excluded.payload, cached_at = excluded.cached_at
+"""
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            str(key): _normalize(item)
+            for key, item in value.items()
+            if str(key).lower() not in _VOLATILE_PARAMS
+        }
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    # query string 中的参数都是字符串，统一转换后 aid=1 与 {"aid": 1} 得到相同的 key
+    return str(value)
+
+
+def build_cache_key(method: str, uri: str, params: Optional[Dict] = None) -> str:
+    """
+    生成缓存 key
+    Args:
+        method: 请求方法
+        uri: 请求路由，query string 中的参数与 params 合并
+        params: GET 参数或 POST 请求体
+
+    Returns:
+        sha1 摘要
+    """
+    path, _, query = uri.partition("?")
+    merged_params: Dict[str, Any] = {}
+    for pair in filter(None, query.split("&")):
+        key, _, value = pair.partition("=")
+        merged_params[key] = value
+    merged_params.update(params or {})
+    normalized = json.dumps(
+        [method.upper(), path, _normalize(merged_params)],
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    基于 SQLite 的响应缓存，所有平台共用一个数据库文件
+    """
+
+    def __init__(self, db_path: str, platform: str, enabled: bool = True):
+        self.db_path = db_path
+        self.platform = platform
+        self.enabled = enabled
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def _get_db(self) -> aiosqlite.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            db = await aiosqlite.connect(self.db_path, timeout=30)
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.execute(_CREATE_TABLE_SQL)
+            await db.commit()
+            self._db = db
+        return self._db
+
+    @staticmethod
+    def _get_ttl_sec(endpoint: str) -> float:
+        return config.RESPONSE_CACHE_TTL_HOURS.get(endpoint, 0) * 3600
+
+    def _is_enabled(self, endpoint: str) -> bool:
+        return self.enabled and self._get_ttl_sec(endpoint) > 0
+
+    async def get(self, endpoint: str, cache_key: str) -> Optional[Any]:
+        """
+        读取 TTL 内的缓存响应，未命中返回 None
+        """
+        if not self._is_enabled(endpoint):
+            return None
+        min_cached_at = time.time() - self._get_ttl_sec(endpoint)
+        async with self._lock:
+            db = await self._get_db()
+            async with db.execute(
+                "SELECT payload FROM responses WHERE platform = ? AND cache_key = ? AND cached_at >= ?",
+                (self.platform, cache_key, min_cached_at),
+            ) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            self.misses[endpoint] = self.misses.get(endpoint, 0) + 1
+            return None
+        self.hits[endpoint] = self.hits.get(endpoint, 0) + 1
+        return json.loads(row[0])
+
+    async def set(self, endpoint: str, cache_key: str, payload: Any):
+        """
+        写入响应
+        """
+        if not self._is_enabled(endpoint):
+            return
+        row = (self.platform, cache_key, endpoint, json.dumps(payload, ensure_ascii=False), time.time())
+        async with self._lock:
+            db = await self._get_db()
+            await db.execute(_UPSERT_SQL, row)
+            await db.commit()
+
+    async def fetch(
+        self,
+        endpoint: str,
+        method: str,
+        uri: str,
+        params: Optional[Dict],
+        request: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        先查缓存，未命中时发起请求并缓存非空结果（签名也一并跳过）
+        用法：
+            return await get_response_cache().fetch(CACHE_NOTE_DETAIL, "POST", uri, data, lambda: self.post(uri, data))
+        Args:
+            endpoint: 接口类型，决定 TTL
+            method: 请求方法
+            uri: 请求路由
+            params: 请求参数
+            request: 未命中时发起请求的函数
+
+        Returns:
+            响应数据
+        """
+        if not self._is_enabled(endpoint):
+            return await request()
+        cache_key = build_cache_key(method, uri, params)
+        cached = await self.get(endpoint, cache_key)
+        if cached is not None:
+            return cached
+        response = await request()
+        if response:
+            await self.set(endpoint, cache_key, response)
+        return response
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        各类接口的命中次数、未命中次数和命中率
+        """
+        result = {}
+        for endpoint in sorted(set(self.hits) | set(self.misses)):
+            hits, misses = self.hits.get(endpoint, 0), self.misses.get(endpoint, 0)
+            result[endpoint] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+        return result
+
+    async def purge_expired(self):
+        """
+        删除已超过最长 TTL 的缓存，控制数据库大小
+        """
+        max_ttl_sec = max(config.RESPONSE_CACHE_TTL_HOURS.values(), default=0) * 3600
+        async with self._lock:
+            db = await self._get_db()
+            await db.execute(
+                "DELETE FROM responses WHERE platform = ? AND cached_at < ?",
+                (self.platform, time.time() - max_ttl_sec),
+            )
+            await db.commit()
+
+    async def close(self):
+        for endpoint, endpoint_stats in self.stats().items():
+            message = (
+                f"[ResponseCache.close] {self.platform} {endpoint}: {endpoint_stats['hits']} hits, "
+                f"{endpoint_stats['misses']} misses, hit rate {endpoint_stats['hit_rate']:.1%}"
+            )
+            if not endpoint_stats["hits"]:
+                utils.logger.info(message)
+                continue
+            # 命中的响应是之前缓存的旧数据，输出中的点赞数、评论数等字段不是最新的
+            utils.logger.warning(
+                f"{message}, these responses are up to {self._get_ttl_sec(endpoint) / 3600:g}h old; "
+                f"set ENABLE_RESPONSE_CACHE = False to fetch fresh data"
+            )
+        if self._db is not None:
+            await self.purge_expired()
+            db, self._db = self._db, None
+            await db.close()
+
+
+_response_caches: Dict[int, ResponseCache] = {}
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    获取当前事件循环中当前平台的响应缓存
+    """
+    loop_id = id(asyncio.get_running_loop())
+    response_cache = _response_caches.get(loop_id)
+    if response_cache is None:
+        response_cache = ResponseCache(
+            config.RESPONSE_CACHE_DB_PATH, config.PLATFORM, enabled=config.ENABLE_RESPONSE_CACHE
+        )
+        _response_caches[loop_id] = response_cache
+    return response_cache
+
+
+async def close_response_caches():
+    response_caches = list(_response_caches.values())
+    _response_caches.clear()
+    for response_cache in response_caches:
+        try:
+            await response_cache.close()
+        except Exception as e:
+            utils.logger.warning(f"[close_response_caches] close response cache error: {e}")
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/seen_index.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 已爬取内容索引（跨运行去重），按 平台 + 类型 + ID 记录最近一次爬取时间，
+#            重复运行时跳过在 TTL 内已经爬取过的帖子详情和评论，只为新内容或过期内容发请求
+
+import asyncio
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+import aiosqlite
+
+import config
+from tools import utils
+
+# 索引中的内容类型
+ITEM_CONTENT = "content"
+ITEM_COMMENTS = "comments"
+
+# 单条 SQL 中 IN 参数的最大数量（SQLite 默认上限 999）
+_QUERY_CHUNK_SIZE = 500
+
+_CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS seen_items (
+    platform TEXT NOT NULL,
+    item_type TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    last_crawled_at REAL NOT NULL,
+    PRIMARY KEY (platform, item_type, item_id)
+)
+"""
+
+_UPSERT_SQL = """
+INSERT INTO seen_items (platform, item_type, item_id, last_crawled_at) VALUES (?, ?, ?, ?)
+ON CONFLICT(platform, item_type, item_id) DO UPDATE SET last_crawled_at = excluded.last_crawled_at
+"""
+
+
+def _get_ttl_sec(item_type: str) -> float:
+    if item_type == ITEM_COMMENTS:
+        return config.SEEN_INDEX_COMMENT_TTL_HOURS * 3600
+    return config.SEEN_INDEX_CONTENT_TTL_HOURS * 3600
+
+
+class SeenIndex:
+    """
+    基于 SQLite 的已爬取内容索引，所有平台共用一个数据库文件
+    """
+
+    def __init__(self, db_path: str, platform: str, enabled: bool = True):
+        self.db_path = db_path
+        self.platform = platform
+        self.enabled = enabled
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+        self._skipped: Dict[str, int] = {}  # 本次运行按类型统计的跳过数量
+
+    async def _get_db(self) -> aiosqlite.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            db = await aiosqlite.connect(self.db_path, timeout=30)
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.execute(_CREATE_TABLE_SQL)
+            await db.commit()
+            self._db = db
+        return self._db
+
+    async def filter_unseen(self, item_type: str, item_ids: Iterable[str]) -> List[str]:
+        """
+        过滤出需要爬取的 ID：从未爬取过，或上次爬取时间已超过 TTL
+        Args:
+            item_type: 内容类型，content / comments
+            item_ids: 待检查的 ID
+
+        Returns:
+            需要爬取的 ID，保持原有顺序
+        """
+        item_ids = [str(item_id) for item_id in item_ids if item_id]
+        ttl_sec = _get_ttl_sec(item_type)
+        if not self.enabled or ttl_sec <= 0 or not item_ids:
+            return item_ids
+
+        fresh_ids = set()
+        min_crawled_at = time.time() - ttl_sec
+        async with self._lock:
+            db = await self._get_db()
+            for start in range(0, len(item_ids), _QUERY_CHUNK_SIZE):
+                chunk = item_ids[start:start + _QUERY_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                async with db.execute(
+                    f"SELECT item_id FROM seen_items WHERE platform = ? AND item_type = ? "
+                    f"AND last_crawled_at >= ? AND item_id IN ({placeholders})",
+                    (self.platform, item_type, min_crawled_at, *chunk),
+                ) as cursor:
+                    fresh_ids.update(row[0] for row in await cursor.fetchall())
+
+        if fresh_ids:
+            self._skipped[item_type] = self._skipped.get(item_type, 0) + len(fresh_ids)
+            utils.logger.warning(
+                f"[SeenIndex.filter_unseen] skip {len(fresh_ids)} {item_type} crawled within the last {ttl_sec / 3600:g}h"
+            )
+        return [item_id for item_id in item_ids if item_id not in fresh_ids]
+
+    async def is_fresh(self, item_type: str, item_id: str) -> bool:
+        """
+        ID 是否在 TTL 内已经爬取过
+        """
+        return not await self.filter_unseen(item_type, [item_id])
+
+    async def mark_seen(self, item_type: str, item_ids: Iterable[str]):
+        """
+        记录这些 ID 刚刚爬取完成
+        """
+        rows = [(self.platform, item_type, str(item_id), time.time()) for item_id in item_ids if item_id]
+        if not self.enabled or not rows:
+            return
+        async with self._lock:
+            db = await self._get_db()
+            await db.executemany(_UPSERT_SQL, rows)
+            await db.commit()
+
+    def log_skipped_summary(self):
+        """
+        本次运行因 TTL 内已爬取而跳过的数量，这些内容不会出现在本次运行的输出中
+        """
+        if not self._skipped:
+            return
+        skipped = ", ".join(
+            f"{count} {item_type} (TTL {_get_ttl_sec(item_type) / 3600:g}h)" for item_type, count in self._skipped.items()
+        )
+        utils.logger.warning(
+            f"[SeenIndex] {self.platform}: skipped {skipped} already crawled by an earlier run, "
+            f"they are not stored again in this run's output; set ENABLE_SEEN_INDEX = False to crawl them"
+        )
+        self._skipped = {}
+
+    async def close(self):
+        self.log_skipped_summary()
+        if self._db is not None:
+            db, self._db = self._db, None
+            await db.close()
+
+
+_seen_indexes: Dict[int, SeenIndex] = {}
+
+
+def get_seen_index() -> SeenIndex:
+    """
+    获取当前事件循环中当前平台的已爬取内容索引
+    """
+    loop_id = id(asyncio.get_running_loop())
+    seen_index = _seen_indexes.get(loop_id)
+    if seen_index is None:
+        seen_index = SeenIndex(config.SEEN_INDEX_DB_PATH, config.PLATFORM, enabled=config.ENABLE_SEEN_INDEX)
+        _seen_indexes[loop_id] = seen_index
+    return seen_index
+
+
+async def close_seen_indexes():
+    seen_indexes = list(_seen_indexes.values())
+    _seen_indexes.clear()
+    for seen_index in seen_indexes:
+        try:
+            await seen_index.close()
+        except Exception as e:
+            utils.logger.warning(f"[close_seen_indexes] close seen index error: {e}")
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/shard_runner.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# @Desc    : 多进程分片爬取（--workers N）
+#            将关键词 / 指定帖子 / 创作者列表按轮询方式拆分到 N 个子进程，每个子进程使用独立的浏览器目录、
+#            CDP 端口和代理池；文件类存储先写入各自的 _shardN 文件，全部结束后合并到常规文件名
+
+import asyncio
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+
+import config
+from tools import utils
+
+# 搜索模式按关键词分片，详情/创作者模式按各平台配置的列表分片
+SEARCH_SHARD_SOURCE = "KEYWORDS"
+SHARD_SOURCES: Dict[str, Dict[str, str]] = {
+    "xhs": {"detail": "XHS_SPECIFIED_NOTE_URL_LIST", "creator": "XHS_CREATOR_ID_LIST"},
+    "dy": {"detail": "DY_SPECIFIED_ID_LIST", "creator": "DY_CREATOR_ID_LIST"},
+    "ks": {"detail": "KS_SPECIFIED_ID_LIST", "creator": "KS_CREATOR_ID_LIST"},
+    "bili": {"detail": "BILI_SPECIFIED_ID_LIST", "creator": "BILI_CREATOR_ID_LIST"},
+    "wb": {"detail": "WEIBO_SPECIFIED_ID_LIST", "creator": "WEIBO_CREATOR_ID_LIST"},
+    "tieba": {"detail": "TIEBA_SPECIFIED_ID_LIST", "creator": "TIEBA_CREATOR_URL_LIST"},
+    "zhihu": {"detail": "ZHIHU_SPECIFIED_ID_LIST", "creator": "ZHIHU_CREATOR_URL_LIST"},
+}
+
+# 子进程以 spawn 方式启动会重新导入 config，命令行覆盖过的配置需要显式传递
+FORWARDED_CONFIG_KEYS = (
+    "PLATFORM",
+    "LOGIN_TYPE",
+    "CRAWLER_TYPE",
+    "START_PAGE",
+    "KEYWORDS",
+    "ENABLE_GET_COMMENTS",
+    "ENABLE_GET_SUB_COMMENTS",
+    "SAVE_DATA_OPTION",
+    "COOKIES",
+    "CRAWL_RESUME",
+)
+
+# 各子进程的 CDP 调试端口间隔，避免同时启动时抢占同一端口
+CDP_PORT_STEP = 10
+
+_SHARD_FILE_PATTERN = re.compile(r"^(?P<name>.+)_shard\d+\.(?P<ext>csv|json|jsonl)$")
+
+
+def get_shard_file_suffix() -> str:
+    """
+    分片子进程中写入的数据文件名后缀，非分片模式下为空
+    """
+    if config.CRAWLER_SHARD_ID is None:
+        return ""
+    return f"_shard{config.CRAWLER_SHARD_ID}"
+
+
+def get_shard_source(platform: str, crawler_type: str) -> str:
+    if crawler_type == "search":
+        return SEARCH_SHARD_SOURCE
+    source = SHARD_SOURCES.get(platform, {}).get(crawler_type)
+    if not source:
+        raise ValueError(f"[get_shard_source] Unsupported shard target: platform={platform}, type={crawler_type}")
+    return source
+
+
+def get_shard_items(source: str) -> List[str]:
+    if source == SEARCH_SHARD_SOURCE:
+        return [keyword.strip() for keyword in config.KEYWORDS.split(",") if keyword.strip()]
+    return list(getattr(config, source))
+
+
+def apply_shard_items(source: str, items: List[str]):
+    """
+    用分片后的任务覆盖配置；列表原地修改，保证以默认参数引用该列表的函数也能看到分片结果
+    """
+    if source == SEARCH_SHARD_SOURCE:
+        config.KEYWORDS = ",".join(items)
+    else:
+        getattr(config, source)[:] = items
+
+
+def split_into_shards(items: List[str], worker_num: int) -> List[List[str]]:
+    """
+    按轮询方式拆分任务，任务数少于进程数时只返回非空分片
+    """
+    shards = [items[index::worker_num] for index in range(worker_num)]
+    return [shard for shard in shards if shard]
+
+
+def _prepare_worker_browser(shard_id: int):
+    """
+    每个子进程使用独立的浏览器用户目录和 CDP 端口；
+    首次使用时从主目录复制一份，以沿用已保存的登录状态
+    """
+    base_dir_name = config.USER_DATA_DIR % config.PLATFORM
+    config.USER_DATA_DIR = f"{config.USER_DATA_DIR}_shard{shard_id}"
+    for prefix in ("", "cdp_"):
+        base_dir = os.path.join(os.getcwd(), "browser_data", f"{prefix}{base_dir_name}")
+        worker_dir = os.path.join(os.getcwd(), "browser_data", f"{prefix}{config.USER_DATA_DIR % config.PLATFORM}")
+        if os.path.isdir(base_dir) and not os.path.exists(worker_dir):
+            shutil.copytree(base_dir, worker_dir, ignore=shutil.ignore_patterns("Singleton*", "*.lock"))
+    config.CDP_DEBUG_PORT = config.CDP_DEBUG_PORT + shard_id * CDP_PORT_STEP
+
+
+def _shard_worker_main(
+    shard_id: int,
+    source: str,
+    items: List[str],
+    config_overrides: Dict[str, Any],
+    crawl_func: Callable[[], Coroutine],
+    events: multiprocessing.Queue,
+):
+    for key, value in config_overrides.items():
+        setattr(config, key, value)
+    config.CRAWLER_SHARD_ID = shard_id
+    apply_shard_items(source, items)
+    _prepare_worker_browser(shard_id)
+
+    events.put(("start", shard_id, len(items)))
+    start = time.monotonic()
+    try:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(crawl_func())
+        loop.close()
+    except BaseException as e:
+        events.put(("failed", shard_id, time.monotonic() - start, f"{e.__class__.__name__}: {e}"))
+        raise SystemExit(1)
+    events.put(("done", shard_id, time.monotonic() - start, None))
+
+
+class ShardResult:
+    def __init__(self, shard_id: int, items: List[str]):
+        self.shard_id = shard_id
+        self.items = items
+        self.status = "pending"
+        self.elapsed = 0.0
+        self.error: Optional[str] = None
+        self.exitcode: Optional[int] = None
+
+
+class ShardRunner:
+    """
+    启动并监控分片子进程，定期输出各分片状态，结束后汇总成功/失败情况
+    """
+
+    def __init__(self, worker_num: int, crawl_func: Callable[[], Coroutine]):
+        self.worker_num = worker_num
+        self.crawl_func = crawl_func
+        self.source = get_shard_source(config.PLATFORM, config.CRAWLER_TYPE)
+        self.results: List[ShardResult] = []
+
+    def run(self) -> List[ShardResult]:
+        items = get_shard_items(self.source)
+        shards = split_into_shards(items, self.worker_num)
+        if not shards:
+            utils.logger.warning(f"[ShardRunner.run] {self.source} is empty, nothing to crawl")
+            return []
+
+        ctx = multiprocessing.get_context("spawn")
+        events = ctx.Queue()
+        config_overrides = {key: getattr(config, key) for key in FORWARDED_CONFIG_KEYS}
+        processes = []
+        for shard_id, shard_items in enumerate(shards):
+            self.results.append(ShardResult(shard_id, shard_items))
+            process = ctx.Process(
+                target=_shard_worker_main,
+                args=(shard_id, self.source, shard_items, config_overrides, self.crawl_func, events),
+                name=f"MediaCrawler-shard{shard_id}",
+            )
+            process.start()
+            processes.append(process)
+        utils.logger.info(
+            f"[ShardRunner.run] started {len(processes)} workers for {len(items)} items of {self.source}"
+        )
+
+        last_report = time.monotonic()
+        while any(process.is_alive() for process in processes):
+            self._consume_events(events, timeout=1)
+            if time.monotonic() - last_report >= config.CRAWLER_SHARD_PROGRESS_INTERVAL_SEC:
+                last_report = time.monotonic()
+                self._log_progress()
+        for process, result in zip(processes, self.results):
+            process.join()
+            result.exitcode = process.exitcode
+        self._consume_events(events, timeout=0)
+
+        for result in self.results:
+            if result.status != "done":
+                result.status = "failed"
+                result.error = result.error or f"worker exited with code {result.exitcode}"
+        self._log_summary()
+        return self.results
+
+    def _consume_events(self, events: multiprocessing.Queue, timeout: float):
+        while True:
+            try:
+                event = events.get(timeout=timeout) if timeout else events.get_nowait()
+            except queue.Empty:
+                return
+            timeout = 0
+            kind, shard_id = event[0], event[1]
+            result = self.results[shard_id]
+            if kind == "start":
+                result.status = "running"
+                utils.logger.info(f"[ShardRunner] shard {shard_id} started with {event[2]} items")
+            else:
+                result.status, result.elapsed, result.error = kind, event[2], event[3]
+                utils.logger.info(
+                    f"[ShardRunner] shard {shard_id} {kind} in {result.elapsed:.1f}s"
+                    + (f", error: {result.error}" if result.error else "")
+                )
+
+    def _log_progress(self):
+        status = ", ".join(f"shard{result.shard_id}={result.status}" for result in self.results)
+        utils.logger.info(f"[ShardRunner] progress: {status}")
+
+    def _log_summary(self):
+        failed = [result for result in self.results if result.status == "failed"]
+        utils.logger.info(
+            f"[ShardRunner] finished: {len(self.results) - len(failed)} shards succeeded, {len(failed)} failed"
+        )
+        for result in failed:
+            utils.logger.error(
+                f"[ShardRunner] shard {result.shard_id} failed ({result.error}), items: {result.items}"
+            )
+
+
+def _merge_csv(shard_files: List[str], target_file: str):
+    fieldnames: Optional[List[str]] = None
+    if os.path.exists(target_file) and os.path.getsize(target_file) > 0:
+        with open(target_file, newline="", encoding="utf-8-sig") as f:
+            fieldnames = next(csv.reader(f), None)
+    with open(target_file, "a", newline="", encoding="utf-8-sig") as out:
+        writer = None
+        for shard_file in shard_files:
+            with open(shard_file, newline="", encoding="utf-8-sig") as f:
+                reader = csv.DictReader(f)
+                if writer is None:
+                    fieldnames = fieldnames or reader.fieldnames
+                    if not fieldnames:
+                        continue
+                    writer = csv.DictWriter(out, fieldnames=fieldnames, extrasaction="ignore")
+                    if out.tell() == 0:
+                        writer.writeheader()
+                writer.writerows(reader)
+
+
+def _merge_json(shard_files: List[str], target_file: str):
+    merged: List[Any] = []
+    for file_path in [target_file] + shard_files:
+        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+            with open(file_path, encoding="utf-8") as f:
+                data = json.load(f)
+            merged.extend(data if isinstance(data, list) else [data])
+    with open(target_file, "w", encoding="utf-8") as f:
+        f.write(json.dumps(merged, ensure_ascii=False, indent=4))
+
+
+def _merge_jsonl(shard_files: List[str], target_file: str):
+    with open(target_file, "ab") as out:
+        for shard_file in shard_files:
+            with open(shard_file, "rb") as f:
+                shutil.copyfileobj(f, out)
+
+
+_MERGERS = {"csv": _merge_csv, "json": _merge_json, "jsonl": _merge_jsonl}
+
+
+def merge_shard_files(platform: str, file_type: str) -> List[str]:
+    """
+    将各分片写入的 data/<platform>/<file_type>/*_shardN.<file_type> 文件合并到常规文件名，合并后删除分片文件
+    Args:
+        platform: 平台
+        file_type: csv / json / jsonl
+
+    Returns:
+        合并后的文件路径
+    """
+    merger = _MERGERS.get(file_type)
+    if merger is None:
+        return []
+    groups: Dict[str, List[str]] = {}
+    for shard_file in sorted(glob.glob(f"data/{platform}/{file_type}/*_shard*.{file_type}")):
+        match = _SHARD_FILE_PATTERN.match(os.path.basename(shard_file))
+        if match:
+            target_file = os.path.join(os.path.dirname(shard_file), f"{match.group('name')}.{file_type}")
+            groups.setdefault(target_file, []).append(shard_file)
+
+    for target_file, shard_files in groups.items():
+        merger(shard_files, target_file)
+        for shard_file in shard_files:
+            os.remove(shard_file)
+        utils.logger.info(f"[merge_shard_files] merged {len(shard_files)} shard files into {target_file}")
+    return list(groups)
+
+
+async def run_sharded_crawl(worker_num: int, crawl_func: Callable[[], Coroutine]) -> List[str]:
+    """
+    以 worker_num 个子进程分片爬取，并合并文件类存储的分片结果
+    Args:
+        worker_num: 子进程数量
+        crawl_func: 子进程中执行的爬取协程函数（需为模块级函数，可被 pickle）
+
+    Returns:
+        合并后的数据文件路径
+    """
+    runner = ShardRunner(worker_num, crawl_func)
+    await asyncio.to_thread(runner.run)
+    return await asyncio.to_thread(merge_shard_files, config.PLATFORM, config.SAVE_DATA_OPTION)
@@ -19,27 +19,18 @@
 
 
 import argparse
-import logging
 
 from .crawler_util import *
+from .log_util import format_payload, get_logger, init_logging, log_payload
 from .slider_util import *
 from .time_util import *
 
 
 def init_loging_config():
-    level = logging.INFO
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s %(name)s %(levelname)s (%(filename)s:%(lineno)d) - %(message)s",
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    _logger = logging.getLogger("MediaCrawler")
-    _logger.setLevel(level)
-
-    # 关闭 httpx 的 INFO 日志
-    logging.getLogger("httpx").setLevel(logging.WARNING)
-
-    return _logger
+    """
+    日志在后台线程输出，级别、格式和分类级别见 config 中的日志配置
+    """
+    return init_logging()
 
 
 logger = init_loging_config()